@@ -0,0 +1,196 @@
+"""
+Control de admisión de la Event Processor API
+=============================================
+
+Este archivo contiene la protección del worker frente a sobrecarga:
+
+- LoopLagMonitor: tarea en segundo plano que mide continuamente el retraso del event
+  loop (cuánto tarda en despertar un sleep respecto a lo previsto). Un lag alto indica
+  que hay trabajo de CPU acumulado y que cualquier petición nueva va a esperar.
+- AdmissionController: cuenta las peticiones en curso y decide si una petición nueva
+  entra, espera en una cola acotada o se rechaza.
+- AdmissionControlMiddleware: middleware ASGI que aplica el controlador a los
+  endpoints de procesamiento y responde 429 con Retry-After al rechazar. El resto de
+  rutas (en particular /health/ y /health/ready) nunca pasa por el controlador.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Optional
+
+from .asgi_utils import send_json_error
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Endpoints sujetos a control de admisión
+ADMISSION_PATHS = frozenset({"/events/process", "/process_events", "/events/store"})
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+class LoopLagMonitor:
+    """
+    Mide el retraso del event loop en segundo plano.
+
+    Attributes:
+        interval: Segundos entre mediciones
+        lag: Último retraso medido, en segundos
+    """
+
+    def __init__(self, interval: float = 0.05):
+        self.interval = interval
+        self.lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+        self._histogram = metrics.histogram("event_loop_lag_seconds", "Retraso del event loop",
+                                            buckets=LAG_BUCKETS)
+        self._gauge = metrics.gauge("event_loop_lag_last_seconds", "Último retraso medido del event loop")
+
+    def start(self) -> None:
+        """Arranca la tarea de medición en el event loop actual."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Detiene la tarea de medición."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.lag = 0.0
+
+    def record(self, lag: float) -> None:
+        """Registra una medición de retraso."""
+        self.lag = lag
+        self._gauge.set(lag)
+        self._histogram.observe(lag)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.record(max(0.0, loop.time() - start - self.interval))
+
+
+class AdmissionController:
+    """
+    Decide la admisión de peticiones según el retraso del loop y la concurrencia.
+
+    Una petición se rechaza si el lag supera max_lag. Si hay max_inflight peticiones en
+    curso espera en una cola de como mucho max_queue peticiones, hasta queue_timeout
+    segundos; al liberarse un hueco se entrega directamente a la primera de la cola.
+    Un límite a 0 lo desactiva.
+    """
+
+    def __init__(self, monitor: LoopLagMonitor, max_inflight: int = 0, max_queue: int = 0,
+                 queue_timeout: float = 1.0, max_lag: float = 0.0):
+        self.monitor = monitor
+        self.max_inflight = max_inflight
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_lag = max_lag
+        self.inflight = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._inflight_gauge = metrics.gauge("admission_inflight", "Peticiones admitidas en curso")
+        self._queued_gauge = metrics.gauge("admission_queued", "Peticiones esperando admisión")
+        self._queue_wait = metrics.histogram("admission_queue_wait_seconds", "Espera en la cola de admisión")
+
+    def _shed(self, reason: str) -> str:
+        metrics.counter("admission_shed_total", "Peticiones rechazadas por sobrecarga",
+                        labels={"reason": reason}).inc()
+        return reason
+
+    def _update_gauges(self) -> None:
+        self._inflight_gauge.set(self.inflight)
+        self._queued_gauge.set(len(self._waiters))
+
+    async def acquire(self) -> Optional[str]:
+        """
+        Intenta admitir una petición.
+
+        Returns:
+            Optional[str]: None si se admite; si no, el motivo del rechazo
+            (lag, concurrency o queue_timeout)
+        """
+        if self.max_lag and self.monitor.lag > self.max_lag:
+            return self._shed("lag")
+
+        if not self.max_inflight or (self.inflight < self.max_inflight and not self._waiters):
+            self.inflight += 1
+            self._update_gauges()
+            return None
+
+        if len(self._waiters) >= self.max_queue:
+            return self._shed("concurrency")
+
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._waiters.append(waiter)
+        self._update_gauges()
+        start = loop.time()
+        try:
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except asyncio.TimeoutError:
+            return self._shed("queue_timeout")
+        except asyncio.CancelledError:
+            # Si el hueco ya se había entregado hay que devolverlo
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+            self._update_gauges()
+            self._queue_wait.observe(loop.time() - start)
+        return None
+
+    def release(self) -> None:
+        """Libera el hueco de una petición admitida."""
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # El hueco pasa a la petición en espera: inflight no cambia
+                waiter.set_result(None)
+                self._update_gauges()
+                return
+        self.inflight -= 1
+        self._update_gauges()
+
+
+class AdmissionControlMiddleware:
+    """
+    Middleware ASGI que aplica el control de admisión a los endpoints de procesamiento.
+    """
+
+    def __init__(self, app, controller: AdmissionController, retry_after: int = 1,
+                 paths: frozenset = ADMISSION_PATHS):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+        self._headers = [(b"retry-after", str(retry_after).encode())]
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+            or scope.get("warmup")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        reason = await self.controller.acquire()
+        if reason is not None:
+            await self._reject(send, reason)
+            return
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release()
+
+    async def _reject(self, send, reason: str) -> None:
+        logger.debug(f"🚦 Petición rechazada por sobrecarga ({reason})")
+        await send_json_error(send, 429, "Servicio sobrecargado, reintente más tarde",
+                              f"OVERLOADED_{reason.upper()}", self._headers)
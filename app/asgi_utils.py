@@ -0,0 +1,139 @@
+"""
+Utilidades ASGI compartidas por los middlewares
+===============================================
+"""
+
+import json
+import re
+from typing import List, Optional, Tuple
+
+Headers = List[Tuple[bytes, bytes]]
+
+# Clave cuyo número de apariciones en el cuerpo da el número de eventos de una petición
+EVENT_MARKER = b'"event_id"'
+# Solo como clave: seguida (tras espacios opcionales) de ":". Un string con el valor
+# exacto event_id también se serializa como "event_id", pero le sigue "," "]" o "}"
+_EVENT_KEY = EVENT_MARKER + b":"
+_SPACED_EVENT_KEY = re.compile(rb'"event_id"[ \t\r\n]+:')
+_JSON_SPACES = b" \t\r\n"
+
+
+def count_events(body: bytes) -> int:
+    """
+    Cuenta los eventos de un cuerpo JSON sin parsearlo.
+
+    Cuenta las claves "event_id": dentro de un string JSON las comillas van escapadas,
+    así que solo un valor que sea exactamente event_id produce el texto "event_id", y
+    a un valor no le sigue ":".
+
+    Args:
+        body: Cuerpo completo de la petición
+
+    Returns:
+        int: Número de claves "event_id"
+    """
+    keys = body.count(_EVENT_KEY)
+    if body.count(EVENT_MARKER) == keys:
+        return keys  # Lo habitual (sin valores event_id ni espacios antes de ":"): dos bytes.count
+    return keys + len(_SPACED_EVENT_KEY.findall(body))
+
+
+class EventCounter:
+    """
+    Cuenta las claves "event_id" de un cuerpo que llega en fragmentos.
+
+    Una clave puede quedar partida entre dos fragmentos, también entre las comillas y
+    los ":" (con espacios en medio): se guarda el final del fragmento que aún podría
+    ser el principio de una clave y se antepone al siguiente.
+
+    Attributes:
+        count: Claves contadas hasta ahora
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._tail = b""
+
+    def feed(self, chunk: bytes) -> int:
+        """
+        Cuenta las claves de un fragmento.
+
+        Returns:
+            int: Claves contadas en total
+        """
+        buffer = self._tail + chunk
+        self.count += count_events(buffer)
+        if buffer.rstrip(_JSON_SPACES).endswith(EVENT_MARKER):
+            self._tail = EVENT_MARKER  # Los espacios que faltan por cerrar no importan
+        else:
+            self._tail = b""
+            for size in range(min(len(EVENT_MARKER) - 1, len(buffer)), 0, -1):
+                if EVENT_MARKER.startswith(buffer[-size:]):
+                    self._tail = buffer[-size:]
+                    break
+        return self.count
+
+
+async def send_json_error(send, status: int, detail: str, error_code: str,
+                          headers: Optional[Headers] = None) -> None:
+    """
+    Envía una respuesta de error con el formato de ErrorResponse sin pasar por FastAPI.
+
+    Args:
+        send: Canal send de ASGI
+        status: Código de estado HTTP
+        detail: Descripción del error
+        error_code: Código de error interno
+        headers: Cabeceras adicionales
+    """
+    body = json.dumps({"detail": detail, "error_code": error_code}).encode()
+    response_headers = [
+        (b"content-type", b"application/json"),
+        (b"content-length", str(len(body)).encode()),
+    ]
+    response_headers.extend(headers or ())
+    await send({"type": "http.response.start", "status": status, "headers": response_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+async def read_body(receive) -> Optional[bytes]:
+    """
+    Lee el cuerpo completo de una petición.
+
+    Args:
+        receive: Canal receive de ASGI
+
+    Returns:
+        Optional[bytes]: Cuerpo de la petición, o None si el cliente se desconectó
+    """
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            return b"".join(chunks)
+
+
+def replay_receive(body: bytes, receive):
+    """
+    Crea un canal receive que entrega primero un cuerpo ya leído.
+
+    Args:
+        body: Cuerpo leído previamente
+        receive: Canal receive original (para la desconexión posterior)
+
+    Returns:
+        Callable: Canal receive para la aplicación interna
+    """
+    delivered = False
+
+    async def wrapper():
+        nonlocal delivered
+        if not delivered:
+            delivered = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return await receive()
+
+    return wrapper
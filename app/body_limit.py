@@ -0,0 +1,118 @@
+"""
+Límite de tamaño del cuerpo de las peticiones
+=============================================
+
+Este archivo contiene un middleware ASGI que rechaza con 413 los cuerpos demasiado
+grandes antes de parsearlos:
+
+- Si Content-Length ya supera el límite de bytes, se responde sin leer el cuerpo.
+- Si no, se cuentan los bytes según llegan y se corta en cuanto se supera el límite
+  (también con Transfer-Encoding: chunked, sin Content-Length).
+- En los endpoints de procesamiento se cuentan además los eventos según llegan (las
+  claves "event_id", ver asgi_utils.EventCounter) y se corta en cuanto pasan
+  de max_events_per_request, sin esperar a que Pydantic lo detecte tras parsear todo.
+
+El cuerpo aceptado queda en memoria (como mucho max_bytes) y se entrega a la
+aplicación tal cual.
+"""
+
+import logging
+from typing import Optional
+
+from .asgi_utils import EventCounter, replay_receive, send_json_error
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Métodos cuyo cuerpo se limita
+BODY_METHODS = frozenset({"POST", "PUT", "PATCH"})
+
+# Endpoints en los que se cuentan los eventos
+EVENT_PATHS = frozenset({"/events/process", "/process_events", "/events/store"})
+
+_CLOSE = [(b"connection", b"close")]
+
+
+class BodyTooLarge(Exception):
+    """El cuerpo supera uno de los límites."""
+
+    def __init__(self, reason: str, detail: str):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+
+
+class BodyLimitMiddleware:
+    """
+    Middleware ASGI que limita el tamaño del cuerpo y el número de eventos.
+
+    Attributes:
+        max_bytes: Tamaño máximo del cuerpo
+        max_events: Eventos máximos por petición en EVENT_PATHS (None = sin contar)
+    """
+
+    def __init__(self, app, max_bytes: int, max_events: Optional[int] = None,
+                 event_paths: frozenset = EVENT_PATHS):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.max_events = max_events
+        self.event_paths = event_paths
+        self._rejected = {
+            reason: metrics.counter("body_limit_rejected_total", "Peticiones rechazadas por tamaño",
+                                    labels={"reason": reason})
+            for reason in ("content_length", "bytes", "events")
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in BODY_METHODS:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            self._check_content_length(scope)
+            count = self.max_events is not None and scope["path"] in self.event_paths
+            body = await self._read_limited(receive, count)
+        except BodyTooLarge as e:
+            self._rejected[e.reason].inc()
+            logger.warning(f"📦 Cuerpo rechazado ({e.reason}): {e.detail}")
+            await send_json_error(send, 413, e.detail, "PAYLOAD_TOO_LARGE", _CLOSE)
+            return
+
+        if body is None:
+            return  # El cliente se desconectó
+        await self.app(scope, replay_receive(body, receive), send)
+
+    def _check_content_length(self, scope) -> None:
+        for name, value in scope["headers"]:
+            if name == b"content-length":
+                try:
+                    length = int(value)
+                except ValueError:
+                    return
+                if length > self.max_bytes:
+                    raise BodyTooLarge("content_length",
+                                       f"El cuerpo ({length} bytes) supera el máximo de {self.max_bytes} bytes")
+                return
+
+    async def _read_limited(self, receive, count: bool) -> Optional[bytes]:
+        chunks = []
+        received = 0
+        events = EventCounter()
+
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                return None
+            chunk = message.get("body", b"")
+            received += len(chunk)
+            if received > self.max_bytes:
+                raise BodyTooLarge("bytes", f"El cuerpo supera el máximo de {self.max_bytes} bytes")
+
+            if count and chunk:
+                if events.feed(chunk) > self.max_events:
+                    raise BodyTooLarge("events",
+                                       f"La solicitud supera el máximo de {self.max_events} eventos")
+
+            chunks.append(chunk)
+            if not message.get("more_body", False):
+                return b"".join(chunks)
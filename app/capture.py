@@ -0,0 +1,201 @@
+"""
+Captura de tráfico de la Event Processor API
+============================================
+
+Este archivo contiene el middleware ASGI que graba los cuerpos y la temporización
+de las peticiones a los endpoints de eventos, y el formato del archivo de captura.
+
+El archivo de captura es JSON Lines comprimido con gzip: una línea por petición con
+el instante de llegada, el método, la ruta, el cuerpo original, el estado y la
+duración. La escritura la hace un hilo aparte a partir de una cola acotada, así que
+el camino de la petición solo paga el encolado; si la cola se llena el registro se
+descarta y se cuenta en `dropped`.
+"""
+
+import gzip
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Endpoints cuyo tráfico se graba
+CAPTURE_PATHS = frozenset({"/events/process", "/process_events"})
+
+
+@dataclass
+class CaptureRecord:
+    """
+    Petición grabada.
+
+    Attributes:
+        t: Instante de llegada (epoch UTC, segundos con decimales)
+        method: Método HTTP
+        path: Ruta de la petición
+        body: Cuerpo original de la petición
+        status: Código de estado de la respuesta
+        duration_ms: Duración del procesamiento en milisegundos
+    """
+    t: float
+    method: str
+    path: str
+    body: str
+    status: int
+    duration_ms: float
+
+
+class CaptureWriter:
+    """
+    Escribe registros de captura desde un hilo en segundo plano.
+    """
+
+    _STOP = object()
+
+    def __init__(self, path: str, max_queue: int = 10_000, flush_interval: float = 1.0):
+        """
+        Args:
+            path: Archivo de captura; "{pid}" se sustituye por el PID del proceso,
+                  para que cada worker escriba su propio archivo
+            max_queue: Máximo de registros pendientes antes de descartar
+            flush_interval: Segundos entre vaciados del buffer a disco
+        """
+        self.path = Path(path.format(pid=os.getpid()))
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.written = 0
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Arranca el hilo escritor."""
+        if self._thread is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, name="capture-writer", daemon=True)
+        self._thread.start()
+        logger.info(f"📼 Captura de tráfico activa en {self.path}")
+
+    def submit(self, record: CaptureRecord) -> None:
+        """
+        Encola un registro sin bloquear.
+
+        Args:
+            record: Registro a escribir
+        """
+        try:
+            self._queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self) -> None:
+        """Vacía los registros pendientes y detiene el hilo escritor."""
+        if self._thread is None:
+            return
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self._thread = None
+        if self.dropped:
+            logger.warning(f"⚠️ Captura: {self.dropped} registros descartados por cola llena")
+
+    def _run(self) -> None:
+        with gzip.open(self.path, "at", encoding="utf-8") as capture_file:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    record = self._queue.get(timeout=self.flush_interval)
+                except queue.Empty:
+                    record = None
+
+                if record is self._STOP:
+                    break
+                if record is not None:
+                    capture_file.write(json.dumps(asdict(record), separators=(",", ":")) + "\n")
+                    self.written += 1
+
+                if time.monotonic() - last_flush >= self.flush_interval:
+                    capture_file.flush()
+                    last_flush = time.monotonic()
+
+
+class TrafficCaptureMiddleware:
+    """
+    Middleware ASGI que graba una muestra de las peticiones a los endpoints de eventos.
+    """
+
+    def __init__(self, app, writer: CaptureWriter, sample_rate: float = 1.0,
+                 paths: Iterable[str] = CAPTURE_PATHS):
+        self.app = app
+        self.writer = writer
+        self.sample_rate = sample_rate
+        self.paths = frozenset(paths)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] != "POST"
+            or scope["path"] not in self.paths
+            or scope.get("warmup")
+            or (self.sample_rate < 1.0 and random.random() >= self.sample_rate)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks: List[bytes] = []
+        status = 500
+        arrival = time.time()
+        start = time.perf_counter()
+
+        async def receive_wrapper():
+            message = await receive()
+            if message["type"] == "http.request":
+                chunks.append(message.get("body", b""))
+            return message
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive_wrapper, send_wrapper)
+        finally:
+            self.writer.submit(CaptureRecord(
+                t=arrival,
+                method=scope["method"],
+                path=scope["path"],
+                body=b"".join(chunks).decode("utf-8", errors="replace"),
+                status=status,
+                duration_ms=(time.perf_counter() - start) * 1000,
+            ))
+
+
+def read_capture(paths: Iterable[str]) -> Iterator[CaptureRecord]:
+    """
+    Lee uno o varios archivos de captura, ordenados por instante de llegada.
+
+    Args:
+        paths: Archivos de captura (por ejemplo, uno por worker)
+
+    Returns:
+        Iterator[CaptureRecord]: Registros en orden cronológico
+    """
+    records = []
+    for path in paths:
+        with gzip.open(path, "rt", encoding="utf-8") as capture_file:
+            try:
+                for line in capture_file:
+                    if line.strip():
+                        records.append(CaptureRecord(**json.loads(line)))
+            except (EOFError, json.JSONDecodeError):
+                # Archivo truncado (el proceso murió sin cerrar la captura)
+                pass
+    records.sort(key=lambda record: record.t)
+    return iter(records)
@@ -0,0 +1,409 @@
+"""
+Compresión de cuerpos de petición y respuesta
+=============================================
+
+Este archivo contiene dos middlewares ASGI:
+
+- RequestDecompressionMiddleware: acepta cuerpos con Content-Encoding gzip, deflate o
+  zstd. Descomprime según llega el cuerpo y corta con 413 en cuanto la salida supera
+  el límite (protección frente a bombas de descompresión). La aplicación recibe el
+  cuerpo ya descomprimido, con Content-Length actualizado.
+- ResponseCompressionMiddleware: comprime las respuestas con la mejor codificación
+  aceptada por el cliente (Accept-Encoding) entre zstd, br y gzip, solo si el tipo de
+  contenido es comprimible y el cuerpo llega a un tamaño mínimo. Las respuestas en
+  streaming se comprimen por fragmentos. El ETag de una respuesta comprimida lleva la
+  codificación como sufijo (conditional.encoded_etag).
+
+zstd y brotli son opcionales (paquetes zstandard y brotli): si no están instalados,
+esas codificaciones simplemente no se ofrecen. gzip y deflate usan zlib.
+"""
+
+import io
+import logging
+import zlib
+from typing import Dict, List, Optional, Sequence
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from .asgi_utils import replay_receive, send_json_error
+from .conditional import encoded_etag
+from .metrics import metrics
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - dependencia opcional
+    zstandard = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - dependencia opcional
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Tipos de contenido que merece la pena comprimir
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def available_encodings() -> List[str]:
+    """Codificaciones de respuesta disponibles con los paquetes instalados."""
+    encodings = ["gzip"]
+    if brotli is not None:
+        encodings.insert(0, "br")
+    if zstandard is not None:
+        encodings.insert(0, "zstd")
+    return encodings
+
+
+def request_encodings() -> List[str]:
+    """Codificaciones aceptadas en el cuerpo de las peticiones."""
+    encodings = ["gzip", "deflate"]
+    if zstandard is not None:
+        encodings.append("zstd")
+    return encodings
+
+
+class DecompressionError(Exception):
+    """El cuerpo comprimido es inválido o descomprimido supera el límite."""
+
+    def __init__(self, status: int, error_code: str, detail: str):
+        super().__init__(detail)
+        self.status = status
+        self.error_code = error_code
+        self.detail = detail
+
+
+def _too_large(max_bytes: int) -> DecompressionError:
+    return DecompressionError(413, "PAYLOAD_TOO_LARGE",
+                              f"El cuerpo descomprimido supera el máximo de {max_bytes} bytes")
+
+
+async def _decompress_zlib(receive, wbits: int, max_bytes: int) -> Optional[bytes]:
+    """Descomprime gzip/deflate según llega, sin producir nunca más de max_bytes + 1."""
+    decompressor = zlib.decompressobj(wbits)
+    output = []
+    total = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        data = message.get("body", b"")
+        while data:
+            piece = decompressor.decompress(data, max_bytes - total + 1)
+            total += len(piece)
+            if total > max_bytes:
+                raise _too_large(max_bytes)
+            output.append(piece)
+            data = decompressor.unconsumed_tail
+        if not message.get("more_body", False):
+            break
+    if not decompressor.eof:
+        raise zlib.error("flujo comprimido incompleto")
+    return b"".join(output)
+
+
+async def _decompress_zstd(receive, max_bytes: int) -> Optional[bytes]:
+    """Descomprime zstd leyendo la salida por bloques para no materializar una bomba."""
+    compressed = []
+    received = 0
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            return None
+        chunk = message.get("body", b"")
+        received += len(chunk)
+        if received > max_bytes:  # La entrada comprimida tampoco puede superar el límite
+            raise _too_large(max_bytes)
+        compressed.append(chunk)
+        if not message.get("more_body", False):
+            break
+
+    output = []
+    total = 0
+    reader = zstandard.ZstdDecompressor().stream_reader(io.BytesIO(b"".join(compressed)))
+    with reader:
+        while True:
+            piece = reader.read(CHUNK_SIZE)
+            if not piece:
+                break
+            total += len(piece)
+            if total > max_bytes:
+                raise _too_large(max_bytes)
+            output.append(piece)
+    return b"".join(output)
+
+
+class RequestDecompressionMiddleware:
+    """
+    Middleware ASGI que descomprime los cuerpos de petición con Content-Encoding.
+
+    Attributes:
+        max_bytes: Tamaño máximo del cuerpo descomprimido
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+        self.encodings = frozenset(request_encodings())
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = Headers(scope=scope).get("content-encoding", "identity").strip().lower()
+        if encoding == "identity":
+            await self.app(scope, receive, send)
+            return
+        if encoding not in self.encodings:
+            await send_json_error(send, 415, f"Content-Encoding no soportado: {encoding}",
+                                  "UNSUPPORTED_ENCODING")
+            return
+
+        try:
+            if encoding == "zstd":
+                body = await _decompress_zstd(receive, self.max_bytes)
+            else:
+                wbits = 16 + zlib.MAX_WBITS if encoding == "gzip" else zlib.MAX_WBITS
+                body = await _decompress_zlib(receive, wbits, self.max_bytes)
+        except DecompressionError as e:
+            metrics.counter("request_decompression_rejected_total", "Cuerpos comprimidos rechazados",
+                            labels={"reason": "too_large"}).inc()
+            logger.warning(f"📦 Cuerpo {encoding} rechazado: {e.detail}")
+            await send_json_error(send, e.status, e.detail, e.error_code, [(b"connection", b"close")])
+            return
+        except Exception as e:  # zlib.error, zstandard.ZstdError
+            metrics.counter("request_decompression_rejected_total", "Cuerpos comprimidos rechazados",
+                            labels={"reason": "invalid"}).inc()
+            await send_json_error(send, 400, f"Cuerpo {encoding} inválido: {e}", "INVALID_ENCODING")
+            return
+
+        if body is None:
+            return  # El cliente se desconectó
+
+        metrics.counter("request_decompression_total", "Cuerpos de petición descomprimidos",
+                        labels={"encoding": encoding}).inc()
+        headers = [
+            (name, value) for name, value in scope["headers"]
+            if name not in (b"content-encoding", b"content-length")
+        ]
+        headers.append((b"content-length", str(len(body)).encode()))
+        await self.app(dict(scope, headers=headers), replay_receive(body, receive), send)
+
+
+class _StreamCompressor:
+    """Compresor incremental con la misma interfaz para todas las codificaciones."""
+
+    def __init__(self, encoding: str, level: int):
+        self.encoding = encoding
+        if encoding == "gzip":
+            self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        elif encoding == "zstd":
+            self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+        else:
+            self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        """Comprime un fragmento y vacía el compresor para que el cliente lo reciba ya."""
+        if self.encoding == "gzip":
+            return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+        if self.encoding == "zstd":
+            return self._compressor.compress(data) + self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+def compress_bytes(data: bytes, encoding: str, level: int) -> bytes:
+    """
+    Comprime un cuerpo completo.
+
+    Args:
+        data: Cuerpo sin comprimir
+        encoding: gzip, zstd o br
+        level: Nivel de compresión de la codificación
+
+    Returns:
+        bytes: Cuerpo comprimido
+    """
+    if encoding == "gzip":
+        compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    if encoding == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return brotli.compress(data, quality=level)
+
+
+def parse_accept_encoding(value: str) -> Dict[str, float]:
+    """
+    Interpreta una cabecera Accept-Encoding.
+
+    Args:
+        value: Valor de la cabecera, p. ej. "gzip, br;q=0.8, *;q=0"
+
+    Returns:
+        Dict[str, float]: Calidad (q) por codificación
+    """
+    accepted = {}
+    for part in value.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name] = quality
+    return accepted
+
+
+class ResponseCompressionMiddleware:
+    """
+    Middleware ASGI de compresión negociada de respuestas.
+
+    Attributes:
+        minimum_size: Tamaño mínimo del cuerpo para comprimirlo
+        encodings: Codificaciones ofrecidas, en orden de preferencia del servidor
+        levels: Nivel de compresión por codificación
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, encodings: Sequence[str] = ("zstd", "br", "gzip"),
+                 levels: Optional[Dict[str, int]] = None):
+        self.app = app
+        self.minimum_size = minimum_size
+        available = available_encodings()
+        self.encodings = [encoding for encoding in encodings if encoding in available]
+        self.levels = {"gzip": 6, "zstd": 3, "br": 4, **(levels or {})}
+        self._negotiated: Dict[str, Optional[str]] = {}  # Caché por valor de Accept-Encoding
+
+    def negotiate(self, accept_encoding: str) -> Optional[str]:
+        """
+        Elige la codificación de la respuesta.
+
+        Gana la de mayor q aceptada por el cliente; a igual q, la preferida por el servidor.
+
+        Args:
+            accept_encoding: Cabecera Accept-Encoding de la petición
+
+        Returns:
+            Optional[str]: Codificación elegida, o None para no comprimir
+        """
+        if accept_encoding in self._negotiated:
+            return self._negotiated[accept_encoding]
+
+        accepted = parse_accept_encoding(accept_encoding)
+        wildcard = accepted.get("*", 0.0)
+        best, best_quality = None, 0.0
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_quality:
+                best, best_quality = encoding, quality
+
+        if len(self._negotiated) < 256:
+            self._negotiated[accept_encoding] = best
+        return best
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = self.negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self.levels[encoding], self.minimum_size,
+                                          Headers(scope=scope).get("if-none-match", ""))
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    """Envoltorio de send que decide y aplica la compresión de una respuesta."""
+
+    def __init__(self, send, encoding: str, level: int, minimum_size: int, if_none_match: str = ""):
+        self._send = send
+        self.encoding = encoding
+        self.level = level
+        self.minimum_size = minimum_size
+        self.if_none_match = if_none_match
+        self._start: Optional[dict] = None
+        self._mode: Optional[str] = None  # passthrough, stream
+        self._compressor: Optional[_StreamCompressor] = None
+
+    async def send(self, message) -> None:
+        if message["type"] == "http.response.start":
+            self._start = message
+            return
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        if self._mode is None:
+            await self._first_body(message)
+        elif self._mode == "stream":
+            more_body = message.get("more_body", False)
+            data = self._compressor.compress(message.get("body", b""))
+            if not more_body:
+                data += self._compressor.finish()
+            await self._send({"type": "http.response.body", "body": data, "more_body": more_body})
+        else:
+            await self._send(message)
+
+    def _client_has(self, etag: str) -> bool:
+        return any(candidate.strip().removeprefix("W/") == etag.removeprefix("W/")
+                   for candidate in self.if_none_match.split(","))
+
+    async def _first_body(self, message) -> None:
+        start = self._start
+        headers = MutableHeaders(scope=start)
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        compressible = (
+            start["status"] not in (204, 304)
+            and "content-encoding" not in headers
+            and headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+        )
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+        etag = headers.get("etag")
+        if etag and start["status"] == 304 and self._client_has(encoded_etag(etag, self.encoding)):
+            # El 304 lleva el ETag de la representación que tiene el cliente
+            headers["ETag"] = encoded_etag(etag, self.encoding)
+
+        if not compressible or (not more_body and len(body) < self.minimum_size):
+            self._mode = "passthrough"
+            await self._send(start)
+            await self._send(message)
+            return
+
+        headers["Content-Encoding"] = self.encoding
+        if etag:
+            headers["ETag"] = encoded_etag(etag, self.encoding)
+        metrics.counter("response_compression_total", "Respuestas comprimidas",
+                        labels={"encoding": self.encoding}).inc()
+        if not more_body:
+            self._mode = "passthrough"
+            compressed = compress_bytes(body, self.encoding, self.level)
+            headers["Content-Length"] = str(len(compressed))
+            await self._send(start)
+            await self._send({"type": "http.response.body", "body": compressed})
+            return
+
+        # Respuesta en streaming: longitud desconocida, se comprime fragmento a fragmento
+        self._mode = "stream"
+        del headers["Content-Length"]
+        self._compressor = _StreamCompressor(self.encoding, self.level)
+        await self._send(start)
+        await self._send({"type": "http.response.body", "body": self._compressor.compress(body),
+                          "more_body": True})
@@ -0,0 +1,145 @@
+"""
+Peticiones condicionales (ETag / If-None-Match)
+===============================================
+
+Este archivo contiene las utilidades para que los clientes que consultan de forma
+periódica reciban 304 Not Modified sin cuerpo cuando el resultado no ha cambiado:
+
+- El ETag es fuerte y se calcula a partir de la identidad del resultado (event_id,
+  timestamp y data del ganador), o "none" si no hay ganador, sin serializar la
+  respuesta.
+- En las páginas de eventos el ETag es el hash del cuerpo ya serializado.
+- Si la respuesta sale comprimida, el middleware de compresión añade la codificación al
+  ETag ("abc" pasa a ser "abc-gzip"): cada codificación es una representación distinta y
+  no puede compartir un validador fuerte con la original. etag_matches acepta las dos
+  formas.
+- Cache-Control: max-age indica cuánto sigue siendo válido el ganador: hasta que su
+  timestamp queda en el pasado (entonces deja de ser un evento futuro), acotado por
+  un máximo configurable. Sin ganador el resultado ya no puede cambiar y se usa el
+  máximo.
+
+En los endpoints de procesamiento (POST) la consulta no modifica estado, así que un
+If-None-Match que coincide se responde con 304 igual que en un GET.
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from .models import Event
+
+NONE_ETAG = '"none"'
+
+# Codificaciones que pueden aparecer como sufijo de un ETag (ver encoded_etag)
+ETAG_ENCODINGS = frozenset({"gzip", "deflate", "br", "zstd"})
+
+
+def event_etag(event: Optional[Event]) -> str:
+    """
+    Calcula el ETag fuerte de un resultado.
+
+    Args:
+        event: Evento ganador, o None si no hay
+
+    Returns:
+        str: ETag entre comillas
+    """
+    if event is None:
+        return NONE_ETAG
+    identity = f"{event.event_id}\0{event.timestamp}\0{event.data}".encode()
+    return f'"{hashlib.blake2b(identity, digest_size=8).hexdigest()}"'
+
+
+def body_etag(body: bytes) -> str:
+    """
+    Calcula el ETag fuerte de un cuerpo ya serializado.
+
+    Args:
+        body: Cuerpo de la respuesta
+
+    Returns:
+        str: ETag entre comillas
+    """
+    return f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+
+
+def encoded_etag(etag: str, encoding: str) -> str:
+    """
+    ETag de la representación comprimida de una respuesta.
+
+    Args:
+        etag: ETag de la representación sin comprimir, p. ej. '"abc"' o 'W/"abc"'
+        encoding: Content-Encoding aplicado
+
+    Returns:
+        str: ETag con la codificación como sufijo, p. ej. '"abc-gzip"'
+    """
+    if not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+
+def _strip_encoding(opaque: str) -> str:
+    head, separator, suffix = opaque[:-1].rpartition("-")
+    if separator and opaque.endswith('"') and suffix in ETAG_ENCODINGS:
+        return f'{head}"'
+    return opaque
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comprueba una cabecera If-None-Match (con comparación débil, como indica la RFC 9110).
+
+    También coinciden los ETag de las versiones comprimidas ('"abc-gzip"' con '"abc"').
+
+    Args:
+        if_none_match: Valor de la cabecera, p. ej. '"a", W/"b"' o "*"
+        etag: ETag actual del resultado
+
+    Returns:
+        bool: True si el cliente ya tiene esta representación
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        opaque = candidate.removeprefix("W/")
+        if opaque == etag or _strip_encoding(opaque) == etag:
+            return True
+    return False
+
+
+def max_age(event: Optional[Event], now: int, limit: int) -> int:
+    """
+    Segundos durante los que el resultado sigue siendo válido.
+
+    Args:
+        event: Evento ganador, o None si no hay
+        now: Timestamp actual (epoch UTC)
+        limit: Máximo de segundos
+
+    Returns:
+        int: Valor de max-age
+    """
+    if event is None:
+        return limit
+    return max(0, min(limit, event.timestamp - now))
+
+
+def cache_headers(event: Optional[Event], now: int, limit: int) -> Dict[str, str]:
+    """
+    Cabeceras ETag y Cache-Control de un resultado.
+
+    Args:
+        event: Evento ganador, o None si no hay
+        now: Timestamp actual (epoch UTC)
+        limit: Máximo de segundos de max-age
+
+    Returns:
+        Dict[str, str]: Cabeceras para la respuesta 200/204 o para el 304
+    """
+    return {
+        "ETag": event_etag(event),
+        "Cache-Control": f"private, max-age={max_age(event, now, limit)}",
+    }
@@ -0,0 +1,222 @@
+"""
+Hosts confiables y CORS en una sola capa ASGI
+=============================================
+
+Este archivo contiene un middleware que sustituye a TrustedHostMiddleware y
+CORSMiddleware de Starlette con una sola pasada por las cabeceras de la petición:
+
+- La lista de hosts se compila al arrancar en un conjunto de nombres exactos y una
+  tupla de sufijos (patrones "*.dominio"), de modo que comprobar el Host es una
+  búsqueda en un set o un endswith.
+- Las peticiones sin Origin, o con un Origin igual al propio esquema y host, no son
+  CORS: pasan sin tocar la respuesta.
+- Las cabeceras CORS de las respuestas simples están precalculadas.
+- Las respuestas preflight se guardan por (origen, método, cabeceras pedidas) y se
+  envían con Access-Control-Max-Age para que el navegador tampoco repita el preflight.
+
+Los rechazos mantienen las respuestas de Starlette: 400 "Invalid host header" y
+400 "Disallowed CORS ..." en los preflight no permitidos.
+"""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+ALL_METHODS = ("DELETE", "GET", "HEAD", "OPTIONS", "PATCH", "POST", "PUT")
+
+# Cabeceras que el navegador siempre puede enviar sin que se permitan explícitamente
+SAFELISTED_HEADERS = frozenset({"accept", "accept-language", "content-language", "content-type"})
+
+PREFLIGHT_CACHE_SIZE = 1024
+
+_TEXT_PLAIN = (b"content-type", b"text/plain; charset=utf-8")
+
+
+class HostAllowlist:
+    """
+    Lista de hosts confiables precompilada.
+
+    Admite nombres exactos, patrones "*.dominio" (subdominios, no el dominio en sí) y
+    "*" para aceptar cualquier host.
+    """
+
+    def __init__(self, hosts: Sequence[str]):
+        patterns = [host.lower() for host in hosts]
+        self.allow_all = "*" in patterns
+        self.exact = frozenset(host for host in patterns if not host.startswith("*."))
+        self.suffixes = tuple(host[1:] for host in patterns if host.startswith("*."))
+
+    def allows(self, host: str) -> bool:
+        """
+        Comprueba un valor de la cabecera Host (con o sin puerto).
+
+        Args:
+            host: Cabecera Host de la petición
+
+        Returns:
+            bool: True si el host es confiable
+        """
+        if self.allow_all:
+            return True
+        if host.startswith("["):  # IPv6: [::1]:8000
+            host = host[:host.find("]") + 1]
+        else:
+            host = host.partition(":")[0]
+        host = host.lower()
+        return host in self.exact or (bool(self.suffixes) and host.endswith(self.suffixes))
+
+
+class HostCORSMiddleware:
+    """
+    Middleware ASGI de hosts confiables y CORS.
+
+    Attributes:
+        hosts: Lista precompilada de hosts confiables
+        allow_origins: Orígenes permitidos ("*" = todos)
+        allow_methods: Métodos permitidos en los preflight ("*" = todos)
+        allow_headers: Cabeceras permitidas en los preflight ("*" = las pedidas)
+        allow_credentials: Permitir cookies y credenciales
+        max_age: Segundos que el navegador puede reutilizar un preflight
+        expose_headers: Cabeceras de respuesta legibles desde JavaScript (p. ej. ETag)
+    """
+
+    def __init__(self, app, allowed_hosts: Sequence[str] = ("*",), allow_origins: Sequence[str] = (),
+                 allow_methods: Sequence[str] = ("GET",), allow_headers: Sequence[str] = (),
+                 allow_credentials: bool = False, max_age: int = 600, expose_headers: Sequence[str] = ()):
+        self.app = app
+        self.hosts = HostAllowlist(allowed_hosts)
+        self.allow_all_origins = "*" in allow_origins
+        self.allow_origins = frozenset(allow_origins)
+        self.allow_methods = ALL_METHODS if "*" in allow_methods else tuple(allow_methods)
+        self.allow_all_headers = "*" in allow_headers
+        self.allow_headers = SAFELISTED_HEADERS | {header.lower() for header in allow_headers}
+        self.allow_credentials = allow_credentials
+        self.max_age = max_age
+        self.cors_enabled = bool(self.allow_origins)
+
+        # Con credenciales el navegador no acepta "*": hay que devolver el origen exacto
+        self._echo_origin = allow_credentials or not self.allow_all_origins
+        credentials = [(b"access-control-allow-credentials", b"true")] if allow_credentials else []
+        self._simple_headers: List[Tuple[bytes, bytes]] = list(credentials)
+        if expose_headers:
+            self._simple_headers.append((b"access-control-expose-headers", ", ".join(expose_headers).encode()))
+        self._preflight_headers = credentials + [
+            (b"access-control-allow-methods", ", ".join(self.allow_methods).encode()),
+            (b"access-control-max-age", str(max_age).encode()),
+        ]
+        self._allow_headers_value = ", ".join(sorted(self.allow_headers)).encode()
+        self._preflights: Dict[Tuple[bytes, bytes, bytes], Tuple[int, list, bytes]] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        # Una sola pasada por las cabeceras
+        host = origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"host":
+                host = value
+            elif name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if not self.hosts.allow_all and (host is None or not self.hosts.allows(host.decode("latin-1"))):
+            await self._reject_host(scope, send)
+            return
+
+        if origin is None or not self.cors_enabled or scope["type"] != "http" or \
+                self._same_origin(scope, origin, host):
+            await self.app(scope, receive, send)
+            return
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            await self._preflight(send, origin, request_method, request_headers or b"")
+            return
+
+        if not self._origin_allowed(origin):
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = self._cors_headers(origin)
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", ()))
+                if self._echo_origin:
+                    _add_vary_origin(headers)
+                headers.extend(cors_headers)
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+    @staticmethod
+    def _same_origin(scope, origin: bytes, host: Optional[bytes]) -> bool:
+        if host is None:
+            return False
+        scheme, _, rest = origin.partition(b"://")
+        return rest == host and scheme.decode("latin-1") == scope.get("scheme", "http")
+
+    def _origin_allowed(self, origin: bytes) -> bool:
+        return self.allow_all_origins or origin.decode("latin-1") in self.allow_origins
+
+    def _cors_headers(self, origin: bytes) -> List[Tuple[bytes, bytes]]:
+        allow_origin = origin if self._echo_origin else b"*"
+        return [(b"access-control-allow-origin", allow_origin)] + self._simple_headers
+
+    async def _preflight(self, send, origin: bytes, method: bytes, requested: bytes) -> None:
+        key = (origin, method, requested)
+        cached = self._preflights.get(key)
+        if cached is None:
+            cached = self._build_preflight(origin, method, requested)
+            if len(self._preflights) >= PREFLIGHT_CACHE_SIZE:
+                self._preflights.clear()
+            self._preflights[key] = cached
+        status, headers, body = cached
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    def _build_preflight(self, origin: bytes, method: bytes, requested: bytes) -> Tuple[int, list, bytes]:
+        failures = []
+        if not self._origin_allowed(origin):
+            failures.append("origin")
+        if method.decode("latin-1") not in self.allow_methods:
+            failures.append("method")
+        names = [name.strip().lower() for name in requested.decode("latin-1").split(",") if name.strip()]
+        if not self.allow_all_headers and any(name not in self.allow_headers for name in names):
+            failures.append("headers")
+
+        if failures:
+            body = ("Disallowed CORS " + ", ".join(failures)).encode()
+            headers = [_TEXT_PLAIN, (b"content-length", str(len(body)).encode())]
+            return 400, headers, body
+
+        allow_origin = origin if self._echo_origin else b"*"
+        headers = [_TEXT_PLAIN, (b"content-length", b"2"), (b"access-control-allow-origin", allow_origin)]
+        headers.extend(self._preflight_headers)
+        # Con "*" se devuelven las cabeceras pedidas, que es lo único que el navegador comprueba
+        allowed = requested if self.allow_all_headers and requested else self._allow_headers_value
+        headers.append((b"access-control-allow-headers", allowed))
+        if self._echo_origin:
+            headers.append((b"vary", b"Origin"))
+        return 200, headers, b"OK"
+
+    async def _reject_host(self, scope, send) -> None:
+        if scope["type"] == "websocket":
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        body = b"Invalid host header"
+        await send({"type": "http.response.start", "status": 400,
+                    "headers": [_TEXT_PLAIN, (b"content-length", str(len(body)).encode())]})
+        await send({"type": "http.response.body", "body": body})
+
+
+def _add_vary_origin(headers: List[Tuple[bytes, bytes]]) -> None:
+    """Añade Origin a la cabecera Vary de la respuesta (o la crea)."""
+    for index, (name, value) in enumerate(headers):
+        if name.lower() == b"vary":
+            headers[index] = (name, value + b", Origin")
+            return
+    headers.append((b"vary", b"Origin"))
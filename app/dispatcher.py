@@ -0,0 +1,298 @@
+"""
+Despachador de eventos vencidos
+===============================
+
+Este archivo contiene el despachador que avisa cuando vencen los eventos guardados
+(cuando su timestamp llega al momento actual):
+
+- Los eventos pendientes viven en una TimerWheel: programar y cancelar son O(1) y
+  avanzar un tick es O(1) amortizado aunque haya millones pendientes.
+- Una tarea del event loop avanza la rueda una vez por segundo (alineada al cambio de
+  segundo del reloj) y reparte los vencidos en lotes de batch_size eventos a los
+  suscriptores: callbacks asíncronos del propio proceso o un WebhookSink que hace POST
+  a una URL local.
+- Cada suscriptor tiene una cola de como mucho max_batches lotes y su propia tarea de
+  entrega. Con la política "block" un suscriptor lento frena el reparto (los vencidos
+  esperan en la rueda, que ya los tenía en memoria); con "drop" se descarta el lote más
+  antiguo de su cola y se cuenta. En ningún caso hay buffers sin límite.
+- Si el reloj salta hacia delante (o el proceso estuvo parado) la rueda salta los
+  ticks vacíos y los vencidos se entregan de golpe, en orden; si retrocede no se repite
+  nada.
+
+La entrega es como mucho una vez: lo que esté en una cola al apagar se pierde. Solo un
+proceso por almacén puede despachar (ver app.main.lock_dispatcher).
+"""
+
+import asyncio
+import json
+import logging
+import time
+import urllib.request
+from typing import Awaitable, Callable, Iterable, List, Optional, Tuple
+
+from .metrics import metrics
+from .models import Event
+from .timer_wheel import TimerWheel
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("block", "drop")
+LAG_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0)
+
+Callback = Callable[[List[Event]], Awaitable[None]]
+
+
+class Subscriber:
+    """
+    Suscriptor de los eventos vencidos.
+
+    Attributes:
+        name: Nombre del suscriptor (etiqueta de las métricas)
+        callback: Corrutina que recibe cada lote
+        policy: "block" (frena el reparto) o "drop" (descarta el lote más antiguo)
+        queue: Lotes pendientes de entregar
+    """
+
+    def __init__(self, name: str, callback: Callback, policy: str, max_batches: int):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconocida: {policy!r} (block o drop)")
+        self.name = name
+        self.callback = callback
+        self.policy = policy
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_batches)
+        self.task: Optional[asyncio.Task] = None
+        labels = {"subscriber": name}
+        self._delivered = metrics.counter("dispatcher_delivered_total", "Eventos vencidos entregados",
+                                          labels=labels)
+        self._dropped = metrics.counter("dispatcher_dropped_total",
+                                        "Eventos vencidos descartados por un suscriptor lento", labels=labels)
+        self._errors = metrics.counter("dispatcher_callback_errors_total", "Lotes cuya entrega falló",
+                                       labels=labels)
+        self._lag = metrics.histogram("dispatcher_lag_seconds",
+                                      "Retraso de la entrega respecto al vencimiento del primer evento del lote",
+                                      labels=labels, buckets=LAG_BUCKETS)
+
+    async def offer(self, batch: List[Event]) -> None:
+        """Encola un lote aplicando la política del suscriptor."""
+        if self.policy == "block":
+            await self.queue.put(batch)
+            return
+        if self.queue.full():
+            self._dropped.inc(len(self.queue.get_nowait()))
+        self.queue.put_nowait(batch)
+
+    async def run(self, clock: Callable[[], float]) -> None:
+        while True:
+            batch = await self.queue.get()
+            try:
+                self._lag.observe(max(0.0, clock() - batch[0].timestamp))
+                await self.callback(batch)
+                self._delivered.inc(len(batch))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._errors.inc()
+                logger.error(f"⏰ Error entregando {len(batch)} eventos a {self.name}: {e}")
+
+
+class WebhookSink:
+    """
+    Suscriptor que envía cada lote como POST JSON {"events": [...]} a una URL.
+
+    La petición se hace con urllib en un hilo del pool, sin dependencias nuevas.
+
+    Attributes:
+        url: URL del webhook
+        timeout: Segundos máximos de cada POST
+    """
+
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url
+        self.timeout = timeout
+
+    def _post(self, body: bytes) -> int:
+        request = urllib.request.Request(self.url, data=body, method="POST",
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return response.status
+
+    async def __call__(self, events: List[Event]) -> None:
+        body = json.dumps({"events": [event.model_dump() for event in events]}).encode()
+        status = await asyncio.to_thread(self._post, body)
+        if status >= 300:
+            raise RuntimeError(f"El webhook respondió {status}")
+
+
+class DueEventDispatcher:
+    """
+    Entrega a los suscriptores los eventos a medida que vencen.
+
+    Attributes:
+        batch_size: Eventos por lote entregado
+        max_batches: Lotes en la cola de cada suscriptor
+        clock: Reloj (epoch en segundos); se puede sustituir en tests
+    """
+
+    def __init__(self, batch_size: int = 100, max_batches: int = 16,
+                 clock: Callable[[], float] = time.time):
+        self.batch_size = batch_size
+        self.max_batches = max_batches
+        self.clock = clock
+        self.wheel = TimerWheel(int(clock()))
+        self.subscribers: List[Subscriber] = []
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._tick_lock = asyncio.Lock()
+
+        self._pending = metrics.gauge("dispatcher_pending", "Eventos programados pendientes de vencer")
+        self._missed = metrics.counter("dispatcher_missed_ticks_total",
+                                       "Segundos saltados por retrasos del loop o saltos del reloj")
+        self._backwards = metrics.counter("dispatcher_clock_backwards_total", "Veces que el reloj retrocedió")
+
+    def schedule(self, events: Iterable[Event]) -> int:
+        """
+        Programa eventos. Los que ya vencieron (timestamp < ahora) se ignoran.
+
+        Args:
+            events: Eventos a programar
+
+        Returns:
+            int: Eventos programados
+        """
+        now = int(self.clock())
+        scheduled = 0
+        for event in events:
+            if event.timestamp >= now:
+                self.wheel.insert(event.event_id, event.timestamp, event.data)
+                scheduled += 1
+        self._pending.set(len(self.wheel))
+        if self._wakeup is not None and self.wheel.due_count:
+            self._wakeup.set()
+        return scheduled
+
+    def schedule_rows(self, rows: Iterable[Tuple[str, int, str]]) -> int:
+        """
+        Programa filas (event_id, timestamp, data) ya futuras, sin construir modelos Event.
+
+        Es lo que se usa al arrancar para programar todo el contenido del almacén.
+
+        Args:
+            rows: Filas de scan_rows
+
+        Returns:
+            int: Eventos programados
+        """
+        insert = self.wheel.insert
+        scheduled = 0
+        for event_id, timestamp, data in rows:
+            insert(event_id, timestamp, data)
+            scheduled += 1
+        self._pending.set(len(self.wheel))
+        return scheduled
+
+    def cancel(self, event_id: str) -> bool:
+        """
+        Cancela un evento programado.
+
+        Args:
+            event_id: Identificador del evento
+
+        Returns:
+            bool: True si estaba pendiente
+        """
+        cancelled = self.wheel.cancel(event_id)
+        self._pending.set(len(self.wheel))
+        return cancelled
+
+    def subscribe(self, callback: Callback, name: str = "default", policy: str = "block",
+                  max_batches: Optional[int] = None) -> Subscriber:
+        """
+        Registra un suscriptor.
+
+        Args:
+            callback: Corrutina que recibe cada lote de eventos vencidos
+            name: Nombre para las métricas
+            policy: "block" o "drop"
+            max_batches: Lotes en su cola (por defecto los del despachador)
+
+        Returns:
+            Subscriber: El suscriptor registrado
+        """
+        subscriber = Subscriber(name, callback, policy, max_batches or self.max_batches)
+        self.subscribers.append(subscriber)
+        if self._task is not None:
+            subscriber.task = asyncio.get_running_loop().create_task(subscriber.run(self.clock))
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        """Da de baja un suscriptor y cancela su tarea de entrega."""
+        self.subscribers.remove(subscriber)
+        if subscriber.task is not None:
+            subscriber.task.cancel()
+
+    async def tick(self) -> int:
+        """
+        Avanza la rueda hasta el segundo actual y reparte los vencidos.
+
+        Las llamadas concurrentes se serializan: una segunda espera a que la primera
+        termine de repartir.
+
+        Returns:
+            int: Eventos repartidos
+        """
+        async with self._tick_lock:
+            return await self._tick()
+
+    async def _tick(self) -> int:
+        now = int(self.clock())
+        if now < self.wheel.tick:
+            self._backwards.inc()
+        elif now > self.wheel.tick + 1:
+            self._missed.inc(now - self.wheel.tick - 1)
+        self.wheel.advance(now)
+
+        dispatched = 0
+        while self.wheel.due_count:
+            entries = self.wheel.pop_due(self.batch_size)
+            batch = [Event.model_construct(event_id=event_id, timestamp=timestamp, data=data)
+                     for event_id, timestamp, data in entries]
+            for subscriber in list(self.subscribers):
+                await subscriber.offer(batch)  # Con "block" aquí espera a los lentos
+            dispatched += len(batch)
+        self._pending.set(len(self.wheel))
+        return dispatched
+
+    def start(self) -> None:
+        """Arranca la tarea del despachador y las de entrega en el event loop actual."""
+        if self._task is not None and not self._task.done():
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        for subscriber in self.subscribers:
+            subscriber.task = loop.create_task(subscriber.run(self.clock))
+        self._task = loop.create_task(self._run())
+
+    def stop(self) -> None:
+        """Detiene el despachador; los lotes aún en cola se pierden."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        for subscriber in self.subscribers:
+            if subscriber.task is not None:
+                subscriber.task.cancel()
+                subscriber.task = None
+
+    async def _run(self) -> None:
+        while True:
+            self._wakeup.clear()
+            try:
+                await self.tick()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"⏰ Error en el despachador: {e}")
+            # Dormir hasta el siguiente cambio de segundo, o hasta que se programe algo ya vencido
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), 1.0 - self.clock() % 1.0)
+            except asyncio.TimeoutError:
+                pass
@@ -0,0 +1,159 @@
+"""
+Carriles de prioridad para el procesamiento de eventos
+======================================================
+
+Este archivo contiene los carriles que separan el procesamiento de payloads pequeños
+y grandes. Cada carril es un ThreadPoolExecutor con su propia concurrencia y una cola
+acotada, así que una petición pequeña nunca espera en la misma cola que los payloads
+de 1000 eventos.
+
+El trabajo sigue siendo CPU con el GIL, de modo que los carriles no añaden paralelismo:
+lo que cambia es que el event loop queda libre mientras se valida un payload grande y
+que el intérprete reparte el GIL entre los hilos de ambos carriles (cada
+sys.getswitchinterval()) en lugar de atender las peticiones en orden de llegada.
+
+La clasificación usa la cabecera declarada X-Event-Count y el Content-Length, de modo
+que se decide antes de leer el cuerpo; basta con que uno de los dos indique un payload
+grande para ir al carril grande.
+"""
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, TypeVar
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+QUEUE_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+
+
+class LaneFullError(Exception):
+    """El carril tiene su cola llena."""
+
+
+class Lane:
+    """
+    Carril de ejecución acotado.
+
+    Attributes:
+        name: Nombre del carril (small o large)
+        workers: Hilos que procesan en paralelo
+        max_queue: Peticiones que pueden esperar un hilo libre
+    """
+
+    def __init__(self, name: str, workers: int, max_queue: int):
+        self.name = name
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0  # En cola o en ejecución
+        self._executor: Optional[ThreadPoolExecutor] = None  # Se crea en la primera petición
+        labels = {"lane": name}
+        self._queue_time = metrics.histogram("lane_queue_seconds", "Espera en la cola del carril",
+                                             labels=labels, buckets=QUEUE_BUCKETS)
+        self._run_time = metrics.histogram("lane_run_seconds", "Tiempo de ejecución en el carril",
+                                           labels=labels, buckets=QUEUE_BUCKETS)
+        self._pending = metrics.gauge("lane_pending", "Peticiones en cola o en ejecución", labels=labels)
+        self._rejected = metrics.counter("lane_rejected_total", "Peticiones rechazadas con la cola llena",
+                                         labels=labels)
+
+    async def run(self, func: Callable[..., T], *args) -> T:
+        """
+        Ejecuta una función en el carril y espera su resultado.
+
+        Args:
+            func: Función síncrona a ejecutar
+            *args: Argumentos de la función
+
+        Returns:
+            T: Resultado de la función
+
+        Raises:
+            LaneFullError: Si ya hay workers + max_queue peticiones pendientes
+        """
+        if self.pending >= self.workers + self.max_queue:
+            self._rejected.inc()
+            raise LaneFullError(f"Carril {self.name} lleno")
+
+        submitted = time.perf_counter()
+
+        def task():
+            started = time.perf_counter()
+            self._queue_time.observe(started - submitted)
+            try:
+                return func(*args)
+            finally:
+                self._run_time.observe(time.perf_counter() - started)
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"lane-{self.name}")
+
+        self.pending += 1
+        self._pending.set(self.pending)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, task)
+        finally:
+            self.pending -= 1
+            self._pending.set(self.pending)
+
+    def shutdown(self) -> None:
+        """Detiene los hilos del carril (se vuelven a crear si llega otra petición)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class PriorityLanes:
+    """
+    Clasifica las peticiones y las reparte entre el carril pequeño y el grande.
+
+    Attributes:
+        small: Carril de payloads pequeños
+        large: Carril de payloads grandes
+        large_events: Eventos declarados a partir de los cuales un payload es grande
+        large_bytes: Content-Length a partir del cual un payload es grande
+    """
+
+    def __init__(self, small: Lane, large: Lane, large_events: int = 100, large_bytes: int = 16384):
+        self.small = small
+        self.large = large
+        self.large_events = large_events
+        self.large_bytes = large_bytes
+
+    def classify(self, headers) -> Lane:
+        """
+        Elige carril a partir de las cabeceras de la petición.
+
+        Args:
+            headers: Cabeceras de la petición (X-Event-Count, Content-Length)
+
+        Returns:
+            Lane: Carril que debe procesar la petición
+        """
+        declared = _int_header(headers, "x-event-count")
+        length = _int_header(headers, "content-length")
+        if declared is None and length is None:
+            return self.large  # Sin tamaño conocido (cuerpo por chunks) se trata como grande
+        # Un número de eventos declarado pequeño no saca del carril grande a un cuerpo grande
+        if (declared is not None and declared >= self.large_events) or \
+                (length is not None and length >= self.large_bytes):
+            return self.large
+        return self.small
+
+    def shutdown(self) -> None:
+        self.small.shutdown()
+        self.large.shutdown()
+
+
+def _int_header(headers, name: str) -> Optional[int]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
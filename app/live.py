@@ -0,0 +1,218 @@
+"""
+Suscripciones en vivo al evento futuro más próximo
+==================================================
+
+Este archivo contiene el hub que empuja por WebSocket (/events/subscribe) el evento
+futuro más próximo del almacén cada vez que cambia, para que los paneles no tengan que
+sondear /events/latest:
+
+- El ganador se calcula una sola vez por cambio, no por suscriptor: el hub consulta
+  store.latest() cuando se le notifica una escritura (notify), cuando vence el ganador
+  actual (su timestamp queda en el pasado) y cada refresh_interval segundos, que cubre
+  las escrituras hechas por otros workers sobre el mismo SQLite.
+- Si el resultado cambia se serializa un único mensaje {"seq": n, "event": {...} | null}
+  y se reparte a todos los suscriptores. Repartir es O(1) por suscriptor: encolar una
+  referencia a la misma cadena y despertar a su tarea de envío.
+- Cada conexión tiene su cola con una de dos políticas: "coalesce" guarda solo el
+  último mensaje pendiente (un cliente lento recibe directamente el estado actual) y
+  "drop" guarda hasta max_messages y descarta el más antiguo. seq permite al cliente
+  detectar los mensajes que no recibió.
+
+Los eventos expirados por ExpiryEvictor nunca son el ganador (su timestamp es anterior
+al momento actual), así que la expiración del ganador se detecta por tiempo y no hace
+falta avisar al hub al borrarlos.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Callable, List, Optional, Set
+
+from .metrics import metrics
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+POLICIES = ("coalesce", "drop")
+FANOUT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5)
+
+_serialize_event = Event.__pydantic_serializer__.to_json
+
+
+class LiveSubscription:
+    """
+    Cola de envío de una conexión.
+
+    Se usa __slots__, una lista y un único Future de espera (en lugar de asyncio.Queue,
+    deque o asyncio.Event, que reservan bloques de cientos de bytes) porque puede haber
+    miles de conexiones inactivas.
+
+    Attributes:
+        policy: "coalesce" o "drop"
+        max_messages: Mensajes pendientes como máximo con "drop"
+    """
+
+    __slots__ = ("policy", "max_messages", "_pending", "_waiter")
+
+    def __init__(self, policy: str = "coalesce", max_messages: int = 8):
+        if policy not in POLICIES:
+            raise ValueError(f"Política desconocida: {policy!r} (coalesce o drop)")
+        self.policy = policy
+        self.max_messages = 1 if policy == "coalesce" else max_messages
+        self._pending: List[str] = []
+        self._waiter: Optional[asyncio.Future] = None
+
+    def push(self, message: str) -> bool:
+        """
+        Encola un mensaje sin esperar nunca.
+
+        Args:
+            message: Mensaje ya serializado (compartido entre todas las conexiones)
+
+        Returns:
+            bool: False si se descartó un mensaje anterior para hacerle sitio
+        """
+        replaced = len(self._pending) >= self.max_messages
+        if replaced:
+            del self._pending[0]  # Como mucho max_messages elementos
+        self._pending.append(message)
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return not replaced
+
+    async def next(self) -> List[str]:
+        """Espera a que haya mensajes y devuelve todos los pendientes."""
+        while not self._pending:
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        messages, self._pending = self._pending, []
+        return messages
+
+
+class LatestEventHub:
+    """
+    Calcula los cambios del evento futuro más próximo y los reparte a los suscriptores.
+
+    Attributes:
+        store: EventStore o SQLiteEventStore
+        refresh_interval: Segundos máximos entre dos consultas al almacén
+        max_subscribers: Conexiones simultáneas admitidas
+        seq: Número del último cambio publicado
+        current: Ganador actual
+        message: Mensaje del estado actual, el que recibe cada suscriptor al conectarse
+    """
+
+    def __init__(self, store, refresh_interval: float = 1.0, max_subscribers: int = 10000,
+                 clock: Callable[[], float] = time.time):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.max_subscribers = max_subscribers
+        self.clock = clock
+        self.seq = 0
+        self.current: Optional[Event] = None
+        self.message = self._encode()
+        self.subscribers: Set[LiveSubscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._dirty: Optional[asyncio.Event] = None
+
+        self._subscribers_gauge = metrics.gauge("live_subscribers", "Conexiones de /events/subscribe abiertas")
+        self._changes = metrics.counter("live_changes_total", "Cambios del evento futuro más próximo publicados")
+        self._replaced = metrics.counter("live_replaced_messages_total",
+                                         "Mensajes descartados o sustituidos en colas de conexiones lentas")
+        self._fanout = metrics.histogram("live_fanout_seconds", "Tiempo de repartir un cambio a todos los suscriptores",
+                                         buckets=FANOUT_BUCKETS)
+
+    def _encode(self) -> str:
+        event = _serialize_event(self.current).decode() if self.current is not None else "null"
+        return f'{{"seq":{self.seq},"event":{event}}}'
+
+    def subscribe(self, policy: str = "coalesce", max_messages: int = 8) -> Optional[LiveSubscription]:
+        """
+        Registra una conexión y le encola el estado actual.
+
+        Args:
+            policy: "coalesce" o "drop"
+            max_messages: Mensajes pendientes como máximo con "drop"
+
+        Returns:
+            Optional[LiveSubscription]: La suscripción, o None si se alcanzó max_subscribers
+        """
+        if len(self.subscribers) >= self.max_subscribers:
+            return None
+        subscription = LiveSubscription(policy, max_messages)
+        subscription.push(self.message)
+        self.subscribers.add(subscription)
+        self._subscribers_gauge.set(len(self.subscribers))
+        return subscription
+
+    def unsubscribe(self, subscription: LiveSubscription) -> None:
+        """Da de baja una conexión."""
+        self.subscribers.discard(subscription)
+        self._subscribers_gauge.set(len(self.subscribers))
+
+    def notify(self) -> None:
+        """Avisa de que el almacén cambió; el hub lo consulta en cuanto puede."""
+        if self._dirty is not None:
+            self._dirty.set()
+
+    async def refresh(self) -> bool:
+        """
+        Consulta el ganador actual y, si cambió, publica el cambio.
+
+        Returns:
+            bool: True si se publicó un cambio
+        """
+        latest = await self.store.latest(int(self.clock()))
+        if latest == self.current:
+            return False
+        self.current = latest
+        self.seq += 1
+        self.message = self._encode()
+        self._changes.inc()
+
+        started = time.perf_counter()
+        replaced = 0
+        for subscription in self.subscribers:
+            if not subscription.push(self.message):
+                replaced += 1
+        self._fanout.observe(time.perf_counter() - started)
+        if replaced:
+            self._replaced.inc(replaced)
+        return True
+
+    def _timeout(self) -> float:
+        # El ganador deja de serlo cuando su timestamp queda en el pasado
+        if self.current is None:
+            return self.refresh_interval
+        return max(0.0, min(self.refresh_interval, self.current.timestamp + 1 - self.clock()))
+
+    async def start(self) -> None:
+        """Calcula el estado inicial y arranca la tarea del hub en el event loop actual."""
+        if self._task is not None and not self._task.done():
+            return
+        self._dirty = asyncio.Event()
+        await self.refresh()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Detiene la tarea del hub."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._dirty.wait(), self._timeout())
+            except asyncio.TimeoutError:
+                pass
+            self._dirty.clear()
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error(f"📡 Error consultando el evento más próximo: {e}")
+                await asyncio.sleep(self.refresh_interval)
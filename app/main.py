@@ -5,9 +5,9 @@ Event Processor API - Aplicación Principal
 API desarrollada en FastAPI para procesar eventos y encontrar el evento futuro más próximo.
 """
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.middleware.trustedhost import TrustedHostMiddleware
+from fastapi import FastAPI, Request
+import asyncio
+import fcntl
 import logging
 import sys
 from pathlib import Path
@@ -15,17 +15,34 @@ from pathlib import Path
 # Agregar el directorio padre al path para importaciones
 sys.path.append(str(Path(__file__).parent.parent))
 
-from .routes import events_router, health_router, main_router
+from config.settings import settings
+
+from .admission import AdmissionControlMiddleware, AdmissionController, LoopLagMonitor
+from .body_limit import BodyLimitMiddleware
+from .compression import RequestDecompressionMiddleware, ResponseCompressionMiddleware
+from .cors import HostCORSMiddleware
+from .dispatcher import DueEventDispatcher, WebhookSink
+from .lanes import Lane, PriorityLanes
+from .live import LatestEventHub
+from .openapi_cache import install_openapi_cache
+from .rate_limit import RateLimitMiddleware, ShardedRateLimiter
+from .result_cache import ResultCache
+from .runtime_tuning import apply_runtime_tuning
+from .storage import (EventStore, ExpiryEvictor, PartitionedStore, ReplicaStore, ReplicationFollower,
+                      ReplicationLeader, SQLiteEventStore, parse_address)
+from .warmup import internal_host, readiness, run_warmup
+from .routes import EVENTS_REQUEST_BODY, events_router, health_router, main_router
 from . import __version__, __description__
 
-# Configurar logging
+# Configurar logging (el archivo de log se abre en la primera escritura, no al importar)
+log_handlers = [logging.StreamHandler(sys.stdout)]
+if settings.log_file:
+    log_handlers.append(logging.FileHandler(settings.log_file, encoding="utf-8", delay=True))
+
 logging.basicConfig(
-    level=logging.INFO,
+    level=settings.log_level,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler("app.log", encoding="utf-8")
-    ]
+    handlers=log_handlers
 )
 
 logger = logging.getLogger(__name__)
@@ -35,9 +52,9 @@ app = FastAPI(
     title="Event Processor API",
     description=__description__,
     version=__version__,
-    docs_url="/docs",
-    redoc_url="/redoc",
-    openapi_url="/openapi.json",
+    docs_url=settings.docs_url or None,
+    redoc_url=settings.redoc_url or None,
+    openapi_url=settings.openapi_url or None,
     contact={
         "name": "Event Processor Team",
         "email": "contact@eventprocessor.com",
@@ -48,21 +65,126 @@ app = FastAPI(
     },
 )
 
-# Configurar CORS (Cross-Origin Resource Sharing)
+# Control de admisión: 429 con Retry-After si el event loop va retrasado o hay demasiadas
+# peticiones de procesamiento en curso. Se añade antes que CORS para que los 429 lleven
+# también las cabeceras CORS
+loop_monitor = LoopLagMonitor(settings.loop_lag_interval_ms / 1000)
+admission_controller = AdmissionController(
+    loop_monitor,
+    max_inflight=settings.admission_max_inflight,
+    max_queue=settings.admission_max_queue,
+    queue_timeout=settings.admission_queue_timeout,
+    max_lag=settings.admission_max_lag_ms / 1000,
+)
+app.add_middleware(
+    AdmissionControlMiddleware,
+    controller=admission_controller,
+    retry_after=settings.admission_retry_after
+)
+
+
+def build_rate_limiter(lane: str, rate: float, burst: float):
+    """Crea el limitador de un carril, o None si su tasa es 0."""
+    if not rate:
+        return None
+    return ShardedRateLimiter(rate, burst, shards=settings.rate_limit_shards,
+                              idle_seconds=settings.rate_limit_idle_seconds, name=lane)
+
+
+# Límite de tasa por cliente, por delante del control de admisión: un cliente ruidoso
+# recibe 429 sin ocupar huecos de procesamiento
+rate_limiters = {
+    "small": build_rate_limiter("small", settings.rate_limit_small_rate, settings.rate_limit_small_burst),
+    "large": build_rate_limiter("large", settings.rate_limit_large_rate, settings.rate_limit_large_burst),
+}
+if any(rate_limiters.values()):
+    app.add_middleware(
+        RateLimitMiddleware,
+        small=rate_limiters["small"],
+        large=rate_limiters["large"],
+        large_threshold=settings.rate_limit_large_threshold,
+        api_key_header=settings.rate_limit_api_key_header
+    )
+
+# Límite de tamaño del cuerpo: 413 antes de parsear (por Content-Length, por bytes
+# recibidos o por eventos contados según llega el cuerpo). Va por fuera del límite de
+# tasa, que lee el cuerpo completo, para que nunca se lea más de max_body_bytes
 app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # En producción, especificar dominios específicos
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    BodyLimitMiddleware,
+    max_bytes=settings.max_body_bytes,
+    max_events=settings.max_events_per_request
 )
 
-# Configurar hosts confiables (seguridad)
+# Captura de tráfico de los endpoints de eventos (desactivada si no se define CAPTURE_FILE).
+# Va por dentro de la descompresión para guardar los cuerpos en JSON plano
+capture_writer = None
+if settings.capture_file:
+    # Importación diferida: la captura no forma parte del camino normal
+    from .capture import CaptureWriter, TrafficCaptureMiddleware
+
+    capture_writer = CaptureWriter(settings.capture_file)
+    app.add_middleware(
+        TrafficCaptureMiddleware,
+        writer=capture_writer,
+        sample_rate=settings.capture_sample_rate
+    )
+
+# Cuerpos de petición comprimidos (gzip, deflate, zstd): se descomprimen según llegan y
+# se corta con 413 en cuanto superan max_decompressed_bytes
+if settings.request_decompression:
+    app.add_middleware(
+        RequestDecompressionMiddleware,
+        max_bytes=settings.max_decompressed_bytes or settings.max_body_bytes
+    )
+
+# Compresión negociada de las respuestas (zstd, br, gzip según Accept-Encoding)
+if settings.response_compression:
+    app.add_middleware(
+        ResponseCompressionMiddleware,
+        minimum_size=settings.compression_minimum_size,
+        encodings=settings.compression_encodings,
+        levels={"gzip": settings.gzip_level, "zstd": settings.zstd_level, "br": settings.brotli_quality}
+    )
+
+# Hosts confiables y CORS (Cross-Origin Resource Sharing) en una sola capa, la más
+# externa: un Host no confiable se rechaza antes de todo lo demás y los preflight se
+# responden desde caché
 app.add_middleware(
-    TrustedHostMiddleware,
-    allowed_hosts=["localhost", "127.0.0.1", "*.localhost"]
+    HostCORSMiddleware,
+    allowed_hosts=settings.trusted_hosts,
+    allow_origins=settings.cors_origins,  # En producción, especificar dominios específicos
+    allow_methods=settings.cors_methods,
+    allow_headers=settings.cors_headers,
+    allow_credentials=settings.cors_allow_credentials,
+    max_age=settings.cors_max_age,
+    expose_headers=settings.cors_expose_headers
 )
 
+# Carriles de prioridad: los payloads pequeños y los grandes se procesan en executors
+# separados, cada uno con su concurrencia y su cola
+if settings.lanes_enabled:
+    app.state.lanes = PriorityLanes(
+        Lane("small", settings.lane_small_workers, settings.lane_small_queue),
+        Lane("large", settings.lane_large_workers, settings.lane_large_queue),
+        large_events=settings.lane_large_threshold_events,
+        large_bytes=settings.lane_large_threshold_bytes,
+    )
+    if settings.lane_switch_interval_ms:
+        # Cambios de GIL más frecuentes: el carril pequeño no espera 5 ms tras uno grande
+        sys.setswitchinterval(settings.lane_switch_interval_ms / 1000)
+
+# Almacén durable de eventos: se abre (recuperando snapshot + WAL) al arrancar. event_store
+# es la partición del espacio por defecto; las demás se abren bajo demanda
+app.state.event_store = None
+app.state.partitions = None
+app.state.evictor = None
+app.state.dispatcher = None
+app.state.dispatcher_lock = None  # flock de EVENT_STORE_DIR/dispatcher.lock
+app.state.live_hub = None
+app.state.replication = None  # ReplicationLeader o ReplicationFollower
+# Caché de resultados compartida entre workers: se engancha (o se crea) al arrancar
+app.state.result_cache = None
+
 # Incluir routers
 app.include_router(main_router)
 app.include_router(events_router)
@@ -75,9 +197,10 @@ app.include_router(health_router)
     summary="[LEGACY] Procesar eventos - Endpoint de compatibilidad",
     description="Endpoint legacy mantenido para compatibilidad. Use /events/process en su lugar.",
     deprecated=True,
-    tags=["Legacy"]
+    tags=["Legacy"],
+    openapi_extra=EVENTS_REQUEST_BODY
 )
-async def process_events_legacy(request):
+async def process_events_legacy(request: Request):
     """
     Endpoint legacy para compatibilidad con la versión anterior.
     Se recomienda usar /events/process en su lugar.
@@ -86,6 +209,113 @@ async def process_events_legacy(request):
     return await process_events(request)
 
 
+# Esquema OpenAPI generado una sola vez y servido ya serializado
+openapi_cache = install_openapi_cache(app, settings.openapi_cache_file)
+
+# Tarea de calentamiento en segundo plano (se guarda la referencia para que no se recolecte)
+warmup_task = None
+
+
+def open_event_store(directory: str):
+    """
+    Abre el almacén de eventos del backend configurado en EVENT_STORE_BACKEND.
+
+    Args:
+        directory: Directorio del almacén (el de EVENT_STORE_DIR o el de una partición)
+
+    Raises:
+        ValueError: Si el backend no existe
+    """
+    if settings.event_store_backend == "sqlite":
+        return SQLiteEventStore.open(directory, fsync=settings.event_store_fsync)
+    if settings.event_store_backend == "wal":
+        return EventStore.open(
+            directory,
+            fsync=settings.event_store_fsync,
+            commit_delay=settings.event_store_commit_delay_ms / 1000,
+            snapshot_bytes=settings.event_store_snapshot_bytes,
+        )
+    raise ValueError(f"EVENT_STORE_BACKEND desconocido: {settings.event_store_backend!r} (wal o sqlite)")
+
+
+def lock_dispatcher(directory: str):
+    """
+    Bloquea el despachador de un directorio de almacén para este proceso.
+
+    Cada worker programaría todos los eventos guardados y el webhook los recibiría una
+    vez por worker (y cada uno solo vería los guardados a través de él), así que solo un
+    proceso puede despachar.
+
+    Args:
+        directory: Directorio del almacén (EVENT_STORE_DIR)
+
+    Returns:
+        Archivo abierto que mantiene el flock hasta cerrarlo
+
+    Raises:
+        RuntimeError: Si otro proceso ya despacha los eventos de este directorio
+    """
+    path = Path(directory) / "dispatcher.lock"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    lock_file = open(path, "a")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        lock_file.close()
+        raise RuntimeError(f"El despachador de {directory} ya está activo en otro proceso: "
+                           "DISPATCHER_ENABLED requiere un solo worker")
+    return lock_file
+
+
+async def create_dispatcher(store) -> DueEventDispatcher:
+    """
+    Crea el despachador de eventos vencidos y programa los eventos futuros del almacén.
+
+    Args:
+        store: Almacén de eventos ya abierto
+
+    Returns:
+        DueEventDispatcher: Despachador sin arrancar
+    """
+    dispatcher = DueEventDispatcher(settings.dispatcher_batch_size, settings.dispatcher_max_batches)
+    if settings.dispatcher_webhook_url:
+        dispatcher.subscribe(WebhookSink(settings.dispatcher_webhook_url, settings.dispatcher_webhook_timeout_s),
+                             name="webhook", policy=settings.dispatcher_policy)
+
+    def schedule_stored() -> int:
+        # Por páginas, sin construir modelos Event; aún no se sirven peticiones
+        now, after, scheduled = int(dispatcher.clock()), None, 0
+        while True:
+            rows = store.scan_rows(now, 2 ** 63 - 1, after, 10000)
+            scheduled += dispatcher.schedule_rows(rows)
+            if len(rows) < 10000:
+                return scheduled
+            after = (rows[-1][1], rows[-1][0])
+
+    scheduled = await asyncio.to_thread(schedule_stored)
+    logger.info(f"⏰ Despachador: {scheduled} eventos futuros programados")
+    return dispatcher
+
+
+async def start_follower() -> None:
+    """
+    Arranca el nodo como seguidor de REPLICATION_LEADER.
+
+    El almacén es la réplica en memoria (sin particiones, sin despachador y sin
+    expiración propia: la expiración llega del líder).
+    """
+    replica = ReplicaStore()
+    app.state.event_store = replica
+    app.state.live_hub = LatestEventHub(replica, refresh_interval=settings.live_refresh_interval_s,
+                                        max_subscribers=settings.live_max_subscribers)
+    await app.state.live_hub.start()
+    host, port = parse_address(settings.replication_leader)
+    app.state.replication = ReplicationFollower(replica, host, port, settings.replication_heartbeat_s,
+                                                settings.replication_reconnect_s, on_change=app.state.live_hub.notify)
+    app.state.replication.start()
+    logger.info(f"🔁 Seguidor de {settings.replication_leader}: solo lectura")
+
+
 @app.on_event("startup")
 async def startup_event():
     """
@@ -93,6 +323,67 @@ async def startup_event():
     """
     logger.info("🚀 Event Processor API iniciándose...")
     logger.info(f"📊 Versión: {__version__}")
+    if capture_writer is not None:
+        capture_writer.start()
+    if openapi_cache is not None and not settings.debug:
+        openapi_cache.load()
+    if settings.loop_lag_interval_ms:
+        loop_monitor.start()
+    if settings.result_cache_slots:
+        try:
+            app.state.result_cache = ResultCache.open(settings.result_cache_name or f"event-processor-{settings.port}",
+                                                      settings.result_cache_slots, settings.result_cache_slot_bytes)
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Caché de resultados desactivada: {e}")
+    if settings.replication_leader:
+        await start_follower()
+    elif settings.event_store_dir:
+        app.state.partitions = await asyncio.to_thread(
+            PartitionedStore.open,
+            settings.event_store_dir,
+            open_event_store,
+            max_partitions=settings.event_store_max_partitions,
+            max_events=settings.event_store_partition_max_events,
+            max_bytes=settings.event_store_partition_max_bytes,
+            idle_seconds=settings.event_store_partition_idle_seconds,
+        )
+        app.state.partitions.start()
+        app.state.event_store = app.state.partitions.default
+        if settings.event_store_eviction_interval_s:
+            app.state.evictor = ExpiryEvictor(
+                app.state.partitions,  # Expira todas las particiones abiertas
+                retention=settings.event_store_retention_seconds,
+                interval=settings.event_store_eviction_interval_s,
+                batch=settings.event_store_eviction_batch,
+                max_pass=settings.event_store_eviction_max_pass_ms / 1000,
+            )
+            app.state.evictor.start()
+        if settings.dispatcher_enabled:
+            app.state.dispatcher_lock = lock_dispatcher(settings.event_store_dir)
+            app.state.dispatcher = await create_dispatcher(app.state.event_store)
+            app.state.dispatcher.start()
+        app.state.live_hub = LatestEventHub(app.state.event_store,
+                                            refresh_interval=settings.live_refresh_interval_s,
+                                            max_subscribers=settings.live_max_subscribers)
+        await app.state.live_hub.start()
+        if settings.replication_listen:
+            if not isinstance(app.state.event_store, EventStore):
+                raise ValueError("REPLICATION_LISTEN requiere EVENT_STORE_BACKEND=wal")
+            # Se replica el espacio de nombres por defecto
+            app.state.replication = ReplicationLeader(app.state.event_store, settings.replication_backlog,
+                                                      settings.replication_heartbeat_s)
+            await app.state.replication.start(*parse_address(settings.replication_listen))
+
+    # Calentar el worker antes de declararlo disponible en /health/ready
+    global warmup_task
+    host = internal_host(settings.trusted_hosts)
+    if settings.warmup_mode == "off":
+        readiness.mark_ready()
+    elif settings.warmup_mode == "blocking":
+        await run_warmup(app, settings.warmup_rounds, host)
+    else:
+        warmup_task = asyncio.create_task(run_warmup(app, settings.warmup_rounds, host))
+
     logger.info("✅ Aplicación iniciada correctamente")
 
 
@@ -102,19 +393,58 @@ async def shutdown_event():
     Eventos que se ejecutan al apagar la aplicación.
     """
     logger.info("🛑 Event Processor API cerrándose...")
+    if warmup_task is not None and not warmup_task.done():
+        warmup_task.cancel()
+    loop_monitor.stop()
+    if settings.lanes_enabled:
+        app.state.lanes.shutdown()
+    if capture_writer is not None:
+        capture_writer.close()
+    if isinstance(app.state.replication, ReplicationLeader):
+        await app.state.replication.stop()
+    elif app.state.replication is not None:
+        app.state.replication.stop()
+        app.state.event_store.close()
+        app.state.event_store = None
+    app.state.replication = None
+    if app.state.live_hub is not None:
+        app.state.live_hub.stop()
+        app.state.live_hub = None
+    if app.state.dispatcher is not None:
+        app.state.dispatcher.stop()
+        app.state.dispatcher = None
+    if app.state.dispatcher_lock is not None:
+        app.state.dispatcher_lock.close()  # Libera el flock
+        app.state.dispatcher_lock = None
+    if app.state.evictor is not None:
+        app.state.evictor.stop()
+        app.state.evictor = None
+    if app.state.partitions is not None:
+        app.state.partitions.stop()
+        await asyncio.to_thread(app.state.partitions.close)
+        app.state.partitions = None
+        app.state.event_store = None
+    if app.state.result_cache is not None:
+        app.state.result_cache.close()  # Las entradas se quedan en /dev/shm para el siguiente worker
+        app.state.result_cache = None
     logger.info("✅ Aplicación cerrada correctamente")
 
 
+# Ajustes del GC al terminar de importar la aplicación (umbrales, pausas, gc.freeze)
+apply_runtime_tuning(settings)
+
+
 # Punto de entrada para desarrollo local
 if __name__ == "__main__":
     import uvicorn
 
     logger.info("🚀 Iniciando Event Processor API en modo desarrollo...")
+    logger.info("💡 Para producción use: python scripts/run_prod.py")
 
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
+        host=settings.host,
+        port=settings.port,
         reload=True,
         log_level="info",
         access_log=True
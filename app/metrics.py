@@ -0,0 +1,169 @@
+"""
+Métricas de la Event Processor API
+==================================
+
+Este archivo contiene un registro de métricas en memoria del proceso (contadores,
+gauges e histogramas) que se exporta en /health/metrics, en JSON o en el formato de
+texto de Prometheus. Cada worker tiene su propio registro.
+"""
+
+import bisect
+import threading
+from typing import Dict, Optional, Tuple
+
+# Límites por defecto de los histogramas, en segundos
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+LabelsKey = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Contador monótono."""
+
+    kind = "counter"
+    __slots__ = ("description", "value")
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge:
+    """Valor que puede subir y bajar."""
+
+    kind = "gauge"
+    __slots__ = ("description", "value")
+
+    def __init__(self, description: str = ""):
+        self.description = description
+        self.value = 0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def snapshot(self):
+        return self.value
+
+
+class Histogram:
+    """Histograma acumulativo con límites fijos."""
+
+    kind = "histogram"
+    __slots__ = ("description", "buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, description: str = "", buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.description = description
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def snapshot(self) -> dict:
+        cumulative, buckets = 0, {}
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            buckets[f"{bound:g}"] = cumulative
+        buckets["+Inf"] = self.count
+        return {"count": self.count, "sum": self.sum, "max": self.max, "buckets": buckets}
+
+
+def _labels_key(labels: Optional[Dict[str, str]]) -> LabelsKey:
+    return tuple(sorted(labels.items())) if labels else ()
+
+
+def _format_name(name: str, labels: LabelsKey, extra: str = "") -> str:
+    pairs = [f'{key}="{value}"' for key, value in labels]
+    if extra:
+        pairs.append(extra)
+    return f"{name}{{{','.join(pairs)}}}" if pairs else name
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas del proceso.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[Tuple[str, LabelsKey], object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, factory, name: str, labels: Optional[Dict[str, str]], *args):
+        key = (name, _labels_key(labels))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.setdefault(key, factory(*args))
+        return metric
+
+    def counter(self, name: str, description: str = "", labels: Optional[Dict[str, str]] = None) -> Counter:
+        return self._get_or_create(Counter, name, labels, description)
+
+    def gauge(self, name: str, description: str = "", labels: Optional[Dict[str, str]] = None) -> Gauge:
+        return self._get_or_create(Gauge, name, labels, description)
+
+    def histogram(self, name: str, description: str = "", labels: Optional[Dict[str, str]] = None,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, labels, description, buckets)
+
+    def snapshot(self) -> dict:
+        """
+        Devuelve el valor actual de todas las métricas.
+
+        Returns:
+            dict: Métricas indexadas por nombre (con etiquetas al estilo Prometheus)
+        """
+        return {
+            _format_name(name, labels): metric.snapshot()
+            for (name, labels), metric in sorted(self._metrics.items())
+        }
+
+    def render_prometheus(self) -> str:
+        """
+        Exporta las métricas en el formato de texto de Prometheus.
+
+        Returns:
+            str: Métricas en formato de exposición de Prometheus
+        """
+        lines, described = [], set()
+        for (name, labels), metric in sorted(self._metrics.items()):
+            if name not in described:
+                described.add(name)
+                if metric.description:
+                    lines.append(f"# HELP {name} {metric.description}")
+                lines.append(f"# TYPE {name} {metric.kind}")
+
+            if isinstance(metric, Histogram):
+                for bound, cumulative in metric.snapshot()["buckets"].items():
+                    le = 'le="' + bound + '"'
+                    lines.append(f"{_format_name(name + '_bucket', labels, le)} {cumulative}")
+                lines.append(f"{_format_name(name + '_sum', labels)} {metric.sum}")
+                lines.append(f"{_format_name(name + '_count', labels)} {metric.count}")
+            else:
+                lines.append(f"{_format_name(name, labels)} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+# Registro global del proceso
+metrics = MetricsRegistry()
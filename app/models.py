@@ -6,7 +6,7 @@ Este archivo contiene todos los modelos Pydantic utilizados en la API.
 """
 
 from pydantic import BaseModel, Field, validator
-from typing import List
+from typing import List, Optional
 from datetime import datetime
 
 
@@ -90,6 +90,33 @@ class EventsRequest(BaseModel):
         }
 
 
+class StoreResponse(BaseModel):
+    """
+    Modelo para la respuesta de almacenamiento de eventos.
+    """
+    stored: int = Field(
+        description="Eventos guardados en esta solicitud",
+        example=2
+    )
+    total: int = Field(
+        description="Eventos en el almacén",
+        example=1500
+    )
+
+
+class EventsPage(BaseModel):
+    """
+    Modelo para una página de eventos de una consulta por rango.
+    """
+    events: List[Event] = Field(
+        description="Eventos de la página, ordenados por timestamp y event_id"
+    )
+    next_cursor: Optional[str] = Field(
+        description="Cursor de la página siguiente, o null si es la última",
+        example="WzE3MDQwNjcyMDAsImV2dF8wMDEiXQ"
+    )
+
+
 class HealthResponse(BaseModel):
     """
     Modelo para la respuesta de salud de la API.
@@ -0,0 +1,168 @@
+"""
+Caché del esquema OpenAPI
+=========================
+
+FastAPI genera el esquema OpenAPI en la primera petición a /openapi.json (o a /docs
+y /redoc) de cada worker, y lo vuelve a serializar en cada petición. Este archivo
+genera el esquema una sola vez, lo guarda serializado en disco junto con una huella
+del código fuente, y sirve siempre los mismos bytes.
+
+La caché se invalida sola cuando cambia cualquier archivo de app/ (también en sus
+subpaquetes) o config/settings.py, la configuración cargada (algunos valores, como el
+tamaño máximo de página, forman parte del esquema) o la versión de FastAPI o Pydantic.
+También se puede generar al construir la imagen:
+
+    python -m app.openapi_cache
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import fastapi
+import pydantic
+from fastapi import FastAPI
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+PROJECT_ROOT = Path(__file__).parent.parent
+FINGERPRINT_SOURCES = (PROJECT_ROOT / "app", PROJECT_ROOT / "config" / "settings.py")
+
+
+def source_fingerprint() -> str:
+    """
+    Calcula una huella de todo lo que define el esquema.
+
+    Returns:
+        str: SHA-256 de los archivos fuente de la aplicación, la configuración y las
+        versiones de FastAPI y Pydantic
+    """
+    digest = hashlib.sha256()
+    for source in FINGERPRINT_SOURCES:
+        files = sorted(source.rglob("*.py")) if source.is_dir() else [source]
+        for path in files:
+            digest.update(path.relative_to(PROJECT_ROOT).as_posix().encode())
+            digest.update(path.read_bytes())
+    digest.update(settings.model_dump_json().encode())
+    digest.update(f"fastapi={fastapi.__version__} pydantic={pydantic.VERSION}".encode())
+    return digest.hexdigest()
+
+
+def _read_cache(cache_path: Path, fingerprint: str) -> Optional[bytes]:
+    try:
+        document = json.loads(cache_path.read_bytes())
+    except (OSError, ValueError):
+        return None
+    if document.get("fingerprint") != fingerprint:
+        return None
+    return json.dumps(document["schema"], separators=(",", ":")).encode()
+
+
+def _write_cache(cache_path: Path, fingerprint: str, schema: dict) -> None:
+    # Escritura atómica: varios workers pueden arrancar a la vez
+    cache_path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=cache_path.parent, prefix=".openapi-")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as tmp_file:
+            json.dump({"fingerprint": fingerprint, "schema": schema}, tmp_file)
+        os.replace(tmp_name, cache_path)
+    except OSError as e:
+        logger.warning(f"⚠️ No se pudo guardar la caché de OpenAPI: {e}")
+        Path(tmp_name).unlink(missing_ok=True)
+
+
+class OpenAPICache:
+    """
+    Esquema OpenAPI pre-serializado de una aplicación FastAPI.
+    """
+
+    def __init__(self, app: FastAPI, cache_path: Optional[str] = None):
+        """
+        Args:
+            app: Aplicación FastAPI
+            cache_path: Archivo de caché en disco (None o vacío = solo en memoria)
+        """
+        self.app = app
+        self.cache_path = Path(cache_path) if cache_path else None
+        self.body: Optional[bytes] = None
+        self._generate_openapi = app.openapi
+
+    def load(self) -> bytes:
+        """
+        Devuelve el esquema serializado, cargándolo de disco o generándolo una sola vez.
+
+        Returns:
+            bytes: Esquema OpenAPI en JSON
+        """
+        if self.body is not None:
+            return self.body
+
+        fingerprint = source_fingerprint() if self.cache_path else ""
+        body = _read_cache(self.cache_path, fingerprint) if self.cache_path else None
+
+        if body is None:
+            schema = self._generate_openapi()
+            body = json.dumps(schema, separators=(",", ":")).encode()
+            if self.cache_path:
+                _write_cache(self.cache_path, fingerprint, schema)
+                logger.info(f"📝 Esquema OpenAPI generado y guardado en {self.cache_path}")
+
+        self.body = body
+        self.app.openapi_schema = json.loads(body)
+        return body
+
+    def openapi(self) -> dict:
+        """Reemplazo de FastAPI.openapi que usa la caché."""
+        if self.app.openapi_schema is None:
+            self.load()
+        return self.app.openapi_schema
+
+    async def endpoint(self, request: Request) -> Response:
+        return Response(self.load(), media_type="application/json")
+
+
+def install_openapi_cache(app: FastAPI, cache_path: Optional[str] = None) -> Optional[OpenAPICache]:
+    """
+    Sustituye la ruta de OpenAPI de la aplicación por una que sirve el esquema cacheado.
+
+    Args:
+        app: Aplicación FastAPI
+        cache_path: Archivo de caché en disco (opcional)
+
+    Returns:
+        Optional[OpenAPICache]: La caché instalada, o None si OpenAPI está desactivado
+    """
+    if not app.openapi_url:
+        return None
+
+    cache = OpenAPICache(app, cache_path)
+    app.openapi = cache.openapi
+
+    for index, route in enumerate(app.router.routes):
+        if isinstance(route, Route) and route.path == app.openapi_url:
+            app.router.routes[index] = Route(app.openapi_url, cache.endpoint, include_in_schema=False)
+            break
+
+    return cache
+
+
+if __name__ == "__main__":
+    # Generar la caché al construir la imagen, con la configuración del entorno actual
+    sys.path.insert(0, str(PROJECT_ROOT))
+    from app.main import app, openapi_cache
+
+    if openapi_cache is None or openapi_cache.cache_path is None:
+        print("❌ OpenAPI o su caché en disco están desactivados en esta configuración")
+        sys.exit(1)
+    openapi_cache.load()
+    print(f"✅ Esquema OpenAPI guardado en {openapi_cache.cache_path}")
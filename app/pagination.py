@@ -0,0 +1,56 @@
+"""
+Cursores de paginación
+======================
+
+Este archivo contiene los cursores opacos de las consultas por rango. Un cursor es la
+clave (timestamp, event_id) del último evento de una página, codificada en JSON y
+base64url, y la página siguiente empieza justo después de esa clave (paginación por
+clave, no por offset): pedir la página 1000 cuesta lo mismo que pedir la primera y los
+eventos que se guardan mientras se pagina no desplazan ni repiten resultados.
+"""
+
+import base64
+import binascii
+import json
+from typing import Tuple
+
+# (timestamp, event_id)
+CursorKey = Tuple[int, str]
+
+
+def encode_cursor(timestamp: int, event_id: str) -> str:
+    """
+    Codifica la clave de un evento como cursor opaco.
+
+    Args:
+        timestamp: Timestamp del último evento de la página
+        event_id: event_id del último evento de la página
+
+    Returns:
+        str: Cursor en base64url sin relleno
+    """
+    raw = json.dumps([timestamp, event_id], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """
+    Decodifica un cursor creado con encode_cursor.
+
+    Args:
+        cursor: Cursor recibido del cliente
+
+    Returns:
+        CursorKey: Clave (timestamp, event_id)
+
+    Raises:
+        ValueError: Si el cursor no es válido
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        timestamp, event_id = json.loads(raw)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise ValueError("Cursor inválido")
+    if type(timestamp) is not int or not isinstance(event_id, str):
+        raise ValueError("Cursor inválido")
+    return timestamp, event_id
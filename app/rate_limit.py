@@ -0,0 +1,217 @@
+"""
+Limitación de tasa por cliente
+==============================
+
+Este archivo contiene un limitador de tipo token bucket por cliente (IP o API key)
+para los endpoints de eventos, de modo que un solo cliente no pueda saturar los
+workers.
+
+- ShardedRateLimiter: tabla en memoria de buckets repartida en shards, cada uno con
+  su propio lock. Los buckets inactivos se eliminan barriendo un shard cada vez, así
+  que el coste de la limpieza no crece de golpe con el número de clientes.
+- RateLimitMiddleware: middleware ASGI que calcula el coste de cada petición (número
+  de eventos del cuerpo) y la carga en el carril de payloads pequeños o grandes, cada
+  uno con sus propios límites. Responde 429 con Retry-After al superar el límite.
+
+Los límites son por worker: con N workers, un cliente puede llegar a N veces la tasa
+configurada si el balanceo reparte sus conexiones.
+"""
+
+import logging
+import math
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from .asgi_utils import count_events, read_body, replay_receive, send_json_error
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Bucket de un cliente: tokens disponibles y último instante de actualización.
+    """
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, tokens: float, updated: float):
+        self.tokens = tokens
+        self.updated = updated
+
+
+class ShardedRateLimiter:
+    """
+    Token buckets por clave repartidos en shards.
+
+    Attributes:
+        rate: Tokens que se recuperan por segundo
+        burst: Capacidad máxima del bucket
+        idle_seconds: Tiempo sin uso tras el que se elimina un bucket
+        name: Nombre del limitador en las métricas
+    """
+
+    def __init__(self, rate: float, burst: float, shards: int = 64, idle_seconds: float = 300.0,
+                 name: str = "default", clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        # Un bucket sin uso durante burst / rate segundos ya está lleno: olvidarlo es equivalente
+        self.idle_seconds = max(idle_seconds, burst / rate)
+        self._clock = clock
+        count = 1 << max(0, shards - 1).bit_length()  # Potencia de dos para usar una máscara
+        self._mask = count - 1
+        self._shards: List[Dict[str, TokenBucket]] = [{} for _ in range(count)]
+        self._locks = [threading.Lock() for _ in range(count)]
+        self._sweep_cursor = 0
+        self._sweep_interval = self.idle_seconds / count  # Vuelta completa cada idle_seconds
+        self._next_sweep = clock() + self._sweep_interval
+        self._buckets_gauge = metrics.gauge("rate_limit_buckets", "Clientes con bucket en memoria",
+                                            labels={"lane": name})
+
+    def acquire(self, key: str, cost: float = 1.0) -> float:
+        """
+        Consume tokens del bucket de un cliente.
+
+        Args:
+            key: Identificador del cliente
+            cost: Tokens a consumir (se limita a burst para que siempre sea alcanzable)
+
+        Returns:
+            float: 0 si se admite; si no, segundos hasta disponer de los tokens
+        """
+        now = self._clock()
+        cost = min(cost, self.burst)
+        index = hash(key) & self._mask
+        shard = self._shards[index]
+
+        with self._locks[index]:
+            bucket = shard.get(key)
+            if bucket is None:
+                bucket = shard[key] = TokenBucket(self.burst, now)
+            else:
+                bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+                bucket.updated = now
+
+            if bucket.tokens >= cost:
+                bucket.tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - bucket.tokens) / self.rate
+
+        if now >= self._next_sweep:
+            self._sweep_next(now)
+        return wait
+
+    def _sweep_next(self, now: float) -> None:
+        self._next_sweep = now + self._sweep_interval
+        index = self._sweep_cursor
+        self._sweep_cursor = (index + 1) & self._mask
+        self.sweep_shard(index, now)
+        self._buckets_gauge.set(len(self))
+
+    def sweep_shard(self, index: int, now: Optional[float] = None) -> int:
+        """
+        Elimina los buckets inactivos de un shard.
+
+        Args:
+            index: Shard a barrer
+            now: Instante de referencia (por defecto el reloj del limitador)
+
+        Returns:
+            int: Número de buckets eliminados
+        """
+        now = self._clock() if now is None else now
+        shard = self._shards[index]
+        with self._locks[index]:
+            idle = [key for key, bucket in shard.items() if now - bucket.updated > self.idle_seconds]
+            for key in idle:
+                del shard[key]
+        return len(idle)
+
+    def __len__(self) -> int:
+        return sum(len(shard) for shard in self._shards)
+
+
+def request_cost(body: bytes) -> int:
+    """
+    Estima el coste de una petición como su número de eventos, sin parsear el JSON.
+
+    Cuenta las claves "event_id" (asgi_utils.count_events): un data con el valor
+    event_id no encarece la petición.
+
+    Args:
+        body: Cuerpo de la petición
+
+    Returns:
+        int: Número de eventos (mínimo 1)
+    """
+    return max(1, count_events(body))
+
+
+class RateLimitMiddleware:
+    """
+    Middleware ASGI de limitación de tasa para los endpoints de eventos.
+
+    Las peticiones POST cuestan tantos tokens como eventos traen y van al carril
+    "large" a partir de large_threshold eventos; el resto de peticiones cuesta 1 token
+    del carril "small". Un carril sin limitador (None) no se limita.
+    """
+
+    def __init__(self, app, small: Optional[ShardedRateLimiter], large: Optional[ShardedRateLimiter],
+                 large_threshold: int = 100, api_key_header: str = "x-api-key"):
+        self.app = app
+        self.lanes = {"small": small, "large": large}
+        self.large_threshold = large_threshold
+        self.api_key_header = api_key_header.lower().encode()
+        self._limited = {
+            lane: metrics.counter("rate_limited_total", "Peticiones rechazadas por límite de tasa",
+                                  labels={"lane": lane})
+            for lane in self.lanes
+        }
+
+    def client_key(self, scope) -> str:
+        """
+        Identifica al cliente por su API key o, si no la envía, por su IP.
+
+        Args:
+            scope: Scope ASGI de la petición
+
+        Returns:
+            str: Clave del cliente
+        """
+        for name, value in scope["headers"]:
+            if name == self.api_key_header:
+                return "key:" + value.decode("latin-1")
+        client = scope.get("client")
+        return "ip:" + (client[0] if client else "unknown")
+
+    @staticmethod
+    def applies_to(path: str) -> bool:
+        return path.startswith("/events/") or path == "/process_events"
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.applies_to(scope["path"]) or scope.get("warmup"):
+            await self.app(scope, receive, send)
+            return
+
+        key = self.client_key(scope)
+        if scope["method"] != "POST":
+            lane, cost = "small", 1
+        else:
+            body = await read_body(receive)
+            if body is None:
+                return
+            receive = replay_receive(body, receive)
+            cost = request_cost(body)
+            lane = "large" if cost >= self.large_threshold else "small"
+
+        limiter = self.lanes[lane]
+        wait = limiter.acquire(key, cost) if limiter is not None else 0.0
+        if wait:
+            self._limited[lane].inc()
+            logger.debug(f"🚦 Límite de tasa superado por {key} (carril {lane}, coste {cost})")
+            await send_json_error(send, 429, "Límite de peticiones superado, reintente más tarde",
+                                  "RATE_LIMITED", [(b"retry-after", str(math.ceil(wait)).encode())])
+            return
+
+        await self.app(scope, receive, send)
@@ -0,0 +1,300 @@
+"""
+Caché de resultados compartida entre workers
+============================================
+
+Este archivo contiene la caché de resultados de /events/process en memoria compartida
+(multiprocessing.shared_memory). Todos los workers del host la leen y la escriben
+directamente, sin pasar por otro proceso:
+
+- La clave es un hash del contenido del cuerpo (los 16 primeros bytes de su sha256): el mismo JSON
+  enviado a cualquier worker cae en la misma entrada.
+- Lo que se guarda no depende del momento actual: es el candidato de un payload que
+  pasó la validación, el evento de timestamp más alto (el primero si empatan). Al leer
+  se aplica filter_future_events: mientras el timestamp del candidato no haya pasado, el
+  candidato es el resultado de process_events, y después el resultado es None. Una
+  entrada nunca queda obsoleta y no hace falta caducarla. Los payloads que no pasan la
+  validación no se guardan.
+- Tabla de tamaño fijo con direccionamiento abierto: la clave elige una ranura y se
+  prueban como mucho PROBES consecutivas.
+- Cada ranura lleva un seqlock. El escritor pone su contador en impar, escribe y lo deja
+  en par; el lector copia la ranura sin lock y la descarta si el contador era impar o
+  cambió durante la copia. La ranura lleva además un CRC32 de su contenido, que detecta
+  una copia a medias aunque el procesador reordene los accesos (Python no tiene
+  barreras de memoria). Los escritores de una ranura se excluyen con un lock de rango de
+  bytes (fcntl) sobre un archivo de locks, y los hilos de un mismo proceso con un lock
+  del proceso. Si la ranura está ocupada por otro escritor, la escritura se omite.
+
+Expulsión: una entrada nueva ocupa la ranura de su misma clave si está en su ventana de
+PROBES, si no la primera libre, y si no hay ninguna libre sustituye a la escrita hace
+más tiempo. Las lecturas no escriben nada, así que es un FIFO por ventana, no un LRU.
+
+El segmento tiene nombre y no se registra en el resource_tracker, así que sobrevive a
+los reinicios de los workers (y del servidor): un worker nuevo se engancha a las
+entradas que ya hay. Solo desaparece al reiniciar el host o al borrarlo (unlink, o
+borrar /dev/shm/<nombre>). El nombre incluye la geometría, así que cambiar el número o
+el tamaño de las ranuras crea otro segmento, y la versión de la aplicación con una huella
+de app/models.py y app/services.py (release_tag): una versión nueva no lee nunca las
+entradas escritas por otra, que podría validar o elegir el candidato de otra forma. Al
+crear el segmento de una versión se borran los de las demás con el mismo prefijo; los
+workers antiguos que sigan enganchados conservan el suyo hasta cerrarlo.
+"""
+
+import fcntl
+import hashlib
+import logging
+import os
+import re
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from multiprocessing import resource_tracker
+from multiprocessing.shared_memory import SharedMemory
+from pathlib import Path
+from typing import Optional
+
+from . import __version__
+from .metrics import metrics
+from .models import Event
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"EVCACHE1"
+PROBES = 8  # Ranuras consecutivas en las que puede estar una clave
+KEY_BYTES = 16
+
+# Cabecera del segmento: magic, número de ranuras y bytes por ranura (64 bytes reservados)
+_HEADER = struct.Struct("<8sII")
+HEADER_BYTES = 64
+# Ranura: seq (seqlock) y CRC32, y después el cuerpo con el candidato y sus textos
+_SEQ = struct.Struct("<Q")
+_CRC = struct.Struct("<I")
+_BODY = struct.Struct("<16sqqHI")  # clave, escrita (ns), timestamp, bytes de event_id, bytes de data
+_CRC_OFFSET = _SEQ.size
+_BODY_OFFSET = _CRC_OFFSET + _CRC.size
+_PAYLOAD_OFFSET = _BODY_OFFSET + _BODY.size
+
+# Lo que decide qué candidato se guarda para un cuerpo
+RELEASE_SOURCES = (Path(__file__).parent / "models.py", Path(__file__).parent / "services.py")
+SHM_DIR = Path("/dev/shm")
+
+
+def release_tag() -> str:
+    """
+    Identifica la versión de la aplicación en el nombre del segmento.
+
+    Returns:
+        str: v<__version__>-<8 primeros caracteres del sha256 de RELEASE_SOURCES>
+    """
+    digest = hashlib.sha256(__version__.encode())
+    for path in RELEASE_SOURCES:
+        digest.update(path.read_bytes())
+    return f"v{__version__}-{digest.hexdigest()[:8]}"
+
+
+def _attach(name: str, create: bool, size: int = 0) -> SharedMemory:
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name, create=create, size=size, track=False)
+    segment = SharedMemory(name, create=create, size=size)
+    # Antes de 3.13 el resource_tracker borra el segmento cuando termina el proceso que
+    # lo creó (o que se enganchó), y la caché no sobreviviría al reinicio de un worker
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_other_releases(name: str, segment_name: str) -> None:
+    # Solo los segmentos de este prefijo con el formato de open(); los de otras geometrías
+    # de la misma versión se dejan
+    pattern = re.compile(rf"{re.escape(name)}-v.+-[0-9a-f]{{8}}-\d+x\d+")
+    release = segment_name[:segment_name.rindex("-")]
+    try:
+        stale = [path for path in SHM_DIR.iterdir()
+                 if pattern.fullmatch(path.name) and not path.name.startswith(f"{release}-")]
+    except OSError:
+        return  # Sin /dev/shm (otros sistemas) no hay nada que limpiar
+    for path in stale:
+        for leftover in (path, Path(tempfile.gettempdir()) / f"{path.name}.lock"):
+            try:
+                leftover.unlink()
+            except OSError:
+                pass
+        logger.info(f"🧹 Caché de resultados de otra versión borrada: {path}")
+
+
+class ResultCache:
+    """
+    Tabla de candidatos en memoria compartida.
+
+    Attributes:
+        name: Nombre del segmento (incluye la versión y la geometría)
+        slots: Número de ranuras
+        slot_bytes: Bytes por ranura; los candidatos que no caben no se guardan
+    """
+
+    def __init__(self, segment: SharedMemory, slots: int, slot_bytes: int):
+        self.name = segment.name
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._segment = segment
+        self._buf = segment.buf
+        lock_path = os.path.join(tempfile.gettempdir(), f"{segment.name.lstrip('/')}.lock")
+        self._lock_fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        self._thread_lock = threading.Lock()  # Los locks de fcntl son por proceso, no por hilo
+
+        self._hits = metrics.counter("result_cache_hits_total", "Resultados de /events/process servidos desde la caché")
+        self._misses = metrics.counter("result_cache_misses_total", "Consultas a la caché de resultados sin entrada")
+        self._writes = metrics.counter("result_cache_writes_total", "Entradas escritas en la caché de resultados")
+        self._evictions = metrics.counter("result_cache_evictions_total",
+                                          "Entradas de otra clave sustituidas al escribir en la caché")
+        self._skipped = metrics.counter("result_cache_skipped_total",
+                                        "Escrituras omitidas (candidato demasiado grande o ranura ocupada)")
+
+    @classmethod
+    def open(cls, name: str, slots: int = 16384, slot_bytes: int = 512,
+             release: Optional[str] = None) -> "ResultCache":
+        """
+        Se engancha al segmento de la caché, o lo crea si no existe.
+
+        Args:
+            name: Prefijo del nombre del segmento
+            slots: Número de ranuras
+            slot_bytes: Bytes por ranura (múltiplo de 8, al menos 128)
+            release: Versión en el nombre del segmento (por defecto, release_tag())
+
+        Returns:
+            ResultCache: La caché
+
+        Raises:
+            ValueError: Si la geometría no es válida o el segmento existente no es una caché
+        """
+        if slots < PROBES or slot_bytes < 128 or slot_bytes % 8:
+            raise ValueError(f"Geometría de caché inválida: {slots} ranuras de {slot_bytes} bytes")
+        segment_name = f"{name}-{release or release_tag()}-{slots}x{slot_bytes}"
+        size = HEADER_BYTES + slots * slot_bytes
+        try:
+            segment = _attach(segment_name, create=True, size=size)
+            _HEADER.pack_into(segment.buf, 0, MAGIC, slots, slot_bytes)  # El resto ya está a cero
+            logger.info(f"🧠 Caché de resultados creada: /dev/shm/{segment_name} ({size // 1024} KiB)")
+            _unlink_other_releases(name, segment_name)
+        except FileExistsError:
+            segment = _attach(segment_name, create=False)
+            deadline = time.monotonic() + 1.0
+            # Quien lo creó escribe la cabecera justo después de crearlo
+            while _HEADER.unpack_from(segment.buf, 0)[0] != MAGIC and time.monotonic() < deadline:
+                time.sleep(0.001)
+            if segment.size < size or _HEADER.unpack_from(segment.buf, 0) != (MAGIC, slots, slot_bytes):
+                segment.close()
+                raise ValueError(f"/dev/shm/{segment_name} no es una caché de resultados válida")
+        return cls(segment, slots, slot_bytes)
+
+    @staticmethod
+    def key(body: bytes) -> bytes:
+        """Clave de un cuerpo: hash de su contenido."""
+        return hashlib.sha256(body).digest()[:KEY_BYTES]  # sha256 va acelerado por hardware en OpenSSL
+
+    def _offset(self, key: bytes, probe: int) -> int:
+        slot = (int.from_bytes(key[:8], "little") + probe) % self.slots
+        return HEADER_BYTES + slot * self.slot_bytes
+
+    def get(self, key: bytes) -> Optional[Event]:
+        """
+        Busca el candidato de una clave, sin locks.
+
+        Returns:
+            Optional[Event]: El candidato, o None si no está (o se está escribiendo)
+        """
+        buf = self._buf
+        for probe in range(PROBES):
+            offset = self._offset(key, probe)
+            seq = _SEQ.unpack_from(buf, offset)[0]
+            if seq == 0:
+                break  # Ranura nunca escrita: las entradas no se borran, así que no está más allá
+            if seq & 1 or buf[offset + _BODY_OFFSET:offset + _BODY_OFFSET + KEY_BYTES] != key:
+                continue
+            copy = bytes(buf[offset:offset + self.slot_bytes])
+            if _SEQ.unpack_from(buf, offset)[0] != seq or _SEQ.unpack_from(copy)[0] != seq:
+                break  # Otro worker la reescribió mientras se copiaba
+            stored_key, _, timestamp, id_length, data_length = _BODY.unpack_from(copy, _BODY_OFFSET)
+            end = _PAYLOAD_OFFSET + id_length + data_length
+            if stored_key != key or end > self.slot_bytes or \
+                    zlib.crc32(copy[_BODY_OFFSET:end]) != _CRC.unpack_from(copy, _CRC_OFFSET)[0]:
+                break
+            self._hits.inc()
+            payload = copy[_PAYLOAD_OFFSET:end]
+            return Event.model_construct(event_id=payload[:id_length].decode(), timestamp=timestamp,
+                                         data=payload[id_length:].decode())
+        self._misses.inc()
+        return None
+
+    def put(self, key: bytes, candidate: Event) -> bool:
+        """
+        Guarda el candidato de una clave.
+
+        Returns:
+            bool: False si no se escribió (no cabe en una ranura u otro escritor la ocupa)
+        """
+        event_id, data = candidate.event_id.encode(), candidate.data.encode()
+        if _PAYLOAD_OFFSET + len(event_id) + len(data) > self.slot_bytes:
+            self._skipped.inc()
+            return False
+        body = _BODY.pack(key, time.time_ns(), candidate.timestamp, len(event_id), len(data)) + event_id + data
+        crc = zlib.crc32(body)
+
+        buf = self._buf
+        with self._thread_lock:
+            offset = self._choose(key)
+            try:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, offset)
+            except OSError:
+                self._skipped.inc()
+                return False
+            try:
+                seq = _SEQ.unpack_from(buf, offset)[0]
+                if seq and buf[offset + _BODY_OFFSET:offset + _BODY_OFFSET + KEY_BYTES] != key:
+                    self._evictions.inc()
+                seq += seq & 1  # Impar: un escritor murió a medias; la ranura se reescribe entera
+                _SEQ.pack_into(buf, offset, seq + 1)
+                _CRC.pack_into(buf, offset + _CRC_OFFSET, crc)
+                buf[offset + _BODY_OFFSET:offset + _BODY_OFFSET + len(body)] = body
+                _SEQ.pack_into(buf, offset, seq + 2)
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, 1, offset)
+        self._writes.inc()
+        return True
+
+    def _choose(self, key: bytes) -> int:
+        """Ranura para escribir una clave: la suya, la primera libre o la escrita hace más tiempo."""
+        buf = self._buf
+        oldest, oldest_written = None, None
+        for probe in range(PROBES):
+            offset = self._offset(key, probe)
+            if _SEQ.unpack_from(buf, offset)[0] == 0:
+                return offset
+            stored_key, written = _BODY.unpack_from(buf, offset + _BODY_OFFSET)[:2]
+            if stored_key == key:
+                return offset
+            if oldest_written is None or written < oldest_written:
+                oldest, oldest_written = offset, written
+        return oldest
+
+    def close(self) -> None:
+        """Se desengancha del segmento; las entradas se conservan para los demás workers."""
+        if self._buf is None:
+            return
+        self._buf = None
+        self._segment.close()
+        os.close(self._lock_fd)
+
+    def unlink(self) -> None:
+        """Borra el segmento y su archivo de locks (todos los workers pierden la caché)."""
+        if sys.version_info < (3, 13):
+            # SharedMemory.unlink lo quita del resource_tracker, que debe tenerlo registrado
+            resource_tracker.register(self._segment._name, "shared_memory")
+        self._segment.unlink()
+        lock_path = os.path.join(tempfile.gettempdir(), f"{self.name.lstrip('/')}.lock")
+        try:
+            os.unlink(lock_path)
+        except FileNotFoundError:
+            pass
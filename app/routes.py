@@ -5,12 +5,26 @@ Rutas de la Event Processor API
 Este archivo contiene todas las rutas y endpoints de la API.
 """
 
-from fastapi import APIRouter, HTTPException, status, Response
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Query, Request, status, Response, WebSocket
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import ValidationError
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+import asyncio
 import logging
 
-from .models import Event, EventsRequest, HealthResponse
+from config.settings import settings
+
+from .conditional import body_etag, cache_headers, etag_matches, event_etag
+from .lanes import LaneFullError
+from .metrics import metrics
+from .models import Event, EventsPage, EventsRequest, HealthResponse, StoreResponse
+from .pagination import decode_cursor, encode_cursor
 from .services import EventProcessorService, HealthService
+from .storage import (DEFAULT_NAMESPACE, NAMESPACE_PATTERN, Partition, PartitionLimitError,
+                      PartitionQuotaError, ReadOnlyReplicaError)
+from .warmup import readiness
 
 # Configurar logging
 logger = logging.getLogger(__name__)
@@ -35,6 +49,121 @@ health_router = APIRouter(
 # Router principal (sin prefijo)
 main_router = APIRouter()
 
+# Serializador de Event de pydantic-core: convierte a JSON un Event ya validado sin
+# volver a validarlo (FastAPI lo haría con response_model) ni pasar por jsonable_encoder
+_serialize_event = Event.__pydantic_serializer__.to_json
+_serialize_page = EventsPage.__pydantic_serializer__.to_json
+
+
+class PrebuiltResponse(Response):
+    """
+    Respuesta construida una sola vez y reutilizada en todas las peticiones.
+
+    Cada envío lleva una copia de las cabeceras, para que un middleware que las
+    modifique no altere la respuesta compartida.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code,
+                    "headers": list(self.raw_headers)})
+        await send({"type": "http.response.body", "body": self.body})
+
+
+# Sin ganador el ETag y el Cache-Control son siempre los mismos, así que el 204 y su
+# 304 son respuestas únicas compartidas por todas las peticiones
+_NONE_HEADERS = cache_headers(None, 0, settings.cache_max_age)
+NO_CONTENT = PrebuiltResponse(status_code=status.HTTP_204_NO_CONTENT, headers=_NONE_HEADERS)
+NOT_MODIFIED_NONE = PrebuiltResponse(status_code=status.HTTP_304_NOT_MODIFIED, headers=_NONE_HEADERS)
+
+# Los resultados del almacén dependen de un estado que cambia con cada escritura: el
+# cliente puede guardarlos, pero tiene que revalidarlos siempre con el ETag
+STORED_CACHE_CONTROL = "private, no-cache"
+_STORED_NONE_HEADERS = {"ETag": event_etag(None), "Cache-Control": STORED_CACHE_CONTROL}
+STORED_NO_CONTENT = PrebuiltResponse(status_code=status.HTTP_204_NO_CONTENT, headers=_STORED_NONE_HEADERS)
+STORED_NOT_MODIFIED_NONE = PrebuiltResponse(status_code=status.HTTP_304_NOT_MODIFIED,
+                                            headers=_STORED_NONE_HEADERS)
+
+
+def event_response(event: Event, headers: Optional[dict] = None) -> Response:
+    """
+    Construye la respuesta 200 de un evento ganador.
+
+    Devolver una Response hace que FastAPI no aplique el response_model, que se
+    mantiene en el decorador solo para documentar la respuesta en OpenAPI.
+
+    Args:
+        event: Evento ya validado
+        headers: Cabeceras adicionales (ETag, Cache-Control)
+
+    Returns:
+        Response: Evento en JSON
+    """
+    return Response(content=_serialize_event(event), media_type="application/json", headers=headers)
+
+
+def result_response(result: Optional[Event], if_none_match: Optional[str]) -> Response:
+    """
+    Construye la respuesta de un resultado con ETag y Cache-Control.
+
+    Args:
+        result: Evento ganador, o None si no hay eventos futuros
+        if_none_match: Cabecera If-None-Match de la petición
+
+    Returns:
+        Response: 200 con el evento, 204 sin ganador, o 304 si el cliente ya lo tiene
+    """
+    if result is None:
+        return NOT_MODIFIED_NONE if etag_matches(if_none_match, _NONE_HEADERS["ETag"]) else NO_CONTENT
+
+    headers = cache_headers(result, EventProcessorService.get_current_timestamp(), settings.cache_max_age)
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return event_response(result, headers)
+
+
+def stored_result_response(result: Optional[Event], if_none_match: Optional[str]) -> Response:
+    """
+    Construye la respuesta de un resultado del almacén con ETag y Cache-Control: no-cache.
+
+    A diferencia de result_response no usa max-age: guardar un evento posterior cambia el
+    ganador antes de que venza el actual.
+
+    Args:
+        result: Evento ganador, o None si no hay eventos futuros guardados
+        if_none_match: Cabecera If-None-Match de la petición
+
+    Returns:
+        Response: 200 con el evento, 204 sin ganador, o 304 si el cliente ya lo tiene
+    """
+    if result is None:
+        return STORED_NOT_MODIFIED_NONE if etag_matches(if_none_match, event_etag(None)) else STORED_NO_CONTENT
+
+    headers = {"ETag": event_etag(result), "Cache-Control": STORED_CACHE_CONTROL}
+    if etag_matches(if_none_match, headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return event_response(result, headers)
+
+
+# El cuerpo de los endpoints de procesamiento se valida dentro del carril de prioridad
+# (ver process_payload), así que el esquema se declara aquí para que OpenAPI siga
+# documentando EventsRequest. Event ya está en components por el response_model.
+EVENTS_REQUEST_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {
+                "schema": {
+                    key: value
+                    for key, value in EventsRequest.model_json_schema(
+                        ref_template="#/components/schemas/{model}"
+                    ).items()
+                    if key != "$defs"
+                }
+            }
+        },
+    }
+}
+
 
 @main_router.get(
     "/",
@@ -81,6 +210,9 @@ async def root():
         204: {
             "description": "No se encontraron eventos válidos (futuros)"
         },
+        304: {
+            "description": "El resultado no ha cambiado (If-None-Match coincide con el ETag)"
+        },
         400: {
             "description": "Error de validación en los datos de entrada"
         },
@@ -108,37 +240,66 @@ async def root():
     **Respuestas:**
     - 200: Evento futuro más próximo encontrado
     - 204: No hay eventos futuros válidos
+    - 304: Resultado sin cambios respecto al ETag enviado en If-None-Match
     - 400/422: Errores de validación
-    """
+    - 429: Carril de procesamiento lleno
+    """,
+    openapi_extra=EVENTS_REQUEST_BODY
 )
-async def process_events(request: EventsRequest):
+async def process_events(request: Request):
     """
     Procesa una lista de eventos y devuelve el evento futuro más próximo.
 
+    El cuerpo se valida y se procesa en el carril de prioridad que le corresponde por
+    tamaño (ver app/lanes.py), o directamente en el event loop si no hay carriles. Con
+    la caché de resultados (ver app/result_cache.py), un cuerpo idéntico a otro ya
+    validado por cualquier worker no se vuelve a validar.
+
     Args:
-        request: Objeto que contiene la lista de eventos a procesar
+        request: Petición HTTP cuyo cuerpo es un EventsRequest en JSON
 
     Returns:
-        Event: El evento con el timestamp más alto que sea >= al momento actual
-        Response: 204 No Content si no hay eventos válidos
+        Response: El evento con el timestamp más alto que sea >= al momento actual en
+            JSON, 204 No Content si no hay eventos válidos, o 304 Not Modified si el
+            If-None-Match coincide con el ETag del resultado
 
     Raises:
+        RequestValidationError: Si el cuerpo no cumple el esquema (422)
         HTTPException: Para errores de validación o procesamiento
     """
+    body = await request.body()
+    cache = getattr(request.app.state, "result_cache", None)
     try:
-        # Validar reglas de negocio adicionales
-        EventProcessorService.validate_events_business_rules(request.events)
-
-        # Procesar eventos
-        result = EventProcessorService.process_events(request)
+        if cache is None:
+            result = await _in_lane(request, process_payload, body)
+        else:
+            # La caché guarda el candidato, que no depende del momento actual; el filtro
+            # de eventos futuros se aplica en cada petición
+            key = cache.key(body)
+            candidate = cache.get(key)
+            if candidate is None:
+                candidate = await _in_lane(request, payload_candidate, body)
+                cache.put(key, candidate)
+            result = next(iter(EventProcessorService.filter_future_events([candidate])), None)
 
-        # Si no hay eventos futuros, devolver 204 No Content
-        if result is None:
-            return Response(status_code=status.HTTP_204_NO_CONTENT)
-
-        logger.info(f"Evento procesado exitosamente: {result.event_id}")
-        return result
+        if result is not None:
+            logger.info(f"Evento procesado exitosamente: {result.event_id}")
+        # 204 No Content si no hay eventos futuros; 304 si el cliente ya tiene el resultado
+        return result_response(result, request.headers.get("if-none-match"))
 
+    except ValidationError as e:
+        # Mismo formato de 422 que la validación de FastAPI
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)],
+            body=body
+        )
+    except LaneFullError as e:
+        logger.warning(f"Petición rechazada: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Servicio sobrecargado, reintente más tarde",
+            headers={"Retry-After": str(settings.admission_retry_after)}
+        )
     except ValueError as e:
         logger.warning(f"Error de validación de negocio: {str(e)}")
         raise HTTPException(
@@ -153,6 +314,317 @@ async def process_events(request: EventsRequest):
         )
 
 
+async def _in_lane(request: Request, func, body: bytes):
+    """Ejecuta func(body) en el carril de la petición, o en el event loop si no hay carriles."""
+    lanes = getattr(request.app.state, "lanes", None)
+    if lanes is None:
+        return func(body)
+    return await lanes.classify(request.headers).run(func, body)
+
+
+def process_payload(body: bytes) -> Optional[Event]:
+    """
+    Valida un cuerpo JSON y devuelve el evento futuro más próximo.
+
+    Args:
+        body: Cuerpo de la petición (EventsRequest en JSON)
+
+    Returns:
+        Optional[Event]: Evento ganador, o None si no hay eventos futuros
+
+    Raises:
+        ValidationError: Si el cuerpo no cumple el esquema
+        ValueError: Si no cumple las reglas de negocio
+    """
+    events_request = EventsRequest.model_validate_json(body)
+    EventProcessorService.validate_events_business_rules(events_request.events)
+    return EventProcessorService.process_events(events_request)
+
+
+def payload_candidate(body: bytes) -> Event:
+    """
+    Valida un cuerpo JSON y devuelve su candidato para la caché de resultados.
+
+    El candidato es el evento de timestamp más alto (el primero si empatan), sea futuro
+    o no: el resultado de process_payload es el candidato si aún es futuro, y None si no.
+
+    Args:
+        body: Cuerpo de la petición (EventsRequest en JSON)
+
+    Returns:
+        Event: El candidato
+
+    Raises:
+        ValidationError: Si el cuerpo no cumple el esquema
+        ValueError: Si no cumple las reglas de negocio
+    """
+    events_request = EventsRequest.model_validate_json(body)
+    EventProcessorService.validate_events_business_rules(events_request.events)
+    return EventProcessorService.find_latest_event(events_request.events)
+
+
+def _event_store(request: Request):
+    """Devuelve el almacén de eventos de la aplicación, o 503 si no está configurado."""
+    store = getattr(request.app.state, "event_store", None)
+    if store is None:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Almacenamiento de eventos desactivado (configure EVENT_STORE_DIR)"
+        )
+    return store
+
+
+def namespace_query():
+    """Parámetro namespace de los endpoints del almacén."""
+    return Query(DEFAULT_NAMESPACE, pattern=NAMESPACE_PATTERN,
+                 description="Espacio de nombres (partición) de los eventos")
+
+
+@asynccontextmanager
+async def _partition(request: Request, namespace: str) -> AsyncIterator[Partition]:
+    """
+    Usa la partición de un espacio de nombres mientras dura el bloque.
+
+    Sin registro de particiones (almacén fijado directamente en app.state.event_store)
+    solo existe el espacio por defecto.
+    """
+    partitions = getattr(request.app.state, "partitions", None)
+    if partitions is None:
+        store = _event_store(request)
+        if namespace != DEFAULT_NAMESPACE:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Particiones desactivadas: solo está disponible el espacio de nombres default"
+            )
+        yield Partition(namespace, store)
+        return
+
+    try:
+        partition = await partitions.acquire(namespace)
+    except PartitionLimitError as e:
+        logger.warning(f"Partición rechazada: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Demasiadas particiones en uso, reintente más tarde",
+            headers={"Retry-After": str(settings.admission_retry_after)}
+        )
+    try:
+        yield partition
+    finally:
+        partitions.release(partition)
+
+
+@events_router.post(
+    "/store",
+    response_model=StoreResponse,
+    status_code=201,
+    responses={
+        400: {"description": "event_ids duplicados (en la solicitud o ya guardados) o timestamps inválidos"},
+        503: {"description": "Almacenamiento de eventos desactivado, demasiadas particiones en uso o nodo "
+                            "seguidor de solo lectura"},
+        507: {"description": "El lote supera la cuota de eventos del espacio de nombres"}
+    },
+    summary="Guardar eventos",
+    description="Guarda los eventos en el almacén durable del servidor, en la partición del espacio de "
+                "nombres indicado. La respuesta se envía cuando el lote está escrito en el WAL y "
+                "sincronizado a disco."
+)
+async def store_events(events_request: EventsRequest, request: Request, namespace: str = namespace_query()):
+    """
+    Guarda una lista de eventos en el almacén del servidor.
+    """
+    async with _partition(request, namespace) as partition:
+        try:
+            # Los event_ids repetidos los detecta el almacén, también contra lo ya guardado
+            EventProcessorService.validate_events_business_rules(events_request.events, check_duplicates=False)
+            stored = await partition.append(events_request.events)
+        except PartitionQuotaError as e:
+            logger.warning(f"Cuota superada: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_507_INSUFFICIENT_STORAGE,
+                detail=str(e)
+            )
+        except ReadOnlyReplicaError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+        except ValueError as e:
+            logger.warning(f"Error de validación de negocio: {str(e)}")
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+        total = len(partition.store)
+    # El despachador y las suscripciones en vivo siguen el espacio por defecto
+    if namespace == DEFAULT_NAMESPACE:
+        dispatcher = getattr(request.app.state, "dispatcher", None)
+        if dispatcher is not None:
+            dispatcher.schedule(events_request.events)
+        live_hub = getattr(request.app.state, "live_hub", None)
+        if live_hub is not None:
+            live_hub.notify()
+    return StoreResponse(stored=stored, total=total)
+
+
+@events_router.get(
+    "/latest",
+    response_model=Optional[Event],
+    responses={
+        204: {"description": "No hay eventos futuros guardados"},
+        304: {"description": "El resultado no ha cambiado (If-None-Match coincide con el ETag)"},
+        503: {"description": "Almacenamiento de eventos desactivado o demasiadas particiones en uso"}
+    },
+    summary="Evento futuro más próximo guardado",
+    description="Devuelve, entre los eventos guardados en el espacio de nombres, el de timestamp más alto "
+                "que sea >= al momento actual, con la misma lógica que /events/process. Admite "
+                "If-None-Match."
+)
+async def latest_stored_event(request: Request, namespace: str = namespace_query()):
+    """
+    Devuelve el evento futuro más próximo del almacén.
+    """
+    async with _partition(request, namespace) as partition:
+        latest = await partition.store.latest()
+    return stored_result_response(latest, request.headers.get("if-none-match"))
+
+
+def _range_bounds(start: int, end: int, cursor: Optional[str]):
+    """Valida el rango y el cursor de una consulta, o responde 400."""
+    if end <= start:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end debe ser mayor que start")
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+
+@events_router.get(
+    "/range",
+    response_model=EventsPage,
+    responses={
+        304: {"description": "La página no ha cambiado (If-None-Match coincide con el ETag)"},
+        400: {"description": "Rango o cursor inválido"},
+        503: {"description": "Almacenamiento de eventos desactivado o demasiadas particiones en uso"}
+    },
+    summary="Eventos guardados en un rango de tiempo",
+    description="Lista los eventos guardados con timestamp en [start, end), ordenados por timestamp y "
+                "event_id, en páginas de como mucho limit eventos. next_cursor se pasa como cursor para "
+                "pedir la página siguiente; cada página cuesta lo mismo sea cual sea su posición. "
+                "Admite If-None-Match."
+)
+async def list_events_range(
+    request: Request,
+    start: int = Query(..., description="Primer timestamp incluido"),
+    end: int = Query(..., description="Primer timestamp excluido"),
+    limit: int = Query(settings.event_store_page_size, ge=1, le=settings.event_store_max_page_size,
+                       description="Máximo de eventos de la página"),
+    cursor: Optional[str] = Query(None, description="next_cursor de la página anterior"),
+    namespace: str = namespace_query(),
+):
+    """
+    Devuelve una página de los eventos guardados en un rango de tiempo.
+    """
+    after = _range_bounds(start, end, cursor)
+    async with _partition(request, namespace) as partition:
+        # Uno más para saber si hay otra página
+        events = await partition.store.scan_page(start, end, after, limit + 1)
+    next_cursor = None
+    if len(events) > limit:
+        events = events[:limit]
+        next_cursor = encode_cursor(events[-1].timestamp, events[-1].event_id)
+
+    body = _serialize_page(EventsPage.model_construct(events=events, next_cursor=next_cursor))
+    headers = {"ETag": body_etag(body), "Cache-Control": STORED_CACHE_CONTROL}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@events_router.get(
+    "/range/export",
+    response_class=StreamingResponse,
+    responses={
+        200: {"description": "Un evento JSON por línea", "content": {"application/x-ndjson": {}}},
+        400: {"description": "Rango inválido"},
+        503: {"description": "Almacenamiento de eventos desactivado o demasiadas particiones en uso"}
+    },
+    summary="Exportar los eventos de un rango de tiempo",
+    description="Envía todos los eventos guardados con timestamp en [start, end) como NDJSON, ordenados "
+                "por timestamp y event_id, leyendo el almacén por páginas mientras se envían."
+)
+async def export_events_range(
+    request: Request,
+    start: int = Query(..., description="Primer timestamp incluido"),
+    end: int = Query(..., description="Primer timestamp excluido"),
+    namespace: str = namespace_query(),
+):
+    """
+    Exporta como NDJSON los eventos guardados en un rango de tiempo.
+    """
+    _range_bounds(start, end, None)
+    batch = settings.event_store_max_page_size
+    # Se comprueba antes de empezar a responder (503 si no hay almacén o partición)
+    async with _partition(request, namespace):
+        pass
+
+    async def lines():
+        # La partición no se cierra por inactividad mientras dura la exportación
+        async with _partition(request, namespace) as partition:
+            after = None
+            while True:
+                events = await partition.store.scan_page(start, end, after, batch)
+                if not events:
+                    return
+                yield b"".join([_serialize_event(event) + b"\n" for event in events])
+                if len(events) < batch:
+                    return
+                after = (events[-1].timestamp, events[-1].event_id)
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+async def _send_updates(websocket: WebSocket, subscription) -> None:
+    while True:
+        for message in await subscription.next():
+            await websocket.send_text(message)
+
+
+@events_router.websocket("/subscribe")
+async def subscribe_latest(
+    websocket: WebSocket,
+    policy: str = Query(settings.live_policy, pattern="^(coalesce|drop)$",
+                        description="coalesce: solo el último cambio pendiente; drop: cola acotada"),
+):
+    """
+    Envía el evento futuro más próximo guardado al conectarse y cada vez que cambia.
+
+    Cada mensaje es {"seq": n, "event": {...} | null}; un salto en seq indica mensajes
+    descartados por la política de la conexión.
+    """
+    live_hub = getattr(websocket.app.state, "live_hub", None)
+    if live_hub is None:
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR,
+                              reason="Almacenamiento de eventos desactivado")
+        return
+    subscription = live_hub.subscribe(policy, settings.live_queue_size)
+    if subscription is None:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER, reason="Demasiadas suscripciones")
+        return
+
+    await websocket.accept()
+    sender = asyncio.create_task(_send_updates(websocket, subscription))
+    try:
+        # Lo que envíe el cliente se ignora; solo interesa enterarse de la desconexión
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+    finally:
+        sender.cancel()
+        live_hub.unsubscribe(subscription)
+
+
 @health_router.get(
     "/",
     response_model=HealthResponse,
@@ -192,3 +664,51 @@ async def check_dependencies():
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error al verificar las dependencias"
         )
+
+
+@health_router.get(
+    "/ready",
+    summary="Disponibilidad (readiness)",
+    description="Devuelve 200 cuando el worker terminó el calentamiento y puede recibir tráfico, "
+                "503 mientras tanto. A diferencia de /health/ (liveness), no indica si el proceso está vivo.",
+    responses={503: {"description": "El worker todavía se está calentando"}}
+)
+async def readiness_check():
+    """
+    Verifica si el worker está listo para recibir tráfico.
+    """
+    state = readiness.snapshot()
+    if not readiness.ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=state)
+    return state
+
+
+@health_router.get(
+    "/replication",
+    summary="Estado de la replicación",
+    description="Rol del nodo en la replicación del almacén. En el líder: época, último cambio y seguidores "
+                "conectados. En un seguidor: conexión, cambios aplicados y retraso (lag_seconds es null hasta "
+                "que recibe el primer snapshot)."
+)
+async def replication_status(request: Request):
+    """
+    Devuelve el estado de la replicación del almacén.
+    """
+    replication = getattr(request.app.state, "replication", None)
+    if replication is None:
+        return {"role": "none"}
+    return replication.status()
+
+
+@health_router.get(
+    "/metrics",
+    summary="Métricas del worker",
+    description="Métricas internas del worker en JSON, o en formato Prometheus con ?format=prometheus"
+)
+async def get_metrics(format: str = "json"):
+    """
+    Exporta las métricas del worker.
+    """
+    if format == "prometheus":
+        return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+    return metrics.snapshot()
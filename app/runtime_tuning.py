@@ -0,0 +1,116 @@
+"""
+Ajustes del runtime de Python
+=============================
+
+Este archivo contiene los ajustes del recolector de basura (GC) de cada worker:
+
+- gc.freeze() tras importar la aplicación: los objetos creados al importar (módulos,
+  clases, modelos de Pydantic, rutas) pasan a la generación permanente y el GC deja
+  de recorrerlos en cada colección completa. Con un servidor que hace fork después
+  de cargar la aplicación (por ejemplo gunicorn --preload) además evita que el GC
+  escriba en esas páginas, que siguen compartidas copy-on-write entre workers. Los
+  workers de uvicorn se lanzan con spawn e importan la aplicación cada uno, así que
+  ahí solo aplica lo primero.
+- Umbrales de generación configurables (gc.set_threshold).
+- Un callback en gc.callbacks que registra la duración de cada pausa del GC en las
+  métricas, por generación.
+"""
+
+import gc
+import logging
+import time
+from typing import Optional, Sequence
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+GC_PAUSE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class GCPauseRecorder:
+    """
+    Callback de gc.callbacks que mide las pausas del recolector.
+    """
+
+    def __init__(self):
+        self._started = 0.0
+        self._pauses = [
+            metrics.histogram("gc_pause_seconds", "Duración de las pausas del GC",
+                              labels={"generation": str(generation)}, buckets=GC_PAUSE_BUCKETS)
+            for generation in range(3)
+        ]
+        self._collected = metrics.counter("gc_collected_objects_total", "Objetos liberados por el GC")
+
+    def __call__(self, phase: str, info: dict) -> None:
+        if phase == "start":
+            self._started = time.perf_counter()
+        else:
+            self._pauses[info["generation"]].observe(time.perf_counter() - self._started)
+            self._collected.inc(info["collected"])
+
+
+_recorder: Optional[GCPauseRecorder] = None
+
+
+def install_gc_pause_metrics() -> None:
+    """Registra el callback de pausas del GC (solo una vez por proceso)."""
+    global _recorder
+    if _recorder is None:
+        _recorder = GCPauseRecorder()
+        gc.callbacks.append(_recorder)
+
+
+def uninstall_gc_pause_metrics() -> None:
+    """Quita el callback de pausas del GC."""
+    global _recorder
+    if _recorder is not None:
+        gc.callbacks.remove(_recorder)
+        _recorder = None
+
+
+def set_gc_thresholds(thresholds: Optional[Sequence[int]]) -> None:
+    """
+    Cambia los umbrales de generación del GC.
+
+    Args:
+        thresholds: Umbrales (gen0, gen1, gen2); None mantiene los del intérprete
+
+    Raises:
+        ValueError: Si no son tres enteros no negativos
+    """
+    if not thresholds:
+        return
+    if len(thresholds) != 3 or any(value < 0 for value in thresholds):
+        raise ValueError("gc_thresholds debe tener tres enteros no negativos (gen0, gen1, gen2)")
+    gc.set_threshold(*thresholds)
+
+
+def freeze_heap() -> int:
+    """
+    Recolecta y congela todos los objetos actuales en la generación permanente.
+
+    Returns:
+        int: Número de objetos congelados
+    """
+    gc.collect()
+    gc.freeze()
+    frozen = gc.get_freeze_count()
+    metrics.gauge("gc_frozen_objects", "Objetos en la generación permanente del GC").set(frozen)
+    return frozen
+
+
+def apply_runtime_tuning(settings) -> None:
+    """
+    Aplica los ajustes del GC según la configuración. Se llama al final de la
+    importación de la aplicación.
+
+    Args:
+        settings: Configuración de la aplicación
+    """
+    set_gc_thresholds(settings.gc_thresholds)
+    if settings.gc_pause_metrics:
+        install_gc_pause_metrics()
+    if settings.gc_freeze:
+        frozen = freeze_heap()
+        logger.debug(f"🧊 gc.freeze(): {frozen} objetos congelados, umbrales {gc.get_threshold()}")
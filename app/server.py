@@ -0,0 +1,164 @@
+"""
+Configuración del servidor de producción
+========================================
+
+Este archivo traduce la configuración de config/settings.py a los parámetros de
+uvicorn: número de workers según los núcleos disponibles, selección de uvloop y
+httptools cuando están instalados, keep-alive, backlog y reciclado de workers.
+"""
+
+import importlib.util
+import inspect
+import os
+from pathlib import Path
+from typing import Optional
+
+from config.settings import Settings
+
+# Archivo de cuota de CPU de cgroup v2 (contenedores con límite de CPU)
+CGROUP_CPU_MAX = Path("/sys/fs/cgroup/cpu.max")
+
+
+def _cgroup_cpu_limit() -> Optional[int]:
+    """
+    Lee la cuota de CPU de cgroup v2, si existe.
+
+    Returns:
+        Optional[int]: Núcleos permitidos por la cuota (redondeando hacia arriba), o None sin límite
+    """
+    try:
+        quota, period = CGROUP_CPU_MAX.read_text().split()[:2]
+    except (OSError, ValueError):
+        return None
+    if quota == "max":
+        return None
+    return max(1, -(-int(quota) // int(period)))
+
+
+def available_cpus() -> int:
+    """
+    Núcleos que este proceso puede usar realmente: afinidad de CPU y cuota de cgroup.
+
+    Returns:
+        int: Número de núcleos disponibles (al menos 1)
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = len(os.sched_getaffinity(0))
+    else:
+        cpus = os.cpu_count() or 1
+
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, limit)
+    return max(1, cpus)
+
+
+def resolve_workers(configured: int) -> int:
+    """
+    Número de workers a lanzar.
+
+    Args:
+        configured: Valor de la configuración (0 = automático)
+
+    Returns:
+        int: Workers configurados, o uno por núcleo disponible
+    """
+    return configured if configured > 0 else available_cpus()
+
+
+def single_worker_reason(settings: Settings) -> Optional[str]:
+    """
+    Indica si la configuración solo admite un proceso, y por qué.
+
+    - El backend "wal" del almacén bloquea EVENT_STORE_DIR con flock: cualquier worker
+      más fallaría al arrancar y el supervisor lo reiniciaría en bucle.
+    - El despachador entrega cada evento vencido desde un único proceso (ver
+      app.main.lock_dispatcher).
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        Optional[str]: Motivo, o None si admite varios workers
+    """
+    if settings.event_store_dir and settings.event_store_backend == "wal":
+        return "EVENT_STORE_BACKEND=wal bloquea EVENT_STORE_DIR para un solo proceso"
+    if settings.event_store_dir and settings.dispatcher_enabled:
+        return "DISPATCHER_ENABLED entrega los eventos vencidos desde un solo proceso"
+    return None
+
+
+def select_loop(configured: str) -> str:
+    """
+    Selecciona la implementación del event loop.
+
+    Args:
+        configured: "auto", "uvloop" o "asyncio"
+
+    Returns:
+        str: "uvloop" si se pide auto y está instalado; en otro caso el valor configurado o "asyncio"
+    """
+    if configured != "auto":
+        return configured
+    return "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+
+
+def select_http(configured: str) -> str:
+    """
+    Selecciona el parser HTTP.
+
+    Args:
+        configured: "auto", "httptools" o "h11"
+
+    Returns:
+        str: "httptools" si se pide auto y está instalado; en otro caso el valor configurado o "h11"
+    """
+    if configured != "auto":
+        return configured
+    return "httptools" if importlib.util.find_spec("httptools") else "h11"
+
+
+def build_uvicorn_options(settings: Settings) -> dict:
+    """
+    Construye los argumentos de uvicorn.run para producción.
+
+    Args:
+        settings: Configuración de la aplicación
+
+    Returns:
+        dict: Argumentos con nombre para uvicorn.run / uvicorn.Config
+
+    Raises:
+        ValueError: Si se piden varios workers con el almacén WAL o el despachador
+    """
+    import uvicorn
+
+    workers = resolve_workers(settings.workers)
+    reason = single_worker_reason(settings)
+    if reason is not None:
+        if settings.workers > 1:
+            raise ValueError(f"{reason} y WORKERS={settings.workers}: usa WORKERS=1 (o 0)")
+        workers = 1  # Automático: un solo worker en lugar de uno por núcleo
+
+    options = {
+        "host": settings.host,
+        "port": settings.port,
+        "workers": workers,
+        "loop": select_loop(settings.loop),
+        "http": select_http(settings.http),
+        "timeout_keep_alive": settings.timeout_keep_alive,
+        "backlog": settings.backlog,
+        "limit_concurrency": settings.limit_concurrency,
+        "limit_max_requests": settings.limit_max_requests,
+        "timeout_graceful_shutdown": settings.timeout_graceful_shutdown,
+        "log_level": settings.log_level.lower(),
+        "access_log": settings.debug,
+        "lifespan": "on",
+        "reload": False,
+    }
+
+    # El jitter del reciclado solo existe en versiones recientes de uvicorn
+    if "limit_max_requests_jitter" in inspect.signature(uvicorn.Config).parameters:
+        options["limit_max_requests_jitter"] = settings.limit_max_requests_jitter
+
+    return options
@@ -9,6 +9,9 @@ import time
 from typing import List, Optional
 from .models import Event, EventsRequest
 
+# Mensaje de error de los event_ids repetidos, compartido con los almacenes de eventos
+DUPLICATE_EVENT_IDS = "No se permiten event_ids duplicados"
+
 
 class EventProcessorService:
     """
@@ -89,12 +92,13 @@ class EventProcessorService:
         return latest_event
 
     @staticmethod
-    def validate_events_business_rules(events: List[Event]) -> bool:
+    def validate_events_business_rules(events: List[Event], check_duplicates: bool = True) -> bool:
         """
         Valida reglas de negocio adicionales para los eventos.
 
         Args:
             events: Lista de eventos a validar
+            check_duplicates: Comprobar event_ids repetidos (False si ya lo hace el almacén)
 
         Returns:
             bool: True si todos los eventos cumplen las reglas de negocio
@@ -103,9 +107,10 @@ class EventProcessorService:
             ValueError: Si algún evento no cumple las reglas de negocio
         """
         # Verificar que no haya event_ids duplicados
-        event_ids = [event.event_id for event in events]
-        if len(event_ids) != len(set(event_ids)):
-            raise ValueError("No se permiten event_ids duplicados")
+        if check_duplicates:
+            event_ids = [event.event_id for event in events]
+            if len(event_ids) != len(set(event_ids)):
+                raise ValueError(DUPLICATE_EVENT_IDS)
 
         # Verificar que los timestamps estén en un rango razonable
         # (no más de 10 años en el futuro)
@@ -0,0 +1,47 @@
+"""
+Almacenamiento de eventos en el servidor
+========================================
+
+Este paquete contiene los almacenes durables de eventos: EventStore (WAL + snapshots,
+con su formato binario) y SQLiteEventStore. Los dos exponen la misma interfaz, que es
+la que usan los endpoints: append, latest, latest_future, scan, scan_rows, scan_page, get, len y
+close, más evict_expired y oldest_timestamp para ExpiryEvictor. PartitionedStore abre
+uno de ellos por espacio de nombres. ReplicationLeader replica un EventStore a nodos
+seguidores, que sirven las lecturas desde un ReplicaStore con la misma interfaz.
+"""
+
+from .codec import decode_events, encode_events
+from .eviction import ExpiryEvictor
+from .partitions import (DEFAULT_NAMESPACE, NAMESPACE_PATTERN, Partition, PartitionedStore, PartitionLimitError,
+                         PartitionQuotaError)
+from .replication import (ReadOnlyReplicaError, ReplicaStore, ReplicationFollower, ReplicationLeader,
+                          ReplicationProtocolError, parse_address)
+from .store import EventStore, IndexedEvents, RecoveryStats, StoreCorruptedError, read_snapshot, write_snapshot
+from .sqlite import SQLiteEventStore
+from .wal import WriteAheadLog
+
+__all__ = [
+    "DEFAULT_NAMESPACE",
+    "NAMESPACE_PATTERN",
+    "EventStore",
+    "ExpiryEvictor",
+    "IndexedEvents",
+    "Partition",
+    "PartitionLimitError",
+    "PartitionQuotaError",
+    "PartitionedStore",
+    "ReadOnlyReplicaError",
+    "RecoveryStats",
+    "ReplicaStore",
+    "ReplicationFollower",
+    "ReplicationLeader",
+    "ReplicationProtocolError",
+    "SQLiteEventStore",
+    "StoreCorruptedError",
+    "WriteAheadLog",
+    "decode_events",
+    "encode_events",
+    "parse_address",
+    "read_snapshot",
+    "write_snapshot",
+]
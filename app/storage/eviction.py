@@ -0,0 +1,99 @@
+"""
+Expiración de eventos pasados
+=============================
+
+Un evento cuyo timestamp ya pasó nunca vuelve a ser el "evento futuro más próximo"
+(ver filter_future_events), pero el almacén lo guardaría para siempre. ExpiryEvictor
+es una tarea en segundo plano que, cada `interval` segundos, borra los eventos con
+timestamp < ahora - retention.
+
+Los dos almacenes tienen ya un índice ordenado por timestamp, así que los eventos
+expirados son siempre su prefijo: cada pasada borra desde el principio en lotes de
+`batch` eventos (cada lote toma el lock del almacén una sola vez) y se detiene al
+agotar `max_pass` segundos, para que ninguna pasada bloquee a las escrituras más de lo
+configurado. Lo que quede se borra en la siguiente.
+
+No se escribe nada en el WAL: expirar depende solo del reloj, y los eventos expirados
+que se reproduzcan al recuperar se vuelven a borrar en las primeras pasadas.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Optional
+
+from ..metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PASS_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1)
+
+
+class ExpiryEvictor:
+    """
+    Borra periódicamente los eventos expirados de un almacén.
+
+    Attributes:
+        store: EventStore o SQLiteEventStore
+        retention: Segundos que se conserva un evento después de su timestamp
+        interval: Segundos entre pasadas
+        batch: Eventos borrados por lote
+        max_pass: Duración máxima de cada pasada, en segundos
+    """
+
+    def __init__(self, store, retention: float = 0, interval: float = 1.0, batch: int = 1000,
+                 max_pass: float = 0.01):
+        self.store = store
+        self.retention = retention
+        self.interval = interval
+        self.batch = batch
+        self.max_pass = max_pass
+        self._task: Optional[asyncio.Task] = None
+
+        self._evicted = metrics.counter("event_store_evicted_total", "Eventos expirados borrados del almacén")
+        self._pass_time = metrics.histogram("event_store_eviction_pass_seconds",
+                                             "Duración de cada pasada de expiración", buckets=PASS_BUCKETS)
+        self._lag = metrics.gauge("event_store_eviction_lag_seconds",
+                                  "Antigüedad del evento expirado más viejo aún sin borrar")
+
+    def start(self) -> None:
+        """Arranca la tarea de expiración en el event loop actual."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Detiene la tarea de expiración."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def run_once(self, now: Optional[float] = None) -> int:
+        """
+        Hace una pasada de expiración.
+
+        Args:
+            now: Timestamp de referencia (opcional, usa el actual si no se proporciona)
+
+        Returns:
+            int: Eventos borrados
+        """
+        cutoff = int((time.time() if now is None else now) - self.retention)
+        started = time.perf_counter()
+        evicted = self.store.evict_expired(cutoff, self.batch, self.max_pass)
+        self._pass_time.observe(time.perf_counter() - started)
+        self._evicted.inc(evicted)
+
+        oldest = self.store.oldest_timestamp()
+        self._lag.set(max(0, cutoff - oldest) if oldest is not None else 0)
+        return evicted
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                evicted = await asyncio.to_thread(self.run_once)
+            except Exception as e:
+                logger.error(f"💾 Error en la expiración de eventos: {e}")
+                continue
+            if evicted:
+                logger.debug(f"💾 {evicted} eventos expirados borrados")
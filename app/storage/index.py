@@ -0,0 +1,235 @@
+"""
+Índice por tiempo con versiones inmutables
+==========================================
+
+Este archivo contiene el índice ordenado por (timestamp, event_id) del EventStore. En
+lugar de una estructura que se modifica con un lock tomado, cada cambio publica una
+nueva IndexVersion que nunca se vuelve a modificar:
+
+- Los lectores toman la versión actual con una lectura de atributo (atómica con el GIL)
+  y trabajan sobre ella sin lock: nunca esperan a un escritor ni lo bloquean, y una
+  página se lee entera de una misma versión.
+- Las filas (timestamp, event_id, data) están en un árbol de dos niveles: hojas
+  ordenadas de unas LEAF filas agrupadas en ramas de unas BRANCH hojas. Una versión
+  nueva comparte con la anterior todo lo que no cambia y copia solo el camino de cada
+  fila nueva: su hoja, su rama y la raíz (copia de caminos). En CPython copiar una
+  referencia toca el objeto referenciado (su contador de referencias), y con millones
+  de filas casi todas están fuera de la caché, así que el coste de un lote es sobre
+  todo cuántas referencias se copian: ~(LEAF + 2·BRANCH) por fila más la raíz, en vez
+  de todo el índice.
+- El hilo de commit publica una sola versión por group commit.
+- Expirar quita un prefijo: las ramas y hojas enteras se dejan de referenciar y solo
+  se copia el camino de la primera fila que queda.
+- La versión lleva también el ganador (el evento de timestamp más alto), así que
+  latest_future y las consultas por rango ven siempre un estado coherente.
+- Todo son tuplas: una tupla que solo contiene tuplas de int y str deja de estar
+  vigilada por el GC tras su primera pasada, así que las filas y los nodos nuevos no
+  alargan las colecciones completas.
+
+Las versiones viejas se liberan cuando el último lector que las usa termina.
+"""
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .codec import StoredEvent
+
+LEAF = 64  # Filas por hoja; una hoja se parte al superar 2 * LEAF
+BRANCH = 32  # Hojas por rama; una rama se parte al superar 2 * BRANCH
+
+# (timestamp, event_id, data): se ordena por timestamp y event_id (que es único)
+Row = Tuple[int, str, str]
+Leaf = Tuple[Row, ...]
+# (hojas, última fila de cada hoja, filas de la rama)
+Branch = Tuple[Tuple[Leaf, ...], Tuple[Row, ...], int]
+
+
+def _branch(leaves: Sequence[Leaf]) -> Branch:
+    return tuple(leaves), tuple(leaf[-1] for leaf in leaves), sum(map(len, leaves))
+
+
+def _split(items: Sequence, size: int) -> List[tuple]:
+    return [tuple(items[i:i + size]) for i in range(0, len(items), size)]
+
+
+class IndexVersion:
+    """
+    Versión inmutable del índice por tiempo.
+
+    Attributes:
+        number: Número de versión (crece con cada cambio publicado)
+        size: Filas en el índice
+        best: (event_id, timestamp, data) del ganador, o None si está vacío
+    """
+
+    __slots__ = ("number", "size", "best", "_branches", "_maxes")
+
+    def __init__(self, number: int, branches: Tuple[Branch, ...], best: Optional[StoredEvent],
+                 maxes: Optional[Tuple[Row, ...]] = None, size: Optional[int] = None):
+        self.number = number
+        self.best = best
+        self._branches = branches
+        # Última fila de cada rama, para localizar la rama con bisect
+        self._maxes = maxes if maxes is not None else tuple(branch[1][-1] for branch in branches)
+        self.size = size if size is not None else sum(branch[2] for branch in branches)
+
+    @classmethod
+    def build(cls, rows: List[Row], best: Optional[StoredEvent] = None, number: int = 0) -> "IndexVersion":
+        """
+        Crea una versión a partir de filas ya ordenadas.
+
+        Args:
+            rows: Filas ordenadas por (timestamp, event_id)
+            best: Ganador
+            number: Número de versión
+
+        Returns:
+            IndexVersion: La versión
+        """
+        leaves = _split(rows, LEAF)
+        branches = tuple(_branch(leaves[i:i + BRANCH]) for i in range(0, len(leaves), BRANCH))
+        return cls(number, branches, best, size=len(rows))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def oldest_timestamp(self) -> Optional[int]:
+        """Timestamp más bajo, o None si el índice está vacío."""
+        return self._branches[0][0][0][0][0] if self._branches else None
+
+    def last(self) -> Optional[Row]:
+        """La última fila, o None si el índice está vacío."""
+        return self._maxes[-1] if self._maxes else None
+
+    def _leaves_from(self, minimum: Tuple):
+        """Recorre las hojas desde la fila `minimum` (incluida); la primera ya recortada."""
+        branches = self._branches
+        b = bisect_left(self._maxes, minimum)
+        if b == len(branches):
+            return
+        leaves, maxes, _ = branches[b]
+        index = bisect_left(maxes, minimum)
+        yield leaves[index][bisect_left(leaves[index], minimum):]
+        yield from leaves[index + 1:]
+        for leaves, _, _ in branches[b + 1:]:
+            yield from leaves
+
+    def range(self, minimum: Tuple, end: int, limit: int) -> List[StoredEvent]:
+        """
+        Lista las filas desde `minimum` (incluida) con timestamp < end.
+
+        Args:
+            minimum: Clave (timestamp, event_id) de la primera fila posible
+            end: Primer timestamp excluido
+            limit: Máximo de filas
+
+        Returns:
+            List[StoredEvent]: (event_id, timestamp, data) de cada fila
+        """
+        result: List[StoredEvent] = []
+        for leaf in self._leaves_from(minimum):
+            for timestamp, event_id, data in leaf[:limit - len(result)]:
+                if timestamp >= end:
+                    return result
+                result.append((event_id, timestamp, data))
+            if len(result) >= limit:
+                break
+        return result
+
+    def count_before(self, key: Tuple) -> int:
+        """Filas menores que `key` (las expiradas si key es (cutoff, ""))."""
+        count = 0
+        for (leaves, maxes, size), maximum in zip(self._branches, self._maxes):
+            if maximum < key:
+                count += size
+                continue
+            for leaf, leaf_max in zip(leaves, maxes):
+                if leaf_max >= key:
+                    return count + bisect_left(leaf, key)
+                count += len(leaf)
+        return count
+
+    def first(self, count: int) -> List[Row]:
+        """Las `count` primeras filas."""
+        result: List[Row] = []
+        for leaf in self._leaves_from(()):
+            if len(result) >= count:
+                break
+            result.extend(leaf[:count - len(result)])
+        return result
+
+    def inserted(self, rows: Sequence[Row], best: Optional[StoredEvent]) -> "IndexVersion":
+        """
+        Crea la versión siguiente con las filas añadidas.
+
+        Args:
+            rows: Filas nuevas (event_id que no estén ya en el índice)
+            best: Ganador de la versión nueva
+
+        Returns:
+            IndexVersion: La versión nueva; esta no se modifica
+        """
+        if not self._branches:
+            return IndexVersion.build(sorted(rows), best, self.number + 1)
+        branches, maxes = self._branches, self._maxes
+        last_branch = len(branches) - 1
+        # Rama -> hoja -> copia de la hoja con sus filas nuevas
+        touched: Dict[int, Dict[int, List[Row]]] = {}
+        for row in rows:
+            b = min(bisect_left(maxes, row), last_branch)
+            leaves, leaf_maxes, _ = branches[b]
+            index = min(bisect_left(leaf_maxes, row), len(leaves) - 1)
+            copies = touched.setdefault(b, {})
+            leaf = copies.get(index)
+            if leaf is None:
+                leaf = copies[index] = list(leaves[index])
+            insort(leaf, row)
+
+        new_branches, new_maxes = list(branches), list(maxes)
+        for b in sorted(touched, reverse=True):  # De atrás adelante: partir no mueve las pendientes
+            leaves, leaf_maxes, size = branches[b]
+            leaves, leaf_maxes = list(leaves), list(leaf_maxes)
+            for index in sorted(touched[b], reverse=True):
+                leaf = touched[b][index]
+                size += len(leaf) - len(leaves[index])
+                parts = _split(leaf, LEAF) if len(leaf) > 2 * LEAF else [tuple(leaf)]
+                leaves[index:index + 1] = parts
+                leaf_maxes[index:index + 1] = [part[-1] for part in parts]
+            if len(leaves) > 2 * BRANCH:
+                parts = [_branch(leaves[i:i + BRANCH]) for i in range(0, len(leaves), BRANCH)]
+            else:
+                parts = [(tuple(leaves), tuple(leaf_maxes), size)]
+            new_branches[b:b + 1] = parts
+            new_maxes[b:b + 1] = [part[1][-1] for part in parts]
+        return IndexVersion(self.number + 1, tuple(new_branches), best, maxes=tuple(new_maxes),
+                            size=self.size + len(rows))
+
+    def without_first(self, count: int, best: Optional[StoredEvent]) -> "IndexVersion":
+        """
+        Crea la versión siguiente sin las `count` primeras filas.
+
+        Args:
+            count: Filas a quitar del principio
+            best: Ganador de la versión nueva
+
+        Returns:
+            IndexVersion: La versión nueva; esta no se modifica
+        """
+        size = self.size - count
+        branches = self._branches
+        b = 0
+        while b < len(branches) and count >= branches[b][2]:
+            count -= branches[b][2]
+            b += 1
+        branches, maxes = branches[b:], self._maxes[b:]
+        if count:
+            leaves = branches[0][0]
+            index = 0
+            while count >= len(leaves[index]):
+                count -= len(leaves[index])
+                index += 1
+            leaves = leaves[index:]
+            if count:
+                leaves = (leaves[0][count:],) + leaves[1:]
+            branches = (_branch(leaves),) + branches[1:]
+        return IndexVersion(self.number + 1, branches, best, maxes=maxes, size=size)
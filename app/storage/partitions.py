@@ -0,0 +1,355 @@
+"""
+Particiones del almacén por espacio de nombres
+==============================================
+
+Este archivo contiene el registro que reparte el almacenamiento de eventos entre
+inquilinos independientes. Cada espacio de nombres (el parámetro namespace de los
+endpoints de /events) es un almacén completo, abierto con la misma función que el
+almacén sin particiones, en su propio directorio:
+
+- Su índice, su lock y su hilo de commit (WAL) o su conexión de escritura (SQLite):
+  la ingesta grande de un inquilino compite con las demás por CPU y disco, pero nunca
+  por su lock ni por su group commit.
+- Su cuota: con max_bytes (tamaño de los eventos según encode_events, ver
+  codec.encoded_size) o max_events, un lote que la superaría se rechaza entero
+  (PartitionQuotaError), contando también los lotes aceptados aún sin confirmar. El
+  número de eventos por sí solo no acota la memoria: un evento puede tener un data
+  muy grande.
+- Su ganador: latest_future aplica la selección de EventProcessorService solo a los
+  eventos de la partición.
+
+Las particiones se abren en el primer acceso (recuperando su snapshot y su WAL) y se
+cierran cuando llevan idle_seconds sin usarse: cerrar escribe el snapshot y libera la
+memoria, el hilo y el flock, y el siguiente acceso la vuelve a abrir. Cada uso toma una
+concesión (acquire / release) y una partición con concesiones nunca se cierra, así que
+una exportación larga la mantiene abierta. Con max_partitions abiertas, abrir otra
+cierra antes la libre menos usada recientemente (PartitionLimitError si no hay ninguna).
+
+El espacio por defecto no se cierra nunca: está en el mismo directorio que el almacén
+sin particiones y es el que usan el despachador y las suscripciones en vivo.
+
+El lock del registro solo protege el diccionario de particiones y las concesiones, y se
+toma durante microsegundos. Abrir y cerrar particiones se hace fuera de él, de una en
+una: recuperar una partición grande retrasa la apertura de otras, pero no los accesos
+a las que ya están abiertas.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from ..metrics import metrics
+from ..models import Event
+from .codec import encoded_size
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_NAMESPACE = "default"
+NAMESPACE_PATTERN = r"^[A-Za-z0-9_-]{1,64}$"  # También es el nombre de su directorio
+NAMESPACES_DIR = "namespaces"
+
+_NAMESPACE = re.compile(NAMESPACE_PATTERN)
+
+
+class PartitionQuotaError(Exception):
+    """Un lote superaría la cuota de bytes o de eventos de su partición."""
+
+
+class PartitionLimitError(Exception):
+    """Hay max_partitions abiertas y todas están en uso."""
+
+
+class Partition:
+    """
+    Almacén de un espacio de nombres, con su cuota.
+
+    Attributes:
+        namespace: Espacio de nombres
+        store: EventStore o SQLiteEventStore de la partición
+        max_events: Eventos como máximo (0 = sin límite)
+        max_bytes: Bytes de eventos (encoded_size) como máximo (0 = sin límite)
+        leases: Usos en curso; con alguno la partición no se cierra
+        last_used: Momento (reloj del registro) del último uso terminado
+    """
+
+    __slots__ = ("namespace", "store", "max_events", "max_bytes", "leases", "last_used", "_inflight",
+                 "_inflight_bytes")
+
+    def __init__(self, namespace: str, store, max_events: int = 0, max_bytes: int = 0, last_used: float = 0.0):
+        self.namespace = namespace
+        self.store = store
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.leases = 0
+        self.last_used = last_used
+        self._inflight = 0  # Eventos de lotes aceptados aún sin confirmar
+        self._inflight_bytes = 0  # Y sus bytes
+
+    async def append(self, events: Sequence[Event]) -> int:
+        """
+        Guarda un lote en la partición si cabe en su cuota.
+
+        La comprobación y la reserva se hacen en el event loop sin esperar entre
+        medias, así que los lotes concurrentes no pueden superar la cuota entre todos.
+
+        Args:
+            events: Eventos ya validados
+
+        Returns:
+            int: Número de eventos guardados
+
+        Raises:
+            PartitionQuotaError: Si el lote no cabe en la cuota
+            ValueError: Si algún event_id se repite en el lote o ya está en la partición
+        """
+        count = len(events)
+        size = encoded_size([event.event_id for event in events], [event.data for event in events]) \
+            if self.max_bytes else 0
+        if self.max_events and len(self.store) + self._inflight + count > self.max_events:
+            self._reject(f"{len(self.store)} de {self.max_events} eventos")
+        if self.max_bytes and self.store.encoded_bytes + self._inflight_bytes + size > self.max_bytes:
+            self._reject(f"{self.store.encoded_bytes} de {self.max_bytes} bytes")
+        self._inflight += count
+        self._inflight_bytes += size
+        try:
+            return await self.store.append(events)
+        finally:
+            self._inflight -= count
+            self._inflight_bytes -= size
+
+    def _reject(self, usage: str) -> None:
+        metrics.counter("event_store_quota_rejected_total",
+                        "Lotes rechazados por superar la cuota de su partición").inc()
+        raise PartitionQuotaError(f"Cuota del espacio de nombres {self.namespace} superada ({usage})")
+
+
+class PartitionedStore:
+    """
+    Registro de las particiones abiertas.
+
+    Attributes:
+        directory: Directorio del espacio por defecto; los demás van en namespaces/<nombre>
+        opener: Función que abre el almacén de un directorio
+        max_partitions: Particiones abiertas a la vez, incluida la del espacio por defecto
+        max_events: Cuota de eventos de cada partición (0 = sin límite)
+        max_bytes: Cuota de bytes de eventos de cada partición (0 = sin límite)
+        idle_seconds: Segundos sin uso tras los que se cierra una partición (0 = nunca)
+        clock: Reloj monotónico (inyectable en los tests)
+    """
+
+    def __init__(self, directory: str, opener: Callable[[str], object], max_partitions: int = 256,
+                 max_events: int = 0, max_bytes: int = 0, idle_seconds: float = 300.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.directory = Path(directory)
+        self.opener = opener
+        self.max_partitions = max(1, max_partitions)
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.idle_seconds = idle_seconds
+        self.clock = clock
+        self._partitions: Dict[str, Partition] = {}
+        self._lock = threading.Lock()
+        self._open_lock = threading.Lock()  # Aperturas y cierres, de uno en uno
+        self._evict_from = 0  # Rotación de la expiración entre particiones
+        self._task: Optional[asyncio.Task] = None
+
+        self._open_gauge = metrics.gauge("event_store_partitions", "Particiones del almacén abiertas")
+        self._opened = metrics.counter("event_store_partitions_opened_total", "Particiones abiertas (o reabiertas)")
+        self._closed = metrics.counter("event_store_partitions_closed_total",
+                                       "Particiones cerradas por inactividad o para abrir otra")
+
+    @classmethod
+    def open(cls, directory: str, opener: Callable[[str], object], **kwargs) -> "PartitionedStore":
+        """Crea el registro y abre la partición del espacio por defecto."""
+        registry = cls(directory, opener, **kwargs)
+        registry.release(registry._open(DEFAULT_NAMESPACE))
+        return registry
+
+    @property
+    def default(self):
+        """Almacén del espacio por defecto."""
+        return self._partitions[DEFAULT_NAMESPACE].store
+
+    def directory_for(self, namespace: str) -> Path:
+        """
+        Directorio de un espacio de nombres.
+
+        Raises:
+            ValueError: Si el nombre no cumple NAMESPACE_PATTERN
+        """
+        if not _NAMESPACE.fullmatch(namespace):
+            raise ValueError(f"Espacio de nombres inválido: {namespace!r}")
+        if namespace == DEFAULT_NAMESPACE:
+            return self.directory
+        return self.directory / NAMESPACES_DIR / namespace
+
+    def namespaces(self) -> List[str]:
+        """Espacios de nombres con la partición abierta."""
+        with self._lock:
+            return list(self._partitions)
+
+    def _lease(self, partition: Partition, touch: bool = True) -> Partition:
+        # Con self._lock tomado
+        partition.leases += 1
+        if touch:
+            partition.last_used = self.clock()
+        return partition
+
+    async def acquire(self, namespace: str) -> Partition:
+        """
+        Toma una concesión sobre la partición de un espacio, abriéndola si hace falta.
+
+        Cada acquire debe ir seguido de un release.
+
+        Raises:
+            PartitionLimitError: Si no se puede abrir porque todas las abiertas están en uso
+            ValueError: Si el nombre no es válido
+        """
+        with self._lock:
+            partition = self._partitions.get(namespace)
+            if partition is not None:
+                return self._lease(partition)
+        return await asyncio.to_thread(self._open, namespace)
+
+    def release(self, partition: Partition) -> None:
+        """Devuelve una concesión tomada con acquire."""
+        with self._lock:
+            partition.leases -= 1
+            partition.last_used = self.clock()
+
+    def _open(self, namespace: str) -> Partition:
+        directory = self.directory_for(namespace)
+        with self._open_lock:
+            with self._lock:
+                partition = self._partitions.get(namespace)
+                if partition is not None:
+                    return self._lease(partition)  # La abrió otra petición mientras esperábamos
+                victim = None
+                if len(self._partitions) >= self.max_partitions:
+                    idle = [p for p in self._partitions.values()
+                            if not p.leases and p.namespace != DEFAULT_NAMESPACE]
+                    if not idle:
+                        raise PartitionLimitError(f"Hay {len(self._partitions)} particiones abiertas y "
+                                                  f"todas están en uso")
+                    victim = min(idle, key=lambda p: p.last_used)
+                    del self._partitions[victim.namespace]
+            if victim is not None:
+                self._close(victim, "para abrir otra")
+
+            store = self.opener(str(directory))
+            partition = Partition(namespace, store, self.max_events, self.max_bytes)
+            with self._lock:
+                self._partitions[namespace] = partition
+                self._lease(partition)
+                self._open_gauge.set(len(self._partitions))
+        self._opened.inc()
+        logger.info(f"🗂️ Partición {namespace} abierta: {len(store)} eventos")
+        return partition
+
+    def _close(self, partition: Partition, reason: str) -> None:
+        partition.store.close()
+        self._closed.inc()
+        logger.info(f"🗂️ Partición {partition.namespace} cerrada {reason}")
+
+    def close_idle(self, now: Optional[float] = None) -> int:
+        """
+        Cierra las particiones sin concesiones que llevan idle_seconds sin usarse.
+
+        Args:
+            now: Momento de referencia del reloj del registro (opcional)
+
+        Returns:
+            int: Particiones cerradas
+        """
+        if not self.idle_seconds:
+            return 0
+        limit = (self.clock() if now is None else now) - self.idle_seconds
+        with self._open_lock:
+            with self._lock:
+                idle = [p for p in self._partitions.values()
+                        if not p.leases and p.last_used <= limit and p.namespace != DEFAULT_NAMESPACE]
+                for partition in idle:
+                    del self._partitions[partition.namespace]
+                self._open_gauge.set(len(self._partitions))
+            for partition in idle:
+                self._close(partition, "por inactividad")
+        return len(idle)
+
+    def _leased(self) -> List[Partition]:
+        """Concesiones sobre todas las abiertas, sin contar como uso (para tareas internas)."""
+        with self._lock:
+            return [self._lease(partition, touch=False) for partition in self._partitions.values()]
+
+    def _return(self, partitions: List[Partition]) -> None:
+        with self._lock:
+            for partition in partitions:
+                partition.leases -= 1
+
+    def evict_expired(self, cutoff: int, batch: int = 1000, max_pass: float = 0.01) -> int:
+        """
+        evict_expired de cada partición abierta, repartiendo max_pass entre todas.
+
+        Cada pasada empieza por una partición distinta, para que una con mucho que borrar
+        no deje siempre sin turno a las siguientes. Las cerradas se expiran al reabrirse.
+
+        Returns:
+            int: Eventos borrados
+        """
+        started = time.perf_counter()
+        partitions = self._leased()
+        evicted = 0
+        try:
+            if not partitions:
+                return 0
+            self._evict_from = (self._evict_from + 1) % len(partitions)
+            for partition in partitions[self._evict_from:] + partitions[:self._evict_from]:
+                remaining = max_pass - (time.perf_counter() - started)
+                if remaining <= 0:
+                    break
+                evicted += partition.store.evict_expired(cutoff, batch, remaining)
+        finally:
+            self._return(partitions)
+        return evicted
+
+    def oldest_timestamp(self) -> Optional[int]:
+        """Timestamp más bajo entre las particiones abiertas, o None si están vacías."""
+        partitions = self._leased()
+        try:
+            oldest = [partition.store.oldest_timestamp() for partition in partitions]
+        finally:
+            self._return(partitions)
+        return min((timestamp for timestamp in oldest if timestamp is not None), default=None)
+
+    def start(self) -> None:
+        """Arranca en el event loop actual la tarea que cierra las particiones inactivas."""
+        if self.idle_seconds and (self._task is None or self._task.done()):
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Detiene la tarea de cierre por inactividad."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        interval = max(1.0, self.idle_seconds / 10)
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.close_idle)
+            except Exception as e:
+                logger.error(f"🗂️ Error cerrando particiones inactivas: {e}")
+
+    def close(self) -> None:
+        """Cierra todas las particiones, incluida la del espacio por defecto."""
+        with self._open_lock:
+            with self._lock:
+                partitions = list(self._partitions.values())
+                self._partitions.clear()
+                self._open_gauge.set(0)
+            for partition in partitions:
+                partition.store.close()
@@ -0,0 +1,512 @@
+"""
+Replicación líder/seguidor del almacén
+======================================
+
+Este archivo contiene la replicación del almacén WAL (EventStore) de un nodo líder a
+nodos seguidores que solo sirven lecturas, por un protocolo TCP propio:
+
+- El líder numera sus cambios con un número de secuencia (lsn): cada group commit (con
+  sus lotes ya codificados, los mismos bytes que escribe en el WAL) y cada tanda de
+  expiración (el cutoff). Guarda los últimos `backlog` cambios en memoria.
+- Un seguidor se conecta y envía su época (identificador aleatorio del proceso líder del
+  que viene su estado) y el último lsn que aplicó. Si es la época actual y el lsn sigue
+  en el backlog, el líder le envía los cambios posteriores. Si no (seguidor nuevo,
+  líder reiniciado o seguidor que se quedó más atrás que el backlog), le envía un
+  snapshot de todo el estado con el lsn que incluye y después los cambios posteriores.
+- Sin cambios que enviar, el líder envía un latido cada `heartbeat` segundos con su lsn,
+  también mientras exporta un snapshot. El seguidor corta la conexión si pasan 3 latidos
+  sin recibir nada; el payload de un mensaje se lee por bloques de READ_CHUNK bytes y
+  ese plazo se aplica a cada bloque, así que un snapshot grande no lo agota mientras
+  siga llegando.
+
+El seguidor guarda el estado en un ReplicaStore: los mismos eventos, índice y ganador
+que el líder, sin WAL (al reiniciar se recupera con un snapshot del líder). Aplica los
+cambios en el mismo orden, así que latest_future devuelve lo mismo que en el líder una
+vez aplicados; la expiración también llega del líder (el seguidor no expira por su
+cuenta) y quita al menos lo que quitó el líder.
+
+Retraso: el seguidor sabe que estaba al día cuando aplica todo lo que el líder había
+confirmado al enviar un cambio o un latido. lag_seconds es 0 mientras recibe mensajes y
+está al día, y si no, el tiempo desde la última vez que lo estuvo (medido con el reloj
+del líder: en hosts distintos requiere relojes sincronizados).
+
+Cada mensaje es:
+
+    [tipo: u8][lsn: u64][hora del líder: f64][longitud: u32][crc32: u32][payload]
+"""
+
+import asyncio
+import itertools
+import logging
+import os
+import struct
+import threading
+import time
+import zlib
+from collections import deque
+from operator import itemgetter
+from typing import Callable, Deque, List, NamedTuple, Optional, Sequence, Tuple
+
+from ..metrics import metrics
+from ..models import Event
+from .codec import HEADER_SIZE, decode_events
+from .index import IndexVersion
+from .store import EventStore, IndexedEvents
+
+logger = logging.getLogger(__name__)
+
+HELLO, WELCOME, SNAPSHOT, COMMIT, EVICT, HEARTBEAT = range(1, 7)
+
+_FRAME = struct.Struct("<BQdII")
+_LENGTH = struct.Struct("<I")
+_CUTOFF = struct.Struct("<q")
+MAX_SEND = 256  # Cambios enviados antes de esperar a que se vacíe el buffer del socket
+READ_CHUNK = 1024 * 1024  # Bytes de payload leídos con cada plazo de timeout
+
+DELAY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+class ReplicationProtocolError(Exception):
+    """El otro extremo envió un mensaje roto o fuera de secuencia."""
+
+
+class ReadOnlyReplicaError(Exception):
+    """Se intentó escribir en un seguidor."""
+
+
+class _Change(NamedTuple):
+    lsn: int
+    time: float
+    kind: int
+    payload: bytes
+
+
+def parse_address(address: str) -> Tuple[str, int]:
+    """
+    Separa host y puerto de una dirección "host:puerto".
+
+    Raises:
+        ValueError: Si no tiene puerto
+    """
+    host, separator, port = address.rpartition(":")
+    if not separator or not port.isdigit():
+        raise ValueError(f"Dirección de replicación inválida: {address!r} (host:puerto)")
+    return host or "0.0.0.0", int(port)
+
+
+def encode_frame(kind: int, lsn: int, payload: bytes = b"", sent: Optional[float] = None) -> bytes:
+    """Codifica un mensaje del protocolo."""
+    header = _FRAME.pack(kind, lsn, time.time() if sent is None else sent, len(payload), zlib.crc32(payload))
+    return header + payload
+
+
+async def read_frame(reader: asyncio.StreamReader, timeout: Optional[float] = None) -> Tuple[int, int, float, bytes]:
+    """
+    Lee un mensaje del protocolo.
+
+    El timeout se aplica a la cabecera y a cada bloque de READ_CHUNK bytes del payload:
+    el plazo total crece con su tamaño, pero una conexión parada se sigue detectando.
+
+    Returns:
+        Tuple[int, int, float, bytes]: Tipo, lsn, hora del líder y payload
+
+    Raises:
+        asyncio.IncompleteReadError: Si se cierra la conexión
+        asyncio.TimeoutError: Si la cabecera o un bloque no llega en timeout segundos
+        ReplicationProtocolError: Si el CRC no coincide
+    """
+    header = await asyncio.wait_for(reader.readexactly(_FRAME.size), timeout)
+    kind, lsn, sent, length, crc = _FRAME.unpack(header)
+    blocks = []
+    for offset in range(0, length, READ_CHUNK):
+        blocks.append(await asyncio.wait_for(reader.readexactly(min(READ_CHUNK, length - offset)), timeout))
+    payload = blocks[0] if len(blocks) == 1 else b"".join(blocks)
+    if zlib.crc32(payload) != crc:
+        raise ReplicationProtocolError("El CRC de un mensaje no coincide")
+    return kind, lsn, sent, payload
+
+
+def _join(payloads: Sequence[bytes]) -> bytes:
+    return b"".join(_LENGTH.pack(len(payload)) + payload for payload in payloads)
+
+
+def _split(data: bytes) -> List[bytes]:
+    payloads, offset = [], 0
+    while offset < len(data):
+        (length,) = _LENGTH.unpack_from(data, offset)
+        offset += _LENGTH.size
+        payloads.append(data[offset:offset + length])
+        offset += length
+    return payloads
+
+
+class ReplicaStore(IndexedEvents):
+    """
+    Estado replicado de un seguidor: lecturas como las de EventStore, sin escrituras.
+
+    No tiene directorio ni WAL: su estado es el que le envía el líder.
+    """
+
+    def replace(self, payload: bytes) -> int:
+        """
+        Sustituye todo el estado por un snapshot del líder.
+
+        Args:
+            payload: Eventos codificados con encode_events, en orden de llegada
+
+        Returns:
+            int: Eventos cargados
+        """
+        ids, timestamps, datas = decode_events(payload)
+        # Como al recuperar EventStore: dos sorts estables por clave simple
+        rows = list(zip(timestamps, ids, datas))
+        rows.sort(key=itemgetter(1))
+        rows.sort(key=itemgetter(0))
+        with self._writer:
+            number = self._index.number
+            self._events, self._best, self._bytes = {}, None, 0
+            self._apply(ids, timestamps, datas, index=False, size=len(payload) - HEADER_SIZE)
+            index = IndexVersion.build(rows, self._best, number + 1)
+            with self._cond:
+                self._index = index
+            self._report_events(len(self._events))
+        return len(ids)
+
+    def apply(self, payloads: Sequence[bytes]) -> int:
+        """
+        Aplica los lotes de un group commit del líder.
+
+        Returns:
+            int: Eventos añadidos
+        """
+        decoded = [(decode_events(payload), len(payload) - HEADER_SIZE) for payload in payloads]
+        added = 0
+        with self._writer:
+            rows = []
+            for (ids, timestamps, datas), size in decoded:
+                self._apply(ids, timestamps, datas, index=False, size=size)
+                rows.extend(zip(timestamps, ids, datas))
+                added += len(ids)
+            index = self._index.inserted(rows, self._best)
+            with self._cond:
+                self._index = index
+            self._report_events(len(self._events))
+        return added
+
+    def evict(self, cutoff: int) -> int:
+        """Expira como el líder: todos los eventos con timestamp < cutoff."""
+        return self.evict_expired(cutoff, batch=10000, max_pass=float("inf"))
+
+    def submit(self, events: Sequence[Event]):
+        raise ReadOnlyReplicaError("Este nodo es un seguidor de solo lectura: escriba en el líder")
+
+    async def append(self, events: Sequence[Event]) -> int:
+        """Los seguidores no aceptan escrituras."""
+        raise ReadOnlyReplicaError("Este nodo es un seguidor de solo lectura: escriba en el líder")
+
+    def close(self) -> None:
+        """Deja de contar sus eventos en el gauge; el estado se pierde."""
+        with self._writer:
+            self._report_events(0)
+
+
+class ReplicationLeader:
+    """
+    Servidor de replicación de un EventStore.
+
+    Attributes:
+        store: Almacén que se replica
+        backlog: Cambios que se guardan para los seguidores que se reconectan
+        heartbeat: Segundos sin cambios tras los que se envía un latido
+        epoch: Identificador de este proceso líder
+        lsn: Número del último cambio
+    """
+
+    def __init__(self, store: EventStore, backlog: int = 10000, heartbeat: float = 0.5):
+        self.store = store
+        self.heartbeat = heartbeat
+        self.epoch = os.urandom(8).hex()
+        self.lsn = 0
+        self._backlog: Deque[_Change] = deque(maxlen=max(1, backlog))
+        self._lock = threading.Lock()  # Protege el backlog; se toma con el lock del almacén tomado
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._changed: Optional[asyncio.Future] = None
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._connections = set()
+
+        self._followers = metrics.gauge("replication_followers", "Seguidores conectados al líder")
+        self._lsn_gauge = metrics.gauge("replication_lsn", "Último cambio numerado por el líder")
+        self._snapshots = metrics.counter("replication_snapshots_sent_total", "Snapshots enviados a seguidores")
+
+    # Oyente del almacén: se llama con su lock tomado (ver IndexedEvents.add_listener)
+
+    def committed(self, payloads: List[bytes]) -> None:
+        self._record(COMMIT, _join(payloads))
+
+    def evicted(self, cutoff: int) -> None:
+        self._record(EVICT, _CUTOFF.pack(cutoff))
+
+    def _record(self, kind: int, payload: bytes) -> None:
+        with self._lock:
+            self.lsn += 1
+            self._backlog.append(_Change(self.lsn, time.time(), kind, payload))
+        self._lsn_gauge.set(self.lsn)
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._wake)
+            except RuntimeError:
+                pass  # El event loop ya se cerró
+
+    def _wake(self) -> None:
+        changed, self._changed = self._changed, self._loop.create_future()
+        changed.set_result(None)
+
+    def _changes_after(self, position: int) -> Optional[List[_Change]]:
+        """Cambios posteriores a un lsn, o None si ya no están en el backlog."""
+        with self._lock:
+            if position >= self.lsn:
+                return []
+            first = self._backlog[0].lsn if self._backlog else self.lsn + 1
+            if position + 1 < first:
+                return None
+            start = position + 1 - first
+            return list(itertools.islice(self._backlog, start, start + MAX_SEND))
+
+    async def start(self, host: str, port: int) -> None:
+        """Registra el oyente en el almacén y empieza a aceptar seguidores."""
+        self._loop = asyncio.get_running_loop()
+        self._changed = self._loop.create_future()
+        self.store.add_listener(self)
+        self._server = await asyncio.start_server(self._serve, host, port)
+        logger.info(f"🔁 Líder de replicación en {host}:{port} (época {self.epoch})")
+
+    @property
+    def port(self) -> int:
+        """Puerto en el que escucha (útil con el puerto 0)."""
+        return self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        """Deja de aceptar seguidores y cierra las conexiones."""
+        if self._server is not None:
+            self._server.close()
+            for task in list(self._connections):
+                task.cancel()
+            await self._server.wait_closed()
+            self._server = None
+
+    def status(self) -> dict:
+        """Estado del líder para /health/replication."""
+        return {"role": "leader", "epoch": self.epoch, "lsn": self.lsn, "followers": len(self._connections)}
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        task = asyncio.current_task()
+        self._connections.add(task)
+        self._followers.set(len(self._connections))
+        peer = writer.get_extra_info("peername")
+        try:
+            kind, position, _, epoch = await read_frame(reader, timeout=10)
+            if kind != HELLO:
+                raise ReplicationProtocolError(f"Se esperaba HELLO y llegó el tipo {kind}")
+            writer.write(encode_frame(WELCOME, self.lsn, self.epoch.encode()))
+            if epoch.decode() != self.epoch or position > self.lsn:
+                position = await self._send_snapshot(writer)
+            logger.info(f"🔁 Seguidor {peer} conectado desde el lsn {position}")
+            await self._stream(writer, position)
+        except asyncio.CancelledError:
+            pass
+        except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ReplicationProtocolError) as e:
+            logger.info(f"🔁 Seguidor {peer} desconectado: {e!r}")
+        finally:
+            self._connections.discard(task)
+            self._followers.set(len(self._connections))
+            writer.close()
+
+    async def _send_snapshot(self, writer: asyncio.StreamWriter) -> int:
+        export = asyncio.ensure_future(asyncio.to_thread(self.store.export, lambda: self.lsn))
+        while True:
+            try:
+                payload, position = await asyncio.wait_for(asyncio.shield(export), self.heartbeat)
+                break
+            except asyncio.TimeoutError:
+                # Con muchos eventos la exportación tarda más que el timeout del seguidor
+                writer.write(encode_frame(HEARTBEAT, self.lsn))
+                await writer.drain()
+        writer.write(encode_frame(SNAPSHOT, position, payload))
+        await writer.drain()
+        self._snapshots.inc()
+        return position
+
+    async def _stream(self, writer: asyncio.StreamWriter, position: int) -> None:
+        while True:
+            changed = self._changed
+            changes = self._changes_after(position)
+            if changes is None:
+                logger.warning("🔁 Un seguidor se quedó más atrás que el backlog: se le envía un snapshot")
+                position = await self._send_snapshot(writer)
+                continue
+            if changes:
+                writer.write(b"".join(encode_frame(change.kind, change.lsn, change.payload, change.time)
+                                      for change in changes))
+                position = changes[-1].lsn
+                await writer.drain()
+                continue
+            try:
+                await asyncio.wait_for(asyncio.shield(changed), self.heartbeat)
+            except asyncio.TimeoutError:
+                writer.write(encode_frame(HEARTBEAT, self.lsn))
+                await writer.drain()
+
+
+class ReplicationFollower:
+    """
+    Cliente de replicación de un seguidor: aplica en un ReplicaStore los cambios del líder.
+
+    Attributes:
+        replica: Estado replicado
+        host: Host del líder
+        port: Puerto de replicación del líder
+        heartbeat: Latido del líder; sin mensajes durante 3 latidos se reconecta
+        reconnect: Segundos entre intentos de conexión
+        on_change: Función que se llama tras aplicar cambios (en el event loop)
+        epoch: Época del líder de la que viene el estado (None sin estado)
+        applied: Último lsn aplicado
+        leader_lsn: Último lsn conocido del líder
+    """
+
+    def __init__(self, replica: ReplicaStore, host: str, port: int, heartbeat: float = 0.5,
+                 reconnect: float = 1.0, on_change: Optional[Callable[[], None]] = None):
+        self.replica = replica
+        self.host = host
+        self.port = port
+        self.heartbeat = heartbeat
+        self.reconnect = reconnect
+        self.on_change = on_change
+        self.epoch: Optional[str] = None
+        self.applied = 0
+        self.leader_lsn = 0
+        self.connected = False
+        self._synced_at: Optional[float] = None  # Hora del líder en la última vez al día
+        self._received_at = 0.0  # Cuándo llegó el último mensaje (reloj local)
+        self._task: Optional[asyncio.Task] = None
+        self._applying: Optional[asyncio.Future] = None  # Cambio que se aplica en un hilo
+
+        self._lag = metrics.gauge("replication_lag_seconds", "Segundos desde que el seguidor estuvo al día")
+        self._applied_gauge = metrics.gauge("replication_applied_lsn", "Último cambio aplicado por el seguidor")
+        self._delay = metrics.histogram("replication_apply_delay_seconds",
+                                        "Desde el commit en el líder hasta aplicarlo en el seguidor",
+                                        buckets=DELAY_BUCKETS)
+        self._snapshots = metrics.counter("replication_snapshots_received_total", "Snapshots recibidos del líder")
+        self._reconnects = metrics.counter("replication_reconnects_total", "Conexiones al líder perdidas o fallidas")
+
+    def lag_seconds(self) -> Optional[float]:
+        """Segundos desde que estuvo al día por última vez (0 si lo está), o None si nunca lo estuvo."""
+        if self._synced_at is None:
+            return None
+        fresh = time.time() - self._received_at <= 2 * self.heartbeat
+        if self.connected and fresh and self.applied >= self.leader_lsn:
+            return 0.0
+        return max(0.0, time.time() - self._synced_at)
+
+    def _report_lag(self) -> None:
+        lag = self.lag_seconds()
+        if lag is not None:
+            self._lag.set(lag)
+
+    def status(self) -> dict:
+        """Estado del seguidor para /health/replication."""
+        lag = self.lag_seconds()
+        return {"role": "follower", "leader": f"{self.host}:{self.port}", "connected": self.connected,
+                "epoch": self.epoch, "applied_lsn": self.applied, "leader_lsn": self.leader_lsn,
+                "lag_changes": max(0, self.leader_lsn - self.applied), "lag_seconds": lag,
+                "events": len(self.replica)}
+
+    def start(self) -> None:
+        """Arranca en el event loop actual la tarea que sigue al líder."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        """Deja de seguir al líder."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.connected = False
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self._follow()
+            except (OSError, asyncio.IncompleteReadError, asyncio.TimeoutError, ReplicationProtocolError) as e:
+                if self.connected:
+                    logger.warning(f"🔁 Conexión con el líder perdida: {e!r}")
+            self.connected = False
+            self._reconnects.inc()
+            self._report_lag()  # El retraso sigue creciendo mientras no hay conexión
+            await asyncio.sleep(self.reconnect)
+
+    async def _follow(self) -> None:
+        if self._applying is not None:
+            # Un cambio de una conexión cancelada puede seguir aplicándose en su hilo: hay
+            # que esperarlo para pedir al líder a partir del lsn correcto
+            await asyncio.wait([self._applying])
+            self._applying = None
+        reader, writer = await asyncio.wait_for(asyncio.open_connection(self.host, self.port), self.reconnect * 5)
+        try:
+            writer.write(encode_frame(HELLO, self.applied, (self.epoch or "").encode()))
+            await writer.drain()
+            kind, self.leader_lsn, _, epoch = await read_frame(reader, timeout=10)
+            if kind != WELCOME:
+                raise ReplicationProtocolError(f"Se esperaba WELCOME y llegó el tipo {kind}")
+            epoch = epoch.decode()
+            self.connected = True
+            logger.info(f"🔁 Conectado al líder {self.host}:{self.port} (época {epoch}, lsn {self.leader_lsn})")
+            while True:
+                kind, lsn, sent, payload = await read_frame(reader, timeout=3 * self.heartbeat)
+                self._received_at = time.time()
+                if kind == SNAPSHOT:
+                    await self._load_snapshot(lsn, sent, payload, epoch)
+                else:
+                    await self._handle(kind, lsn, sent, payload, epoch)
+                self._report_lag()
+        finally:
+            writer.close()
+
+    async def _load_snapshot(self, lsn: int, sent: float, payload: bytes, epoch: str) -> None:
+        count = await asyncio.to_thread(self.replica.replace, payload)
+        self.epoch, self.applied = epoch, lsn
+        self._snapshots.inc()
+        logger.info(f"🔁 Snapshot del líder aplicado: {count} eventos hasta el lsn {lsn}")
+        self._applied_changes(lsn, sent)
+
+    async def _handle(self, kind: int, lsn: int, sent: float, payload: bytes, epoch: str) -> None:
+        if kind == HEARTBEAT:
+            self.leader_lsn = max(self.leader_lsn, lsn)
+            if self.epoch == epoch and self.applied >= self.leader_lsn:
+                self._synced_at = sent
+            return
+        if kind not in (COMMIT, EVICT):
+            raise ReplicationProtocolError(f"Tipo de mensaje inesperado: {kind}")
+        if self.epoch != epoch or lsn != self.applied + 1:
+            raise ReplicationProtocolError(f"Cambio {lsn} fuera de secuencia (aplicado {self.applied})")
+        # Decodificar e indexar un lote grande bloquearía el event loop; los cambios se
+        # siguen aplicando de uno en uno, en orden, porque se espera a cada uno
+        self._applying = asyncio.ensure_future(asyncio.to_thread(self._apply, kind, lsn, payload))
+        await asyncio.shield(self._applying)
+        self._applying = None
+        self._delay.observe(max(0.0, time.time() - sent))
+        self._applied_changes(lsn, sent)
+
+    def _apply(self, kind: int, lsn: int, payload: bytes) -> None:
+        if kind == COMMIT:
+            self.replica.apply(_split(payload))
+        else:
+            self.replica.evict(_CUTOFF.unpack(payload)[0])
+        self.applied = lsn  # Aquí y no en el event loop: vale aunque se cancele la tarea
+
+    def _applied_changes(self, lsn: int, sent: float) -> None:
+        self.leader_lsn = max(self.leader_lsn, lsn)
+        if self.applied >= self.leader_lsn:
+            self._synced_at = sent
+        self._applied_gauge.set(self.applied)
+        if self.on_change is not None:
+            self.on_change()
@@ -0,0 +1,327 @@
+"""
+Almacén de eventos en SQLite
+============================
+
+Alternativa al almacén WAL + snapshots que guarda los eventos en una base de datos
+SQLite (módulo sqlite3 de la biblioteca estándar):
+
+- Tabla events con seq (rowid, orden de llegada), un índice único sobre event_id y un
+  índice sobre timestamp DESC. Las entradas del índice de timestamp terminan en el
+  rowid, así que "el evento futuro más próximo" es un
+  `WHERE timestamp >= ? ORDER BY timestamp DESC, seq LIMIT 1` que lee una sola
+  entrada del índice, con el mismo desempate que process_events. Otro índice sobre
+  (timestamp, event_id) sirve las consultas por rango con paginación por clave.
+- Cada lote se inserta con executemany dentro de una transacción. Los duplicados los
+  detecta el índice único (en el lote y contra lo ya guardado): la transacción se
+  deshace entera y se lanza el mismo ValueError que validate_events_business_rules.
+- journal_mode=WAL: los lectores no bloquean al escritor ni al revés. Cada hilo lector
+  usa su propia conexión de solo lectura, creada la primera vez que la necesita.
+- El total de eventos se lleva en una tabla de contadores dentro de la misma
+  transacción que el insert, para no hacer un count(*) que recorre la tabla.
+
+A diferencia del almacén WAL, varios procesos pueden abrir la misma base de datos, así
+que no requiere un único worker.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence, Tuple
+
+from ..metrics import metrics
+from ..models import Event
+from ..services import DUPLICATE_EVENT_IDS, EventProcessorService
+from .codec import EVENT_OVERHEAD, StoredEvent, encoded_size
+
+logger = logging.getLogger(__name__)
+
+DATABASE_FILE = "events.db"
+BUSY_TIMEOUT_MS = 5000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    seq INTEGER PRIMARY KEY,
+    event_id TEXT NOT NULL,
+    timestamp INTEGER NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE UNIQUE INDEX IF NOT EXISTS events_event_id ON events (event_id);
+CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp DESC);
+CREATE INDEX IF NOT EXISTS events_timestamp_event_id ON events (timestamp, event_id);
+CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL);
+INSERT OR IGNORE INTO counters (name, value) VALUES ('events', 0);
+"""
+
+# encoded_size de unas filas (CAST AS BLOB da la longitud en bytes UTF-8)
+_ROW_SIZE = f"{EVENT_OVERHEAD} + length(CAST(event_id AS BLOB)) + length(CAST(data AS BLOB))"
+
+INSERT_EVENT = "INSERT INTO events (event_id, timestamp, data) VALUES (?, ?, ?)"
+ADD_EVENTS = "UPDATE counters SET value = value + ? WHERE name = 'events'"
+COUNT_EVENTS = "SELECT value FROM counters WHERE name = 'events'"
+ADD_BYTES = "UPDATE counters SET value = value + ? WHERE name = 'bytes'"
+COUNT_BYTES = "SELECT value FROM counters WHERE name = 'bytes'"
+# Bases de datos anteriores al contador: se calcula una vez al abrirlas
+INIT_BYTES = f"INSERT INTO counters (name, value) SELECT 'bytes', coalesce(sum({_ROW_SIZE}), 0) FROM events"
+SELECT_EVENT = "SELECT event_id, timestamp, data FROM events WHERE event_id = ?"
+SELECT_LATEST_FUTURE = ("SELECT event_id, timestamp, data FROM events WHERE timestamp >= ? "
+                        "ORDER BY timestamp DESC, seq LIMIT 1")
+SELECT_RANGE = ("SELECT event_id, timestamp, data FROM events WHERE timestamp >= ? AND timestamp < ? "
+                "ORDER BY timestamp, event_id LIMIT ?")
+SELECT_RANGE_AFTER = ("SELECT event_id, timestamp, data FROM events "
+                      "WHERE (timestamp, event_id) > (?, ?) AND timestamp < ? "
+                      "ORDER BY timestamp, event_id LIMIT ?")
+_EXPIRED = "SELECT seq FROM events WHERE timestamp < ? ORDER BY timestamp LIMIT ?"
+# La misma subconsulta en la misma transacción elige las mismas filas
+SIZE_EXPIRED = f"SELECT coalesce(sum({_ROW_SIZE}), 0) FROM events WHERE seq IN ({_EXPIRED})"
+DELETE_EXPIRED = f"DELETE FROM events WHERE seq IN ({_EXPIRED})"
+SELECT_OLDEST = "SELECT min(timestamp) FROM events"
+
+INSERT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+
+def _row_to_event(row) -> Optional[Event]:
+    if row is None:
+        return None
+    return Event.model_construct(event_id=row[0], timestamp=row[1], data=row[2])
+
+
+class SQLiteEventStore:
+    """
+    Almacén de eventos sobre SQLite, con la misma interfaz que EventStore.
+
+    Attributes:
+        path: Ruta de la base de datos
+        fsync: synchronous=FULL si es True, OFF si es False (solo tests y benchmarks)
+    """
+
+    def __init__(self, directory: str, fsync: bool = True):
+        self.path = Path(directory) / DATABASE_FILE
+        self.fsync = fsync
+        self._writer: Optional[sqlite3.Connection] = None
+        self._write_lock = threading.Lock()
+        self._local = threading.local()
+        self._readers: List[sqlite3.Connection] = []
+        self._readers_lock = threading.Lock()
+        self._closed = False
+
+        self._events_gauge = metrics.gauge("event_store_events", "Eventos en el almacén")
+        self._reported_events = 0  # Lo que este almacén suma al gauge
+        self._insert_time = metrics.histogram("event_store_sqlite_insert_seconds",
+                                              "Transacción de inserción de cada lote en SQLite",
+                                              buckets=INSERT_BUCKETS)
+
+    @classmethod
+    def open(cls, directory: str, **kwargs) -> "SQLiteEventStore":
+        """Crea el almacén y abre (o crea) la base de datos."""
+        store = cls(directory, **kwargs)
+        store.start()
+        return store
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit: las transacciones se abren explícitamente con BEGIN
+        connection = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        connection.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        connection.execute(f"PRAGMA synchronous = {'FULL' if self.fsync else 'OFF'}")
+        return connection
+
+    def start(self) -> None:
+        """Crea el esquema y abre la conexión de escritura."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._writer = self._connect()
+        self._writer.execute("PRAGMA journal_mode = WAL")
+        self._writer.executescript(SCHEMA)
+        if self._writer.execute(COUNT_BYTES).fetchone() is None:
+            self._writer.execute(INIT_BYTES)
+        self._report_events(len(self))
+        logger.info(f"💾 Almacén SQLite {self.path}: {len(self)} eventos")
+
+    def _report_events(self, count: int) -> None:
+        # Por diferencias: con particiones (ver partitions.py) el gauge suma los almacenes abiertos
+        self._events_gauge.inc(count - self._reported_events)
+        self._reported_events = count
+
+    def _reader(self) -> sqlite3.Connection:
+        """Conexión de solo lectura del hilo actual."""
+        if self._closed:
+            raise RuntimeError("El almacén está cerrado")
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._connect()
+            connection.execute("PRAGMA query_only = 1")
+            self._local.connection = connection
+            with self._readers_lock:
+                self._readers.append(connection)
+        return connection
+
+    def __len__(self) -> int:
+        return self._reader().execute(COUNT_EVENTS).fetchone()[0]
+
+    def __contains__(self, event_id: str) -> bool:
+        return self.get(event_id) is not None
+
+    @property
+    def encoded_bytes(self) -> int:
+        """Tamaño de los eventos guardados según encode_events (como en EventStore)."""
+        return self._reader().execute(COUNT_BYTES).fetchone()[0]
+
+    def get(self, event_id: str) -> Optional[Event]:
+        """Devuelve un evento guardado, o None si no existe."""
+        return _row_to_event(self._reader().execute(SELECT_EVENT, (event_id,)).fetchone())
+
+    def latest_future(self, now: Optional[int] = None) -> Optional[Event]:
+        """
+        Devuelve el evento futuro más próximo entre los guardados.
+
+        Args:
+            now: Timestamp de referencia (opcional, usa el actual si no se proporciona)
+
+        Returns:
+            Optional[Event]: El evento con el timestamp más alto que sea >= now, o None
+        """
+        if now is None:
+            now = EventProcessorService.get_current_timestamp()
+        return _row_to_event(self._reader().execute(SELECT_LATEST_FUTURE, (now,)).fetchone())
+
+    async def latest(self, now: Optional[int] = None) -> Optional[Event]:
+        """latest_future en un hilo del pool, para no bloquear el event loop con la lectura."""
+        return await asyncio.to_thread(self.latest_future, now)
+
+    def scan_rows(self, start: int, end: int, after: Optional[Tuple[int, str]] = None,
+                  limit: int = 100) -> List[StoredEvent]:
+        """
+        Lista los eventos con timestamp en [start, end), ordenados por (timestamp, event_id).
+
+        Args:
+            start: Primer timestamp incluido
+            end: Primer timestamp excluido
+            after: Clave (timestamp, event_id) del último evento de la página anterior
+            limit: Máximo de eventos
+
+        Returns:
+            List[StoredEvent]: (event_id, timestamp, data) de cada evento de la página
+        """
+        if after is not None and after >= (start, ""):
+            return self._reader().execute(SELECT_RANGE_AFTER, (after[0], after[1], end, limit)).fetchall()
+        return self._reader().execute(SELECT_RANGE, (start, end, limit)).fetchall()
+
+    def scan(self, start: int, end: int, after: Optional[Tuple[int, str]] = None,
+             limit: int = 100) -> List[Event]:
+        """scan_rows devolviendo modelos Event."""
+        return [Event.model_construct(event_id=event_id, timestamp=timestamp, data=data)
+                for event_id, timestamp, data in self.scan_rows(start, end, after, limit)]
+
+    async def scan_page(self, start: int, end: int, after: Optional[Tuple[int, str]] = None,
+                        limit: int = 100) -> List[Event]:
+        """scan en un hilo del pool."""
+        return await asyncio.to_thread(self.scan, start, end, after, limit)
+
+    def insert(self, events: Sequence[Event]) -> int:
+        """
+        Inserta un lote en una transacción.
+
+        Args:
+            events: Eventos ya validados
+
+        Returns:
+            int: Número de eventos guardados
+
+        Raises:
+            ValueError: Si algún event_id se repite en el lote o ya está en el almacén
+            RuntimeError: Si el almacén está cerrado
+        """
+        rows = [(event.event_id, event.timestamp, event.data) for event in events]
+        with self._write_lock:
+            if self._closed:
+                raise RuntimeError("El almacén está cerrado")
+            started = time.perf_counter()
+            writer = self._writer
+            writer.execute("BEGIN IMMEDIATE")
+            try:
+                writer.executemany(INSERT_EVENT, rows)
+                writer.execute(ADD_EVENTS, (len(rows),))
+                writer.execute(ADD_BYTES, (encoded_size([row[0] for row in rows], [row[2] for row in rows]),))
+                writer.execute("COMMIT")
+            except sqlite3.IntegrityError:
+                writer.execute("ROLLBACK")
+                raise ValueError(DUPLICATE_EVENT_IDS)
+            except BaseException:
+                writer.execute("ROLLBACK")
+                raise
+            self._insert_time.observe(time.perf_counter() - started)
+            self._report_events(writer.execute(COUNT_EVENTS).fetchone()[0])
+        return len(rows)
+
+    def evict_expired(self, cutoff: int, batch: int = 1000, max_pass: float = 0.01) -> int:
+        """
+        Borra los eventos con timestamp < cutoff, por el índice de timestamp.
+
+        Args:
+            cutoff: Primer timestamp que se conserva
+            batch: Eventos borrados por transacción
+            max_pass: Segundos tras los que se deja el resto para la siguiente pasada
+
+        Returns:
+            int: Eventos borrados
+        """
+        started = time.perf_counter()
+        evicted = 0
+        while True:
+            with self._write_lock:
+                if self._closed:
+                    break
+                writer = self._writer
+                writer.execute("BEGIN IMMEDIATE")
+                try:
+                    size = writer.execute(SIZE_EXPIRED, (cutoff, batch)).fetchone()[0]
+                    count = writer.execute(DELETE_EXPIRED, (cutoff, batch)).rowcount
+                    writer.execute(ADD_EVENTS, (-count,))
+                    writer.execute(ADD_BYTES, (-size,))
+                    writer.execute("COMMIT")
+                except BaseException:
+                    writer.execute("ROLLBACK")
+                    raise
+            evicted += count
+            if count < batch or time.perf_counter() - started >= max_pass:
+                break
+        if evicted:
+            count = len(self)
+            with self._write_lock:
+                self._report_events(count)
+        return evicted
+
+    def oldest_timestamp(self) -> Optional[int]:
+        """Timestamp más bajo guardado, o None si el almacén está vacío."""
+        return self._reader().execute(SELECT_OLDEST).fetchone()[0]
+
+    async def append(self, events: Sequence[Event]) -> int:
+        """
+        Guarda un lote en un hilo del pool y espera a que esté confirmado.
+
+        Args:
+            events: Eventos ya validados
+
+        Returns:
+            int: Número de eventos guardados
+
+        Raises:
+            ValueError: Si algún event_id se repite en el lote o ya está en el almacén
+        """
+        return await asyncio.to_thread(self.insert, events)
+
+    def close(self) -> None:
+        """Cierra la conexión de escritura y las de lectura de todos los hilos."""
+        with self._write_lock:
+            if self._closed:
+                return
+            self._closed = True
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        with self._readers_lock:
+            for connection in self._readers:
+                connection.close()
+            self._readers.clear()
+        self._report_events(0)
@@ -0,0 +1,181 @@
+"""
+Rueda de temporizadores jerárquica
+==================================
+
+Este archivo contiene la estructura con la que el despachador sabe qué eventos
+vencen en cada segundo sin recorrer todos los pendientes:
+
+- LEVELS niveles de SLOTS (64) ranuras. Una ranura del nivel L cubre 64^L segundos,
+  así que seis niveles abarcan 64^6 segundos (más de 2000 años).
+- Un evento va al nivel más bajo cuyo horizonte (64^(L+1) segundos desde el tick
+  actual) lo alcanza, en la ranura (timestamp >> 6L) & 63. Insertar y cancelar son
+  O(1): cada ranura es un dict y un índice event_id -> ranura permite borrarlo.
+- Al avanzar, cada tick vacía la ranura del nivel 0 que le toca. Cuando el tick
+  cruza un múltiplo de 64^L, la ranura correspondiente del nivel L se redistribuye
+  en los niveles inferiores (cada evento baja como mucho LEVELS veces en toda su
+  vida), así que el coste amortizado por tick es O(1).
+- Los ticks sin nada pendiente en los niveles bajos se saltan hasta el siguiente
+  límite del nivel que sí tiene eventos, de modo que un salto del reloj de días (o
+  un proceso que estuvo parado) no recorre cada segundo intermedio.
+
+Los eventos vencidos pasan a una cola FIFO de la que se sacan en lotes acotados
+(pop_due), así que quien consume marca el ritmo sin que avanzar la rueda copie nada.
+Si el reloj retrocede no se hace nada: lo que ya venció no se repite y lo que se
+inserte con un timestamp <= tick actual vence de inmediato.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 6
+
+# Ranura especial del índice para los eventos ya vencidos
+_DUE = (-1, -1)
+
+# (event_id, timestamp, payload)
+DueEntry = Tuple[str, int, Any]
+
+
+class TimerWheel:
+    """
+    Rueda de temporizadores con resolución de un segundo.
+
+    Attributes:
+        tick: Último segundo procesado
+    """
+
+    def __init__(self, now: int):
+        self.tick = now
+        self._slots: List[List[Dict[str, Tuple[int, Any]]]] = [
+            [{} for _ in range(SLOTS)] for _ in range(LEVELS)
+        ]
+        self._counts = [0] * LEVELS  # Eventos por nivel, para saltar niveles vacíos
+        self._index: Dict[str, Tuple[int, int]] = {}  # event_id -> (nivel, ranura)
+        self._due: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        """Eventos pendientes, vencidos o no."""
+        return len(self._index)
+
+    def __contains__(self, event_id: str) -> bool:
+        return event_id in self._index
+
+    @property
+    def due_count(self) -> int:
+        """Eventos vencidos que aún no se han sacado con pop_due."""
+        return len(self._due)
+
+    def _place(self, event_id: str, timestamp: int, payload: Any) -> None:
+        delta = timestamp - self.tick
+        if delta <= 0:
+            self._due[event_id] = (timestamp, payload)
+            self._index[event_id] = _DUE
+            return
+        level = min((delta.bit_length() - 1) // SLOT_BITS, LEVELS - 1)
+        slot = (timestamp >> (SLOT_BITS * level)) & SLOT_MASK
+        self._slots[level][slot][event_id] = (timestamp, payload)
+        self._counts[level] += 1
+        self._index[event_id] = (level, slot)
+
+    def insert(self, event_id: str, timestamp: int, payload: Any = None) -> None:
+        """
+        Programa un evento. Si ya estaba programado, se reprograma.
+
+        Args:
+            event_id: Identificador del evento
+            timestamp: Segundo en el que vence
+            payload: Dato que se devuelve al vencer
+        """
+        if event_id in self._index:
+            self.cancel(event_id)
+        self._place(event_id, timestamp, payload)
+
+    def cancel(self, event_id: str) -> bool:
+        """
+        Cancela un evento pendiente (vencido o no).
+
+        Args:
+            event_id: Identificador del evento
+
+        Returns:
+            bool: True si estaba pendiente
+        """
+        location = self._index.pop(event_id, None)
+        if location is None:
+            return False
+        if location is _DUE:
+            del self._due[event_id]
+        else:
+            level, slot = location
+            del self._slots[level][slot][event_id]
+            self._counts[level] -= 1
+        return True
+
+    def _cascade(self, level: int) -> None:
+        slot = (self.tick >> (SLOT_BITS * level)) & SLOT_MASK
+        entries = self._slots[level][slot]
+        if not entries:
+            return
+        self._slots[level][slot] = {}
+        self._counts[level] -= len(entries)
+        for event_id, (timestamp, payload) in entries.items():
+            self._place(event_id, timestamp, payload)
+
+    def advance(self, now: int) -> int:
+        """
+        Procesa los ticks hasta `now` y pasa a la cola de vencidos lo que venza.
+
+        Args:
+            now: Segundo actual
+
+        Returns:
+            int: Eventos que han vencido en esta llamada
+        """
+        before = len(self._due)
+        while self.tick < now:
+            # Con los niveles bajos vacíos se salta hasta el límite anterior a la
+            # siguiente redistribución del primer nivel que tiene eventos
+            lowest = next((level for level, count in enumerate(self._counts) if count), None)
+            if lowest is None:
+                self.tick = now
+                break
+            if lowest > 0:
+                skip_to = self.tick | ((1 << (SLOT_BITS * lowest)) - 1)
+                if skip_to >= now:
+                    self.tick = now
+                    break
+                self.tick = skip_to
+
+            self.tick += 1
+            # Redistribuir de arriba abajo los niveles cuyo periodo empieza en este tick
+            for level in range(LEVELS - 1, 0, -1):
+                if self.tick & ((1 << (SLOT_BITS * level)) - 1) == 0:
+                    self._cascade(level)
+            entries = self._slots[0][self.tick & SLOT_MASK]
+            if entries:
+                self._slots[0][self.tick & SLOT_MASK] = {}
+                self._counts[0] -= len(entries)
+                self._due.update(entries)
+                for event_id in entries:
+                    self._index[event_id] = _DUE
+        return len(self._due) - before
+
+    def pop_due(self, limit: int) -> List[DueEntry]:
+        """
+        Saca hasta `limit` eventos vencidos, en orden de vencimiento.
+
+        Args:
+            limit: Máximo de eventos
+
+        Returns:
+            List[DueEntry]: (event_id, timestamp, payload) de cada evento
+        """
+        batch = []
+        while self._due and len(batch) < limit:
+            event_id, (timestamp, payload) = self._due.popitem(last=False)
+            del self._index[event_id]
+            batch.append((event_id, timestamp, payload))
+        return batch
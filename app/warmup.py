@@ -0,0 +1,206 @@
+"""
+Calentamiento y disponibilidad de la Event Processor API
+========================================================
+
+Las primeras peticiones de cada worker son más lentas: los validadores de Pydantic,
+la resolución de dependencias de FastAPI y los caminos de serialización todavía no
+se han ejecutado nunca. Este archivo contiene el calentamiento que se ejecuta al
+arrancar, pasando payloads sintéticos por la aplicación completa en el mismo
+proceso, y el estado de disponibilidad (readiness) que expone /health/ready.
+"""
+
+import asyncio
+import json
+import logging
+import time
+from typing import List, Optional, Sequence, Tuple
+
+from .metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Endpoints que se calientan con cada payload sintético
+WARMUP_PATHS = ("/events/process", "/process_events")
+
+
+class Readiness:
+    """
+    Estado de disponibilidad del worker.
+
+    Attributes:
+        ready: True cuando el worker puede recibir tráfico
+        warmup_duration_ms: Duración del calentamiento (None si no se ha completado)
+        warmup_requests: Peticiones sintéticas ejecutadas
+        warmup_errors: Peticiones sintéticas con un estado inesperado
+    """
+
+    def __init__(self):
+        self.ready = False
+        self.warmup_duration_ms: Optional[float] = None
+        self.warmup_requests = 0
+        self.warmup_errors = 0
+
+    def mark_ready(self) -> None:
+        self.ready = True
+        metrics.gauge("ready", "1 si el worker acepta tráfico").set(1)
+
+    def snapshot(self) -> dict:
+        return {
+            "status": "ready" if self.ready else "warming_up",
+            "warmup_duration_ms": self.warmup_duration_ms,
+            "warmup_requests": self.warmup_requests,
+            "warmup_errors": self.warmup_errors,
+        }
+
+
+# Estado global del worker
+readiness = Readiness()
+
+
+def warmup_payloads(now: Optional[int] = None) -> List[bytes]:
+    """
+    Genera los cuerpos sintéticos del calentamiento.
+
+    Cubren los caminos de respuesta 200 (evento futuro) y 204 (sin eventos futuros)
+    con listas pequeñas y grandes.
+
+    Args:
+        now: Timestamp de referencia (opcional)
+
+    Returns:
+        List[bytes]: Cuerpos JSON para /events/process
+    """
+    if now is None:
+        now = int(time.time())
+
+    def payload(count: int, future: bool) -> bytes:
+        offset = 3600 if future else -3600
+        events = [
+            {"event_id": f"warmup_{index}", "timestamp": now + offset + index, "data": "warmup"}
+            for index in range(count)
+        ]
+        return json.dumps({"events": events}).encode()
+
+    return [payload(3, True), payload(3, False), payload(100, True)]
+
+
+def internal_host(trusted_hosts: Sequence[str]) -> str:
+    """
+    Elige un valor de cabecera Host aceptado por la configuración de hosts confiables.
+
+    Args:
+        trusted_hosts: Hosts confiables configurados
+
+    Returns:
+        str: Primer host sin comodines, o "localhost"
+    """
+    for host in trusted_hosts:
+        if "*" not in host:
+            return host
+    return "localhost"
+
+
+async def asgi_request(app, method: str, path: str, body: bytes = b"",
+                       host: str = "localhost") -> Tuple[int, bytes]:
+    """
+    Ejecuta una petición HTTP contra una aplicación ASGI sin pasar por la red.
+
+    Las peticiones llevan la clave "warmup" en el scope para que los middlewares
+    que graban o limitan tráfico puedan ignorarlas.
+
+    Args:
+        app: Aplicación ASGI
+        method: Método HTTP
+        path: Ruta
+        body: Cuerpo de la petición
+        host: Valor de la cabecera Host
+
+    Returns:
+        Tuple[int, bytes]: Código de estado y cuerpo de la respuesta
+    """
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "query_string": b"",
+        "root_path": "",
+        "headers": [
+            (b"host", host.encode()),
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+        ],
+        "client": ("127.0.0.1", 0),
+        "server": ("127.0.0.1", 80),
+        "warmup": True,
+    }
+    request_sent = False
+    status = 500
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        # Tras el cuerpo, la conexión sigue abierta hasta que termine la respuesta
+        await asyncio.Event().wait()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, b"".join(chunks)
+
+
+async def run_warmup(app, rounds: int = 20, host: str = "localhost") -> dict:
+    """
+    Calienta el worker y lo marca como disponible al terminar.
+
+    Entre rondas cede el control al event loop, para que el worker siga
+    respondiendo a /health/ y /health/ready mientras se calienta en segundo plano.
+
+    Args:
+        app: Aplicación ASGI completa
+        rounds: Veces que se repite cada payload en cada endpoint
+        host: Cabecera Host a usar
+
+    Returns:
+        dict: Estado de disponibilidad tras el calentamiento
+    """
+    start = time.perf_counter()
+    payloads = warmup_payloads()
+
+    try:
+        for _ in range(rounds):
+            for path in WARMUP_PATHS:
+                for body in payloads:
+                    status, _ = await asgi_request(app, "POST", path, body, host)
+                    readiness.warmup_requests += 1
+                    if status not in (200, 204):
+                        readiness.warmup_errors += 1
+            status, _ = await asgi_request(app, "GET", "/health/", host=host)
+            readiness.warmup_requests += 1
+            await asyncio.sleep(0)
+    except Exception as e:
+        # El calentamiento es una optimización: si falla, el worker se sirve en frío
+        logger.error(f"Error durante el calentamiento: {str(e)}")
+        readiness.warmup_errors += 1
+
+    duration = time.perf_counter() - start
+    readiness.warmup_duration_ms = duration * 1000
+    metrics.gauge("warmup_duration_seconds", "Duración del calentamiento del worker").set(duration)
+    if readiness.warmup_errors:
+        logger.warning(f"⚠️ Calentamiento con {readiness.warmup_errors} respuestas inesperadas")
+
+    readiness.mark_ready()
+    logger.info(f"🔥 Calentamiento completado en {readiness.warmup_duration_ms:.1f} ms "
+                f"({readiness.warmup_requests} peticiones)")
+    return readiness.snapshot()
@@ -0,0 +1,11 @@
+"""
+Benchmarks de la Event Processor API
+====================================
+
+Este paquete contiene la suite de rendimiento de la aplicación: generadores de
+cargas sintéticas, benchmarks de la capa de servicios y de la pila HTTP completa,
+y utilidades para guardar resultados en JSON y compararlos contra una línea base.
+
+Uso: python -m benchmarks run [opciones]
+     python -m benchmarks compare <baseline.json> <resultados.json>
+"""
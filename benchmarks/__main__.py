@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Punto de entrada de la suite de benchmarks
+==========================================
+
+Uso: python -m benchmarks run [--suite services] [--quick] [--output resultados.json]
+     python -m benchmarks compare <baseline.json> <resultados.json> [--threshold 0.10]
+"""
+
+import argparse
+import importlib
+import sys
+from pathlib import Path
+
+from .harness import (
+    DEFAULT_REGRESSION_THRESHOLD,
+    compare_results,
+    format_ns,
+    load_results,
+    save_results,
+)
+
+# Suites disponibles: nombre -> módulo con una función run(quick)
+SUITES = {
+    "services": "benchmarks.bench_services",
+    "http": "benchmarks.bench_http",
+    "startup": "benchmarks.bench_startup",
+    "gc": "benchmarks.bench_gc",
+    "rate_limit": "benchmarks.bench_rate_limit",
+    "lanes": "benchmarks.bench_lanes",
+    "compression": "benchmarks.bench_compression",
+    "cors": "benchmarks.bench_cors",
+    "responses": "benchmarks.bench_responses",
+    "storage": "benchmarks.bench_storage",
+    "dispatch": "benchmarks.bench_dispatch",
+    "live": "benchmarks.bench_live",
+    "index": "benchmarks.bench_index",
+    "partitions": "benchmarks.bench_partitions",
+    "result_cache": "benchmarks.bench_result_cache",
+    "replication": "benchmarks.bench_replication",
+}
+
+RESULTS_DIR = Path(__file__).parent / "results"
+DEFAULT_OUTPUT = RESULTS_DIR / "latest.json"
+DEFAULT_BASELINE = RESULTS_DIR / "baseline.json"
+
+
+def run_command(args) -> int:
+    """Ejecuta las suites seleccionadas y guarda los resultados."""
+    suites = args.suite or list(SUITES)
+    results = []
+
+    for suite in suites:
+        print(f"⏱️  Ejecutando suite '{suite}'...")
+        module = importlib.import_module(SUITES[suite])
+        suite_results = module.run(quick=args.quick)
+        for result in suite_results:
+            p99 = format_ns(result.summary()["p99_ns"])
+            print(f"   {result.name:<55} {format_ns(result.median_ns):>12}  (p99 {p99})")
+        results.extend(suite_results)
+
+    output = Path(args.output)
+    save_results(results, output)
+    print(f"💾 Resultados guardados en {output}")
+
+    if args.save_baseline:
+        save_results(results, DEFAULT_BASELINE)
+        print(f"📌 Línea base actualizada en {DEFAULT_BASELINE}")
+
+    return 0
+
+
+def compare_command(args) -> int:
+    """Compara dos archivos de resultados y falla si hay regresiones."""
+    rows = compare_results(load_results(args.baseline), load_results(args.current), args.threshold)
+
+    icons = {"regression": "❌", "improvement": "🚀", "unchanged": "✅"}
+    for row in rows:
+        print(
+            f"{icons[row['status']]} {row['name']:<55} "
+            f"{format_ns(row['baseline_ns']):>12} -> {format_ns(row['current_ns']):>12} "
+            f"({row['change']:+.1%})"
+        )
+
+    regressions = [row for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"💥 {len(regressions)} regresiones por encima del {args.threshold:.0%}")
+        return 1
+
+    print("🎉 Sin regresiones")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Ejecutar benchmarks")
+    run_parser.add_argument("--suite", action="append", choices=sorted(SUITES),
+                            help="Suite a ejecutar (se puede repetir; por defecto todas)")
+    run_parser.add_argument("--quick", action="store_true", help="Menos cargas y muestras")
+    run_parser.add_argument("--output", default=str(DEFAULT_OUTPUT), help="Archivo JSON de salida")
+    run_parser.add_argument("--save-baseline", action="store_true",
+                            help="Guardar también los resultados como línea base")
+    run_parser.set_defaults(handler=run_command)
+
+    compare_parser = subparsers.add_parser("compare", help="Comparar contra una línea base")
+    compare_parser.add_argument("baseline", nargs="?", default=str(DEFAULT_BASELINE))
+    compare_parser.add_argument("current", nargs="?", default=str(DEFAULT_OUTPUT))
+    compare_parser.add_argument("--threshold", type=float, default=DEFAULT_REGRESSION_THRESHOLD,
+                                help="Cambio relativo de la mediana considerado regresión")
+    compare_parser.set_defaults(handler=compare_command)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
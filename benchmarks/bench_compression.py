@@ -0,0 +1,72 @@
+"""
+Benchmarks de compresión
+========================
+
+Mide, para cada codificación y nivel, el coste de CPU de comprimir y descomprimir los
+payloads estándar y los bytes que ahorra (ratio en los parámetros del resultado), que
+es el compromiso a la hora de elegir niveles en la configuración.
+"""
+
+import json
+import sys
+import zlib
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.compression import available_encodings, compress_bytes, zstandard, brotli
+
+from .harness import BenchmarkResult, measure
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+WORKLOADS = ("small", "large", "large_data")
+
+# Niveles medidos por codificación: rápido, el de la configuración por defecto y alto
+LEVELS = {"gzip": (1, 6, 9), "zstd": (1, 3, 10), "br": (1, 4, 9)}
+
+
+def _decompressor(encoding: str):
+    if encoding == "gzip":
+        return lambda data: zlib.decompress(data, 16 + zlib.MAX_WBITS)
+    if encoding == "zstd":
+        return zstandard.ZstdDecompressor().decompress
+    return brotli.decompress
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de compresión.
+
+    Args:
+        quick: Si es True usa menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    rounds = 5 if quick else 20
+    results = []
+
+    for workload in WORKLOADS:
+        body = json.dumps(generate_payload(STANDARD_WORKLOADS[workload])).encode()
+        for encoding in available_encodings():
+            decompress = _decompressor(encoding)
+            for level in LEVELS[encoding]:
+                compressed = compress_bytes(body, encoding, level)
+                params = {
+                    "workload": workload,
+                    "encoding": encoding,
+                    "level": level,
+                    "body_bytes": len(body),
+                    "compressed_bytes": len(compressed),
+                    "ratio": round(len(body) / len(compressed), 2),
+                }
+                case = f"{encoding}_{level}[{workload}]"
+                results.append(measure(f"compression.compress.{case}",
+                                       lambda: compress_bytes(body, encoding, level),
+                                       rounds=rounds, params=params))
+                results.append(measure(f"compression.decompress.{case}",
+                                       lambda: decompress(compressed),
+                                       rounds=rounds, params=params))
+    return results
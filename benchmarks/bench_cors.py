@@ -0,0 +1,124 @@
+"""
+Benchmarks de la capa de hosts confiables y CORS
+================================================
+
+Compara HostCORSMiddleware con la pila anterior (TrustedHostMiddleware +
+CORSMiddleware de Starlette) con la misma configuración:
+
+- Sobre una aplicación ASGI vacía, para aislar el coste de la capa.
+- Sobre el resto de la aplicación real en /events/process (POST desde otro origen) y
+  /health/ (GET sin Origin), para ver su peso en una petición completa.
+- En preflight (OPTIONS), que la capa nueva responde desde caché.
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from starlette.middleware.cors import CORSMiddleware
+from starlette.middleware.trustedhost import TrustedHostMiddleware
+
+from app.cors import HostCORSMiddleware
+
+from .bench_http import load_app, quiet_logging
+from .harness import BenchmarkResult, measure_async
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+HOSTS = ["localhost", "127.0.0.1", "*.localhost"]
+ORIGIN = b"http://app.localhost:3000"
+
+CASES = {
+    "events_process": ("POST", "/events/process", [(b"origin", ORIGIN), (b"content-type", b"application/json")]),
+    "health": ("GET", "/health/", []),
+    "preflight": ("OPTIONS", "/events/process", [
+        (b"origin", ORIGIN),
+        (b"access-control-request-method", b"POST"),
+        (b"access-control-request-headers", b"content-type"),
+    ]),
+}
+
+
+async def _empty_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _noop_send(message):
+    pass
+
+
+def _app_without_layer(app):
+    """Pila completa de la aplicación sin HostCORSMiddleware, para envolverla con cada variante."""
+    configured = app.user_middleware
+    app.user_middleware = [m for m in configured if m.cls is not HostCORSMiddleware]
+    try:
+        return app.build_middleware_stack()
+    finally:
+        app.user_middleware = configured
+
+
+def _stacks(inner):
+    options = {"allow_origins": ["*"], "allow_methods": ["*"], "allow_headers": ["*"], "allow_credentials": True}
+    return {
+        "starlette": TrustedHostMiddleware(CORSMiddleware(inner, **options), allowed_hosts=HOSTS),
+        "lean": HostCORSMiddleware(inner, allowed_hosts=HOSTS, **options),
+    }
+
+
+def _asgi_call(stack, app, method: str, path: str, headers, body: bytes):
+    message = {"type": "http.request", "body": body, "more_body": False}
+
+    async def receive():
+        return message
+
+    def call():
+        scope = {"type": "http", "http_version": "1.1", "method": method, "scheme": "http",
+                 "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+                 "headers": [(b"host", b"localhost:8000"), *headers], "client": ("127.0.0.1", 50000),
+                 "server": ("127.0.0.1", 8000), "app": app}  # Lo pone Starlette.__call__
+        return stack(scope, receive, _noop_send)
+
+    return call
+
+
+async def _run_async(quick: bool) -> List[BenchmarkResult]:
+    app = load_app()
+    quiet_logging()
+
+    rounds = 5 if quick else 20
+    number = 200 if quick else 1000
+    body = json.dumps(generate_payload(STANDARD_WORKLOADS["small"])).encode()
+    targets = {"empty": _empty_app, "routes": _app_without_layer(app)}
+
+    results = []
+    for target, inner in targets.items():
+        calls = number if target == "empty" else number // 10
+        for case, (method, path, headers) in CASES.items():
+            if case == "preflight" and target == "routes":
+                continue  # El preflight no llega a las rutas
+            payload = body if method == "POST" else b""
+            for stack_name, stack in _stacks(inner).items():
+                results.append(await measure_async(
+                    f"cors.{case}[{target}-{stack_name}]",
+                    _asgi_call(stack, app, method, path, headers, payload),
+                    rounds=rounds, number=calls,
+                    params={"case": case, "target": target, "stack": stack_name}))
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de la capa de hosts y CORS.
+
+    Args:
+        quick: Si es True usa menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    return asyncio.run(_run_async(quick))
@@ -0,0 +1,123 @@
+"""
+Benchmarks del despachador de eventos vencidos
+==============================================
+
+Mide la TimerWheel con muchos eventos pendientes frente a un heap (heapq con borrado
+perezoso, la alternativa obvia):
+
+- Programar y cancelar un evento con N pendientes: O(1) en la rueda, O(log N) en el
+  heap (y el heap no puede cancelar sin marcar el evento y arrastrarlo).
+- Avanzar un segundo y sacar lo que vence, con N eventos repartidos en un día. En la
+  rueda cada evento baja de nivel como mucho LEVELS veces en toda su vida; en el heap
+  cada vencido cuesta un heappop O(log N).
+- Un salto del reloj de una hora (proceso parado): la rueda salta los ticks vacíos.
+"""
+
+import heapq
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.timer_wheel import TimerWheel
+
+from .harness import BenchmarkResult, measure
+
+DAY = 86400
+
+
+def _filled_wheel(now: int, total: int, rng: random.Random) -> TimerWheel:
+    wheel = TimerWheel(now)
+    for i in range(total):
+        wheel.insert(f"evt_{i}", now + rng.randrange(1, DAY))
+    return wheel
+
+
+def _filled_heap(now: int, total: int, rng: random.Random) -> list:
+    heap = [(now + rng.randrange(1, DAY), f"evt_{i}") for i in range(total)]
+    heapq.heapify(heap)
+    return heap
+
+
+def _schedule(now: int, total: int, rounds: int) -> List[BenchmarkResult]:
+    rng = random.Random(1)
+    wheel = _filled_wheel(now, total, rng)
+    heap = _filled_heap(now, total, rng)
+    cancelled = set()
+    counter = iter(range(10 ** 12))
+
+    def wheel_op():
+        event_id = f"new_{next(counter)}"
+        wheel.insert(event_id, now + rng.randrange(1, DAY))
+        wheel.cancel(event_id)
+
+    def heap_op():
+        event_id = f"new_{next(counter)}"
+        heapq.heappush(heap, (now + rng.randrange(1, DAY), event_id))
+        cancelled.add(event_id)  # Borrado perezoso: se descarta al salir del heap
+
+    params = {"pending": total}
+    return [
+        measure("dispatch.wheel.insert_cancel", wheel_op, rounds=rounds, params=params),
+        measure("dispatch.heap.insert_cancel", heap_op, rounds=rounds, params=params),
+    ]
+
+
+def _advance(now: int, total: int, rounds: int) -> List[BenchmarkResult]:
+    rng = random.Random(2)
+    wheel = _filled_wheel(now, total, rng)
+    heap = _filled_heap(now, total, rng)
+    wheel_now = [now]
+    heap_now = [now]
+
+    def wheel_tick():
+        wheel_now[0] += 1
+        wheel.advance(wheel_now[0])
+        wheel.pop_due(10 ** 9)
+
+    def heap_tick():
+        heap_now[0] += 1
+        while heap and heap[0][0] <= heap_now[0]:
+            heapq.heappop(heap)
+
+    params = {"pending": total, "due_per_tick": round(total / DAY, 1)}
+    return [
+        measure("dispatch.wheel.advance_1s", wheel_tick, rounds=rounds, params=params),
+        measure("dispatch.heap.advance_1s", heap_tick, rounds=rounds, params=params),
+    ]
+
+
+def _jump(now: int, total: int, rounds: int) -> BenchmarkResult:
+    rng = random.Random(3)
+    samples = []
+    for _ in range(rounds):
+        wheel = _filled_wheel(now, total, rng)
+        started = time.perf_counter_ns()
+        due = wheel.advance(now + 3600)
+        wheel.pop_due(10 ** 9)
+        samples.append((time.perf_counter_ns() - started) / max(due, 1))
+    return BenchmarkResult("dispatch.wheel.jump_1h_per_due", samples, {"pending": total, "jump_s": 3600})
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks del despachador.
+
+    Args:
+        quick: Si es True usa 100k eventos pendientes en lugar de 1M y menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    total = 100_000 if quick else 1_000_000
+    rounds = 5 if quick else 10
+    now = int(time.time())
+
+    results = _schedule(now, total, rounds)
+    results.extend(_advance(now, total, rounds))
+    results.append(_jump(now, total, 3))
+    return results
@@ -0,0 +1,83 @@
+"""
+Benchmarks del recolector de basura
+===================================
+
+Compara la latencia por petición (sobre todo la cola, p99) de /events/process con
+distintas configuraciones del GC. Una de cada diez peticiones es grande y solo genera
+basura; se miden las pequeñas, que son las que sufren las pausas del GC en la cola.
+Cada configuración se mide en un proceso nuevo, porque gc.freeze() y los umbrales
+afectan a todo el proceso.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+from .harness import BenchmarkResult
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Configuraciones comparadas: nombre -> variables de entorno. [700, 10, 10] son los
+# umbrales por defecto de CPython; producción usa los de freeze_tuned.
+CONFIGURATIONS = {
+    "default": {"GC_FREEZE": "false", "GC_THRESHOLDS": "[700, 10, 10]"},
+    "freeze": {"GC_FREEZE": "true", "GC_THRESHOLDS": "[700, 10, 10]"},
+    "freeze_tuned": {"GC_FREEZE": "true", "GC_THRESHOLDS": "[50000, 20, 100]"},
+}
+
+PROBE = """
+import asyncio, gc, json, time
+from app.main import app
+from app.metrics import metrics
+from app.warmup import asgi_request
+from benchmarks.workloads import STANDARD_WORKLOADS, generate_payload
+
+bodies = [json.dumps(generate_payload(STANDARD_WORKLOADS[name])).encode() for name in ("small", "large")]
+
+async def main():
+    latencies = []
+    for index in range({requests}):
+        large = index % 10 == 0
+        start = time.perf_counter_ns()
+        await asgi_request(app, "POST", "/events/process", bodies[large])
+        if not large and index >= {requests} // 10:
+            latencies.append(time.perf_counter_ns() - start)
+    pauses = {{key: value["count"] for key, value in metrics.snapshot().items() if key.startswith("gc_pause")}}
+    print(json.dumps({{"latencies": latencies, "pauses": pauses,
+                      "frozen": gc.get_freeze_count()}}))
+
+asyncio.run(main())
+"""
+
+
+def _probe(env_overrides: dict, requests: int) -> dict:
+    env = {key: value for key, value in os.environ.items() if not key.startswith("GC_")}
+    env.update({"ENVIRONMENT": "production", "LOG_FILE": "", "OPENAPI_CACHE_FILE": "",
+                "GC_PAUSE_METRICS": "true", **env_overrides})
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(requests=requests)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks del GC. Las muestras son latencias individuales por petición.
+
+    Args:
+        quick: Si es True hace menos peticiones
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    requests = 1000 if quick else 5000
+    results = []
+    for name, env_overrides in CONFIGURATIONS.items():
+        probe = _probe(env_overrides, requests)
+        params = {**env_overrides, "gc_collections": probe["pauses"], "frozen_objects": probe["frozen"]}
+        results.append(BenchmarkResult(f"gc.request_latency[{name}]", probe["latencies"], params))
+    return results
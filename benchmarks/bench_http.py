@@ -0,0 +1,99 @@
+"""
+Benchmarks de la pila HTTP
+==========================
+
+Mide la aplicación ASGI completa (middlewares, validación, rutas y serialización)
+en el mismo proceso, sin red, usando el transporte ASGI de httpx.
+"""
+
+import asyncio
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+import httpx
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from .harness import UNLIMITED_ENV, BenchmarkResult, measure_async
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+QUICK_WORKLOADS = ("small", "large")
+
+# Host aceptado por la configuración de hosts confiables de la aplicación
+BASE_URL = "http://localhost"
+
+
+def asgi_client(app) -> httpx.AsyncClient:
+    """
+    Crea un cliente httpx que llama a la aplicación ASGI en el mismo proceso.
+
+    Args:
+        app: Aplicación ASGI
+
+    Returns:
+        httpx.AsyncClient: Cliente listo para usar
+    """
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url=BASE_URL)
+
+
+def load_app():
+    """Importa la aplicación sin límite de tasa por cliente (salvo que el entorno lo fije)."""
+    for key, value in UNLIMITED_ENV.items():
+        os.environ.setdefault(key, value)
+    from app.main import app
+    return app
+
+
+def quiet_logging() -> None:
+    """Sube el nivel de logging a WARNING, como en producción, para no medir el log por petición."""
+    for name in ("app", "httpx"):
+        logging.getLogger(name).setLevel(logging.WARNING)
+
+
+async def _run_async(quick: bool) -> List[BenchmarkResult]:
+    app = load_app()
+    quiet_logging()
+
+    rounds = 5 if quick else 20
+    number = 10 if quick else 20
+    names = QUICK_WORKLOADS if quick else tuple(STANDARD_WORKLOADS)
+    results = []
+
+    async with asgi_client(app) as client:
+        results.append(await measure_async(
+            "http.health", lambda: client.get("/health/"), rounds=rounds, number=number
+        ))
+
+        for workload in names:
+            spec = STANDARD_WORKLOADS[workload]
+            params = {"workload": workload, **spec.to_dict()}
+            payload = generate_payload(spec)
+
+            for endpoint, path in (("events_process", "/events/process"),
+                                   ("legacy_process_events", "/process_events")):
+                results.append(await measure_async(
+                    f"http.{endpoint}[{workload}]",
+                    lambda path=path: client.post(path, json=payload),
+                    rounds=rounds,
+                    number=number,
+                    params=params,
+                ))
+
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks HTTP.
+
+    Args:
+        quick: Si es True usa menos cargas y menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    return asyncio.run(_run_async(quick))
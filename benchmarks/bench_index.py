@@ -0,0 +1,139 @@
+"""
+Benchmarks del índice por tiempo con lecturas concurrentes a las escrituras
+===========================================================================
+
+Compara el índice de versiones inmutables del EventStore (IndexVersion, lecturas sin
+lock) con la estructura anterior: un SortedList modificado en su sitio, con un lock
+que toman tanto el escritor como los lectores.
+
+En ambos casos un hilo escritor inserta sin pausa lotes de 100 eventos con timestamps
+aleatorios mientras varios hilos lectores piden páginas de 100 eventos de la consulta
+por rango desde posiciones aleatorias. Se mide la latencia de cada lectura (los
+resultados son latencias por lectura) y, en los parámetros, las lecturas y los lotes
+por segundo conseguidos.
+
+El baseline necesita sortedcontainers (requirements-dev.txt).
+"""
+
+import random
+import sys
+import threading
+import time
+from itertools import islice
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from sortedcontainers import SortedList
+
+from app.storage.index import IndexVersion
+
+from .harness import BenchmarkResult
+
+BATCH = 100
+PAGE = 100
+READERS = 4
+SPAN = 10_000_000  # Rango de timestamps generados
+
+
+def _rows(rng: random.Random, start: int, count: int):
+    return [(rng.randrange(SPAN), f"evt_{i:09d}", "payload") for i in range(start, start + count)]
+
+
+class _LockedIndex:
+    """La estructura anterior: SortedList y dict modificados con un lock tomado."""
+
+    def __init__(self, rows):
+        self._lock = threading.Lock()
+        self._events = {event_id: (timestamp, data) for timestamp, event_id, data in rows}
+        self._by_time = SortedList((timestamp, event_id) for timestamp, event_id, _ in rows)
+
+    def insert(self, rows) -> None:
+        with self._lock:
+            self._events.update((event_id, (timestamp, data)) for timestamp, event_id, data in rows)
+            self._by_time.update((timestamp, event_id) for timestamp, event_id, _ in rows)
+
+    def range(self, start: int, end: int, limit: int):
+        with self._lock:
+            keys = list(islice(self._by_time.irange((start, ""), (end, ""), inclusive=(True, False)), limit))
+            return [(event_id, timestamp, self._events[event_id][1]) for timestamp, event_id in keys]
+
+
+class _VersionedIndex:
+    """El índice del EventStore: el escritor publica versiones, los lectores no toman lock."""
+
+    def __init__(self, rows):
+        self._lock = threading.Lock()  # Solo entre escritores, como _writer en el EventStore
+        self._events = {event_id: (timestamp, data) for timestamp, event_id, data in rows}
+        self._version = IndexVersion.build(sorted(rows))
+
+    def insert(self, rows) -> None:
+        with self._lock:
+            self._events.update((event_id, (timestamp, data)) for timestamp, event_id, data in rows)
+            self._version = self._version.inserted(rows, None)
+
+    def range(self, start: int, end: int, limit: int):
+        return self._version.range((start, ""), end, limit)
+
+
+def _contend(index, total: int, duration: float) -> dict:
+    stop = threading.Event()
+    latencies: List[List[int]] = [[] for _ in range(READERS)]
+    batches = [0]
+
+    def writer():
+        rng = random.Random(1)
+        next_id = total
+        while not stop.is_set():
+            index.insert(_rows(rng, next_id, BATCH))
+            next_id += BATCH
+            batches[0] += 1
+
+    def reader(samples: List[int], seed: int):
+        rng = random.Random(seed)
+        while not stop.is_set():
+            start = rng.randrange(SPAN)
+            started = time.perf_counter_ns()
+            index.range(start, SPAN, PAGE)
+            samples.append(time.perf_counter_ns() - started)
+
+    threads = [threading.Thread(target=writer)]
+    threads += [threading.Thread(target=reader, args=(samples, seed)) for seed, samples in enumerate(latencies)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    samples = [latency for reader_samples in latencies for latency in reader_samples]
+    return {
+        "samples": samples,
+        "reads_per_s": round(len(samples) / duration),
+        "batches_per_s": round(batches[0] / duration),
+    }
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks del índice.
+
+    Args:
+        quick: Si es True usa 200k eventos en lugar de 2M y ejecuciones más cortas
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    total = 200_000 if quick else 2_000_000
+    duration = 1.0 if quick else 5.0
+    rows = _rows(random.Random(0), 0, total)
+
+    results = []
+    for name, index_class in (("locked", _LockedIndex), ("versioned", _VersionedIndex)):
+        outcome = _contend(index_class(rows), total, duration)
+        params = {"events": total, "readers": READERS, "batch": BATCH, "page": PAGE,
+                  "reads_per_s": outcome["reads_per_s"], "batches_per_s": outcome["batches_per_s"]}
+        results.append(BenchmarkResult(f"index.read_under_writes[{name}]", outcome["samples"], params))
+    return results
@@ -0,0 +1,88 @@
+"""
+Benchmarks de los carriles de prioridad
+=======================================
+
+Mide la latencia de las peticiones pequeñas a /events/process mientras varias tareas
+envían payloads grandes sin pausa, con y sin carriles de prioridad. Las muestras son
+latencias individuales de las peticiones pequeñas; la cola (p99) es lo que importa.
+"""
+
+import asyncio
+import json
+from typing import List
+
+from app.lanes import Lane, PriorityLanes
+from app.warmup import asgi_request
+
+from .bench_http import load_app, quiet_logging
+from .harness import BenchmarkResult
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+BACKGROUND_LARGE = 4  # Tareas que envían payloads grandes en paralelo
+ARRIVAL_INTERVAL = 0.02  # Segundos entre peticiones pequeñas
+
+
+async def _small_latencies(app, small_body: bytes, large_body: bytes, requests: int) -> List[float]:
+    stop = asyncio.Event()
+
+    async def large_sender():
+        while not stop.is_set():
+            await asgi_request(app, "POST", "/events/process", large_body)
+            await asyncio.sleep(0)  # Sin carriles la petición no cede el loop por sí sola
+
+    senders = [asyncio.create_task(large_sender()) for _ in range(BACKGROUND_LARGE)]
+    await asyncio.sleep(0.05)  # Que los payloads grandes ya estén en curso
+
+    # Llegadas a intervalos fijos; la latencia se mide desde la llegada prevista, así que
+    # incluye el tiempo que la petición espera a que el loop la atienda
+    loop = asyncio.get_running_loop()
+    first = loop.time()
+    latencies = []
+    for index in range(requests):
+        intended = first + index * ARRIVAL_INTERVAL
+        await asyncio.sleep(max(0.0, intended - loop.time()))
+        await asgi_request(app, "POST", "/events/process", small_body)
+        latencies.append((loop.time() - intended) * 1e9)
+
+    stop.set()
+    await asyncio.gather(*senders)
+    return latencies
+
+
+async def _run_async(quick: bool) -> List[BenchmarkResult]:
+    app = load_app()
+    quiet_logging()
+
+    requests = 100 if quick else 500
+    small_body = json.dumps(generate_payload(STANDARD_WORKLOADS["small"])).encode()
+    large_body = json.dumps(generate_payload(STANDARD_WORKLOADS["large"])).encode()
+    params = {"background_large": BACKGROUND_LARGE, "large_bytes": len(large_body)}
+    configured = getattr(app.state, "lanes", None)
+
+    modes = {
+        "inline": None,
+        "lanes": configured or PriorityLanes(Lane("small", 4, 256), Lane("large", 1, 32)),
+    }
+    results = []
+    try:
+        for mode, lanes in modes.items():
+            app.state.lanes = lanes
+            latencies = await _small_latencies(app, small_body, large_body, requests)
+            results.append(BenchmarkResult(f"lanes.small_latency_under_load[{mode}]", latencies,
+                                           {**params, "mode": mode}))
+    finally:
+        app.state.lanes = configured
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de carriles.
+
+    Args:
+        quick: Si es True hace menos peticiones
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    return asyncio.run(_run_async(quick))
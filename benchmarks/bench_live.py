@@ -0,0 +1,134 @@
+"""
+Benchmarks de las suscripciones en vivo (/events/subscribe)
+===========================================================
+
+Abre miles de conexiones WebSocket inactivas contra la aplicación ASGI real (toda la
+pila de middlewares y el endpoint, sin servidor ni sockets) y mide:
+
+- Memoria por suscriptor inactivo, con tracemalloc: la tarea del endpoint, su tarea de
+  envío, la LiveSubscription y lo que reservan FastAPI y Starlette por conexión. No
+  incluye los buffers del servidor (uvicorn y la biblioteca de WebSocket), que se suman
+  en producción. Va en los parámetros de los resultados (bytes_per_idle_subscriber).
+- Reparto de un cambio: desde que refresh() detecta un nuevo ganador hasta que todas las
+  conexiones han enviado el mensaje, por suscriptor.
+"""
+
+import asyncio
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.live import LatestEventHub
+from app.models import Event
+from app.storage import EventStore
+
+from .bench_http import load_app, quiet_logging
+from .harness import BenchmarkResult
+
+
+class _Connection:
+    """Extremo cliente de una conexión: se conecta, queda inactivo y cuenta los mensajes."""
+
+    def __init__(self, app):
+        self.app = app
+        self.received = 0
+        self.accepted = False
+        self._closed = asyncio.get_running_loop().create_future()
+        self._connected = False
+
+    async def receive(self):
+        if not self._connected:
+            self._connected = True
+            return {"type": "websocket.connect"}
+        await self._closed
+        return {"type": "websocket.disconnect", "code": 1000}
+
+    async def send(self, message):
+        if message["type"] == "websocket.accept":
+            self.accepted = True
+        elif message["type"] == "websocket.send":
+            self.received += 1
+
+    def close(self):
+        if not self._closed.done():
+            self._closed.set_result(None)
+
+    def run(self):
+        scope = {"type": "websocket", "path": "/events/subscribe", "raw_path": b"/events/subscribe",
+                 "query_string": b"", "root_path": "", "headers": [(b"host", b"localhost:8000")],
+                 "scheme": "ws", "client": ("127.0.0.1", 50000), "server": ("127.0.0.1", 8000),
+                 "subprotocols": [], "app": self.app}
+        return self.app(scope, self.receive, self.send)
+
+
+async def _wait_for(condition, timeout: float = 60.0) -> None:
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("Las conexiones no respondieron a tiempo")
+        await asyncio.sleep(0.001)
+
+
+async def _run_async(quick: bool) -> List[BenchmarkResult]:
+    app = load_app()
+    quiet_logging()
+    subscribers = 2_000 if quick else 10_000
+    rounds = 3 if quick else 10
+
+    directory = tempfile.mkdtemp(prefix="bench_live_")
+    store = EventStore.open(directory, fsync=False)
+    hub = LatestEventHub(store, refresh_interval=3600, max_subscribers=subscribers)
+    await hub.start()
+    app.state.event_store, app.state.live_hub = store, hub
+    connections, tasks = [], []
+    try:
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        for _ in range(subscribers):
+            connection = _Connection(app)
+            connections.append(connection)
+            tasks.append(asyncio.create_task(connection.run()))
+        await _wait_for(lambda: all(connection.received for connection in connections))
+        per_subscriber = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+        tracemalloc.stop()
+
+        samples = []
+        base = int(time.time()) + 3600
+        for round_index in range(rounds):
+            await store.append([Event(event_id=f"winner_{round_index}", timestamp=base + round_index, data="x")])
+            expected = round_index + 2
+            started = time.perf_counter_ns()
+            await hub.refresh()
+            await _wait_for(lambda: all(connection.received >= expected for connection in connections))
+            samples.append((time.perf_counter_ns() - started) / subscribers)
+    finally:
+        for connection in connections:
+            connection.close()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        hub.stop()
+        app.state.event_store = app.state.live_hub = None
+        store.close()
+        shutil.rmtree(directory, ignore_errors=True)
+
+    params = {"subscribers": subscribers, "bytes_per_idle_subscriber": round(per_subscriber)}
+    return [BenchmarkResult("live.fanout_per_subscriber", samples, params)]
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de las suscripciones en vivo.
+
+    Args:
+        quick: Si es True usa 2000 suscriptores en lugar de 10000 y menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    return asyncio.run(_run_async(quick))
@@ -0,0 +1,143 @@
+"""
+Benchmarks de las particiones del almacén por espacio de nombres
+================================================================
+
+Mide, con el almacén WAL y fsync real:
+
+- Ingesta concurrente: WRITERS hilos guardan sin pausa lotes de 10 eventos repartidos
+  entre 1, 2, 4 u 8 particiones (cada una con su lock, su hilo de commit y su fsync).
+  Los resultados son latencias por lote; los eventos por segundo van en los
+  parámetros, junto con los núcleos de la máquina: con un solo núcleo la ingesta está
+  limitada por CPU y el GIL, y repartirla en particiones no la acelera.
+- Aislamiento: un inquilino guarda lotes de 1000 eventos sin pausa mientras otro
+  guarda eventos sueltos. Se mide la latencia de los eventos sueltos cuando los dos
+  comparten partición (el lote pequeño espera al group commit y a la indexación del
+  grande) y cuando cada uno tiene la suya.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.models import Event
+from app.storage import EventStore, PartitionedStore
+
+from .harness import BenchmarkResult
+
+WRITERS = 16
+BATCH = 10
+LARGE_BATCH = 1000
+BASE_TIMESTAMP = 2_000_000_000
+
+
+def _open(directory: str) -> EventStore:
+    return EventStore.open(directory, fsync=True, snapshot_bytes=0)
+
+
+def _batch(prefix: str, count: int) -> List[Event]:
+    return [Event.model_construct(event_id=f"{prefix}_{i}", timestamp=BASE_TIMESTAMP + i % 86400, data="payload")
+            for i in range(count)]
+
+
+def _stores(registry: PartitionedStore, namespaces: List[str]) -> List[EventStore]:
+    """Abre las particiones; sus concesiones duran hasta registry.close()."""
+    async def acquire_all():
+        return [await registry.acquire(namespace) for namespace in namespaces]
+
+    return [partition.store for partition in asyncio.run(acquire_all())]
+
+
+def _run_threads(targets, stop: threading.Event, duration: float) -> None:
+    threads = [threading.Thread(target=target) for target in targets]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+
+def _ingest(root: Path, partitions: int, duration: float) -> BenchmarkResult:
+    registry = PartitionedStore(str(root), _open, idle_seconds=0)
+    stores = _stores(registry, [f"tenant{i}" for i in range(partitions)])
+    latencies: List[List[int]] = [[] for _ in range(WRITERS)]
+    stop = threading.Event()
+
+    def writer(number: int):
+        store, samples, sequence = stores[number % partitions], latencies[number], 0
+        while not stop.is_set():
+            batch = _batch(f"w{number}_{sequence}", BATCH)
+            started = time.perf_counter_ns()
+            store.submit(batch).result()
+            samples.append(time.perf_counter_ns() - started)
+            sequence += 1
+
+    _run_threads([lambda number=number: writer(number) for number in range(WRITERS)], stop, duration)
+    registry.close()
+
+    samples = [latency for writer_samples in latencies for latency in writer_samples]
+    params = {"partitions": partitions, "writers": WRITERS, "batch": BATCH, "cpus": os.cpu_count(),
+              "events_per_s": round(len(samples) * BATCH / duration)}
+    return BenchmarkResult(f"partitions.ingest[{partitions}]", samples, params)
+
+
+def _isolation(root: Path, shared: bool, duration: float) -> BenchmarkResult:
+    registry = PartitionedStore(str(root), _open, idle_seconds=0)
+    if shared:
+        large = small = _stores(registry, ["large"])[0]
+    else:
+        large, small = _stores(registry, ["large", "small"])
+    samples: List[int] = []
+    large_batches = [0]
+    stop = threading.Event()
+
+    def large_tenant():
+        while not stop.is_set():
+            large.submit(_batch(f"large{large_batches[0]}", LARGE_BATCH)).result()
+            large_batches[0] += 1
+
+    def small_tenant():
+        sequence = 0
+        while not stop.is_set():
+            started = time.perf_counter_ns()
+            small.submit(_batch(f"small{sequence}", 1)).result()
+            samples.append(time.perf_counter_ns() - started)
+            sequence += 1
+            time.sleep(0.001)
+
+    _run_threads([large_tenant, small_tenant], stop, duration)
+    registry.close()
+
+    name = "shared" if shared else "separate"
+    params = {"large_batch": LARGE_BATCH, "cpus": os.cpu_count(),
+              "large_events_per_s": round(large_batches[0] * LARGE_BATCH / duration)}
+    return BenchmarkResult(f"partitions.small_write_beside_large_ingest[{name}]", samples, params)
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de las particiones.
+
+    Args:
+        quick: Si es True usa ejecuciones de 1 segundo en lugar de 3
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    duration = 1.0 if quick else 3.0
+    root = Path(tempfile.mkdtemp(prefix="bench_partitions_"))
+    try:
+        results = [_ingest(root / f"ingest{count}", count, duration) for count in (1, 2, 4, 8)]
+        results += [_isolation(root / f"isolation_{shared}", shared, duration) for shared in (True, False)]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
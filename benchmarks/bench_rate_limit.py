@@ -0,0 +1,94 @@
+"""
+Benchmarks del limitador de tasa
+================================
+
+Mide el coste del limitador por petición con distinto número de clientes distintos
+(el tamaño de la tabla de buckets) y la sobrecarga del middleware frente a una
+aplicación ASGI vacía.
+"""
+
+import asyncio
+import itertools
+import json
+import sys
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.rate_limit import RateLimitMiddleware, ShardedRateLimiter
+
+from .harness import BenchmarkResult, measure, measure_async
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+CLIENT_COUNTS = (1, 10_000, 50_000)
+
+
+async def _empty_app(scope, receive, send):
+    await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b""})
+
+
+async def _noop_send(message):
+    pass
+
+
+def _asgi_call(app, body: bytes, clients):
+    """Crea una función que envía una petición ASGI de un cliente distinto cada vez."""
+    message = {"type": "http.request", "body": body, "more_body": False}
+
+    async def receive():
+        return message
+
+    def call():
+        scope = {"type": "http", "method": "POST", "path": "/events/process",
+                 "headers": [], "client": (next(clients), 50000)}
+        return app(scope, receive, _noop_send)
+
+    return call
+
+
+async def _middleware_cases(rounds: int) -> List[BenchmarkResult]:
+    results = []
+    for workload in ("small", "large"):
+        body = json.dumps(generate_payload(STANDARD_WORKLOADS[workload])).encode()
+        clients = itertools.cycle([f"10.0.{i // 256}.{i % 256}" for i in range(10_000)])
+        limiter = ShardedRateLimiter(rate=1e9, burst=1e9)
+        middleware = RateLimitMiddleware(_empty_app, small=limiter, large=limiter)
+        params = {"workload": workload, "body_bytes": len(body)}
+
+        results.append(await measure_async(f"rate_limit.asgi_baseline[{workload}]",
+                                           _asgi_call(_empty_app, body, clients),
+                                           rounds=rounds, number=200, params=params))
+        results.append(await measure_async(f"rate_limit.asgi_middleware[{workload}]",
+                                           _asgi_call(middleware, body, clients),
+                                           rounds=rounds, number=200, params=params))
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks del limitador de tasa.
+
+    Args:
+        quick: Si es True usa menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    rounds = 5 if quick else 20
+    results = []
+
+    for clients in CLIENT_COUNTS:
+        limiter = ShardedRateLimiter(rate=1e9, burst=1e9)
+        keys = itertools.cycle([f"ip:10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(clients)])
+        for _ in range(clients):
+            limiter.acquire(next(keys))  # Tabla ya poblada
+        results.append(measure(f"rate_limit.acquire[{clients}_clients]",
+                               lambda: limiter.acquire(next(keys)),
+                               rounds=rounds, params={"clients": clients, "buckets": len(limiter)}))
+
+    results.extend(asyncio.run(_middleware_cases(rounds)))
+    return results
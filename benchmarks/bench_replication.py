@@ -0,0 +1,119 @@
+"""
+Benchmarks de la replicación líder/seguidor
+===========================================
+
+Mide el rendimiento de lectura de GET /events/latest al añadir seguidores. Cada nodo es
+un servidor uvicorn de un worker en su propio proceso: un líder con el almacén WAL y
+0, 1, 2 o 3 seguidores. Mientras READERS clientes concurrentes reparten las lecturas
+entre todos los nodos (en lazo cerrado, desde este proceso), un escritor guarda en el
+líder WRITE_RATE lotes de 10 eventos por segundo, que los seguidores replican.
+
+Los resultados son latencias por lectura; las lecturas por segundo, los núcleos de la
+máquina y el mayor retraso observado en los seguidores van en los parámetros. El
+generador de carga comparte la máquina con los nodos: con menos núcleos que procesos,
+añadir seguidores reparte la misma CPU en lugar de sumar capacidad.
+"""
+
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from typing import List
+
+import httpx
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from .harness import BenchmarkResult
+from .loadgen import LocalServer, find_free_port
+
+READERS = 32
+WRITE_RATE = 20  # Lotes por segundo en el líder
+BATCH = 10
+NODE_ENV = {"LOG_FILE": "", "WARMUP_MODE": "off", "RESULT_CACHE_SLOTS": "0", "EVENT_STORE_FSYNC": "false"}
+
+
+async def _load(nodes: List[str], leader: str, duration: float):
+    samples: List[int] = []
+    lags: List[float] = []
+    stop = time.monotonic() + duration
+
+    async def reader(client: httpx.AsyncClient, base_url: str):
+        while time.monotonic() < stop:
+            started = time.perf_counter_ns()
+            response = await client.get(f"{base_url}/events/latest")
+            samples.append(time.perf_counter_ns() - started)
+            response.raise_for_status()
+
+    async def writer(client: httpx.AsyncClient):
+        sequence, base = 0, int(time.time()) + 3600
+        while time.monotonic() < stop:
+            batch = [{"event_id": f"w{sequence}_{i}", "timestamp": base + sequence, "data": "payload"}
+                     for i in range(BATCH)]
+            (await client.post(f"{leader}/events/store", json={"events": batch})).raise_for_status()
+            sequence += 1
+            await asyncio.sleep(1 / WRITE_RATE)
+
+    async def lag_monitor(client: httpx.AsyncClient):
+        while time.monotonic() < stop:
+            for base_url in nodes:
+                status = (await client.get(f"{base_url}/health/replication")).json()
+                if status["role"] == "follower" and status["lag_seconds"] is not None:
+                    lags.append(status["lag_seconds"])
+            await asyncio.sleep(0.2)
+
+    limits = httpx.Limits(max_connections=READERS + 4)
+    async with httpx.AsyncClient(limits=limits, timeout=10) as client:
+        await asyncio.gather(*(reader(client, nodes[i % len(nodes)]) for i in range(READERS)),
+                             writer(client), lag_monitor(client))
+    return samples, max(lags, default=0.0)
+
+
+def _wait_replicated(nodes: List[str], timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    for base_url in nodes:
+        while httpx.get(f"{base_url}/health/replication").json().get("lag_seconds", 0) != 0:
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{base_url} no llegó a estar al día")
+            time.sleep(0.05)
+
+
+def _run_nodes(root: Path, followers: int, duration: float) -> BenchmarkResult:
+    replication = f"127.0.0.1:{find_free_port(9500)}"
+    leader_env = {**NODE_ENV, "EVENT_STORE_DIR": str(root), "REPLICATION_LISTEN": replication}
+    with ExitStack() as stack:
+        leader = stack.enter_context(LocalServer(env=leader_env))
+        nodes = [leader.base_url]
+        for _ in range(followers):
+            follower = stack.enter_context(LocalServer(env={**NODE_ENV, "REPLICATION_LEADER": replication}))
+            nodes.append(follower.base_url)
+        _wait_replicated(nodes)
+        samples, max_lag = asyncio.run(_load(nodes, leader.base_url, duration))
+
+    params = {"followers": followers, "readers": READERS, "write_batches_per_s": WRITE_RATE,
+              "cpus": os.cpu_count(), "reads_per_s": round(len(samples) / duration),
+              "max_lag_s": round(max_lag, 3)}
+    return BenchmarkResult(f"replication.read_latest[{followers}_followers]", samples, params)
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de la replicación.
+
+    Args:
+        quick: Si es True usa ejecuciones de 2 segundos en lugar de 5
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    duration = 2.0 if quick else 5.0
+    root = Path(tempfile.mkdtemp(prefix="bench_replication_"))
+    try:
+        return [_run_nodes(root / f"leader{count}", count, duration) for count in (0, 1, 2, 3)]
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
@@ -0,0 +1,83 @@
+"""
+Benchmarks de la serialización de respuestas
+============================================
+
+Mide lo que ahorra devolver el evento ganador ya serializado (event_response) frente
+a devolver el modelo con response_model=Optional[Event], que FastAPI vuelve a validar y
+serializa con jsonable_encoder + json.dumps, y el 204 compartido frente a construir una
+Response nueva en cada petición.
+
+Las rutas se montan en una aplicación FastAPI mínima, sin middlewares, para que la
+diferencia no quede oculta por el resto de la pila.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Response
+
+from app.models import Event
+from app.routes import NO_CONTENT, event_response
+from app.warmup import asgi_request
+
+from .harness import BenchmarkResult, measure_async
+
+
+def _bench_app(event: Event) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/model", response_model=Optional[Event])
+    async def model():
+        return event
+
+    @app.post("/raw", response_model=Optional[Event])
+    async def raw():
+        return event_response(event)
+
+    @app.post("/no_content_new", response_model=Optional[Event])
+    async def no_content_new():
+        return Response(status_code=204)
+
+    @app.post("/no_content_shared", response_model=Optional[Event])
+    async def no_content_shared():
+        return NO_CONTENT
+
+    return app
+
+
+async def _run_async(quick: bool) -> List[BenchmarkResult]:
+    rounds = 5 if quick else 20
+    number = 200 if quick else 1000
+    event = Event(event_id="evt_bench", timestamp=int(time.time()) + 3600, data="x" * 64)
+    app = _bench_app(event)
+
+    cases = {
+        "winner[response_model]": "/model",
+        "winner[raw]": "/raw",
+        "no_content[new]": "/no_content_new",
+        "no_content[shared]": "/no_content_shared",
+    }
+    results = []
+    for case, path in cases.items():
+        results.append(await measure_async(f"responses.{case}", lambda: asgi_request(app, "POST", path),
+                                           rounds=rounds, number=number, params={"path": path}))
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de serialización de respuestas.
+
+    Args:
+        quick: Si es True usa menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    return asyncio.run(_run_async(quick))
@@ -0,0 +1,81 @@
+"""
+Benchmarks de la caché de resultados compartida
+===============================================
+
+Mide, para payloads de 5, 100 y 1000 eventos:
+
+- uncached: process_payload, lo que hace /events/process sin caché (validar el JSON,
+  las reglas de negocio y elegir el ganador).
+- hit: lo que hace con la caché cuando el cuerpo ya está en ella (hash del cuerpo,
+  lectura de la ranura con el seqlock y filtro de eventos futuros).
+- miss: lo que hace cuando no está (hash, búsqueda, validación y escritura de la ranura).
+
+El segmento se crea con un nombre único y se borra al terminar.
+"""
+
+import json
+import os
+import sys
+from itertools import count
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.result_cache import ResultCache
+from app.routes import payload_candidate, process_payload
+from app.services import EventProcessorService
+
+from .harness import BenchmarkResult, measure
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+WORKLOADS = ("small", "medium", "large")
+SLOTS = 16384
+SLOT_BYTES = 512
+
+
+def _hit(cache: ResultCache, body: bytes):
+    candidate = cache.get(cache.key(body))
+    return EventProcessorService.filter_future_events([candidate])
+
+
+def _miss(cache: ResultCache, body: bytes):
+    key = cache.key(body)
+    if cache.get(key) is None:
+        cache.put(key, payload_candidate(body))
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de la caché de resultados.
+
+    Args:
+        quick: Si es True usa menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    rounds = 5 if quick else 20
+    cache = ResultCache.open(f"bench-result-cache-{os.getpid()}", SLOTS, SLOT_BYTES)
+    results = []
+    try:
+        for workload in WORKLOADS:
+            spec = STANDARD_WORKLOADS[workload]
+            body = json.dumps(generate_payload(spec)).encode()
+            params = {**spec.to_dict(), "body_bytes": len(body)}
+            cache.put(cache.key(body), payload_candidate(body))
+
+            results.append(measure(f"result_cache.uncached[{workload}]", lambda: process_payload(body),
+                                   rounds=rounds, params=params))
+            results.append(measure(f"result_cache.hit[{workload}]", lambda: _hit(cache, body),
+                                   rounds=rounds, params=params))
+            # Variantes del mismo payload con otra clave (cambia el primer event_id): cada
+            # llamada usa una nueva, así que todas fallan
+            variants = (body.replace(b'"event_id": "', f'"event_id": "v{i}_'.encode(), 1) for i in count())
+            results.append(measure(f"result_cache.miss[{workload}]", lambda: _miss(cache, next(variants)),
+                                   rounds=rounds, params=params))
+    finally:
+        cache.unlink()
+        cache.close()
+    return results
@@ -0,0 +1,66 @@
+"""
+Benchmarks de la capa de servicios
+==================================
+
+Mide los modelos Pydantic y las funciones de EventProcessorService sin pasar por HTTP.
+"""
+
+import sys
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.models import Event, EventsRequest
+from app.services import EventProcessorService
+
+from .harness import BenchmarkResult, measure
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+QUICK_WORKLOADS = ("small", "medium", "large")
+
+
+def _validate_rules(events: List[Event]) -> None:
+    """Ejecuta las reglas de negocio ignorando los errores esperados (duplicados)."""
+    try:
+        EventProcessorService.validate_events_business_rules(events)
+    except ValueError:
+        pass
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de servicios para cada carga estándar.
+
+    Args:
+        quick: Si es True usa menos cargas y menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    rounds = 5 if quick else 20
+    names = QUICK_WORKLOADS if quick else tuple(STANDARD_WORKLOADS)
+    now = EventProcessorService.get_current_timestamp()
+    results = []
+
+    for workload in names:
+        spec = STANDARD_WORKLOADS[workload]
+        params = {"workload": workload, **spec.to_dict()}
+        payload = generate_payload(spec, now)
+        request = EventsRequest(**payload)
+        events = request.events
+        future_events = EventProcessorService.filter_future_events(events, now)
+
+        cases = {
+            "validate_request": lambda: EventsRequest(**payload),
+            "filter_future_events": lambda: EventProcessorService.filter_future_events(events, now),
+            "find_latest_event": lambda: EventProcessorService.find_latest_event(future_events),
+            "process_events": lambda: EventProcessorService.process_events(request),
+            "validate_business_rules": lambda: _validate_rules(events),
+        }
+
+        for case, func in cases.items():
+            results.append(measure(f"services.{case}[{workload}]", func, rounds=rounds, params=params))
+
+    return results
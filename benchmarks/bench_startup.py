@@ -0,0 +1,79 @@
+"""
+Benchmarks de arranque
+======================
+
+Mide, en procesos nuevos, la latencia de la primera petición a /events/process
+con y sin calentamiento, la latencia de una petición ya en régimen y la duración
+del propio calentamiento.
+"""
+
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+from typing import List
+
+from .harness import BenchmarkResult
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+PROBE = """
+import asyncio, json, time
+from app.main import app
+from app.warmup import asgi_request, run_warmup
+from benchmarks.workloads import STANDARD_WORKLOADS, generate_payload
+
+body = json.dumps(generate_payload(STANDARD_WORKLOADS["small"])).encode()
+
+async def measure():
+    start = time.perf_counter_ns()
+    status, _ = await asgi_request(app, "POST", "/events/process", body)
+    assert status == 200, status
+    return time.perf_counter_ns() - start
+
+async def main():
+    warmup_ns = 0
+    if {warm}:
+        start = time.perf_counter_ns()
+        await run_warmup(app, {rounds})
+        warmup_ns = time.perf_counter_ns() - start
+    first = await measure()
+    steady = min([await measure() for _ in range(20)])
+    print(json.dumps({{"first_ns": first, "steady_ns": steady, "warmup_ns": warmup_ns}}))
+
+asyncio.run(main())
+"""
+
+
+def _probe(warm: bool, rounds: int) -> dict:
+    env = {**os.environ, "ENVIRONMENT": "production", "LOG_FILE": "", "OPENAPI_CACHE_FILE": ""}
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE.format(warm=warm, rounds=rounds)],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks de arranque. Cada muestra es un proceso nuevo.
+
+    Args:
+        quick: Si es True usa menos procesos
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    processes = 3 if quick else 10
+    rounds = 20
+    cold = [_probe(False, rounds) for _ in range(processes)]
+    warm = [_probe(True, rounds) for _ in range(processes)]
+    params = {"warmup_rounds": rounds}
+
+    return [
+        BenchmarkResult("startup.first_request[cold]", [probe["first_ns"] for probe in cold]),
+        BenchmarkResult("startup.first_request[warm]", [probe["first_ns"] for probe in warm], params),
+        BenchmarkResult("startup.steady_request", [probe["steady_ns"] for probe in cold]),
+        BenchmarkResult("startup.warmup_duration", [probe["warmup_ns"] for probe in warm], params),
+    ]
@@ -0,0 +1,216 @@
+"""
+Benchmarks del almacén durable de eventos
+=========================================
+
+Mide:
+
+- Recuperación: cuánto tarda EventStore.open en reconstruir el estado con varios
+  millones de eventos cuando todo está en un snapshot, cuando todo está en el WAL y
+  en el caso habitual (snapshot + la cola del WAL escrita después).
+- Escritura: el tiempo por lote con fsync real cuando hay un solo escritor y cuando
+  hay muchos concurrentes, que es donde el group commit reparte cada fsync entre
+  varios lotes. Se mide igual con el backend SQLite (una transacción por lote).
+- Lectura: la consulta del evento futuro más próximo en SQLite y una página de la
+  consulta por rango al principio y al final del rango. Gracias a los índices ninguna
+  depende del número de eventos ni de la profundidad de la página.
+- Expiración: el coste por evento borrado de evict_expired en lotes de 1000, con la
+  mitad de los eventos expirados.
+
+Los datos se generan directamente con write_snapshot y el WAL, sin pasar por
+submit, para que preparar millones de eventos no domine la duración de la suite.
+"""
+
+import logging
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.models import Event
+from app.storage import EventStore, SQLiteEventStore, WriteAheadLog, encode_events, write_snapshot
+
+from .harness import BenchmarkResult, measure
+
+WAL_BATCH = 1000  # Eventos por registro del WAL al preparar los datos
+BASE_TIMESTAMP = int(time.time())  # Fijo para que todas las llamadas a _columns coincidan
+
+
+def _columns(start: int, count: int):
+    base = BASE_TIMESTAMP
+    ids = [f"evt_{i:09d}" for i in range(start, start + count)]
+    timestamps = [base + (i * 7919) % 86400 - 43200 for i in range(start, start + count)]
+    datas = [f"payload-{i % 1000}" for i in range(start, start + count)]
+    return ids, timestamps, datas
+
+
+def _prepare(directory: Path, snapshot_events: int, wal_events: int) -> None:
+    directory.mkdir(parents=True)
+    if snapshot_events:
+        write_snapshot(directory / "snapshot-00000000.bin", *_columns(0, snapshot_events), fsync=False)
+    wal = WriteAheadLog(directory, fsync=False)
+    wal.open(0)
+    for start in range(snapshot_events, snapshot_events + wal_events, WAL_BATCH):
+        count = min(WAL_BATCH, snapshot_events + wal_events - start)
+        wal.append([encode_events(*_columns(start, count))])
+    wal.close()
+
+
+def _recovery(root: Path, total: int, rounds: int) -> List[BenchmarkResult]:
+    cases = {
+        "snapshot": (total, 0),
+        "wal": (0, total),
+        "snapshot+wal": (total - total // 10, total // 10),
+    }
+    results = []
+    for case, (snapshot_events, wal_events) in cases.items():
+        directory = root / case.replace("+", "_")
+        _prepare(directory, snapshot_events, wal_events)
+        samples = []
+        for _ in range(rounds):
+            store = EventStore.open(str(directory), fsync=False, snapshot_bytes=0)
+            assert len(store) == total
+            samples.append(store.recovery.seconds * 1e9)
+            store.close(snapshot=False)
+            del store
+        shutil.rmtree(directory)
+        results.append(BenchmarkResult(f"storage.recovery[{case}]", samples,
+                                       {"events": total, "snapshot_events": snapshot_events,
+                                        "wal_events": wal_events}))
+    return results
+
+
+def _open(backend: str, directory: Path, fsync: bool):
+    if backend == "sqlite":
+        return SQLiteEventStore.open(str(directory), fsync=fsync)
+    return EventStore.open(str(directory), fsync=fsync, snapshot_bytes=0)
+
+
+def _write(store, events) -> None:
+    if isinstance(store, SQLiteEventStore):
+        store.insert(events)
+    else:
+        store.submit(events).result()
+
+
+def _append(root: Path, backend: str, writers: int, batches: int, rounds: int) -> BenchmarkResult:
+    """Tiempo medio por lote con `writers` hilos escribiendo lotes de 10 eventos con fsync."""
+    samples = []
+    for round_index in range(rounds):
+        directory = root / f"append_{backend}_{writers}_{round_index}"
+        store = _open(backend, directory, fsync=True)
+        per_writer = batches // writers
+        base = int(time.time()) + 3600
+
+        def writer(index: int) -> None:
+            for batch in range(per_writer):
+                prefix = f"w{index}_{batch}_"
+                events = [Event.model_construct(event_id=f"{prefix}{i}", timestamp=base + i, data="x" * 32)
+                          for i in range(10)]
+                _write(store, events)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(writers)]
+        start = time.perf_counter_ns()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        samples.append((time.perf_counter_ns() - start) / (per_writer * writers))
+        store.close()
+        shutil.rmtree(directory)
+    prefix = "storage.append" if backend == "wal" else "storage.sqlite.append"
+    return BenchmarkResult(f"{prefix}[writers={writers}]", samples,
+                           {"backend": backend, "writers": writers, "batches": batches,
+                            "events_per_batch": 10, "fsync": True})
+
+
+def _reads(root: Path, total: int, rounds: int) -> List[BenchmarkResult]:
+    """
+    Lecturas con `total` eventos guardados: el evento futuro más próximo en SQLite y una
+    página de 100 eventos de /events/range al principio y al final del rango, en los dos
+    backends (con paginación por clave las dos deberían costar lo mismo).
+    """
+    wal_dir = root / "reads_wal"
+    _prepare(wal_dir, total, 0)
+    stores = {"wal": EventStore.open(str(wal_dir), fsync=False, snapshot_bytes=0),
+              "sqlite": SQLiteEventStore.open(str(root / "reads_sqlite"), fsync=False)}
+    for start in range(0, total, WAL_BATCH * 10):
+        ids, timestamps, datas = _columns(start, min(WAL_BATCH * 10, total - start))
+        stores["sqlite"].insert([Event.model_construct(event_id=event_id, timestamp=timestamp, data=data)
+                                 for event_id, timestamp, data in zip(ids, timestamps, datas)])
+
+    now = int(time.time())
+    results = [measure("storage.sqlite.latest_future", lambda: stores["sqlite"].latest_future(now),
+                       rounds=rounds * 4, params={"events": total})]
+    ids, timestamps, _ = _columns(0, total)
+    keys = sorted(zip(timestamps, ids))
+    start, end = keys[0][0], keys[-1][0] + 1
+    # Página más profunda posible: los 100 últimos eventos del rango
+    pages = {"first": None, "deep": keys[-101]}
+    for backend, store in stores.items():
+        assert store.scan(start, end, pages["deep"], 100)[-1].event_id == keys[-1][1]
+        for page, after in pages.items():
+            results.append(measure(f"storage.{backend}.scan[{page}_page]",
+                                   lambda: store.scan(start, end, after, 100),
+                                   rounds=rounds * 4, params={"events": total, "limit": 100}))
+    for store in stores.values():
+        store.close()
+    return results
+
+
+def _eviction(root: Path, total: int, rounds: int) -> List[BenchmarkResult]:
+    """Tiempo por evento borrado al expirar la mitad (timestamp < BASE_TIMESTAMP) de `total` eventos."""
+    results = []
+    for backend in ("wal", "sqlite"):
+        samples = []
+        for round_index in range(rounds):
+            directory = root / f"evict_{backend}_{round_index}"
+            if backend == "wal":
+                _prepare(directory, total, 0)
+            store = _open(backend, directory, fsync=False)
+            if backend == "sqlite":
+                ids, timestamps, datas = _columns(0, total)
+                for start in range(0, total, WAL_BATCH * 10):
+                    store.insert([Event.model_construct(event_id=ids[i], timestamp=timestamps[i], data=datas[i])
+                                  for i in range(start, min(start + WAL_BATCH * 10, total))])
+            started = time.perf_counter_ns()
+            evicted = store.evict_expired(BASE_TIMESTAMP, batch=1000, max_pass=float("inf"))
+            samples.append((time.perf_counter_ns() - started) / evicted)
+            store.close()
+            shutil.rmtree(directory)
+        results.append(BenchmarkResult(f"storage.{backend}.evict_per_event", samples,
+                                       {"events": total, "evicted": evicted, "batch": 1000}))
+    return results
+
+
+def run(quick: bool = False) -> List[BenchmarkResult]:
+    """
+    Ejecuta los benchmarks del almacén.
+
+    Args:
+        quick: Si es True usa 200k eventos en lugar de 2M y menos muestras
+
+    Returns:
+        List[BenchmarkResult]: Resultados de la suite
+    """
+    total = 200_000 if quick else 2_000_000
+    rounds = 3 if quick else 5
+    batches = 200 if quick else 1000
+    logging.getLogger("app.storage").setLevel(logging.WARNING)
+
+    root = Path(tempfile.mkdtemp(prefix="bench_storage_"))
+    try:
+        results = _recovery(root, total, rounds)
+        for backend in ("wal", "sqlite"):
+            for writers in (1, 16):
+                results.append(_append(root, backend, writers, batches, rounds))
+        results.extend(_reads(root, total // 2, rounds))
+        results.extend(_eviction(root, total // 4, rounds))
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return results
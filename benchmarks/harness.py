@@ -0,0 +1,222 @@
+"""
+Utilidades de medición de los benchmarks
+========================================
+
+Este archivo contiene la medición de tiempos, el formato de resultados en JSON
+y la comparación contra una línea base para detectar regresiones.
+"""
+
+import json
+import platform
+import statistics
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+# Umbral por defecto: un benchmark es regresión si su mediana empeora más de un 10%
+DEFAULT_REGRESSION_THRESHOLD = 0.10
+
+# Variables de entorno que desactivan el límite de tasa por cliente de la aplicación:
+# toda la carga de los benchmarks llega desde un mismo cliente
+UNLIMITED_ENV = {"RATE_LIMIT_SMALL_RATE": "0", "RATE_LIMIT_LARGE_RATE": "0"}
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    Resultado de un benchmark.
+
+    Attributes:
+        name: Nombre único del benchmark (suite.caso)
+        samples_ns: Tiempo por operación de cada muestra, en nanosegundos
+        params: Parámetros de la carga usada
+    """
+    name: str
+    samples_ns: List[float]
+    params: dict = field(default_factory=dict)
+
+    @property
+    def median_ns(self) -> float:
+        return statistics.median(self.samples_ns)
+
+    def summary(self) -> dict:
+        """
+        Resume las muestras en estadísticas agregadas.
+
+        Returns:
+            dict: Estadísticas del benchmark
+        """
+        samples = sorted(self.samples_ns)
+        p95_index = min(len(samples) - 1, int(len(samples) * 0.95))
+        p99_index = min(len(samples) - 1, int(len(samples) * 0.99))
+        median = self.median_ns
+
+        return {
+            "name": self.name,
+            "params": self.params,
+            "rounds": len(samples),
+            "min_ns": samples[0],
+            "median_ns": median,
+            "mean_ns": statistics.fmean(samples),
+            "p95_ns": samples[p95_index],
+            "p99_ns": samples[p99_index],
+            "stdev_ns": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+            "ops_per_sec": 1e9 / median if median else 0.0,
+        }
+
+
+def _calibrate(func: Callable[[], object], min_time_s: float) -> int:
+    """Calcula cuántas llamadas por muestra hacen falta para superar min_time_s."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time_s or number >= 1_000_000:
+            return number
+        number *= 10 if elapsed < min_time_s / 10 else 2
+
+
+def measure(name: str, func: Callable[[], object], rounds: int = 20,
+            min_time_s: float = 0.005, params: Optional[dict] = None) -> BenchmarkResult:
+    """
+    Mide una función síncrona.
+
+    Args:
+        name: Nombre del benchmark
+        func: Función sin argumentos a medir
+        rounds: Número de muestras
+        min_time_s: Duración mínima de cada muestra
+        params: Parámetros de la carga (se guardan con el resultado)
+
+    Returns:
+        BenchmarkResult: Muestras de tiempo por operación
+    """
+    func()  # Calentamiento
+    number = _calibrate(func, min_time_s)
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        samples.append((time.perf_counter_ns() - start) / number)
+    return BenchmarkResult(name=name, samples_ns=samples, params=params or {})
+
+
+async def measure_async(name: str, func: Callable[[], Awaitable[object]], rounds: int = 20,
+                        number: int = 20, params: Optional[dict] = None) -> BenchmarkResult:
+    """
+    Mide una corrutina. Cada muestra ejecuta `number` llamadas secuenciales.
+
+    Args:
+        name: Nombre del benchmark
+        func: Función sin argumentos que devuelve un awaitable
+        rounds: Número de muestras
+        number: Llamadas por muestra
+        params: Parámetros de la carga
+
+    Returns:
+        BenchmarkResult: Muestras de tiempo por operación
+    """
+    await func()  # Calentamiento
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            await func()
+        samples.append((time.perf_counter_ns() - start) / number)
+    return BenchmarkResult(name=name, samples_ns=samples, params=params or {})
+
+
+def environment_info() -> dict:
+    """
+    Describe el entorno de ejecución para poder interpretar los resultados.
+
+    Returns:
+        dict: Información del intérprete y la máquina
+    """
+    return {
+        "python_version": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "timestamp": int(time.time()),
+    }
+
+
+def save_results(results: List[BenchmarkResult], path: Path) -> None:
+    """
+    Guarda los resultados en un archivo JSON.
+
+    Args:
+        results: Resultados de los benchmarks
+        path: Ruta del archivo de salida
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    document = {
+        "environment": environment_info(),
+        "benchmarks": [result.summary() for result in results],
+    }
+    path.write_text(json.dumps(document, indent=2), encoding="utf-8")
+
+
+def load_results(path: Path) -> Dict[str, dict]:
+    """
+    Carga un archivo de resultados.
+
+    Args:
+        path: Ruta del archivo JSON
+
+    Returns:
+        Dict[str, dict]: Resúmenes indexados por nombre de benchmark
+    """
+    document = json.loads(Path(path).read_text(encoding="utf-8"))
+    return {entry["name"]: entry for entry in document["benchmarks"]}
+
+
+def compare_results(baseline: Dict[str, dict], current: Dict[str, dict],
+                    threshold: float = DEFAULT_REGRESSION_THRESHOLD) -> List[dict]:
+    """
+    Compara dos conjuntos de resultados usando la mediana.
+
+    Args:
+        baseline: Resultados de referencia
+        current: Resultados actuales
+        threshold: Cambio relativo a partir del cual se marca una regresión
+
+    Returns:
+        List[dict]: Una fila por benchmark común con el cambio relativo y su estado
+    """
+    rows = []
+    for name in sorted(baseline.keys() & current.keys()):
+        before = baseline[name]["median_ns"]
+        after = current[name]["median_ns"]
+        change = (after - before) / before if before else 0.0
+
+        if change > threshold:
+            state = "regression"
+        elif change < -threshold:
+            state = "improvement"
+        else:
+            state = "unchanged"
+
+        rows.append({
+            "name": name,
+            "baseline_ns": before,
+            "current_ns": after,
+            "change": change,
+            "status": state,
+        })
+    return rows
+
+
+def format_ns(value: float) -> str:
+    """Formatea una duración en nanosegundos con la unidad más legible."""
+    for unit, factor in (("s", 1e9), ("ms", 1e6), ("µs", 1e3)):
+        if value >= factor:
+            return f"{value / factor:.2f} {unit}"
+    return f"{value:.0f} ns"
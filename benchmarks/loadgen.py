@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Generador de carga HTTP
+=======================
+
+Herramienta asyncio que lanza peticiones contra un servidor uvicorn local a una tasa
+controlada (lazo abierto) y reporta latencias p50/p90/p99/p999 y tasas de error.
+
+La latencia se mide desde el instante en que la petición *debía* enviarse según la
+tasa objetivo, no desde que realmente se envió. Así, si el servidor (o el propio
+generador) se atasca, las peticiones retrasadas cuentan su espera y no se produce
+omisión coordinada. También se reporta el tiempo de servicio sin corregir.
+
+Uso: python -m benchmarks.loadgen run --rate 200 --duration 10 --mix "process:small=8,health=2"
+     python -m benchmarks.loadgen saturate --workers 1,2,4 --slo-p99-ms 100
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import httpx
+
+# Agregar el directorio padre al path para importaciones
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+from .harness import UNLIMITED_ENV
+from .workloads import STANDARD_WORKLOADS, generate_payload
+
+# Endpoints que se pueden incluir en una mezcla de carga
+ENDPOINTS: Dict[str, Tuple[str, str]] = {
+    "process": ("POST", "/events/process"),
+    "legacy": ("POST", "/process_events"),
+    "health": ("GET", "/health/"),
+}
+
+DEFAULT_MIX = "process:small=6,process:large=1,legacy:small=1,health=2"
+PERCENTILES = (50.0, 90.0, 99.0, 99.9)
+
+
+@dataclass
+class RequestTemplate:
+    """
+    Petición preconstruida de una mezcla de carga.
+
+    Attributes:
+        name: Nombre de la entrada de la mezcla (endpoint:carga)
+        method: Método HTTP
+        path: Ruta del endpoint
+        body: Cuerpo JSON ya serializado (None para GET)
+    """
+    name: str
+    method: str
+    path: str
+    body: Optional[bytes] = None
+
+
+def parse_mix(mix: str, now: Optional[int] = None) -> List[Tuple[RequestTemplate, float]]:
+    """
+    Interpreta una mezcla de carga con el formato "endpoint[:carga]=peso,...".
+
+    Args:
+        mix: Mezcla, por ejemplo "process:small=8,legacy:large=1,health=1"
+        now: Timestamp de referencia para generar los payloads
+
+    Returns:
+        List[Tuple[RequestTemplate, float]]: Plantillas con su peso relativo
+
+    Raises:
+        ValueError: Si algún endpoint o carga no existe
+    """
+    entries = []
+    for item in filter(None, (part.strip() for part in mix.split(","))):
+        key, _, weight = item.partition("=")
+        endpoint, _, workload = key.partition(":")
+
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido en la mezcla: {endpoint}")
+        method, path = ENDPOINTS[endpoint]
+
+        body = None
+        if method == "POST":
+            workload = workload or "small"
+            if workload not in STANDARD_WORKLOADS:
+                raise ValueError(f"Carga desconocida en la mezcla: {workload}")
+            body = json.dumps(generate_payload(STANDARD_WORKLOADS[workload], now)).encode()
+
+        entries.append((RequestTemplate(key, method, path, body), float(weight or 1)))
+
+    if not entries:
+        raise ValueError("La mezcla de carga está vacía")
+    return entries
+
+
+def percentile(sorted_values: Sequence[float], pct: float) -> float:
+    """
+    Percentil por el método del rango más cercano.
+
+    Args:
+        sorted_values: Valores ordenados de menor a mayor
+        pct: Percentil (0-100)
+
+    Returns:
+        float: Valor del percentil, o 0.0 si no hay valores
+    """
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(-(-pct * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+@dataclass
+class LoadResult:
+    """
+    Resultado de una ejecución de carga.
+
+    Attributes:
+        target_rate: Tasa objetivo en peticiones por segundo
+        duration_s: Duración real de la ejecución
+        latencies_s: Latencias corregidas (desde el instante previsto de envío)
+        service_times_s: Tiempos de servicio sin corregir (desde el envío real)
+        statuses: Conteo de respuestas por código de estado o tipo de excepción
+        errors: Número de respuestas con error (>= 400 o excepción)
+    """
+    target_rate: float
+    duration_s: float = 0.0
+    latencies_s: List[float] = field(default_factory=list)
+    service_times_s: List[float] = field(default_factory=list)
+    statuses: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+
+    def record(self, status: str, intended: float, sent: float, finished: float, error: bool) -> None:
+        self.latencies_s.append(finished - intended)
+        self.service_times_s.append(finished - sent)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        if error:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        """
+        Resume la ejecución.
+
+        Returns:
+            dict: Tasas, percentiles de latencia en milisegundos y errores
+        """
+        total = len(self.latencies_s)
+        latencies = sorted(self.latencies_s)
+        service_times = sorted(self.service_times_s)
+
+        def as_ms(values):
+            return {f"p{pct:g}": round(percentile(values, pct) * 1000, 3) for pct in PERCENTILES}
+
+        return {
+            "target_rate": self.target_rate,
+            "achieved_rate": round(total / self.duration_s, 2) if self.duration_s else 0.0,
+            "requests": total,
+            "errors": self.errors,
+            "error_rate": self.errors / total if total else 0.0,
+            "statuses": dict(sorted(self.statuses.items())),
+            "latency_ms": as_ms(latencies),
+            "service_time_ms": as_ms(service_times),
+            "max_latency_ms": round(latencies[-1] * 1000, 3) if latencies else 0.0,
+        }
+
+
+async def send_request(client: httpx.AsyncClient, semaphore: asyncio.Semaphore, template: RequestTemplate,
+                       intended: float, result: LoadResult) -> str:
+    """
+    Envía una petición y registra su latencia desde el instante previsto.
+
+    Returns:
+        str: Código de estado (o nombre de la excepción)
+    """
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        sent = loop.time()
+        try:
+            response = await client.request(
+                template.method,
+                template.path,
+                content=template.body,
+                headers={"content-type": "application/json"} if template.body else None,
+            )
+            status, error = str(response.status_code), response.status_code >= 400
+        except httpx.HTTPError as e:
+            status, error = type(e).__name__, True
+        result.record(status, intended, sent, loop.time(), error)
+    return status
+
+
+async def run_load(base_url: str, rate: float, duration: float, mix: str = DEFAULT_MIX,
+                   concurrency: int = 256, timeout: float = 10.0, seed: int = 42,
+                   transport: Optional[httpx.AsyncBaseTransport] = None) -> LoadResult:
+    """
+    Lanza carga en lazo abierto a una tasa constante.
+
+    Args:
+        base_url: URL base del servidor
+        rate: Peticiones por segundo
+        duration: Duración en segundos
+        mix: Mezcla de carga (ver parse_mix)
+        concurrency: Máximo de peticiones en vuelo (y de conexiones)
+        timeout: Timeout por petición en segundos
+        seed: Semilla para la selección de plantillas
+        transport: Transporte httpx alternativo (por ejemplo, ASGI en tests)
+
+    Returns:
+        LoadResult: Latencias y estados registrados
+    """
+    entries = parse_mix(mix)
+    templates = [template for template, _ in entries]
+    weights = [weight for _, weight in entries]
+    rng = random.Random(seed)
+    result = LoadResult(target_rate=rate)
+    total = max(1, int(rate * duration))
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=timeout,
+                                 transport=transport) as client:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        tasks = []
+        start = loop.time()
+
+        for index in range(total):
+            intended = start + index / rate
+            delay = intended - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            template = rng.choices(templates, weights)[0]
+            tasks.append(asyncio.create_task(send_request(client, semaphore, template, intended, result)))
+
+        await asyncio.gather(*tasks)
+        result.duration_s = loop.time() - start
+
+    return result
+
+
+def is_sustainable(summary: dict, slo_p99_ms: float, max_error_rate: float) -> bool:
+    """
+    Decide si una ejecución se sostuvo a la tasa objetivo.
+
+    Args:
+        summary: Resumen de LoadResult
+        slo_p99_ms: Latencia p99 corregida máxima admitida
+        max_error_rate: Tasa de errores máxima admitida
+
+    Returns:
+        bool: True si se cumplieron la tasa, el SLO y la tasa de errores
+    """
+    return (
+        summary["error_rate"] <= max_error_rate
+        and summary["latency_ms"]["p99"] <= slo_p99_ms
+        and summary["achieved_rate"] >= 0.95 * summary["target_rate"]
+    )
+
+
+async def find_saturation(base_url: str, mix: str = DEFAULT_MIX, start_rate: float = 50.0,
+                          max_rate: float = 50_000.0, stage_duration: float = 5.0,
+                          slo_p99_ms: float = 100.0, max_error_rate: float = 0.001,
+                          precision: float = 0.05) -> dict:
+    """
+    Busca la máxima tasa sostenible: duplica la tasa hasta romper el SLO y luego
+    hace búsqueda binaria entre la última tasa buena (o 0) y la primera mala.
+
+    Args:
+        base_url: URL base del servidor
+        mix: Mezcla de carga
+        start_rate: Tasa inicial
+        max_rate: Tasa máxima a probar
+        stage_duration: Duración de cada etapa en segundos
+        slo_p99_ms: Latencia p99 corregida máxima admitida
+        max_error_rate: Tasa de errores máxima admitida
+        precision: Ancho relativo del intervalo en el que se detiene la búsqueda
+
+    Returns:
+        dict: Tasa máxima sostenible y el resumen de cada etapa
+    """
+    stages = []
+
+    async def probe(rate: float) -> bool:
+        summary = (await run_load(base_url, rate, stage_duration, mix)).summary()
+        ok = is_sustainable(summary, slo_p99_ms, max_error_rate)
+        stages.append({**summary, "sustainable": ok})
+        print(f"   {rate:>10.1f} req/s -> p99 {summary['latency_ms']['p99']:>9.2f} ms, "
+              f"errores {summary['error_rate']:.2%} {'✅' if ok else '❌'}")
+        return ok
+
+    low, high, rate = 0.0, None, start_rate
+    while rate <= max_rate:
+        if not await probe(rate):
+            high = rate
+            break
+        low, rate = rate, rate * 2
+
+    if high is not None:
+        # Si ya la tasa inicial rompe el SLO se busca entre 0 y ella, hasta una resolución
+        # de precision * start_rate
+        while (high - low) / high > precision and high > precision * start_rate:
+            middle = (low + high) / 2
+            if await probe(middle):
+                low = middle
+            else:
+                high = middle
+
+    return {"max_sustainable_rate": low, "stages": stages}
+
+
+def find_free_port(start_port=8100, max_attempts=100):
+    """Encuentra un puerto libre comenzando desde start_port"""
+    for port in range(start_port, start_port + max_attempts):
+        try:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind(("127.0.0.1", port))
+                return port
+        except OSError:
+            continue
+    return None
+
+
+class LocalServer:
+    """
+    Servidor uvicorn local lanzado como subproceso para las pruebas de carga.
+    """
+
+    def __init__(self, workers: int = 1, port: Optional[int] = None, startup_timeout: float = 30.0,
+                 extra_args: Sequence[str] = (), env: Optional[Dict[str, str]] = None):
+        self.workers = workers
+        self.port = port or find_free_port()
+        self.startup_timeout = startup_timeout
+        self.extra_args = list(extra_args)
+        self.env = dict(env or {})  # Variables de entorno propias de este servidor
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "LocalServer":
+        cmd = [
+            sys.executable, "-m", "uvicorn", "app.main:app",
+            "--host", "127.0.0.1",
+            "--port", str(self.port),
+            "--workers", str(self.workers),
+            "--log-level", "warning",
+            "--no-access-log",
+            *self.extra_args,
+        ]
+        env = {"ENVIRONMENT": "production", **UNLIMITED_ENV, **os.environ, **self.env}
+        self.process = subprocess.Popen(cmd, cwd=PROJECT_ROOT, env=env)
+        self._wait_until_healthy()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+    def _wait_until_healthy(self) -> None:
+        deadline = time.monotonic() + self.startup_timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"El servidor terminó al arrancar (código {self.process.returncode})")
+            try:
+                if httpx.get(f"{self.base_url}/health/", timeout=1.0).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            time.sleep(0.1)
+        self.__exit__()
+        raise RuntimeError("El servidor no respondió a tiempo en /health/")
+
+
+def print_summary(summary: dict) -> None:
+    """Muestra un resumen de carga en consola."""
+    latency, service = summary["latency_ms"], summary["service_time_ms"]
+    print(f"📊 {summary['requests']} peticiones, {summary['achieved_rate']} req/s "
+          f"(objetivo {summary['target_rate']}), errores {summary['error_rate']:.2%}")
+    print(f"   Estados: {summary['statuses']}")
+    for key in latency:
+        print(f"   {key:>6}: {latency[key]:>10.2f} ms (servicio {service[key]:>10.2f} ms)")
+
+
+def write_output(path: Optional[str], document: dict) -> None:
+    """Guarda un documento JSON si se indicó archivo de salida."""
+    if path:
+        Path(path).write_text(json.dumps(document, indent=2), encoding="utf-8")
+        print(f"💾 Resultados guardados en {path}")
+
+
+def run_command(args) -> int:
+    """Ejecuta una prueba de carga a tasa fija."""
+    async def go(base_url):
+        return await run_load(base_url, args.rate, args.duration, args.mix, args.concurrency)
+
+    if args.url:
+        result = asyncio.run(go(args.url))
+    else:
+        with LocalServer(workers=args.workers) as server:
+            result = asyncio.run(go(server.base_url))
+
+    summary = result.summary()
+    print_summary(summary)
+    write_output(args.output, summary)
+    return 0
+
+
+def saturate_command(args) -> int:
+    """Busca la tasa máxima sostenible para cada número de workers."""
+    report = {}
+    for workers in (int(value) for value in args.workers.split(",")):
+        print(f"🔎 Buscando saturación con {workers} worker(s)...")
+        with LocalServer(workers=workers) as server:
+            report[workers] = asyncio.run(find_saturation(
+                server.base_url, args.mix, args.start_rate, args.max_rate,
+                args.stage_duration, args.slo_p99_ms, args.max_error_rate,
+            ))
+        print(f"🏁 {workers} worker(s): {report[workers]['max_sustainable_rate']:.1f} req/s sostenibles")
+
+    write_output(args.output, report)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.loadgen", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Carga a tasa fija")
+    run_parser.add_argument("--rate", type=float, default=100.0, help="Peticiones por segundo")
+    run_parser.add_argument("--duration", type=float, default=10.0, help="Duración en segundos")
+    run_parser.add_argument("--concurrency", type=int, default=256, help="Máximo de peticiones en vuelo")
+    run_parser.add_argument("--workers", type=int, default=1, help="Workers del servidor local")
+    run_parser.add_argument("--url", help="Usar un servidor ya arrancado en lugar de uno local")
+    run_parser.set_defaults(handler=run_command)
+
+    saturate_parser = subparsers.add_parser("saturate", help="Buscar la tasa máxima sostenible")
+    saturate_parser.add_argument("--workers", default="1", help="Lista de workers, por ejemplo 1,2,4")
+    saturate_parser.add_argument("--start-rate", type=float, default=50.0)
+    saturate_parser.add_argument("--max-rate", type=float, default=50_000.0)
+    saturate_parser.add_argument("--stage-duration", type=float, default=5.0)
+    saturate_parser.add_argument("--slo-p99-ms", type=float, default=100.0)
+    saturate_parser.add_argument("--max-error-rate", type=float, default=0.001)
+    saturate_parser.set_defaults(handler=saturate_command)
+
+    for subparser in (run_parser, saturate_parser):
+        subparser.add_argument("--mix", default=DEFAULT_MIX, help="Mezcla endpoint[:carga]=peso,...")
+        subparser.add_argument("--output", help="Archivo JSON de salida")
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Reproducción determinista de capturas de tráfico
+================================================
+
+Reenvía las peticiones de uno o varios archivos de captura (ver app/capture.py)
+contra una instancia local, respetando los intervalos originales o acelerándolos.
+
+Como la API decide qué eventos son futuros comparando con el reloj actual, los
+timestamps de cada cuerpo se desplazan antes de enviarlo. Por defecto cada petición
+se evalúa "as of" su instante de captura: se le suma (instante de envío - instante de
+captura), así que la separación entre eventos pasados y futuros es la misma que en
+producción. Con --as-of se fija un instante de evaluación común para toda la captura.
+
+Uso: python -m benchmarks.replay capture.jsonl.gz [--speed 10] [--url http://127.0.0.1:8000]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional
+
+import httpx
+
+# Agregar el directorio padre al path para importaciones
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.capture import CaptureRecord, read_capture
+
+from .loadgen import LoadResult, LocalServer, RequestTemplate, print_summary, send_request, write_output
+
+
+def shift_body(body: str, shift: int) -> bytes:
+    """
+    Desplaza los timestamps de los eventos de un cuerpo capturado.
+
+    Args:
+        body: Cuerpo JSON original
+        shift: Segundos a sumar a cada timestamp
+
+    Returns:
+        bytes: Cuerpo desplazado (o el original si no es un payload de eventos válido)
+    """
+    if not shift:
+        return body.encode()
+    try:
+        payload = json.loads(body)
+        for event in payload["events"]:
+            if isinstance(event.get("timestamp"), int):
+                event["timestamp"] += shift
+    except (ValueError, KeyError, TypeError, AttributeError):
+        # Cuerpos inválidos se reenvían tal cual para reproducir también los errores
+        return body.encode()
+    return json.dumps(payload, separators=(",", ":")).encode()
+
+
+def plan_replay(records: List[CaptureRecord], start_wall: float, speed: float = 1.0,
+                as_of: Optional[float] = None):
+    """
+    Calcula cuándo enviar cada petición y con qué cuerpo.
+
+    Args:
+        records: Registros de la captura en orden cronológico
+        start_wall: Instante (epoch) en que empieza la reproducción
+        speed: Factor de aceleración (1.0 = velocidad original, 0 = sin esperas)
+        as_of: Instante de evaluación común; None evalúa cada petición en su instante de captura
+
+    Returns:
+        List[tuple]: (segundos desde el inicio, plantilla de petición, estado original)
+    """
+    if not records:
+        return []
+
+    first = records[0].t
+    plan = []
+    for record in records:
+        offset = (record.t - first) / speed if speed > 0 else 0.0
+        reference = record.t if as_of is None else as_of
+        shift = round(start_wall + offset - reference)
+        template = RequestTemplate(record.path, record.method, record.path, shift_body(record.body, shift))
+        plan.append((offset, template, record.status))
+    return plan
+
+
+async def replay(base_url: str, records: List[CaptureRecord], speed: float = 1.0,
+                 as_of: Optional[float] = None, concurrency: int = 256,
+                 transport: Optional[httpx.AsyncBaseTransport] = None) -> dict:
+    """
+    Reproduce una captura y compara los estados con los originales.
+
+    Args:
+        base_url: URL base del servidor
+        records: Registros de la captura
+        speed: Factor de aceleración
+        as_of: Instante de evaluación común (opcional)
+        concurrency: Máximo de peticiones en vuelo
+        transport: Transporte httpx alternativo (por ejemplo, ASGI en tests)
+
+    Returns:
+        dict: Resumen de latencias y número de estados distintos a los capturados
+    """
+    plan = plan_replay(records, time.time() + 0.5, speed, as_of)
+    result = LoadResult(target_rate=0.0)
+    mismatches = 0
+
+    async def send_and_check(template, intended, original_status):
+        nonlocal mismatches
+        status = await send_request(client, semaphore, template, intended, result)
+        if status != str(original_status):
+            mismatches += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, transport=transport) as client:
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrency)
+        start = loop.time() + 0.5
+        tasks = []
+
+        for offset, template, original_status in plan:
+            delay = start + offset - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(send_and_check(template, start + offset, original_status)))
+
+        await asyncio.gather(*tasks)
+        result.duration_s = loop.time() - start
+
+    summary = result.summary()
+    summary["target_rate"] = round(len(plan) / plan[-1][0], 2) if plan and plan[-1][0] else 0.0
+    summary["status_mismatches"] = mismatches
+    return summary
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.replay", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("captures", nargs="+", help="Archivos de captura")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="Factor de aceleración (1 = original, 0 = lo más rápido posible)")
+    parser.add_argument("--as-of", type=float, help="Instante epoch común de evaluación")
+    parser.add_argument("--url", help="Usar un servidor ya arrancado en lugar de uno local")
+    parser.add_argument("--workers", type=int, default=1, help="Workers del servidor local")
+    parser.add_argument("--output", help="Archivo JSON de salida")
+    args = parser.parse_args(argv)
+
+    records = list(read_capture(args.captures))
+    print(f"📼 {len(records)} peticiones en la captura")
+
+    if args.url:
+        summary = asyncio.run(replay(args.url, records, args.speed, args.as_of))
+    else:
+        with LocalServer(workers=args.workers) as server:
+            summary = asyncio.run(replay(server.base_url, records, args.speed, args.as_of))
+
+    print_summary(summary)
+    print(f"   Estados distintos a los capturados: {summary['status_mismatches']}")
+    write_output(args.output, summary)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""
+Generadores de cargas sintéticas
+================================
+
+Este archivo contiene los generadores de payloads usados por los benchmarks
+y por las herramientas de carga.
+"""
+
+import random
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Optional
+
+
+@dataclass(frozen=True)
+class WorkloadSpec:
+    """
+    Describe una carga sintética de eventos.
+
+    Attributes:
+        num_events: Número de eventos por payload
+        future_fraction: Fracción de eventos con timestamp futuro (0.0 - 1.0)
+        data_size: Tamaño en caracteres del campo data
+        duplicate_rate: Fracción de eventos que reutilizan un event_id previo (0.0 - 1.0)
+        seed: Semilla para que la carga sea reproducible
+    """
+    num_events: int = 10
+    future_fraction: float = 0.5
+    data_size: int = 32
+    duplicate_rate: float = 0.0
+    seed: int = 42
+
+    def to_dict(self) -> dict:
+        """Devuelve la especificación como diccionario serializable."""
+        return asdict(self)
+
+
+# Cargas estándar usadas por las suites de benchmarks
+STANDARD_WORKLOADS: Dict[str, WorkloadSpec] = {
+    "small": WorkloadSpec(num_events=5, future_fraction=0.5, data_size=32),
+    "medium": WorkloadSpec(num_events=100, future_fraction=0.5, data_size=64),
+    "large": WorkloadSpec(num_events=1000, future_fraction=0.5, data_size=64),
+    "large_data": WorkloadSpec(num_events=100, future_fraction=0.5, data_size=4096),
+    "all_past": WorkloadSpec(num_events=100, future_fraction=0.0, data_size=64),
+    "all_future": WorkloadSpec(num_events=100, future_fraction=1.0, data_size=64),
+    "duplicates": WorkloadSpec(num_events=100, future_fraction=0.5, data_size=64, duplicate_rate=0.1),
+}
+
+
+def generate_events(spec: WorkloadSpec, now: Optional[int] = None) -> List[dict]:
+    """
+    Genera una lista de eventos (como diccionarios) según la especificación.
+
+    Los eventos futuros caen en la próxima semana y los pasados en la semana
+    anterior, de modo que todos respetan las reglas de negocio de la API.
+
+    Args:
+        spec: Especificación de la carga
+        now: Timestamp de referencia (opcional, usa el actual si no se proporciona)
+
+    Returns:
+        List[dict]: Eventos listos para serializar en un payload
+    """
+    if now is None:
+        now = int(time.time())
+
+    rng = random.Random(spec.seed)
+    week = 7 * 24 * 60 * 60
+    num_future = round(spec.num_events * spec.future_fraction)
+    filler = "x" * spec.data_size
+
+    events = []
+    for index in range(spec.num_events):
+        if index < num_future:
+            # Margen de una hora para que el evento siga siendo futuro durante el benchmark
+            timestamp = now + 3600 + rng.randrange(week)
+        else:
+            timestamp = max(0, now - 1 - rng.randrange(week))
+
+        event_id = f"evt_{index:06d}"
+        if events and rng.random() < spec.duplicate_rate:
+            event_id = events[rng.randrange(len(events))]["event_id"]
+
+        events.append({
+            "event_id": event_id,
+            "timestamp": timestamp,
+            "data": filler
+        })
+
+    rng.shuffle(events)
+    return events
+
+
+def generate_payload(spec: WorkloadSpec, now: Optional[int] = None) -> dict:
+    """
+    Genera un payload completo para /events/process.
+
+    Args:
+        spec: Especificación de la carga
+        now: Timestamp de referencia (opcional)
+
+    Returns:
+        dict: Payload con la clave "events"
+    """
+    return {"events": generate_events(spec, now)}
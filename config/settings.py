@@ -6,8 +6,8 @@ Este archivo contiene todas las configuraciones de la aplicación.
 """
 
 import os
-from typing import List
-from pydantic import BaseSettings
+from typing import List, Optional
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -25,6 +25,17 @@ class Settings(BaseSettings):
     port: int = 8000
     debug: bool = False
 
+    # Configuración del launcher de producción (scripts/run_prod.py)
+    workers: int = 0  # 0 = uno por núcleo disponible
+    loop: str = "auto"  # auto (uvloop si está instalado), uvloop, asyncio
+    http: str = "auto"  # auto (httptools si está instalado), httptools, h11
+    timeout_keep_alive: int = 5  # Segundos que se mantiene abierta una conexión inactiva
+    backlog: int = 2048  # Conexiones pendientes de aceptar en el socket
+    limit_concurrency: Optional[int] = None  # Máximo de conexiones/tareas antes de responder 503
+    limit_max_requests: Optional[int] = None  # Reciclar cada worker tras N peticiones
+    limit_max_requests_jitter: int = 0  # Variación aleatoria para no reciclar todos a la vez
+    timeout_graceful_shutdown: Optional[int] = 30  # Segundos para terminar peticiones en curso
+
     # Configuración de logging
     log_level: str = "INFO"
     log_file: str = "app.log"
@@ -33,18 +44,35 @@ class Settings(BaseSettings):
     cors_origins: List[str] = ["*"]
     cors_methods: List[str] = ["*"]
     cors_headers: List[str] = ["*"]
+    cors_allow_credentials: bool = True
+    cors_max_age: int = 600  # Segundos que el navegador reutiliza un preflight
+    cors_expose_headers: List[str] = ["ETag"]  # Legibles desde JavaScript en otro origen
 
     # Configuración de hosts confiables
     trusted_hosts: List[str] = ["localhost", "127.0.0.1", "*.localhost"]
 
     # Límites de la aplicación
-    max_events_per_request: int = 1000
+    max_events_per_request: int = 1000  # Se rechaza con 413 mientras llega el cuerpo
+    max_body_bytes: int = 2 * 1024 * 1024  # Tamaño máximo del cuerpo (413)
     max_future_years: int = 10
-
-    # Configuración de documentación
-    docs_url: str = "/docs"
-    redoc_url: str = "/redoc"
-    openapi_url: str = "/openapi.json"
+    cache_max_age: int = 3600  # Máximo de Cache-Control: max-age de los resultados
+
+    # Compresión (ver app/compression.py). zstd y br solo se ofrecen si están instalados
+    # los paquetes zstandard y brotli
+    request_decompression: bool = True  # Aceptar Content-Encoding gzip, deflate y zstd
+    max_decompressed_bytes: Optional[int] = None  # 413 si se supera; None = max_body_bytes
+    response_compression: bool = True
+    compression_minimum_size: int = 1024  # Las respuestas más pequeñas no se comprimen
+    compression_encodings: List[str] = ["zstd", "br", "gzip"]  # Preferencia del servidor
+    gzip_level: int = 6
+    zstd_level: int = 3
+    brotli_quality: int = 4
+
+    # Configuración de documentación (None o vacío desactiva el endpoint)
+    docs_url: Optional[str] = "/docs"
+    redoc_url: Optional[str] = "/redoc"
+    openapi_url: Optional[str] = "/openapi.json"
+    openapi_cache_file: str = ".openapi_cache.json"  # Esquema pre-serializado ("" = solo en memoria)
 
     # Configuración de contacto
     contact_name: str = "Event Processor Team"
@@ -54,10 +82,110 @@ class Settings(BaseSettings):
     license_name: str = "MIT"
     license_url: str = "https://opensource.org/licenses/MIT"
 
-    class Config:
-        env_file = ".env"
-        env_file_encoding = "utf-8"
-        case_sensitive = False
+    # Calentamiento al arrancar: background (responde /health/ready 503 hasta terminar),
+    # blocking (no acepta conexiones hasta terminar) u off
+    warmup_mode: str = "background"
+    warmup_rounds: int = 20
+
+    # Recolector de basura (ver app/runtime_tuning.py)
+    gc_freeze: bool = True  # gc.freeze() tras importar la aplicación
+    gc_thresholds: Optional[List[int]] = None  # (gen0, gen1, gen2); None = valores del intérprete
+    gc_pause_metrics: bool = True  # Registrar las pausas del GC en /health/metrics
+
+    # Control de admisión de /events/process y /process_events (ver app/admission.py).
+    # Un límite a 0 lo desactiva; /health/* nunca se rechaza
+    loop_lag_interval_ms: int = 50  # Periodo de medición del retraso del event loop
+    admission_max_lag_ms: float = 250  # Rechazar con 429 si el event loop va más retrasado
+    admission_max_inflight: int = 64  # Peticiones de procesamiento simultáneas por worker
+    admission_max_queue: int = 128  # Peticiones que pueden esperar un hueco
+    admission_queue_timeout: float = 1.0  # Segundos máximos de espera en la cola
+    admission_retry_after: int = 1  # Valor de la cabecera Retry-After de los 429
+
+    # Carriles de prioridad (ver app/lanes.py): un payload es grande si declara
+    # X-Event-Count >= lane_large_threshold_events o su Content-Length llega a
+    # lane_large_threshold_bytes. Desactivados, se procesa en el event loop
+    lanes_enabled: bool = True
+    lane_small_workers: int = 4
+    lane_small_queue: int = 256
+    lane_large_workers: int = 1
+    lane_large_queue: int = 32
+    lane_large_threshold_events: int = 100
+    lane_large_threshold_bytes: int = 16384
+    lane_switch_interval_ms: float = 1.0  # sys.setswitchinterval con carriles (0 = por defecto, 5 ms)
+
+    # Límite de tasa por cliente (IP o API key) en los endpoints de eventos, en eventos
+    # por segundo; los payloads de rate_limit_large_threshold eventos o más usan el
+    # carril "large". Una tasa a 0 desactiva el carril (ver app/rate_limit.py)
+    rate_limit_small_rate: float = 200
+    rate_limit_small_burst: float = 400
+    rate_limit_large_rate: float = 2000
+    rate_limit_large_burst: float = 5000
+    rate_limit_large_threshold: int = 100
+    rate_limit_shards: int = 64
+    rate_limit_idle_seconds: float = 300
+    rate_limit_api_key_header: str = "x-api-key"
+
+    # Almacén durable de eventos (ver app/storage/): desactivado si event_store_dir está
+    # vacío. Con el backend "wal" un directorio solo lo puede abrir un proceso, así que
+    # el launcher usa un solo worker (y rechaza WORKERS > 1); "sqlite" admite varios
+    event_store_dir: str = ""
+    event_store_backend: str = "wal"  # wal o sqlite
+    event_store_fsync: bool = True  # false solo para pruebas: se pierde la durabilidad
+    event_store_commit_delay_ms: float = 0  # Solo wal: espera extra para agrupar más lotes en cada fsync
+    event_store_snapshot_bytes: int = 64 * 1024 * 1024  # Solo wal: WAL que dispara un snapshot (0 = solo al cerrar)
+    event_store_page_size: int = 100  # Eventos por página de /events/range si no se indica limit
+    event_store_max_page_size: int = 1000  # Máximo de limit (y tamaño de los lotes de la exportación)
+    # Expiración: se borran los eventos con timestamp < ahora - retención
+    event_store_retention_seconds: int = 0
+    event_store_eviction_interval_s: float = 1.0  # 0 = sin expiración
+    event_store_eviction_batch: int = 1000  # Eventos borrados por cada toma del lock
+    event_store_eviction_max_pass_ms: float = 10  # El resto se deja para la siguiente pasada
+    # Particiones por espacio de nombres (ver app/storage/partitions.py)
+    event_store_max_partitions: int = 256  # Abiertas a la vez; abrir otra cierra la libre menos usada
+    event_store_partition_max_events: int = 0  # Cuota de eventos por partición (0 = sin límite)
+    event_store_partition_max_bytes: int = 0  # Cuota de bytes de eventos por partición (0 = sin límite)
+    event_store_partition_idle_seconds: float = 300  # Sin uso, se cierran (0 = nunca)
+
+    # Caché de resultados de /events/process compartida por los workers del host (ver
+    # app/result_cache.py). Ocupa result_cache_slots * result_cache_slot_bytes en /dev/shm
+    result_cache_slots: int = 16384  # 0 = desactivada
+    result_cache_slot_bytes: int = 512  # Los resultados que no caben en una ranura no se guardan
+    result_cache_name: str = ""  # Prefijo del segmento; vacío = event-processor-<port>
+
+    # Replicación del almacén (ver app/storage/replication.py). El líder (backend wal)
+    # escucha en replication_listen; un seguidor se conecta a replication_leader, sirve
+    # las lecturas del almacén desde su réplica en memoria y no acepta escrituras
+    replication_listen: str = ""  # host:puerto del servidor de replicación (vacío = no es líder)
+    replication_leader: str = ""  # host:puerto del líder (vacío = no es seguidor)
+    replication_backlog: int = 10000  # Cambios guardados para seguidores que se reconectan
+    replication_heartbeat_s: float = 0.5  # Latido del líder sin cambios
+    replication_reconnect_s: float = 1.0  # Espera entre intentos de conexión del seguidor
+
+    # Despachador de eventos vencidos (ver app/dispatcher.py); requiere el almacén y un
+    # solo worker (flock sobre EVENT_STORE_DIR/dispatcher.lock)
+    dispatcher_enabled: bool = False
+    dispatcher_webhook_url: str = ""  # POST de cada lote a esta URL (vacío = sin webhook)
+    dispatcher_webhook_timeout_s: float = 5.0
+    dispatcher_batch_size: int = 100  # Eventos por lote entregado
+    dispatcher_max_batches: int = 16  # Lotes en la cola de cada suscriptor
+    dispatcher_policy: str = "block"  # block (frena el reparto) o drop (descarta el lote más antiguo)
+
+    # Suscripciones por WebSocket al evento futuro más próximo (ver app/live.py)
+    live_max_subscribers: int = 10000  # Más conexiones se cierran con 1013
+    live_policy: str = "coalesce"  # Política por defecto: coalesce o drop
+    live_queue_size: int = 8  # Mensajes pendientes por conexión con drop
+    live_refresh_interval_s: float = 1.0  # Consulta periódica (escrituras de otros workers)
+
+    # Captura de tráfico (desactivada si capture_file está vacío)
+    capture_file: str = ""
+    capture_sample_rate: float = 1.0
+
+    model_config = SettingsConfigDict(
+        env_file=".env",
+        env_file_encoding="utf-8",
+        case_sensitive=False,
+        extra="ignore",
+    )
 
 
 class DevelopmentSettings(Settings):
@@ -75,6 +203,9 @@ class ProductionSettings(Settings):
     debug: bool = False
     log_level: str = "WARNING"
     cors_origins: List[str] = []  # Especificar dominios específicos en producción
+    docs_url: Optional[str] = None  # Sin Swagger UI ni ReDoc en producción
+    redoc_url: Optional[str] = None
+    gc_thresholds: Optional[List[int]] = [50000, 20, 100]  # Menos colecciones jóvenes (ver benchmarks/bench_gc.py)
 
 
 class TestSettings(Settings):
@@ -84,6 +215,15 @@ class TestSettings(Settings):
     debug: bool = True
     log_level: str = "DEBUG"
     max_events_per_request: int = 100  # Límite menor para tests
+    trusted_hosts: List[str] = ["localhost", "127.0.0.1", "*.localhost", "testserver"]  # Host de TestClient
+    openapi_cache_file: str = ""  # Sin caché en disco durante los tests
+    warmup_mode: str = "blocking"  # Disponible en cuanto termina el arranque del TestClient
+    warmup_rounds: int = 2
+    gc_freeze: bool = False  # No congelar el heap del proceso de pytest
+    admission_max_lag_ms: float = 0  # El lag del hilo de TestClient no es representativo
+    rate_limit_small_rate: float = 0  # Todas las peticiones de los tests llegan del mismo cliente
+    rate_limit_large_rate: float = 0
+    result_cache_slots: int = 0  # Los tests que la usan abren su propio segmento
 
 
 def get_settings() -> Settings:
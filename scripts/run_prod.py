@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+"""
+Script para ejecutar el servidor en producción
+==============================================
+
+Carga la configuración de config/settings.py (ENVIRONMENT=production por defecto)
+y arranca uvicorn con varios workers, uvloop/httptools cuando están instalados,
+keep-alive y backlog ajustados, y reciclado de workers tras N peticiones.
+
+Uso: python scripts/run_prod.py [--workers N] [--port PUERTO]
+"""
+import argparse
+import os
+import sys
+from pathlib import Path
+
+# Agregar el directorio padre al path para imports
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.insert(0, str(PROJECT_ROOT))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor de producción de Event Processor API")
+    parser.add_argument("--workers", type=int, help="Número de workers (por defecto, uno por núcleo)")
+    parser.add_argument("--port", type=int, help="Puerto del servidor")
+    args = parser.parse_args()
+
+    # La configuración se lee del entorno; los workers también la cargan al importar la app
+    os.environ.setdefault("ENVIRONMENT", "production")
+    if args.workers is not None:
+        os.environ["WORKERS"] = str(args.workers)
+    if args.port is not None:
+        os.environ["PORT"] = str(args.port)
+
+    import uvicorn
+    from config.settings import get_settings
+    from app.server import build_uvicorn_options
+
+    settings = get_settings()
+    try:
+        options = build_uvicorn_options(settings)
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+    print("🚀 Event Processor API - Modo Producción")
+    print("=" * 50)
+    print(f"🌐 Escuchando en: {options['host']}:{options['port']}")
+    print(f"👷 Workers: {options['workers']}")
+    print(f"🔁 Event loop: {options['loop']} | HTTP: {options['http']}")
+    print(f"⏳ Keep-alive: {options['timeout_keep_alive']}s | Backlog: {options['backlog']}")
+    if options["limit_max_requests"]:
+        print(f"♻️  Reciclado de workers cada {options['limit_max_requests']} peticiones")
+    print("=" * 50)
+
+    os.chdir(PROJECT_ROOT)
+    uvicorn.run("app.main:app", **options)
+
+
+if __name__ == "__main__":
+    main()
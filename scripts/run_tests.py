@@ -4,6 +4,10 @@ Script para ejecutar tests de la Event Processor API
 ==================================================
 
 Uso: python scripts/run_tests.py [opciones]
+
+Opciones:
+    --bench     Ejecuta además la suite de benchmarks (modo rápido) y la compara
+                contra la línea base guardada en benchmarks/results/baseline.json
 """
 
 import os
@@ -12,7 +16,11 @@ import subprocess
 from pathlib import Path
 
 # Agregar el directorio padre al path
-sys.path.append(str(Path(__file__).parent.parent))
+PROJECT_ROOT = Path(__file__).parent.parent
+sys.path.append(str(PROJECT_ROOT))
+
+BASELINE_FILE = PROJECT_ROOT / "benchmarks" / "results" / "baseline.json"
+RESULTS_FILE = PROJECT_ROOT / "benchmarks" / "results" / "latest.json"
 
 def run_command(command, description):
     """
@@ -38,6 +46,24 @@ def run_command(command, description):
         print("💡 Asegúrate de tener pytest instalado: pip install pytest")
         return False
 
+def run_benchmarks():
+    """
+    Ejecuta la suite de benchmarks y la compara con la línea base si existe.
+
+    Returns:
+        bool: True si no se detectaron regresiones
+    """
+    benchmark_command = [sys.executable, "-m", "benchmarks", "run", "--quick", "--output", str(RESULTS_FILE)]
+    if not run_command(benchmark_command, "Benchmarks"):
+        return False
+
+    if not BASELINE_FILE.exists():
+        print("💡 No hay línea base guardada. Créala con: python -m benchmarks run --save-baseline")
+        return True
+
+    compare_command = [sys.executable, "-m", "benchmarks", "compare", str(BASELINE_FILE), str(RESULTS_FILE)]
+    return run_command(compare_command, "Comparación con la línea base")
+
 def main():
     """
     Ejecuta diferentes tipos de tests.
@@ -76,6 +102,12 @@ def main():
 
     print("\n" + "=" * 50)
 
+    # Benchmarks (opcional)
+    if "--bench" in sys.argv[1:]:
+        if not run_benchmarks():
+            success = False
+        print("\n" + "=" * 50)
+
     if success:
         print("🎉 Todos los tests completados exitosamente!")
         return 0
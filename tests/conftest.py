@@ -0,0 +1,9 @@
+"""
+Configuración compartida de los tests
+=====================================
+"""
+
+import os
+
+# Los tests usan TestSettings (igual que scripts/run_tests.py)
+os.environ.setdefault("ENVIRONMENT", "test")
@@ -0,0 +1,128 @@
+"""
+Tests para el control de admisión
+=================================
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.admission import AdmissionController, LoopLagMonitor
+from app.main import admission_controller, app
+from app.metrics import metrics
+
+
+REQUEST = {"events": [{"event_id": "e1", "timestamp": int(time.time()) + 86400, "data": "futuro"}]}
+
+
+def make_controller(lag: float = 0.0, **limits) -> AdmissionController:
+    return AdmissionController(SimpleNamespace(lag=lag), **limits)
+
+
+class TestAdmissionController:
+    """Tests para las decisiones de admisión"""
+
+    def test_admits_below_limits(self):
+        """Test de admisión sin sobrecarga"""
+        controller = make_controller(max_inflight=2, max_lag=0.1)
+
+        async def scenario():
+            assert await controller.acquire() is None
+            assert await controller.acquire() is None
+            assert controller.inflight == 2
+            controller.release()
+            controller.release()
+
+        asyncio.run(scenario())
+        assert controller.inflight == 0
+
+    def test_sheds_on_lag(self):
+        """Test de rechazo cuando el event loop va retrasado"""
+        controller = make_controller(lag=0.5, max_lag=0.1)
+
+        assert asyncio.run(controller.acquire()) == "lag"
+        assert controller.inflight == 0
+
+    def test_sheds_on_concurrency_without_queue(self):
+        """Test de rechazo por concurrencia sin cola"""
+        controller = make_controller(max_inflight=1)
+
+        async def scenario():
+            assert await controller.acquire() is None
+            return await controller.acquire()
+
+        assert asyncio.run(scenario()) == "concurrency"
+
+    def test_queued_request_gets_released_slot(self):
+        """Test de que el hueco liberado pasa a la petición en espera"""
+        controller = make_controller(max_inflight=1, max_queue=1, queue_timeout=1.0)
+
+        async def scenario():
+            assert await controller.acquire() is None
+            waiting = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            assert await controller.acquire() == "concurrency"  # Cola llena
+            controller.release()
+            assert await waiting is None
+            assert controller.inflight == 1
+
+        asyncio.run(scenario())
+
+    def test_queue_timeout(self):
+        """Test de rechazo tras esperar demasiado en la cola"""
+        controller = make_controller(max_inflight=1, max_queue=1, queue_timeout=0.01)
+
+        async def scenario():
+            assert await controller.acquire() is None
+            return await controller.acquire()
+
+        assert asyncio.run(scenario()) == "queue_timeout"
+        assert controller.inflight == 1
+        assert not controller._waiters
+
+    def test_lag_monitor_records(self):
+        """Test de que el monitor mide el retraso del loop"""
+        monitor = LoopLagMonitor(interval=0.001)
+
+        async def scenario():
+            monitor.start()
+            await asyncio.sleep(0.01)
+            monitor.stop()
+
+        asyncio.run(scenario())
+        assert metrics.snapshot()["event_loop_lag_seconds"]["count"] > 0
+
+
+class TestAdmissionMiddleware:
+    """Tests para el middleware de admisión"""
+
+    def test_overloaded_returns_429_but_health_is_served(self, monkeypatch):
+        """Test de 429 con Retry-After mientras /health/ y /health/ready siguen respondiendo"""
+        with TestClient(app) as client:
+            monkeypatch.setattr(admission_controller, "monitor", SimpleNamespace(lag=1.0))
+            monkeypatch.setattr(admission_controller, "max_lag", 0.1)
+
+            response = client.post("/events/process", json=REQUEST)
+            health = client.get("/health/")
+            ready = client.get("/health/ready")
+            shed = client.get("/health/metrics").json()
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["error_code"] == "OVERLOADED_LAG"
+        assert health.status_code == 200
+        assert ready.status_code == 200
+        assert shed['admission_shed_total{reason="lag"}'] >= 1
+
+    def test_admitted_request_releases_slot(self):
+        """Test de que una petición admitida libera su hueco"""
+        with TestClient(app) as client:
+            response = client.post("/events/process", json=REQUEST)
+
+        assert response.status_code == 200
+        assert admission_controller.inflight == 0
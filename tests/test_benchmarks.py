@@ -0,0 +1,68 @@
+"""
+Tests para las utilidades de benchmarks
+=======================================
+"""
+
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from benchmarks.harness import BenchmarkResult, compare_results, load_results, save_results
+from benchmarks.workloads import WorkloadSpec, generate_events
+
+
+class TestWorkloads:
+    """Tests para los generadores de cargas sintéticas"""
+
+    def test_future_fraction(self):
+        """Test de la proporción de eventos futuros"""
+        now = 1_700_000_000
+        events = generate_events(WorkloadSpec(num_events=100, future_fraction=0.3), now)
+
+        assert len(events) == 100
+        assert sum(1 for event in events if event["timestamp"] >= now) == 30
+
+    def test_data_size_and_unique_ids(self):
+        """Test del tamaño de data y de ids únicos sin duplicados"""
+        events = generate_events(WorkloadSpec(num_events=50, data_size=128))
+
+        assert all(len(event["data"]) == 128 for event in events)
+        assert len({event["event_id"] for event in events}) == 50
+
+    def test_duplicate_rate(self):
+        """Test de generación de ids duplicados"""
+        events = generate_events(WorkloadSpec(num_events=200, duplicate_rate=0.5))
+
+        assert len({event["event_id"] for event in events}) < 200
+
+    def test_reproducible(self):
+        """Test de que la misma semilla produce la misma carga"""
+        spec = WorkloadSpec(num_events=20, seed=7)
+        assert generate_events(spec, 1000) == generate_events(spec, 1000)
+
+
+class TestResultComparison:
+    """Tests para el guardado y la comparación de resultados"""
+
+    def test_compare_flags_regression(self, tmp_path):
+        """Test de detección de regresiones contra la línea base"""
+        baseline_file = tmp_path / "baseline.json"
+        current_file = tmp_path / "current.json"
+        save_results([
+            BenchmarkResult("fast", [100.0, 100.0]),
+            BenchmarkResult("slow", [100.0, 100.0]),
+        ], baseline_file)
+        save_results([
+            BenchmarkResult("fast", [50.0, 50.0]),
+            BenchmarkResult("slow", [200.0, 200.0]),
+        ], current_file)
+
+        rows = {row["name"]: row for row in compare_results(
+            load_results(baseline_file), load_results(current_file), threshold=0.1
+        )}
+
+        assert rows["fast"]["status"] == "improvement"
+        assert rows["slow"]["status"] == "regression"
+        assert rows["slow"]["change"] == pytest.approx(1.0)
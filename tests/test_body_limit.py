@@ -0,0 +1,140 @@
+"""
+Tests para el límite de tamaño del cuerpo
+=========================================
+"""
+
+import asyncio
+import json
+import time
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.body_limit import BodyLimitMiddleware
+from app.main import app
+from config.settings import settings
+
+
+async def echo_app(scope, receive, send):
+    message = await receive()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": message["body"]})
+
+
+def make_body(events: int, data: str = "x") -> bytes:
+    now = int(time.time())
+    return json.dumps({"events": [
+        {"event_id": f"e{i}", "timestamp": now + 60 + i, "data": data} for i in range(events)
+    ]}).encode()
+
+
+def call(middleware, body: bytes, chunk_size: int, headers=()):
+    """Envía el cuerpo en fragmentos y devuelve (estado, cuerpo, fragmentos leídos)."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)]
+    consumed = 0
+    sent = []
+
+    async def receive():
+        nonlocal consumed
+        consumed += 1
+        return {"type": "http.request", "body": chunks[consumed - 1],
+                "more_body": consumed < len(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": "POST", "path": "/events/process", "headers": list(headers)}
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"], b"".join(m.get("body", b"") for m in sent[1:]), consumed
+
+
+class TestBodyLimitMiddleware:
+    """Tests para el middleware de límite del cuerpo"""
+
+    def test_content_length_rejected_without_reading(self):
+        """Test de 413 por Content-Length sin leer el cuerpo"""
+        middleware = BodyLimitMiddleware(echo_app, max_bytes=100)
+
+        status, body, consumed = call(middleware, b"x" * 500, 50, [(b"content-length", b"500")])
+
+        assert status == 413
+        assert consumed == 0
+        assert json.loads(body)["error_code"] == "PAYLOAD_TOO_LARGE"
+
+    def test_streamed_bytes_rejected_early(self):
+        """Test de 413 en cuanto los bytes recibidos superan el límite (sin Content-Length)"""
+        middleware = BodyLimitMiddleware(echo_app, max_bytes=100)
+
+        status, _, consumed = call(middleware, b"x" * 1000, 50)
+
+        assert status == 413
+        assert consumed == 3
+
+    def test_events_counted_while_streaming(self):
+        """Test de 413 en cuanto se cuentan más eventos que el máximo"""
+        middleware = BodyLimitMiddleware(echo_app, max_bytes=10_000_000, max_events=10)
+        body = make_body(200)
+
+        status, _, consumed = call(middleware, body, 100)
+
+        assert status == 413
+        assert consumed < len(body) // 100 // 4
+
+    def test_event_key_split_between_chunks(self):
+        """Test de que una clave partida entre fragmentos se cuenta una sola vez"""
+        body = make_body(10)
+        for chunk_size in (1, 3, 7, 64):
+            assert call(BodyLimitMiddleware(echo_app, 10_000, max_events=10), body, chunk_size)[0] == 200
+            assert call(BodyLimitMiddleware(echo_app, 10_000, max_events=9), body, chunk_size)[0] == 413
+
+    def test_event_id_values_are_not_counted(self):
+        """Test de que un data con el valor "event_id" no cuenta como evento"""
+        body = make_body(10, data="event_id")
+        spaced = body.replace(b'"event_id": ', b'"event_id" \n :')
+        for payload in (body, spaced):
+            for chunk_size in (1, 5, 9, 10, 11, 64):
+                assert call(BodyLimitMiddleware(echo_app, 10_000, max_events=10), payload, chunk_size)[0] == 200
+                assert call(BodyLimitMiddleware(echo_app, 10_000, max_events=9), payload, chunk_size)[0] == 413
+
+    def test_accepted_body_is_forwarded(self):
+        """Test de que el cuerpo aceptado llega completo a la aplicación"""
+        body = make_body(5)
+
+        status, echoed, _ = call(BodyLimitMiddleware(echo_app, 10_000, max_events=5), body, 16)
+
+        assert status == 200
+        assert echoed == body
+
+
+class TestBodyLimitRoutes:
+    """Tests del límite con la configuración de la aplicación"""
+
+    def test_max_events_per_request(self):
+        """Test de que max_events_per_request se aplica con 413"""
+        client = TestClient(app)
+        limit = settings.max_events_per_request
+        headers = {"content-type": "application/json"}
+
+        accepted = client.post("/events/process", content=make_body(limit), headers=headers)
+        rejected = client.post("/events/process", content=make_body(limit + 1), headers=headers)
+
+        assert accepted.status_code == 200
+        assert rejected.status_code == 413
+
+    def test_event_id_values_within_limit(self):
+        """Test de que los valores "event_id" no llevan al 413 a un lote dentro del límite"""
+        client = TestClient(app)
+        body = make_body(settings.max_events_per_request * 6 // 10, data="event_id")
+
+        response = client.post("/events/process", content=body, headers={"content-type": "application/json"})
+
+        assert response.status_code == 200
+
+    def test_max_body_bytes(self):
+        """Test de 413 por tamaño con un único evento enorme"""
+        client = TestClient(app)
+        body = make_body(1, data="x" * settings.max_body_bytes)
+
+        assert client.post("/events/process", content=body).status_code == 413
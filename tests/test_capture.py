@@ -0,0 +1,113 @@
+"""
+Tests para la captura y reproducción de tráfico
+===============================================
+"""
+
+import asyncio
+import json
+import time
+import httpx
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.capture import CaptureRecord, CaptureWriter, TrafficCaptureMiddleware, read_capture
+from app.main import app
+from benchmarks.replay import plan_replay, replay, shift_body
+
+
+def _payload(*timestamps):
+    return {"events": [
+        {"event_id": f"evt_{index}", "timestamp": timestamp, "data": "Evento"}
+        for index, timestamp in enumerate(timestamps)
+    ]}
+
+
+async def _post_all(asgi_app, requests):
+    transport = httpx.ASGITransport(app=asgi_app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://localhost") as client:
+        for path, payload in requests:
+            await client.post(path, json=payload)
+
+
+def _capture(tmp_path, requests, sample_rate=1.0):
+    writer = CaptureWriter(str(tmp_path / "capture.jsonl.gz"), flush_interval=0.05)
+    writer.start()
+    asyncio.run(_post_all(TrafficCaptureMiddleware(app, writer, sample_rate=sample_rate), requests))
+    writer.close()
+    return writer
+
+
+class TestTrafficCapture:
+    """Tests para el middleware de captura"""
+
+    def test_capture_records_events_requests(self, tmp_path):
+        """Test de grabación de cuerpos, rutas y estados"""
+        now = int(time.time())
+        writer = _capture(tmp_path, [
+            ("/events/process", _payload(now + 3600)),
+            ("/process_events", _payload(now - 3600)),
+        ])
+
+        records = list(read_capture([writer.path]))
+
+        assert writer.written == 2
+        assert [record.path for record in records] == ["/events/process", "/process_events"]
+        assert [record.status for record in records] == [200, 204]
+        assert json.loads(records[0].body) == _payload(now + 3600)
+        assert records[0].t <= records[1].t
+
+    def test_capture_sampling_disabled(self, tmp_path):
+        """Test de muestreo al 0%: no se graba nada"""
+        writer = _capture(tmp_path, [("/events/process", _payload(int(time.time()) + 3600))], sample_rate=0.0)
+
+        assert writer.written == 0
+        assert list(read_capture([writer.path])) == []
+
+
+class TestReplay:
+    """Tests para la reproducción de capturas"""
+
+    def test_shift_body(self):
+        """Test de desplazamiento de timestamps"""
+        shifted = json.loads(shift_body(json.dumps(_payload(100, 200)), 50))
+
+        assert [event["timestamp"] for event in shifted["events"]] == [150, 250]
+        assert shift_body("no es json", 50) == b"no es json"
+
+    def test_plan_replay_as_of(self):
+        """Test del desplazamiento según el instante de evaluación"""
+        records = [
+            CaptureRecord(t=1000.0, method="POST", path="/events/process",
+                          body=json.dumps(_payload(1500)), status=200, duration_ms=1.0),
+            CaptureRecord(t=1010.0, method="POST", path="/events/process",
+                          body=json.dumps(_payload(1500)), status=200, duration_ms=1.0),
+        ]
+
+        per_record = plan_replay(records, start_wall=5000.0, speed=2.0)
+        common = plan_replay(records, start_wall=5000.0, speed=2.0, as_of=1000.0)
+
+        assert [offset for offset, _, _ in per_record] == [0.0, 5.0]
+        # Cada petición conserva su distancia original al "ahora" de la captura
+        assert json.loads(per_record[1][1].body)["events"][0]["timestamp"] == 1500 + 5005 - 1010
+        assert json.loads(common[1][1].body)["events"][0]["timestamp"] == 1500 + 5005 - 1000
+
+    def test_replay_reproduces_statuses(self, tmp_path):
+        """Test de que una captura antigua reproduce los mismos estados"""
+        now = int(time.time())
+        writer = _capture(tmp_path, [
+            ("/events/process", _payload(now + 5)),
+            ("/events/process", _payload(now - 5)),
+        ])
+        records = list(read_capture([writer.path]))
+        # Simular que la captura se hizo hace un día
+        for record in records:
+            record.t -= 86400
+            record.body = shift_body(record.body, -86400).decode()
+
+        summary = asyncio.run(replay("http://localhost", records, speed=0,
+                                     transport=httpx.ASGITransport(app=app)))
+
+        assert summary["requests"] == 2
+        assert summary["status_mismatches"] == 0
@@ -0,0 +1,242 @@
+"""
+Tests para la compresión de peticiones y respuestas
+===================================================
+"""
+
+import asyncio
+import gzip
+import json
+import time
+import zlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.compression import (
+    RequestDecompressionMiddleware,
+    ResponseCompressionMiddleware,
+    compress_bytes,
+    parse_accept_encoding,
+)
+from app.main import app
+
+
+def make_body(events: int) -> bytes:
+    now = int(time.time())
+    return json.dumps({"events": [
+        {"event_id": f"e{i}", "timestamp": now + 60 + i, "data": "x"} for i in range(events)
+    ]}).encode()
+
+
+def run_app(middleware, body: bytes = b"", headers=(), chunk_size: int = 1024, method: str = "POST"):
+    """Ejecuta el middleware y devuelve (estado, cabeceras, cuerpo, mensajes de cuerpo)."""
+    chunks = [body[i:i + chunk_size] for i in range(0, len(body), chunk_size)] or [b""]
+    sent = []
+
+    async def receive():
+        chunk = chunks.pop(0)
+        return {"type": "http.request", "body": chunk, "more_body": bool(chunks)}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {"type": "http", "method": method, "path": "/", "headers": list(headers)}
+    asyncio.run(middleware(scope, receive, send))
+    start = sent[0]
+    bodies = [m for m in sent[1:] if m["type"] == "http.response.body"]
+    return start["status"], dict(start["headers"]), b"".join(m["body"] for m in bodies), bodies
+
+
+async def echo_app(scope, receive, send):
+    """Devuelve el cuerpo recibido y su Content-Length declarado."""
+    message = await receive()
+    length = dict(scope["headers"]).get(b"content-length", b"")
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"x-content-length", length)]})
+    await send({"type": "http.response.body", "body": message["body"]})
+
+
+def json_app(body: bytes, status: int = 200, chunks: int = 1, content_type: bytes = b"application/json",
+             extra_headers=()):
+    async def inner(scope, receive, send):
+        await send({"type": "http.response.start", "status": status, "headers": [
+            (b"content-type", content_type), (b"content-length", str(len(body)).encode()), *extra_headers]})
+        step = max(1, len(body) // chunks)
+        parts = [body[i:i + step] for i in range(0, len(body), step)] or [b""]
+        for index, part in enumerate(parts):
+            await send({"type": "http.response.body", "body": part, "more_body": index < len(parts) - 1})
+    return inner
+
+
+class TestRequestDecompression:
+    """Tests de la descompresión de cuerpos de petición"""
+
+    def test_gzip_body_is_decompressed(self):
+        body = make_body(50)
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        status, headers, received, _ = run_app(middleware, gzip.compress(body),
+                                               [(b"content-encoding", b"gzip")], chunk_size=100)
+        assert status == 200
+        assert received == body
+        assert headers[b"x-content-length"] == str(len(body)).encode()
+
+    def test_deflate_body_is_decompressed(self):
+        body = make_body(10)
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        _, _, received, _ = run_app(middleware, zlib.compress(body), [(b"content-encoding", b"deflate")])
+        assert received == body
+
+    def test_zstd_body_is_decompressed(self):
+        zstandard = pytest.importorskip("zstandard")
+        body = make_body(50)
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        _, _, received, _ = run_app(middleware, zstandard.ZstdCompressor().compress(body),
+                                    [(b"content-encoding", b"zstd")])
+        assert received == body
+
+    def test_identity_passes_through(self):
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=10)
+        _, _, received, _ = run_app(middleware, b"plain")
+        assert received == b"plain"
+
+    def test_gzip_bomb_rejected_with_413(self):
+        bomb = gzip.compress(b"\0" * (50 * 1024 * 1024))  # ~50 KB comprimidos
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        started = time.perf_counter()
+        status, headers, body, _ = run_app(middleware, bomb, [(b"content-encoding", b"gzip")], chunk_size=65536)
+        assert status == 413
+        assert json.loads(body)["error_code"] == "PAYLOAD_TOO_LARGE"
+        assert headers[b"connection"] == b"close"
+        assert time.perf_counter() - started < 0.5  # Se corta sin descomprimir los 50 MB
+
+    def test_zstd_bomb_rejected_with_413(self):
+        zstandard = pytest.importorskip("zstandard")
+        bomb = zstandard.ZstdCompressor().compress(b"\0" * (50 * 1024 * 1024))
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        status, _, _, _ = run_app(middleware, bomb, [(b"content-encoding", b"zstd")])
+        assert status == 413
+
+    def test_unsupported_encoding_rejected_with_415(self):
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        status, _, body, _ = run_app(middleware, b"xx", [(b"content-encoding", b"compress")])
+        assert status == 415
+        assert json.loads(body)["error_code"] == "UNSUPPORTED_ENCODING"
+
+    def test_invalid_and_truncated_streams_rejected_with_400(self):
+        middleware = RequestDecompressionMiddleware(echo_app, max_bytes=1 << 20)
+        status, _, body, _ = run_app(middleware, b"not gzip", [(b"content-encoding", b"gzip")])
+        assert status == 400
+        assert json.loads(body)["error_code"] == "INVALID_ENCODING"
+
+        truncated = gzip.compress(make_body(20))[:-20]
+        status, _, _, _ = run_app(middleware, truncated, [(b"content-encoding", b"gzip")])
+        assert status == 400
+
+
+class TestResponseCompression:
+    """Tests de la compresión negociada de respuestas"""
+
+    BODY = json.dumps({"values": list(range(1000))}).encode()
+
+    def test_parse_accept_encoding(self):
+        assert parse_accept_encoding("gzip, br;q=0.5, zstd;q=0") == {"gzip": 1.0, "br": 0.5, "zstd": 0.0}
+
+    def test_negotiation_prefers_server_order_on_equal_quality(self):
+        middleware = ResponseCompressionMiddleware(echo_app, encodings=("zstd", "br", "gzip"))
+        assert middleware.negotiate("gzip") == "gzip"
+        assert middleware.negotiate("gzip;q=1, identity") == "gzip"
+        assert middleware.negotiate("") is None
+        assert middleware.negotiate("gzip;q=0") is None
+        if "zstd" in middleware.encodings:
+            assert middleware.negotiate("gzip, zstd") == "zstd"
+            assert middleware.negotiate("gzip, zstd;q=0.5") == "gzip"
+            assert middleware.negotiate("*") == "zstd"
+
+    @pytest.mark.parametrize("encoding", ["gzip", "zstd", "br"])
+    def test_large_json_response_is_compressed(self, encoding):
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY), encodings=(encoding,))
+        if encoding not in middleware.encodings:
+            pytest.skip(f"{encoding} no está instalado")
+        status, headers, body, _ = run_app(middleware, headers=[(b"accept-encoding", encoding.encode())])
+        assert status == 200
+        assert headers[b"content-encoding"] == encoding.encode()
+        assert headers[b"vary"] == b"Accept-Encoding"
+        assert int(headers[b"content-length"]) == len(body) < len(self.BODY)
+        if encoding == "gzip":
+            assert gzip.decompress(body) == self.BODY
+
+    def test_small_response_is_not_compressed(self):
+        middleware = ResponseCompressionMiddleware(json_app(b'{"ok": true}'), minimum_size=1024)
+        _, headers, body, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert b"content-encoding" not in headers
+        assert body == b'{"ok": true}'
+
+    def test_non_compressible_type_and_no_accept_are_untouched(self):
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY, content_type=b"image/png"))
+        _, headers, body, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert b"content-encoding" not in headers and body == self.BODY
+
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY))
+        _, headers, body, _ = run_app(middleware)
+        assert b"content-encoding" not in headers and body == self.BODY
+
+    def test_streaming_response_is_compressed_per_chunk(self):
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY, chunks=4), encodings=("gzip",))
+        _, headers, body, messages = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert headers[b"content-encoding"] == b"gzip"
+        assert b"content-length" not in headers
+        assert len(messages) >= 4
+        # Cada fragmento se vacía al cliente: lo recibido hasta el primero ya se descomprime
+        partial = zlib.decompressobj(16 + zlib.MAX_WBITS).decompress(messages[0]["body"])
+        assert partial and self.BODY.startswith(partial)
+        assert gzip.decompress(body) == self.BODY
+
+    def test_compressed_response_gets_its_own_etag(self):
+        etag = [(b"etag", b'"abc"')]
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY, extra_headers=etag), encodings=("gzip",))
+        _, headers, _, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert headers[b"etag"] == b'"abc-gzip"'
+
+        middleware = ResponseCompressionMiddleware(json_app(self.BODY, chunks=4, extra_headers=etag),
+                                                   encodings=("gzip",))
+        _, headers, _, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert headers[b"etag"] == b'"abc-gzip"'
+
+        middleware = ResponseCompressionMiddleware(json_app(b'{"ok": true}', extra_headers=etag), encodings=("gzip",))
+        _, headers, _, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip")])
+        assert headers[b"etag"] == b'"abc"'
+
+    def test_304_keeps_the_etag_the_client_sent(self):
+        etag = [(b"etag", b'"abc"')]
+        middleware = ResponseCompressionMiddleware(json_app(b"", status=304, extra_headers=etag), encodings=("gzip",))
+        _, headers, _, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip"),
+                                                        (b"if-none-match", b'"abc-gzip"')])
+        assert headers[b"etag"] == b'"abc-gzip"'
+
+        _, headers, _, _ = run_app(middleware, headers=[(b"accept-encoding", b"gzip"), (b"if-none-match", b'"abc"')])
+        assert headers[b"etag"] == b'"abc"'
+
+    def test_compress_bytes_roundtrip(self):
+        assert gzip.decompress(compress_bytes(self.BODY, "gzip", 6)) == self.BODY
+
+
+class TestCompressionEndpoints:
+    """Tests de la compresión en la aplicación completa"""
+
+    def test_gzip_request_to_process_events(self):
+        with TestClient(app) as client:
+            response = client.post("/events/process", content=gzip.compress(make_body(3)),
+                                   headers={"content-encoding": "gzip", "content-type": "application/json"})
+        assert response.status_code == 200
+        assert response.json()["event_id"] == "e2"
+
+    def test_openapi_response_is_gzipped(self):
+        with TestClient(app) as client:
+            response = client.get("/openapi.json", headers={"accept-encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "openapi" in response.json()  # httpx descomprime la respuesta
@@ -0,0 +1,90 @@
+"""
+Tests para las peticiones condicionales (ETag / If-None-Match)
+==============================================================
+"""
+
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.conditional import NONE_ETAG, cache_headers, encoded_etag, etag_matches, event_etag, max_age
+from app.main import app
+from app.models import Event
+from config.settings import settings
+
+client = TestClient(app)
+
+
+def payload(*timestamps, data="x"):
+    return {"events": [{"event_id": f"evt_{i}", "timestamp": ts, "data": data} for i, ts in enumerate(timestamps)]}
+
+
+class TestConditionalHelpers:
+    """Tests de las utilidades de ETag y Cache-Control"""
+
+    def test_etag_depends_on_result_identity(self):
+        event = Event(event_id="evt_1", timestamp=2_000_000_000, data="a")
+        assert event_etag(event) == event_etag(event.model_copy())
+        assert event_etag(event) != event_etag(event.model_copy(update={"timestamp": 2_000_000_001}))
+        assert event_etag(event) != event_etag(event.model_copy(update={"data": "b"}))
+        assert event_etag(None) == NONE_ETAG
+        assert event_etag(event).startswith('"') and event_etag(event).endswith('"')
+
+    def test_etag_matches(self):
+        assert etag_matches('"abc"', '"abc"')
+        assert etag_matches('"x", W/"abc"', '"abc"')
+        assert etag_matches("*", '"abc"')
+        assert not etag_matches('"abcd"', '"abc"')
+        assert not etag_matches(None, '"abc"')
+        assert etag_matches('"abc-gzip"', '"abc"')
+        assert etag_matches('W/"abc-zstd"', '"abc"')
+        assert not etag_matches('"abc-foo"', '"abc"')
+        assert encoded_etag('"abc"', "br") == '"abc-br"'
+
+    def test_max_age_until_winner_expires(self):
+        event = Event(event_id="evt_1", timestamp=1000, data="a")
+        assert max_age(event, now=900, limit=3600) == 100
+        assert max_age(event, now=900, limit=60) == 60
+        assert max_age(event, now=1000, limit=3600) == 0
+        assert max_age(None, now=900, limit=3600) == 3600
+        assert cache_headers(event, 900, 3600)["Cache-Control"] == "private, max-age=100"
+
+
+class TestConditionalEndpoints:
+    """Tests de If-None-Match en los endpoints de procesamiento"""
+
+    @pytest.mark.parametrize("path", ["/events/process", "/process_events"])
+    def test_304_when_result_unchanged(self, path):
+        future = int(time.time()) + 120
+        first = client.post(path, json=payload(future, future - 60))
+        assert first.status_code == 200
+        etag = first.headers["etag"]
+        assert 0 < int(first.headers["cache-control"].split("max-age=")[1]) <= 120
+
+        second = client.post(path, json=payload(future, future - 60), headers={"If-None-Match": etag})
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == etag
+
+    def test_200_when_result_changed(self):
+        future = int(time.time()) + 120
+        etag = client.post("/events/process", json=payload(future)).headers["etag"]
+        response = client.post("/events/process", json=payload(future + 10), headers={"If-None-Match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+
+    def test_no_winner_uses_none_etag(self):
+        past = int(time.time()) - 60
+        response = client.post("/events/process", json=payload(past))
+        assert response.status_code == 204
+        assert response.headers["etag"] == NONE_ETAG
+        assert response.headers["cache-control"] == f"private, max-age={settings.cache_max_age}"
+
+        response = client.post("/events/process", json=payload(past), headers={"If-None-Match": NONE_ETAG})
+        assert response.status_code == 304
+        assert response.headers["etag"] == NONE_ETAG
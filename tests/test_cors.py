@@ -0,0 +1,176 @@
+"""
+Tests para la capa de hosts confiables y CORS
+=============================================
+"""
+
+import asyncio
+
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.cors import HostAllowlist, HostCORSMiddleware
+from app.main import app
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200,
+                "headers": [(b"content-type", b"application/json"), (b"vary", b"Accept-Encoding")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+def call(middleware, method="GET", headers=(), scheme="http"):
+    """Ejecuta el middleware y devuelve (estado, cabeceras, cuerpo, si llegó a la app)."""
+    sent = []
+    reached = False
+
+    async def inner(scope, receive, send):
+        nonlocal reached
+        reached = True
+        await ok_app(scope, receive, send)
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    middleware.app = inner
+    scope = {"type": "http", "method": method, "scheme": scheme, "path": "/",
+             "headers": [(b"host", b"api.example.com")] + list(headers)}
+    asyncio.run(middleware(scope, receive, send))
+    return sent[0]["status"], dict(sent[0]["headers"]), sent[1]["body"], reached
+
+
+def make(**kwargs):
+    options = {"allowed_hosts": ["api.example.com"], "allow_origins": ["https://app.example.com"],
+               "allow_methods": ["GET", "POST"], "allow_headers": ["x-api-key"],
+               "allow_credentials": True, "max_age": 900, "expose_headers": ["ETag"]}
+    options.update(kwargs)
+    return HostCORSMiddleware(ok_app, **options)
+
+
+PREFLIGHT = [(b"origin", b"https://app.example.com"), (b"access-control-request-method", b"POST")]
+
+
+class TestHostAllowlist:
+    """Tests de la lista de hosts precompilada"""
+
+    def test_exact_wildcard_and_ports(self):
+        hosts = HostAllowlist(["localhost", "*.example.com", "[::1]"])
+        assert hosts.allows("localhost")
+        assert hosts.allows("LOCALHOST:8000")
+        assert hosts.allows("api.example.com:443")
+        assert not hosts.allows("example.com")  # El patrón solo cubre subdominios
+        assert not hosts.allows("evil-example.com")
+        assert hosts.allows("[::1]:8000")
+        assert not hosts.allows("otherhost")
+
+    def test_allow_all(self):
+        assert HostAllowlist(["*"]).allows("anything")
+
+
+class TestHostCORSMiddleware:
+    """Tests del middleware combinado"""
+
+    def test_untrusted_host_rejected(self):
+        middleware = make(allowed_hosts=["other.example.com"])
+        status, _, body, reached = call(middleware)
+        assert status == 400
+        assert body == b"Invalid host header"
+        assert not reached
+
+    def test_request_without_origin_is_untouched(self):
+        status, headers, _, reached = call(make())
+        assert status == 200 and reached
+        assert b"access-control-allow-origin" not in headers
+
+    def test_same_origin_short_circuit(self):
+        _, headers, _, reached = call(make(), headers=[(b"origin", b"https://api.example.com")], scheme="https")
+        assert reached
+        assert b"access-control-allow-origin" not in headers
+
+    def test_simple_request_gets_cors_headers(self):
+        _, headers, _, _ = call(make(), headers=[(b"origin", b"https://app.example.com")])
+        assert headers[b"access-control-allow-origin"] == b"https://app.example.com"
+        assert headers[b"access-control-allow-credentials"] == b"true"
+        assert headers[b"vary"] == b"Accept-Encoding, Origin"
+        assert headers[b"access-control-expose-headers"] == b"ETag"
+
+    def test_wildcard_without_credentials_uses_star(self):
+        middleware = make(allow_origins=["*"], allow_credentials=False)
+        _, headers, _, _ = call(middleware, headers=[(b"origin", b"https://any.example.org")])
+        assert headers[b"access-control-allow-origin"] == b"*"
+        assert headers[b"vary"] == b"Accept-Encoding"
+
+    def test_disallowed_origin_gets_no_cors_headers(self):
+        _, headers, _, reached = call(make(), headers=[(b"origin", b"https://evil.example.org")])
+        assert reached
+        assert b"access-control-allow-origin" not in headers
+
+    def test_preflight_answered_with_max_age(self):
+        status, headers, body, reached = call(make(), "OPTIONS",
+                                              PREFLIGHT + [(b"access-control-request-headers", b"X-API-Key")])
+        assert status == 200 and body == b"OK"
+        assert not reached
+        assert headers[b"access-control-max-age"] == b"900"
+        assert headers[b"access-control-allow-origin"] == b"https://app.example.com"
+        assert b"POST" in headers[b"access-control-allow-methods"]
+        assert b"x-api-key" in headers[b"access-control-allow-headers"]
+        assert b"access-control-expose-headers" not in headers
+
+    def test_preflight_headers_not_duplicated(self):
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = make()
+        scope = {"type": "http", "method": "OPTIONS", "scheme": "http", "path": "/",
+                 "headers": [(b"host", b"api.example.com")] + PREFLIGHT}
+        asyncio.run(middleware(scope, None, send))
+        names = [name for name, _ in sent[0]["headers"]]
+        assert len(names) == len(set(names))
+
+    def test_preflight_is_cached(self):
+        middleware = make()
+        call(middleware, "OPTIONS", PREFLIGHT)
+        call(middleware, "OPTIONS", PREFLIGHT)
+        assert len(middleware._preflights) == 1
+
+    def test_disallowed_preflight(self):
+        status, _, body, _ = call(make(), "OPTIONS", [
+            (b"origin", b"https://evil.example.org"),
+            (b"access-control-request-method", b"DELETE"),
+            (b"access-control-request-headers", b"x-other"),
+        ])
+        assert status == 400
+        assert body == b"Disallowed CORS origin, method, headers"
+
+    def test_wildcard_headers_echo_requested(self):
+        middleware = make(allow_headers=["*"])
+        _, headers, _, _ = call(middleware, "OPTIONS",
+                                PREFLIGHT + [(b"access-control-request-headers", b"x-custom, x-other")])
+        assert headers[b"access-control-allow-headers"] == b"x-custom, x-other"
+
+
+class TestHostCORSApp:
+    """Tests de la capa en la aplicación completa (configuración de test)"""
+
+    def test_preflight_on_events_process(self):
+        with TestClient(app) as client:
+            response = client.options("/events/process", headers={
+                "origin": "https://app.example.com",
+                "access-control-request-method": "POST",
+                "access-control-request-headers": "content-type",
+            })
+        assert response.status_code == 200
+        assert response.headers["access-control-allow-origin"] == "https://app.example.com"
+        assert response.headers["access-control-max-age"] == "600"
+
+    def test_untrusted_host(self):
+        with TestClient(app) as client:
+            response = client.get("/health/", headers={"host": "evil.example.org"})
+        assert response.status_code == 400
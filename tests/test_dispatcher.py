@@ -0,0 +1,250 @@
+"""
+Tests para la rueda de temporizadores y el despachador de eventos vencidos
+==========================================================================
+"""
+
+import asyncio
+import json
+import random
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.dispatcher import DueEventDispatcher, WebhookSink
+from app.main import app, create_dispatcher, lock_dispatcher
+from app.models import Event
+from app.storage import EventStore
+from app.timer_wheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def events(*timestamps, prefix="e"):
+    return [Event(event_id=f"{prefix}{i}", timestamp=ts, data=f"d{i}") for i, ts in enumerate(timestamps)]
+
+
+class TestTimerWheel:
+    """Tests de la rueda de temporizadores"""
+
+    def test_matches_brute_force(self):
+        """Inserciones, cancelaciones y avances aleatorios frente a un dict"""
+        rng = random.Random(7)
+        for _ in range(50):
+            now = rng.randint(0, 10 ** 9)
+            wheel, pending = TimerWheel(now), {}
+            for _ in range(300):
+                op = rng.random()
+                if op < 0.5:
+                    event_id = f"e{rng.randint(0, 300)}"
+                    timestamp = now + rng.choice([rng.randint(-5, 70), rng.randint(0, 5000), rng.randint(0, 10 ** 7)])
+                    wheel.insert(event_id, timestamp)
+                    pending[event_id] = timestamp
+                elif op < 0.6 and pending:
+                    event_id = rng.choice(list(pending))
+                    assert wheel.cancel(event_id)
+                    del pending[event_id]
+                else:
+                    previous = now
+                    now += rng.choice([1, 2, 63, 64, 65, 4096, rng.randint(0, 10 ** 6)])
+                    wheel.advance(now)
+                    due = wheel.pop_due(10 ** 9)
+                    # Lo que vence al avanzar sale en orden (lo insertado ya vencido sale antes, tal cual)
+                    expired = [ts for _, ts, _ in due if ts > previous]
+                    assert expired == sorted(expired)
+                    for event_id, timestamp, _ in due:
+                        assert pending.pop(event_id) == timestamp <= now
+                    assert all(timestamp > now for timestamp in pending.values())
+            assert len(wheel) == len(pending)
+
+    def test_big_jump_skips_empty_ticks(self):
+        wheel = TimerWheel(0)
+        wheel.insert("far", 10 ** 8)
+        started = time.perf_counter()
+        assert wheel.advance(10 ** 8 - 1) == 0
+        assert wheel.advance(10 ** 8) == 1
+        assert time.perf_counter() - started < 0.1  # No recorre 10^8 ticks
+
+    def test_clock_going_back_does_not_refire(self):
+        wheel = TimerWheel(100)
+        wheel.insert("a", 101)
+        wheel.advance(105)
+        assert [entry[0] for entry in wheel.pop_due(10)] == ["a"]
+        assert wheel.advance(50) == 0 and wheel.tick == 105
+        wheel.insert("late", 60)  # Ya vencido respecto al tick actual
+        assert wheel.due_count == 1
+
+    def test_cancel_due_and_reschedule(self):
+        wheel = TimerWheel(0)
+        wheel.insert("a", 5, "x")
+        wheel.insert("a", 500, "y")  # Reprogramar
+        wheel.advance(5)
+        assert wheel.pop_due(10) == []
+        wheel.advance(500)
+        assert wheel.cancel("a") and not wheel.cancel("a")
+        assert wheel.pop_due(10) == [] and len(wheel) == 0
+
+    def test_pop_due_is_bounded(self):
+        wheel = TimerWheel(0)
+        for i in range(10):
+            wheel.insert(f"e{i}", 1)
+        wheel.advance(1)
+        assert len(wheel.pop_due(4)) == 4
+        assert wheel.due_count == 6
+
+
+class TestDueEventDispatcher:
+    """Tests del despachador"""
+
+    def test_delivers_due_events_in_batches(self):
+        clock = FakeClock(1000)
+        dispatcher = DueEventDispatcher(batch_size=2, clock=clock)
+        received = []
+
+        async def collect(batch):
+            received.append([event.event_id for event in batch])
+
+        async def scenario():
+            dispatcher.subscribe(collect)
+            dispatcher.start()
+            assert dispatcher.schedule(events(1001, 1001, 1001, 1005, 999)) == 4  # El pasado se ignora
+            clock.now = 1002
+            await dispatcher.tick()
+            await asyncio.sleep(0.01)
+            dispatcher.stop()
+
+        asyncio.run(scenario())
+        assert received == [["e0", "e1"], ["e2"]]
+        assert len(dispatcher.wheel) == 1
+
+    def test_missed_ticks_are_delivered_in_order(self):
+        clock = FakeClock(0)
+        dispatcher = DueEventDispatcher(batch_size=100, clock=clock)
+        received = []
+
+        async def collect(batch):
+            received.extend(event.timestamp for event in batch)
+
+        async def scenario():
+            dispatcher.subscribe(collect)
+            dispatcher.start()
+            dispatcher.schedule(events(300, 5, 70, 4000))
+            missed_before = dispatcher._missed.value
+            clock.now = 3600  # El proceso estuvo parado una hora
+            await dispatcher.tick()
+            await asyncio.sleep(0.01)
+            dispatcher.stop()
+            return dispatcher._missed.value - missed_before
+
+        assert asyncio.run(scenario()) > 0
+        assert received == [5, 70, 300]
+
+    def test_drop_policy_bounds_slow_subscriber(self):
+        clock = FakeClock(0)
+        dispatcher = DueEventDispatcher(batch_size=1, clock=clock)
+
+        async def scenario():
+            gate = asyncio.Event()
+            delivered = []
+
+            async def slow(batch):
+                await gate.wait()
+                delivered.append(batch[0].event_id)
+
+            subscriber = dispatcher.subscribe(slow, name="slow", policy="drop", max_batches=2)
+            dispatcher.start()
+            dropped_before = subscriber._dropped.value
+            dispatcher.schedule(events(*[1] * 10))
+            clock.now = 1
+            await asyncio.wait_for(dispatcher.tick(), 1)  # Con "drop" nunca se bloquea
+            assert subscriber.queue.qsize() <= 2
+            gate.set()
+            await asyncio.sleep(0.01)
+            dispatcher.stop()
+            return delivered, subscriber._dropped.value - dropped_before
+
+        delivered, dropped = asyncio.run(scenario())
+        # El reparto no cede el loop: quedan los dos últimos lotes y el resto se descarta
+        assert delivered == ["e8", "e9"] and dropped == 8
+
+    def test_block_policy_applies_backpressure(self):
+        clock = FakeClock(0)
+        dispatcher = DueEventDispatcher(batch_size=1, clock=clock)
+
+        async def scenario():
+            gate = asyncio.Event()
+            delivered = []
+
+            async def slow(batch):
+                await gate.wait()
+                delivered.extend(batch)
+
+            dispatcher.subscribe(slow, max_batches=1)
+            dispatcher.start()
+            dispatcher.schedule(events(*[1] * 5))
+            clock.now = 1
+            tick = asyncio.create_task(dispatcher.tick())
+            await asyncio.sleep(0.01)
+            assert not tick.done()
+            assert dispatcher.wheel.due_count > 0  # Lo que falta espera en la rueda
+            gate.set()
+            await asyncio.wait_for(tick, 1)
+            await asyncio.sleep(0.01)
+            dispatcher.stop()
+            assert len(delivered) == 5  # Nada se descarta
+
+        asyncio.run(scenario())
+
+    def test_webhook_sink_posts_batches(self, monkeypatch):
+        sink = WebhookSink("http://127.0.0.1:9/hook")
+        bodies = []
+        monkeypatch.setattr(sink, "_post", lambda body: bodies.append(json.loads(body)) or 204)
+        asyncio.run(sink(events(10)))
+        assert bodies == [{"events": [{"event_id": "e0", "timestamp": 10, "data": "d0"}]}]
+
+        monkeypatch.setattr(sink, "_post", lambda body: 500)
+        with pytest.raises(RuntimeError, match="500"):
+            asyncio.run(sink(events(10)))
+
+
+class TestDispatcherIntegration:
+    """Tests del despachador con el almacén y los endpoints"""
+
+    def test_schedules_stored_and_new_events(self, tmp_path):
+        now = int(time.time())
+        store = EventStore.open(str(tmp_path), fsync=False)
+        store.submit(events(now + 100, now - 100, now + 200)).result()
+
+        dispatcher = asyncio.run(create_dispatcher(store))
+        assert sorted(dispatcher.wheel._index) == ["e0", "e2"]  # Solo los futuros
+
+        app.state.event_store = store
+        app.state.dispatcher = dispatcher
+        try:
+            with TestClient(app) as client:
+                event = {"event_id": "new", "timestamp": now + 50, "data": "x"}
+                assert client.post("/events/store", json={"events": [event]}).status_code == 201
+            assert "new" in dispatcher.wheel
+        finally:
+            app.state.event_store = None
+            app.state.dispatcher = None
+
+    def test_single_dispatching_process(self, tmp_path):
+        """Test de que un segundo proceso no puede despachar el mismo directorio"""
+        first = lock_dispatcher(str(tmp_path))
+        try:
+            with pytest.raises(RuntimeError, match="un solo worker"):
+                lock_dispatcher(str(tmp_path))
+        finally:
+            first.close()
+        lock_dispatcher(str(tmp_path)).close()  # Liberado al cerrar
@@ -0,0 +1,116 @@
+"""
+Tests para los carriles de prioridad
+====================================
+"""
+
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.lanes import Lane, LaneFullError, PriorityLanes
+from app.main import app
+from app.metrics import metrics
+from config.settings import settings
+
+
+def make_lanes() -> PriorityLanes:
+    return PriorityLanes(Lane("small", 2, 4), Lane("large", 1, 1), large_events=100, large_bytes=10_000)
+
+
+class TestClassification:
+    """Tests para la clasificación por tamaño"""
+
+    @pytest.mark.parametrize("headers,lane", [
+        ({"content-length": "500"}, "small"),
+        ({"content-length": "50000"}, "large"),
+        ({"x-event-count": "5", "content-length": "500"}, "small"),
+        ({"x-event-count": "500", "content-length": "500"}, "large"),
+        ({"x-event-count": "5", "content-length": "50000"}, "large"),  # Declaración engañosa
+        ({}, "large"),  # Sin tamaño conocido
+        ({"x-event-count": "muchos", "content-length": "500"}, "small"),
+    ])
+    def test_classify(self, headers, lane):
+        """Test de elección de carril según las cabeceras"""
+        assert make_lanes().classify(headers).name == lane
+
+
+class TestLane:
+    """Tests para la ejecución en un carril"""
+
+    def test_runs_in_lane_thread_and_records_queue_time(self):
+        """Test de ejecución fuera del event loop con métrica de espera"""
+        lane = Lane("test", 1, 1)
+        key = 'lane_queue_seconds{lane="test"}'
+
+        name = asyncio.run(lane.run(lambda: threading.current_thread().name))
+
+        assert name.startswith("lane-test")
+        assert metrics.snapshot()[key]["count"] == 1
+        assert lane.pending == 0
+        lane.shutdown()
+
+    def test_full_lane_rejects(self):
+        """Test de rechazo cuando el carril y su cola están llenos"""
+        lane = Lane("full", 1, 1)
+        release = threading.Event()
+
+        async def scenario():
+            running = [asyncio.create_task(lane.run(release.wait)) for _ in range(2)]
+            await asyncio.sleep(0.01)
+            with pytest.raises(LaneFullError):
+                await lane.run(time.time)
+            release.set()
+            await asyncio.gather(*running)
+
+        asyncio.run(scenario())
+        lane.shutdown()
+
+
+class TestLaneRoutes:
+    """Tests para el procesamiento con y sin carriles"""
+
+    def payload(self):
+        now = int(time.time())
+        return {"events": [
+            {"event_id": "e1", "timestamp": now + 60, "data": "a"},
+            {"event_id": "e2", "timestamp": now + 120, "data": "b"},
+        ]}
+
+    def test_inline_without_lanes(self, monkeypatch):
+        """Test de que sin carriles se procesa en el event loop con el mismo resultado"""
+        monkeypatch.setattr(app.state, "lanes", None)
+        client = TestClient(app)
+
+        response = client.post("/events/process", json=self.payload())
+
+        assert response.status_code == 200
+        assert response.json()["event_id"] == "e2"
+
+    def test_full_lane_returns_429(self, monkeypatch):
+        """Test de 429 con el Retry-After configurado cuando el carril está lleno"""
+        lanes = make_lanes()
+        monkeypatch.setattr(lanes.small, "pending", 6)
+        monkeypatch.setattr(app.state, "lanes", lanes)
+        monkeypatch.setattr(settings, "admission_retry_after", 7)
+        client = TestClient(app)
+
+        response = client.post("/events/process", json=self.payload())
+
+        assert response.status_code == 429
+        assert response.headers["retry-after"] == "7"
+
+    def test_openapi_documents_request_body(self):
+        """Test de que OpenAPI sigue documentando EventsRequest en ambos endpoints"""
+        schema = TestClient(app).get("/openapi.json").json()
+
+        for path in ("/events/process", "/process_events"):
+            body = schema["paths"][path]["post"]["requestBody"]["content"]["application/json"]["schema"]
+            assert body["title"] == "EventsRequest"
+            assert body["properties"]["events"]["items"]["$ref"] == "#/components/schemas/Event"
+        assert "Event" in schema["components"]["schemas"]
@@ -0,0 +1,177 @@
+"""
+Tests de las suscripciones en vivo al evento futuro más próximo
+===============================================================
+"""
+
+import asyncio
+import json
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.live import LatestEventHub, LiveSubscription
+from app.main import app
+from app.models import Event
+from app.storage import EventStore, SQLiteEventStore
+
+
+class FakeClock:
+    def __init__(self, now: float):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def write(store, events):
+    if isinstance(store, SQLiteEventStore):
+        store.insert(events)
+    else:
+        store.submit(events).result()
+
+
+@pytest.fixture(params=["wal", "sqlite"])
+def any_store(request, tmp_path):
+    if request.param == "wal":
+        store = EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=0)
+    else:
+        store = SQLiteEventStore.open(str(tmp_path), fsync=False)
+    yield store
+    store.close()
+
+
+class TestLiveSubscription:
+    """Tests de la cola de envío de cada conexión"""
+
+    def test_coalesce_keeps_only_latest(self):
+        subscription = LiveSubscription("coalesce")
+        assert subscription.push("a")
+        assert not subscription.push("b")
+        assert asyncio.run(subscription.next()) == ["b"]
+
+    def test_drop_keeps_newest_messages(self):
+        subscription = LiveSubscription("drop", max_messages=2)
+        results = [subscription.push(message) for message in "abcd"]
+        assert results == [True, True, False, False]
+        assert asyncio.run(subscription.next()) == ["c", "d"]
+
+    def test_next_waits_for_push(self):
+        async def scenario():
+            subscription = LiveSubscription()
+            waiting = asyncio.create_task(subscription.next())
+            await asyncio.sleep(0)
+            assert not waiting.done()
+            subscription.push("x")
+            return await asyncio.wait_for(waiting, 1)
+
+        assert asyncio.run(scenario()) == ["x"]
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            LiveSubscription("block")
+
+
+class TestLatestEventHub:
+    """Tests del cálculo y reparto de cambios"""
+
+    def test_publishes_only_winner_changes(self, any_store):
+        clock = FakeClock(1000)
+        hub = LatestEventHub(any_store, clock=clock)
+
+        async def scenario():
+            subscription = hub.subscribe()
+            assert await subscription.next() == ['{"seq":0,"event":null}']
+
+            write(any_store, [Event(event_id="a", timestamp=2000, data="x")])
+            assert await hub.refresh()
+            write(any_store, [Event(event_id="b", timestamp=1500, data="y")])  # No cambia el ganador
+            assert not await hub.refresh()
+            write(any_store, [Event(event_id="c", timestamp=3000, data="z")])
+            assert await hub.refresh()
+            return await subscription.next()
+
+        messages = asyncio.run(scenario())
+        # Con "coalesce" solo queda el último cambio pendiente
+        assert [json.loads(message) for message in messages] == [
+            {"seq": 2, "event": {"event_id": "c", "timestamp": 3000, "data": "z"}}
+        ]
+
+    def test_winner_expires_with_time(self, any_store):
+        clock = FakeClock(1000)
+        write(any_store, [Event(event_id="a", timestamp=1001, data="x")])
+        hub = LatestEventHub(any_store, refresh_interval=60, clock=clock)
+
+        async def scenario():
+            await hub.start()
+            assert hub.current.event_id == "a"
+            assert hub._timeout() == 2  # Se despierta justo cuando deja de ser futuro (1002)
+            clock.now = 1002
+            subscription = hub.subscribe("drop")
+            await subscription.next()
+            hub.notify()
+            messages = await asyncio.wait_for(subscription.next(), 1)
+            hub.stop()
+            return messages
+
+        assert [json.loads(message) for message in asyncio.run(scenario())] == [{"seq": 2, "event": None}]
+
+    def test_fanout_shares_one_message(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False)
+        hub = LatestEventHub(store, clock=FakeClock(0))
+        subscriptions = [hub.subscribe() for _ in range(1000)]
+        write(store, [Event(event_id="a", timestamp=10, data="x")])
+        assert asyncio.run(hub.refresh())
+        pending = {id(subscription._pending[-1]) for subscription in subscriptions}
+        assert pending == {id(hub.message)}  # Serializado una sola vez
+        store.close()
+
+    def test_max_subscribers(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False)
+        hub = LatestEventHub(store, max_subscribers=2)
+        first, _ = hub.subscribe(), hub.subscribe()
+        assert hub.subscribe() is None
+        hub.unsubscribe(first)
+        assert hub.subscribe() is not None
+        store.close()
+
+
+class TestSubscribeEndpoint:
+    """Tests del WebSocket /events/subscribe"""
+
+    def test_pushes_changes(self, any_store):
+        now = int(time.time())
+        write(any_store, [Event(event_id="a", timestamp=now + 1000, data="x")])
+        app.state.event_store = any_store
+        try:
+            with TestClient(app) as client:
+                app.state.live_hub = LatestEventHub(any_store)
+                client.portal.call(app.state.live_hub.start)
+                with client.websocket_connect("/events/subscribe") as websocket:
+                    assert websocket.receive_json()["event"]["event_id"] == "a"
+                    event = {"event_id": "b", "timestamp": now + 2000, "data": "y"}
+                    assert client.post("/events/store", json={"events": [event]}).status_code == 201
+                    assert websocket.receive_json() == {"seq": 2, "event": event}
+                assert not app.state.live_hub.subscribers  # La desconexión da de baja
+        finally:
+            app.state.event_store = None
+            app.state.live_hub = None
+
+    def test_closes_without_store(self):
+        with TestClient(app) as client:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                with client.websocket_connect("/events/subscribe") as websocket:
+                    websocket.receive_text()
+            assert exc_info.value.code == 1011
+
+    def test_rejects_unknown_policy(self):
+        with TestClient(app) as client:
+            with pytest.raises(WebSocketDisconnect) as exc_info:
+                with client.websocket_connect("/events/subscribe?policy=block") as websocket:
+                    websocket.receive_text()
+            assert exc_info.value.code == 1008
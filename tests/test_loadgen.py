@@ -0,0 +1,94 @@
+"""
+Tests para el generador de carga HTTP
+=====================================
+"""
+
+import asyncio
+import pytest
+import httpx
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+import benchmarks.loadgen as loadgen
+from benchmarks.loadgen import find_saturation, is_sustainable, parse_mix, percentile, run_load
+
+
+class TestLoadgenHelpers:
+    """Tests para las utilidades del generador de carga"""
+
+    def test_percentile_nearest_rank(self):
+        """Test del percentil por rango más cercano"""
+        values = list(range(1, 101))
+
+        assert percentile(values, 50) == 50
+        assert percentile(values, 99) == 99
+        assert percentile(values, 99.9) == 100
+        assert percentile([], 50) == 0.0
+
+    def test_parse_mix(self):
+        """Test de interpretación de la mezcla de carga"""
+        entries = parse_mix("process:small=3,legacy:large=1,health")
+
+        assert [(template.path, weight) for template, weight in entries] == [
+            ("/events/process", 3.0),
+            ("/process_events", 1.0),
+            ("/health/", 1.0),
+        ]
+        assert entries[0][0].body is not None
+        assert entries[2][0].body is None
+
+    def test_parse_mix_unknown_endpoint(self):
+        """Test de mezcla con endpoint desconocido"""
+        with pytest.raises(ValueError, match="Endpoint desconocido"):
+            parse_mix("unknown=1")
+
+    def test_is_sustainable(self):
+        """Test del criterio de tasa sostenible"""
+        summary = {"error_rate": 0.0, "latency_ms": {"p99": 20.0}, "target_rate": 100, "achieved_rate": 99}
+
+        assert is_sustainable(summary, slo_p99_ms=50, max_error_rate=0.01)
+        assert not is_sustainable(summary, slo_p99_ms=10, max_error_rate=0.01)
+        assert not is_sustainable({**summary, "achieved_rate": 50}, slo_p99_ms=50, max_error_rate=0.01)
+
+    @pytest.mark.parametrize("limit, expected", [(300, (200, 300)), (20, (18, 20)), (0, (0, 0))])
+    def test_find_saturation(self, monkeypatch, limit, expected):
+        """Test de la búsqueda, también cuando la tasa inicial ya no es sostenible"""
+        class FakeResult:
+            def __init__(self, rate):
+                self.rate = rate
+
+            def summary(self):
+                p99 = 10.0 if self.rate <= limit else 500.0
+                return {"error_rate": 0.0, "latency_ms": {"p99": p99}, "target_rate": self.rate,
+                        "achieved_rate": self.rate}
+
+        async def fake_run_load(base_url, rate, duration, mix):
+            return FakeResult(rate)
+
+        monkeypatch.setattr(loadgen, "run_load", fake_run_load)
+        report = asyncio.run(find_saturation("http://test", start_rate=50, precision=0.1))
+
+        low, high = expected
+        assert low <= report["max_sustainable_rate"] <= high
+        assert len(report["stages"]) < 20
+
+
+class TestRunLoad:
+    """Tests de carga contra la aplicación en el mismo proceso"""
+
+    def test_run_load_in_process(self):
+        """Test de una ejecución corta a tasa fija"""
+        transport = httpx.ASGITransport(app=app)
+        result = asyncio.run(run_load(
+            "http://localhost", rate=100, duration=0.2,
+            mix="process:small=1,legacy:small=1,health=1", transport=transport,
+        ))
+        summary = result.summary()
+
+        assert summary["requests"] == 20
+        assert summary["errors"] == 0
+        assert set(summary["latency_ms"]) == {"p50", "p90", "p99", "p99.9"}
+        assert summary["latency_ms"]["p99"] >= summary["service_time_ms"]["p50"]
@@ -0,0 +1,220 @@
+"""
+Tests de las particiones del almacén por espacio de nombres
+===========================================================
+"""
+
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+from config.settings import settings
+from app.models import Event
+from app.storage import (DEFAULT_NAMESPACE, EventStore, PartitionedStore, PartitionLimitError, PartitionQuotaError,
+                         SQLiteEventStore)
+
+
+class FakeClock:
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def events(prefix: str, count: int, base: int = None):
+    base = int(time.time()) + 3600 if base is None else base
+    return [Event(event_id=f"{prefix}{i}", timestamp=base + i, data=prefix) for i in range(count)]
+
+
+def opener(backend: str):
+    def open_store(directory: str):
+        if backend == "sqlite":
+            return SQLiteEventStore.open(directory, fsync=False)
+        return EventStore.open(directory, fsync=False, snapshot_bytes=0)
+    return open_store
+
+
+@pytest.fixture(params=["wal", "sqlite"])
+def registry(request, tmp_path):
+    registry = PartitionedStore.open(str(tmp_path), opener(request.param), clock=FakeClock(), idle_seconds=60)
+    yield registry
+    registry.close()
+
+
+def store_in(registry, namespace, batch):
+    async def scenario():
+        partition = await registry.acquire(namespace)
+        try:
+            return await partition.append(batch)
+        finally:
+            registry.release(partition)
+    return asyncio.run(scenario())
+
+
+def latest_in(registry, namespace):
+    async def scenario():
+        partition = await registry.acquire(namespace)
+        try:
+            return await partition.store.latest()
+        finally:
+            registry.release(partition)
+    return asyncio.run(scenario())
+
+
+class TestPartitionedStore:
+    """Tests del registro de particiones, con los dos backends"""
+
+    def test_namespaces_are_independent(self, registry, tmp_path):
+        store_in(registry, "a", events("x", 3))
+        store_in(registry, "b", events("x", 5))  # Mismos event_ids en otro espacio
+        assert latest_in(registry, "a").event_id == "x2"
+        assert latest_in(registry, "b").event_id == "x4"
+        assert latest_in(registry, DEFAULT_NAMESPACE) is None
+        assert (tmp_path / "namespaces" / "a").is_dir()
+        assert sorted(registry.namespaces()) == ["a", "b", DEFAULT_NAMESPACE]
+
+    def test_invalid_namespace(self, registry):
+        for namespace in ("../x", "", "a/b", "a\n"):
+            with pytest.raises(ValueError):
+                registry.directory_for(namespace)
+
+    def test_idle_partitions_close_and_reopen(self, registry):
+        store_in(registry, "a", events("x", 3))
+
+        async def hold():
+            return await registry.acquire("b")
+
+        held = asyncio.run(hold())
+        registry.clock.now = 100
+        assert registry.close_idle() == 1  # "a"; "b" está en uso y default no se cierra
+        assert sorted(registry.namespaces()) == ["b", DEFAULT_NAMESPACE]
+        registry.release(held)
+        assert registry.close_idle() == 0  # "b" acaba de usarse
+        assert latest_in(registry, "a").event_id == "x2"  # Reabierta desde disco
+
+    def test_max_partitions_closes_least_recent(self, tmp_path):
+        clock = FakeClock()
+        registry = PartitionedStore.open(str(tmp_path), opener("wal"), max_partitions=3, clock=clock)
+        for now, namespace in enumerate(("a", "b")):
+            clock.now = now
+            store_in(registry, namespace, events("x", 1))
+        clock.now = 5
+        store_in(registry, "c", events("x", 1))
+        assert sorted(registry.namespaces()) == ["b", "c", DEFAULT_NAMESPACE]
+
+        async def hold_all():
+            return [await registry.acquire(namespace) for namespace in ("b", "c")]
+
+        held = asyncio.run(hold_all())
+        with pytest.raises(PartitionLimitError):
+            asyncio.run(registry.acquire("d"))
+        for partition in held:
+            registry.release(partition)
+        registry.close()
+
+    def test_quota(self, tmp_path):
+        registry = PartitionedStore.open(str(tmp_path), opener("wal"), max_events=10)
+
+        async def scenario():
+            partition = await registry.acquire("q")
+            try:
+                # Los lotes concurrentes cuentan para la cuota aunque aún no estén confirmados
+                results = await asyncio.gather(*(partition.append(events(f"b{i}_", 4)) for i in range(3)),
+                                               return_exceptions=True)
+                return results, len(partition.store)
+            finally:
+                registry.release(partition)
+
+        results, stored = asyncio.run(scenario())
+        assert results[:2] == [4, 4] and isinstance(results[2], PartitionQuotaError)
+        assert stored == 8
+        store_in(registry, "other", events("y", 10))  # La cuota es por partición
+        registry.close()
+
+    @pytest.mark.parametrize("backend", ["wal", "sqlite"])
+    def test_bytes_quota(self, tmp_path, backend):
+        big = [Event(event_id=f"big{i}", timestamp=int(time.time()) + 3600, data="x" * 400) for i in range(2)]
+        registry = PartitionedStore.open(str(tmp_path), opener(backend), max_bytes=1000)
+        try:
+            assert store_in(registry, "q", big) == 2
+            # Pocos eventos pero grandes: la cuota de bytes los rechaza
+            with pytest.raises(PartitionQuotaError, match="bytes"):
+                store_in(registry, "q", [Event(event_id="one", timestamp=big[0].timestamp, data="x" * 400)])
+            store_in(registry, "q", events("s", 2))  # Los pequeños aún caben
+            store_in(registry, "other", big)  # La cuota es por partición
+        finally:
+            registry.close()
+
+    def test_eviction_covers_every_partition(self, registry):
+        store_in(registry, "a", events("old", 3, base=100) + events("new", 2, base=500))
+        store_in(registry, DEFAULT_NAMESPACE, events("old", 4, base=50))
+        assert registry.oldest_timestamp() == 50
+        assert registry.evict_expired(200, max_pass=1.0) == 7
+        assert registry.oldest_timestamp() == 500
+
+
+@pytest.fixture
+def partitioned_client(tmp_path):
+    registry = PartitionedStore.open(str(tmp_path), opener("wal"), max_events=5)
+    app.state.partitions, app.state.event_store = registry, registry.default
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.state.partitions = app.state.event_store = None
+        registry.close()
+
+
+class TestPartitionEndpoints:
+    """Tests del parámetro namespace de los endpoints del almacén"""
+
+    def test_store_and_latest_per_namespace(self, partitioned_client):
+        future = int(time.time()) + 3600
+        for namespace, timestamp in (("t1", future), ("t2", future + 10)):
+            body = {"events": [{"event_id": "same", "timestamp": timestamp, "data": namespace}]}
+            response = partitioned_client.post("/events/store", params={"namespace": namespace}, json=body)
+            assert response.json() == {"stored": 1, "total": 1}
+        assert partitioned_client.get("/events/latest", params={"namespace": "t1"}).json()["data"] == "t1"
+        assert partitioned_client.get("/events/latest", params={"namespace": "t2"}).json()["data"] == "t2"
+        assert partitioned_client.get("/events/latest").status_code == 204
+        page = partitioned_client.get("/events/range", params={"namespace": "t2", "start": 0, "end": 2 ** 40})
+        assert [event["data"] for event in page.json()["events"]] == ["t2"]
+        export = partitioned_client.get("/events/range/export", params={"namespace": "t1", "start": 0,
+                                                                        "end": 2 ** 40})
+        assert export.text.count("\n") == 1
+
+    def test_quota_exceeded(self, partitioned_client):
+        body = {"events": [{"event_id": f"e{i}", "timestamp": 100, "data": "x"} for i in range(6)]}
+        response = partitioned_client.post("/events/store", params={"namespace": "small"}, json=body)
+        assert response.status_code == 507
+        assert "Cuota" in response.json()["detail"]
+
+    def test_partition_limit_retry_after(self, partitioned_client, monkeypatch):
+        async def full(namespace):
+            raise PartitionLimitError("todas en uso")
+
+        monkeypatch.setattr(settings, "admission_retry_after", 7)
+        monkeypatch.setattr(app.state.partitions, "acquire", full)
+        response = partitioned_client.get("/events/latest", params={"namespace": "busy"})
+        assert response.status_code == 503
+        assert response.headers["retry-after"] == "7"
+
+    def test_invalid_namespace(self, partitioned_client):
+        assert partitioned_client.get("/events/latest", params={"namespace": "../etc"}).status_code == 422
+
+    def test_without_registry(self, tmp_path):
+        app.state.event_store = EventStore.open(str(tmp_path), fsync=False)
+        try:
+            with TestClient(app) as client:
+                assert client.get("/events/latest").status_code == 204
+                assert client.get("/events/latest", params={"namespace": "other"}).status_code == 503
+        finally:
+            app.state.event_store.close()
+            app.state.event_store = None
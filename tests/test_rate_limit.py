@@ -0,0 +1,141 @@
+"""
+Tests para la limitación de tasa por cliente
+============================================
+"""
+
+import json
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.rate_limit import RateLimitMiddleware, ShardedRateLimiter, request_cost
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_body(events: int) -> bytes:
+    return json.dumps({"events": [
+        {"event_id": f"e{i}", "timestamp": i, "data": "x"} for i in range(events)
+    ]}).encode()
+
+
+def make_client(small: ShardedRateLimiter, large: ShardedRateLimiter = None) -> TestClient:
+    app = FastAPI()
+
+    @app.post("/events/process")
+    async def process(request: Request):
+        return {"received": len(await request.body())}
+
+    @app.get("/health/")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(RateLimitMiddleware, small=small, large=large, large_threshold=10)
+    return TestClient(app)
+
+
+class TestShardedRateLimiter:
+    """Tests para los token buckets"""
+
+    def test_burst_then_refill(self):
+        """Test de ráfaga, rechazo y recuperación de tokens"""
+        clock = FakeClock()
+        limiter = ShardedRateLimiter(rate=10, burst=3, clock=clock)
+
+        assert [limiter.acquire("a") for _ in range(3)] == [0.0, 0.0, 0.0]
+        assert limiter.acquire("a") == 0.1
+
+        clock.now += 0.1
+        assert limiter.acquire("a") == 0.0
+
+    def test_clients_are_independent(self):
+        """Test de que cada cliente tiene su propio bucket"""
+        limiter = ShardedRateLimiter(rate=1, burst=1, clock=FakeClock())
+
+        assert limiter.acquire("a") == 0.0
+        assert limiter.acquire("a") > 0
+        assert limiter.acquire("b") == 0.0
+
+    def test_cost_is_capped_at_burst(self):
+        """Test de que una petición más cara que la ráfaga sigue siendo admisible"""
+        limiter = ShardedRateLimiter(rate=10, burst=5, clock=FakeClock())
+
+        assert limiter.acquire("a", cost=50) == 0.0
+
+    def test_idle_buckets_are_evicted(self):
+        """Test de eliminación incremental de buckets inactivos"""
+        clock = FakeClock()
+        limiter = ShardedRateLimiter(rate=10, burst=10, shards=4, idle_seconds=60, clock=clock)
+        for client in range(1000):
+            limiter.acquire(f"client-{client}")
+        assert len(limiter) == 1000
+
+        # Cada shard se barre una vez por vuelta (idle_seconds / shards entre barridos)
+        clock.now += 61
+        for _ in range(4):
+            clock.now += 15
+            limiter.acquire("active")
+
+        assert len(limiter) == 1
+
+    def test_request_cost(self):
+        """Test del coste por número de eventos"""
+        assert request_cost(make_body(25)) == 25
+        assert request_cost(b"{}") == 1
+        # Un data con el valor "event_id" no es otro evento
+        assert request_cost(make_body(25).replace(b'"data": "x"', b'"data": "event_id"')) == 25
+
+
+class TestRateLimitMiddleware:
+    """Tests para el middleware de limitación"""
+
+    def test_limits_by_client_with_retry_after(self):
+        """Test de 429 con Retry-After al agotar la ráfaga"""
+        client = make_client(ShardedRateLimiter(rate=1, burst=2))
+
+        statuses = [client.post("/events/process", content=make_body(1)).status_code for _ in range(3)]
+        response = client.post("/events/process", content=make_body(1))
+
+        assert statuses == [200, 200, 429]
+        assert response.headers["retry-after"] == "1"
+        assert response.json()["error_code"] == "RATE_LIMITED"
+
+    def test_body_is_forwarded(self):
+        """Test de que el cuerpo leído llega intacto a la aplicación"""
+        client = make_client(ShardedRateLimiter(rate=100, burst=100))
+        body = make_body(3)
+
+        assert client.post("/events/process", content=body).json() == {"received": len(body)}
+
+    def test_api_key_has_its_own_bucket(self):
+        """Test de que la API key identifica al cliente antes que la IP"""
+        client = make_client(ShardedRateLimiter(rate=1, burst=1))
+
+        assert client.post("/events/process", content=make_body(1)).status_code == 200
+        assert client.post("/events/process", content=make_body(1)).status_code == 429
+        response = client.post("/events/process", content=make_body(1), headers={"X-API-Key": "abc"})
+        assert response.status_code == 200
+
+    def test_large_payloads_use_their_own_lane(self):
+        """Test de carriles separados y coste por número de eventos"""
+        client = make_client(ShardedRateLimiter(rate=1, burst=5), ShardedRateLimiter(rate=1, burst=20))
+
+        assert client.post("/events/process", content=make_body(15)).status_code == 200
+        assert client.post("/events/process", content=make_body(15)).status_code == 429
+        assert client.post("/events/process", content=make_body(5)).status_code == 200
+        assert client.post("/events/process", content=make_body(1)).status_code == 429
+
+    def test_other_routes_are_not_limited(self):
+        """Test de que las rutas de salud no se limitan"""
+        client = make_client(ShardedRateLimiter(rate=1, burst=1))
+
+        assert all(client.get("/health/").status_code == 200 for _ in range(5))
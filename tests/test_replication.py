@@ -0,0 +1,319 @@
+"""
+Tests de la replicación líder/seguidor del almacén
+==================================================
+"""
+
+import asyncio
+import threading
+import time
+
+import httpx
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.metrics import metrics
+from app.models import Event
+from app.storage import (EventStore, ReadOnlyReplicaError, ReplicaStore, ReplicationFollower, ReplicationLeader,
+                         decode_events, parse_address)
+from app.storage import replication as replication_module
+from app.storage.replication import SNAPSHOT, encode_frame, read_frame
+from benchmarks.loadgen import LocalServer, find_free_port
+
+HEARTBEAT = 0.05
+
+
+def events(prefix: str, count: int, base: int = None):
+    base = int(time.time()) + 3600 if base is None else base
+    return [Event(event_id=f"{prefix}{i}", timestamp=base + i, data=prefix) for i in range(count)]
+
+
+def snapshots_received() -> float:
+    return metrics.counter("replication_snapshots_received_total", "").value
+
+
+def reconnects_total() -> float:
+    return metrics.counter("replication_reconnects_total", "").value
+
+
+async def wait_for(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "La réplica no llegó al estado esperado"
+        await asyncio.sleep(0.01)
+
+
+async def started_leader(store, backlog: int = 100) -> ReplicationLeader:
+    leader = ReplicationLeader(store, backlog=backlog, heartbeat=HEARTBEAT)
+    await leader.start("127.0.0.1", 0)
+    return leader
+
+
+def follower_of(leader: ReplicationLeader, replica: ReplicaStore = None) -> ReplicationFollower:
+    replica = replica if replica is not None else ReplicaStore()  # Vacía es falsy (__len__)
+    follower = ReplicationFollower(replica, "127.0.0.1", leader.port, heartbeat=HEARTBEAT, reconnect=0.05)
+    follower.start()
+    return follower
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=0)
+    yield store
+    store.close()
+
+
+class TestReplication:
+    """Tests del protocolo, con líder y seguidores en el mismo proceso"""
+
+    def test_snapshot_then_stream(self, store):
+        async def scenario():
+            await store.append(events("a", 5))
+            leader = await started_leader(store)
+            follower = follower_of(leader)
+            try:
+                await wait_for(lambda: len(follower.replica) == 5)
+                await store.append(events("b", 3, base=int(time.time()) + 7200))
+                await wait_for(lambda: follower.applied == leader.lsn == 1)
+                assert follower.replica.latest_future() == store.latest_future()
+                assert follower.replica.scan(0, 2 ** 40, limit=100) == store.scan(0, 2 ** 40, limit=100)
+                await wait_for(lambda: follower.lag_seconds() == 0)
+                assert leader.status()["followers"] == 1
+            finally:
+                follower.stop()
+                await leader.stop()
+
+        asyncio.run(scenario())
+
+    def test_slow_snapshot_export(self, store, monkeypatch):
+        export = store.export
+
+        def slow_export(mark=None):
+            time.sleep(10 * HEARTBEAT)  # Como un almacén con millones de eventos
+            return export(mark)
+
+        async def scenario():
+            await store.append(events("a", 5))
+            monkeypatch.setattr(store, "export", slow_export)
+            leader = await started_leader(store)
+            received, reconnects = snapshots_received(), reconnects_total()
+            follower = follower_of(leader)
+            try:
+                await wait_for(lambda: len(follower.replica) == 5)
+                # Los latidos durante la exportación mantienen la conexión
+                assert snapshots_received() == received + 1
+                assert reconnects_total() == reconnects
+            finally:
+                follower.stop()
+                await leader.stop()
+
+        asyncio.run(scenario())
+
+    def test_large_payload_timeout_scales_with_size(self, monkeypatch):
+        monkeypatch.setattr(replication_module, "READ_CHUNK", 1000)
+        payload = bytes(range(256)) * 20
+
+        async def scenario():
+            reader = asyncio.StreamReader()
+            frame = encode_frame(SNAPSHOT, 7, payload)
+
+            async def trickle():
+                # Cada bloque llega dentro del timeout, el mensaje entero no
+                for offset in range(0, len(frame), 500):
+                    reader.feed_data(frame[offset:offset + 500])
+                    await asyncio.sleep(0.02)
+
+            feeder = asyncio.get_running_loop().create_task(trickle())
+            frame_read = await read_frame(reader, timeout=0.1)
+            await feeder
+            return frame_read
+
+        kind, lsn, _, received = asyncio.run(scenario())
+        assert (kind, lsn, received) == (SNAPSHOT, 7, payload)
+
+    def test_reconnect_resumes_from_backlog(self, store):
+        async def scenario():
+            leader = await started_leader(store)
+            replica = ReplicaStore()
+            follower = follower_of(leader, replica)
+            await store.append(events("a", 2))
+            await wait_for(lambda: follower.applied == 1)
+            follower.stop()
+            received = snapshots_received()
+            for i in range(3):
+                await store.append(events(f"b{i}_", 2))
+            follower = follower_of(leader, replica)
+            follower.epoch, follower.applied = leader.epoch, 1
+            try:
+                await wait_for(lambda: follower.applied == 4)
+                assert snapshots_received() == received  # Sin snapshot: desde el backlog
+                assert len(replica) == 8
+            finally:
+                follower.stop()
+                await leader.stop()
+
+        asyncio.run(scenario())
+
+    def test_behind_backlog_gets_snapshot(self, store):
+        async def scenario():
+            leader = await started_leader(store, backlog=2)
+            replica = ReplicaStore()
+            follower = follower_of(leader, replica)
+            await wait_for(lambda: follower.connected and follower.lag_seconds() == 0)
+            follower.stop()
+            for i in range(5):
+                await store.append(events(f"b{i}_", 1))
+            received = snapshots_received()
+            follower = follower_of(leader, replica)
+            follower.epoch = leader.epoch
+            try:
+                await wait_for(lambda: follower.applied == 5)
+                assert snapshots_received() == received + 1
+                assert len(replica) == 5
+            finally:
+                follower.stop()
+                await leader.stop()
+
+        asyncio.run(scenario())
+
+    def test_new_leader_epoch_replaces_state(self, store, tmp_path):
+        async def scenario():
+            await store.append(events("old", 3))
+            leader = await started_leader(store)
+            replica = ReplicaStore()
+            follower = follower_of(leader, replica)
+            await wait_for(lambda: len(replica) == 3)
+            follower.stop()
+            await leader.stop()
+
+            other = EventStore.open(str(tmp_path / "other"), fsync=False, snapshot_bytes=0)
+            await other.append(events("new", 2))
+            leader = await started_leader(other)
+            follower = follower_of(leader, replica)
+            follower.epoch, follower.applied = "antigua", 1
+            try:
+                await wait_for(lambda: follower.epoch == leader.epoch)
+                assert sorted(event.event_id for event in replica.scan(0, 2 ** 40)) == ["new0", "new1"]
+            finally:
+                follower.stop()
+                await leader.stop()
+                other.close()
+
+        asyncio.run(scenario())
+
+    def test_eviction_is_replicated(self, store):
+        async def scenario():
+            await store.append(events("past", 3, base=100) + events("future", 2))
+            leader = await started_leader(store)
+            follower = follower_of(leader)
+            try:
+                await wait_for(lambda: len(follower.replica) == 5)
+                assert await asyncio.to_thread(store.evict_expired, 1000) == 3
+                await wait_for(lambda: len(follower.replica) == 2)
+                assert follower.replica.oldest_timestamp() == store.oldest_timestamp()
+            finally:
+                follower.stop()
+                await leader.stop()
+
+        asyncio.run(scenario())
+
+    def test_changes_are_applied_off_the_event_loop(self, store):
+        class SlowReplica(ReplicaStore):
+            applied = []
+
+            def apply(self, payloads):
+                self.applied.append((threading.get_ident(), decode_events(payloads[0])[0][0]))
+                time.sleep(0.05)  # Como un lote grande: decodificar e indexar
+                return super().apply(payloads)
+
+        async def scenario():
+            leader = await started_leader(store)
+            follower = follower_of(leader, SlowReplica())
+            gaps = []
+
+            async def ticker():
+                while True:
+                    started = time.monotonic()
+                    await asyncio.sleep(0.005)
+                    gaps.append(time.monotonic() - started)
+
+            try:
+                await wait_for(lambda: follower.connected)
+                ticks = asyncio.get_running_loop().create_task(ticker())
+                for i in range(4):
+                    await store.append(events(f"b{i}_", 2))
+                await wait_for(lambda: len(follower.replica) == 8)
+                ticks.cancel()
+            finally:
+                follower.stop()
+                await leader.stop()
+            return gaps
+
+        gaps = asyncio.run(scenario())
+        assert all(thread != threading.get_ident() for thread, _ in SlowReplica.applied)
+        assert [first for _, first in SlowReplica.applied] == ["b0_0", "b1_0", "b2_0", "b3_0"]  # En orden
+        assert max(gaps) < 0.04  # El event loop no se bloqueó durante los 50 ms de cada apply
+
+    def test_lag_grows_without_leader(self, store):
+        async def scenario():
+            leader = await started_leader(store)
+            follower = follower_of(leader)
+            assert follower.lag_seconds() is None
+            await wait_for(lambda: follower.lag_seconds() == 0)
+            await leader.stop()
+            await wait_for(lambda: not follower.connected)
+            await asyncio.sleep(0.1)
+            assert follower.lag_seconds() >= 0.1
+            assert follower.status()["connected"] is False
+            follower.stop()
+
+        asyncio.run(scenario())
+
+    def test_replica_is_read_only(self):
+        with pytest.raises(ReadOnlyReplicaError):
+            asyncio.run(ReplicaStore().append(events("a", 1)))
+
+    def test_parse_address(self):
+        assert parse_address("127.0.0.1:9000") == ("127.0.0.1", 9000)
+        assert parse_address(":9000") == ("0.0.0.0", 9000)
+        with pytest.raises(ValueError):
+            parse_address("localhost")
+
+
+class TestReplicationProcesses:
+    """Líder y dos seguidores como servidores uvicorn independientes"""
+
+    def test_followers_serve_reads(self, tmp_path):
+        replication_port = find_free_port(9400)
+        common = {"LOG_FILE": "", "WARMUP_MODE": "off", "REPLICATION_HEARTBEAT_S": "0.1",
+                  "REPLICATION_RECONNECT_S": "0.1"}
+        leader_env = {**common, "EVENT_STORE_DIR": str(tmp_path), "EVENT_STORE_FSYNC": "false",
+                      "REPLICATION_LISTEN": f"127.0.0.1:{replication_port}"}
+        follower_env = {**common, "REPLICATION_LEADER": f"127.0.0.1:{replication_port}"}
+        future = int(time.time()) + 3600
+        body = {"events": [{"event_id": "e1", "timestamp": future, "data": "uno"},
+                           {"event_id": "e2", "timestamp": future + 60, "data": "dos"}]}
+
+        with LocalServer(env=leader_env) as leader:
+            assert httpx.post(f"{leader.base_url}/events/store", json=body).status_code == 201
+            with LocalServer(env=follower_env) as first, LocalServer(env=follower_env) as second:
+                for follower in (first, second):
+                    deadline = time.monotonic() + 10
+                    while httpx.get(f"{follower.base_url}/events/latest").status_code != 200:
+                        assert time.monotonic() < deadline
+                        time.sleep(0.05)
+                    assert httpx.get(f"{follower.base_url}/events/latest").json()["event_id"] == "e2"
+                    status = httpx.get(f"{follower.base_url}/health/replication").json()
+                    assert status["role"] == "follower" and status["connected"]
+                    write = httpx.post(f"{follower.base_url}/events/store", json=body)
+                    assert write.status_code == 503
+
+                newer = {"events": [{"event_id": "e3", "timestamp": future + 120, "data": "tres"}]}
+                assert httpx.post(f"{leader.base_url}/events/store", json=newer).status_code == 201
+                deadline = time.monotonic() + 10
+                while httpx.get(f"{second.base_url}/events/latest").json()["event_id"] != "e3":
+                    assert time.monotonic() < deadline
+                    time.sleep(0.05)
+                assert httpx.get(f"{leader.base_url}/health/replication").json()["followers"] == 2
@@ -0,0 +1,210 @@
+"""
+Tests de la caché de resultados compartida entre workers
+========================================================
+"""
+
+import json
+import multiprocessing
+import time
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+from app import result_cache as result_cache_module
+from app.models import Event
+from app.result_cache import ResultCache
+
+SLOTS = 64
+SLOT_BYTES = 256
+
+
+def candidate(event_id: str = "e1", timestamp: int = 2_000_000_000, data: str = "payload") -> Event:
+    return Event(event_id=event_id, timestamp=timestamp, data=data)
+
+
+@pytest.fixture
+def cache_name():
+    name = f"test-cache-{uuid.uuid4().hex[:12]}"
+    yield name
+    cache = ResultCache.open(name, SLOTS, SLOT_BYTES)
+    cache.unlink()
+    cache.close()
+
+
+@pytest.fixture
+def cache(cache_name):
+    cache = ResultCache.open(cache_name, SLOTS, SLOT_BYTES)
+    yield cache
+    cache.close()
+
+
+def write_in_child(name: str, key: bytes, event_id: str):
+    cache = ResultCache.open(name, SLOTS, SLOT_BYTES)
+    cache.put(key, candidate(event_id))
+    cache.close()
+
+
+def alternate_in_child(name: str, key: bytes, rounds: int):
+    cache = ResultCache.open(name, SLOTS, SLOT_BYTES)
+    values = (candidate("a", 1, "a" * 100), candidate("bb", 2, "b" * 150))
+    for i in range(rounds):
+        cache.put(key, values[i % 2])
+    cache.close()
+
+
+def fork():
+    return multiprocessing.get_context("fork")
+
+
+class TestResultCache:
+    """Tests de la tabla en memoria compartida"""
+
+    def test_round_trip(self, cache):
+        key = ResultCache.key(b'{"events": []}')
+        assert cache.get(key) is None
+        assert cache.put(key, candidate(data="ñandú"))
+        assert cache.get(key) == candidate(data="ñandú")
+        assert cache.put(key, candidate("e2"))  # Misma clave: se sobrescribe
+        assert cache.get(key).event_id == "e2"
+
+    def test_collisions_probe_and_evict_oldest(self, cache, monkeypatch):
+        monkeypatch.setattr(result_cache_module, "PROBES", 4)
+        # Todas las claves empiezan en la misma ranura
+        keys = [bytes(8) + i.to_bytes(8, "little") for i in range(6)]
+        for i, key in enumerate(keys[:4]):
+            cache.put(key, candidate(f"e{i}"))
+        assert [cache.get(key).event_id for key in keys[:4]] == ["e0", "e1", "e2", "e3"]
+        cache.put(keys[4], candidate("e4"))  # Ventana llena: sustituye a la escrita hace más tiempo
+        assert cache.get(keys[0]) is None
+        assert cache.get(keys[4]).event_id == "e4"
+        cache.get(keys[1])  # Leer no la protege (FIFO, no LRU)
+        cache.put(keys[5], candidate("e5"))
+        assert cache.get(keys[1]) is None
+        assert [cache.get(key).event_id for key in keys[2:]] == ["e2", "e3", "e4", "e5"]
+
+    def test_too_large_is_skipped(self, cache):
+        key = ResultCache.key(b"large")
+        assert not cache.put(key, candidate(data="x" * SLOT_BYTES))
+        assert cache.get(key) is None
+
+    def test_geometry_is_part_of_the_name(self, cache_name, cache):
+        other = ResultCache.open(cache_name, SLOTS * 2, SLOT_BYTES)
+        try:
+            assert other.name != cache.name
+        finally:
+            other.unlink()
+            other.close()
+        with pytest.raises(ValueError):
+            ResultCache.open(cache_name, 4, SLOT_BYTES)
+
+    def test_release_is_part_of_the_name(self, cache_name, cache, monkeypatch):
+        key = ResultCache.key(b"release")
+        cache.put(key, candidate())
+        other_geometry = ResultCache.open(cache_name, SLOTS * 2, SLOT_BYTES)
+        monkeypatch.setattr(result_cache_module, "__version__", "9.9.9")
+        upgraded = ResultCache.open(cache_name, SLOTS, SLOT_BYTES)
+        try:
+            assert upgraded.name != cache.name and "-v9.9.9-" in upgraded.name
+            assert upgraded.get(key) is None  # No lee lo que escribió la versión anterior
+            # Al crearlo se borran los segmentos de las demás versiones, de cualquier geometría
+            shm = result_cache_module.SHM_DIR
+            assert not (shm / cache.name.lstrip("/")).exists()
+            assert not (shm / other_geometry.name.lstrip("/")).exists()
+            assert cache.get(key) == candidate()  # Quien ya estaba enganchado lo conserva
+        finally:
+            upgraded.unlink()
+            upgraded.close()
+            other_geometry.close()
+
+    def test_sources_are_part_of_the_release(self, tmp_path, monkeypatch):
+        models, services = tmp_path / "models.py", tmp_path / "services.py"
+        models.write_text("A = 1")
+        services.write_text("B = 1")
+        monkeypatch.setattr(result_cache_module, "RELEASE_SOURCES", (models, services))
+        before = result_cache_module.release_tag()
+        services.write_text("B = 2")
+        assert result_cache_module.release_tag() != before
+
+    def test_survives_restart(self, cache_name):
+        key = ResultCache.key(b"restart")
+        cache = ResultCache.open(cache_name, SLOTS, SLOT_BYTES)
+        cache.put(key, candidate())
+        cache.close()
+        reopened = ResultCache.open(cache_name, SLOTS, SLOT_BYTES)
+        try:
+            assert reopened.get(key) == candidate()
+        finally:
+            reopened.close()
+
+    def test_shared_between_processes(self, cache_name, cache):
+        key = ResultCache.key(b"cross-process")
+        process = fork().Process(target=write_in_child, args=(cache_name, key, "child"))
+        process.start()
+        process.join(10)
+        assert process.exitcode == 0
+        assert cache.get(key).event_id == "child"
+
+    def test_interrupted_writer_is_repaired(self, cache):
+        key = ResultCache.key(b"torn")
+        cache.put(key, candidate("old"))
+        offset = cache._offset(key, 0)
+        seq = result_cache_module._SEQ.unpack_from(cache._buf, offset)[0]
+        result_cache_module._SEQ.pack_into(cache._buf, offset, seq + 1)  # Escritor muerto a medias
+        assert cache.get(key) is None
+        assert cache.put(key, candidate("new"))
+        assert cache.get(key).event_id == "new"
+
+    def test_readers_never_see_torn_entries(self, cache_name, cache):
+        key = ResultCache.key(b"seqlock")
+        expected = {("a", 1, "a" * 100), ("bb", 2, "b" * 150)}
+        process = fork().Process(target=alternate_in_child, args=(cache_name, key, 20000))
+        process.start()
+        seen = set()
+        while process.is_alive():
+            found = cache.get(key)
+            if found is not None:
+                seen.add((found.event_id, found.timestamp, found.data))
+        process.join()
+        assert process.exitcode == 0
+        assert seen <= expected and seen
+
+
+@pytest.fixture
+def cached_client(cache):
+    app.state.result_cache = cache
+    try:
+        with TestClient(app) as client:
+            yield client
+    finally:
+        app.state.result_cache = None
+
+
+class TestCachedEndpoint:
+    """Tests de /events/process con la caché de resultados"""
+
+    def test_hit_returns_same_result(self, cached_client, cache):
+        future = int(time.time()) + 3600
+        body = json.dumps({"events": [{"event_id": "a", "timestamp": future, "data": "x"},
+                                      {"event_id": "b", "timestamp": future + 5, "data": "y"}]})
+        first = cached_client.post("/events/process", content=body)
+        second = cached_client.post("/events/process", content=body)
+        assert first.json()["event_id"] == "b"
+        assert second.content == first.content
+        assert cache.get(ResultCache.key(body.encode())).event_id == "b"
+
+    def test_cached_candidate_in_the_past(self, cached_client, cache):
+        body = json.dumps({"events": [{"event_id": "a", "timestamp": 100, "data": "x"}]}).encode()
+        cache.put(ResultCache.key(body), candidate("a", 100, "x"))
+        assert cached_client.post("/events/process", content=body).status_code == 204
+
+    def test_invalid_bodies_are_not_cached(self, cached_client, cache):
+        body = json.dumps({"events": [{"event_id": "a", "timestamp": 100, "data": "x"},
+                                      {"event_id": "a", "timestamp": 200, "data": "y"}]})
+        assert cached_client.post("/events/process", content=body).status_code == 400
+        assert cache.get(ResultCache.key(body.encode())) is None
@@ -3,6 +3,7 @@ Tests para las rutas de la Event Processor API
 ==============================================
 """
 
+import asyncio
 import pytest
 from fastapi.testclient import TestClient
 import time
@@ -12,6 +13,8 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent))
 
 from app.main import app
+from app.models import Event
+from app.routes import NO_CONTENT
 
 client = TestClient(app)
 
@@ -82,6 +85,30 @@ class TestEventRoutes:
         assert response.status_code == 204
         assert response.content == b""
 
+    def test_process_events_response_bytes(self):
+        """Test de la respuesta serializada directamente: mismo JSON que el response_model"""
+        future_timestamp = int(time.time()) + 3600
+        event = {"event_id": "evt_ñ", "timestamp": future_timestamp, "data": "Señal"}
+
+        response = client.post("/events/process", json={"events": [event]})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        assert response.content == Event(**event).model_dump_json().encode()
+
+    def test_prebuilt_no_content_is_not_shared_state(self):
+        """Test de que el 204 compartido envía una copia de sus cabeceras"""
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        asyncio.run(NO_CONTENT({"type": "http"}, None, send))
+        sent[0]["headers"].append((b"x-mutated", b"1"))
+        assert sent[0]["status"] == 204
+        assert sent[1]["body"] == b""
+        assert (b"x-mutated", b"1") not in NO_CONTENT.raw_headers
+
     def test_process_events_duplicate_ids(self):
         """Test con IDs duplicados - debe devolver 400"""
         future_timestamp = int(time.time()) + 3600
@@ -209,6 +236,13 @@ class TestAPIDocumentation:
         assert "info" in data
         assert data["info"]["title"] == "Event Processor API"
 
+    def test_openapi_documents_event_response(self):
+        """Test de que /events/process sigue documentando Event aunque devuelva la respuesta en crudo"""
+        data = client.get("/openapi.json").json()
+        schema = data["paths"]["/events/process"]["post"]["responses"]["200"]["content"]["application/json"]["schema"]
+        assert "#/components/schemas/Event" in str(schema)
+        assert "Event" in data["components"]["schemas"]
+
     def test_swagger_ui(self):
         """Test de Swagger UI"""
         response = client.get("/docs")
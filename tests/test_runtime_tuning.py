@@ -0,0 +1,93 @@
+"""
+Tests para los ajustes del recolector de basura
+===============================================
+"""
+
+import gc
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.metrics import metrics
+from app.runtime_tuning import (
+    freeze_heap,
+    install_gc_pause_metrics,
+    set_gc_thresholds,
+    uninstall_gc_pause_metrics,
+)
+
+
+class TestGCThresholds:
+    """Tests para los umbrales del GC"""
+
+    def test_set_thresholds(self):
+        """Test de cambio y restauración de umbrales"""
+        original = gc.get_threshold()
+        try:
+            set_gc_thresholds([50000, 20, 100])
+            assert gc.get_threshold() == (50000, 20, 100)
+        finally:
+            gc.set_threshold(*original)
+
+    def test_none_keeps_thresholds(self):
+        """Test de que None mantiene los umbrales del intérprete"""
+        original = gc.get_threshold()
+        set_gc_thresholds(None)
+        assert gc.get_threshold() == original
+
+    @pytest.mark.parametrize("thresholds", [[700, 10], [700, -1, 10]])
+    def test_invalid_thresholds(self, thresholds):
+        """Test de umbrales inválidos"""
+        with pytest.raises(ValueError):
+            set_gc_thresholds(thresholds)
+
+
+class TestGCFreeze:
+    """Tests para gc.freeze()"""
+
+    def test_freeze_heap(self):
+        """Test de que los objetos actuales quedan congelados"""
+        try:
+            frozen = freeze_heap()
+            assert frozen == gc.get_freeze_count()
+            assert frozen > 0
+            assert metrics.snapshot()["gc_frozen_objects"] == frozen
+        finally:
+            gc.unfreeze()
+
+
+class TestGCPauseMetrics:
+    """Tests para las métricas de pausas del GC"""
+
+    def test_pause_recorded_by_generation(self):
+        """Test de que una colección completa queda registrada en su generación"""
+        install_gc_pause_metrics()
+        key = 'gc_pause_seconds{generation="2"}'
+        before = metrics.snapshot()[key]["count"]
+
+        gc.collect()
+
+        assert metrics.snapshot()[key]["count"] == before + 1
+
+    def test_uninstall(self):
+        """Test de que sin callback no se registran pausas"""
+        install_gc_pause_metrics()
+        uninstall_gc_pause_metrics()
+        key = 'gc_pause_seconds{generation="2"}'
+        before = metrics.snapshot()[key]["count"]
+        try:
+            gc.collect()
+            assert metrics.snapshot()[key]["count"] == before
+        finally:
+            install_gc_pause_metrics()
+
+    def test_metrics_endpoint(self):
+        """Test de que las pausas aparecen en /health/metrics"""
+        with TestClient(app) as client:
+            response = client.get("/health/metrics", params={"format": "prometheus"})
+
+        assert "# TYPE gc_pause_seconds histogram" in response.text
@@ -0,0 +1,80 @@
+"""
+Tests para la configuración del servidor de producción
+======================================================
+"""
+
+from unittest.mock import patch
+
+import pytest
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app import server
+from config.settings import ProductionSettings
+
+
+class TestServerOptions:
+    """Tests para la traducción de la configuración a opciones de uvicorn"""
+
+    def test_resolve_workers(self):
+        """Test del número de workers automático y configurado"""
+        with patch.object(server, "available_cpus", return_value=6):
+            assert server.resolve_workers(0) == 6
+        assert server.resolve_workers(3) == 3
+
+    def test_cgroup_limit_caps_cpus(self, tmp_path):
+        """Test de la cuota de CPU de cgroup"""
+        cpu_max = tmp_path / "cpu.max"
+        cpu_max.write_text("150000 100000\n")
+
+        with patch.object(server, "CGROUP_CPU_MAX", cpu_max):
+            assert server._cgroup_cpu_limit() == 2
+
+        cpu_max.write_text("max 100000\n")
+        with patch.object(server, "CGROUP_CPU_MAX", cpu_max):
+            assert server._cgroup_cpu_limit() is None
+
+    def test_select_loop_and_http(self):
+        """Test de selección de uvloop/httptools según disponibilidad"""
+        with patch("importlib.util.find_spec", return_value=None):
+            assert server.select_loop("auto") == "asyncio"
+            assert server.select_http("auto") == "h11"
+        with patch("importlib.util.find_spec", return_value=object()):
+            assert server.select_loop("auto") == "uvloop"
+            assert server.select_http("auto") == "httptools"
+        assert server.select_loop("asyncio") == "asyncio"
+
+    def test_build_uvicorn_options(self):
+        """Test de las opciones de producción"""
+        settings = ProductionSettings(workers=4, limit_max_requests=10000, backlog=4096, timeout_keep_alive=15)
+
+        options = server.build_uvicorn_options(settings)
+
+        assert options["workers"] == 4
+        assert options["limit_max_requests"] == 10000
+        assert options["backlog"] == 4096
+        assert options["timeout_keep_alive"] == 15
+        assert options["reload"] is False
+        assert options["log_level"] == "warning"
+
+    def test_wal_store_forces_single_worker(self, tmp_path):
+        """Test de que el almacén WAL usa un worker en automático y rechaza varios"""
+        with patch.object(server, "available_cpus", return_value=6):
+            options = server.build_uvicorn_options(ProductionSettings(workers=0, event_store_dir=str(tmp_path)))
+            assert options["workers"] == 1
+            sqlite = ProductionSettings(workers=0, event_store_dir=str(tmp_path), event_store_backend="sqlite")
+            assert server.build_uvicorn_options(sqlite)["workers"] == 6
+
+        with pytest.raises(ValueError, match="wal.*WORKERS=4"):
+            server.build_uvicorn_options(ProductionSettings(workers=4, event_store_dir=str(tmp_path)))
+
+    def test_dispatcher_forces_single_worker(self, tmp_path):
+        """Test de que el despachador, también con SQLite, usa un worker y rechaza varios"""
+        settings = dict(event_store_dir=str(tmp_path), event_store_backend="sqlite", dispatcher_enabled=True)
+        with patch.object(server, "available_cpus", return_value=6):
+            assert server.build_uvicorn_options(ProductionSettings(workers=0, **settings))["workers"] == 1
+
+        with pytest.raises(ValueError, match="DISPATCHER_ENABLED.*WORKERS=2"):
+            server.build_uvicorn_options(ProductionSettings(workers=2, **settings))
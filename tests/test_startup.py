@@ -0,0 +1,134 @@
+"""
+Tests para el arranque de la aplicación
+=======================================
+"""
+
+import json
+import os
+import re
+import subprocess
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+import app.openapi_cache as openapi_cache
+from app.openapi_cache import install_openapi_cache, source_fingerprint
+from config.settings import settings
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Presupuesto de importación de app.main en milisegundos (ajustable en máquinas lentas)
+IMPORT_TIME_BUDGET_MS = float(os.getenv("IMPORT_TIME_BUDGET_MS", "1500"))
+
+
+def _run_python(code, *flags):
+    env = {**os.environ, "ENVIRONMENT": "production", "LOG_FILE": "", "OPENAPI_CACHE_FILE": ""}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+class TestImportTime:
+    """Tests del coste de importación"""
+
+    def test_import_time_budget(self):
+        """Test de que importar app.main no supera el presupuesto"""
+        result = _run_python("import app.main", "-X", "importtime")
+        match = re.search(r"^import time:\s+\d+ \|\s+(\d+) \| app\.main$", result.stderr, re.MULTILINE)
+
+        assert match is not None
+        cumulative_ms = int(match.group(1)) / 1000
+        assert cumulative_ms < IMPORT_TIME_BUDGET_MS
+
+    def test_cold_path_modules_not_imported(self):
+        """Test de que la captura de tráfico no se importa si está desactivada"""
+        result = _run_python(
+            "import json, sys, app.main\n"
+            "print(json.dumps(sorted(m for m in ('app.capture', 'gzip') if m in sys.modules)))"
+        )
+
+        assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+class TestOpenAPICache:
+    """Tests de la caché del esquema OpenAPI"""
+
+    def _build_app(self):
+        app = FastAPI(title="Cache test")
+
+        @app.get("/items")
+        async def items():
+            return []
+
+        return app
+
+    def test_schema_written_and_served(self, tmp_path):
+        """Test de generación, guardado y servicio del esquema"""
+        cache_file = tmp_path / "openapi.json"
+        app = self._build_app()
+        install_openapi_cache(app, str(cache_file))
+
+        response = TestClient(app).get("/openapi.json")
+
+        assert response.status_code == 200
+        assert "/items" in response.json()["paths"]
+        assert "/items" in json.loads(cache_file.read_text())["schema"]["paths"]
+
+    def test_schema_loaded_from_disk(self, tmp_path):
+        """Test de que un worker nuevo usa la caché sin regenerar el esquema"""
+        cache_file = tmp_path / "openapi.json"
+        install_openapi_cache(self._build_app(), str(cache_file)).load()
+
+        app = self._build_app()
+        cache = install_openapi_cache(app, str(cache_file))
+        cache._generate_openapi = lambda: pytest.fail("No debería regenerar el esquema")
+
+        assert app.openapi()["info"]["title"] == "Cache test"
+
+    def test_stale_cache_regenerated(self, tmp_path):
+        """Test de que una huella distinta invalida la caché"""
+        cache_file = tmp_path / "openapi.json"
+        cache_file.write_text(json.dumps({"fingerprint": "otra", "schema": {"paths": {}}}))
+
+        app = self._build_app()
+        install_openapi_cache(app, str(cache_file))
+
+        assert "/items" in app.openapi()["paths"]
+
+    def test_fingerprint_covers_subpackages_and_settings(self, monkeypatch, tmp_path):
+        """Test de que la huella cambia con app/storage y con la configuración"""
+        before = source_fingerprint()
+        monkeypatch.setattr(settings, "event_store_max_page_size", settings.event_store_max_page_size + 1)
+        assert source_fingerprint() != before
+        monkeypatch.undo()
+
+        storage = tmp_path / "app" / "storage"
+        storage.mkdir(parents=True)
+        (storage / "models.py").write_text("A = 1\n")
+        monkeypatch.setattr(openapi_cache, "PROJECT_ROOT", tmp_path)
+        monkeypatch.setattr(openapi_cache, "FINGERPRINT_SOURCES", (tmp_path / "app",))
+        first = source_fingerprint()
+        (storage / "models.py").write_text("A = 2\n")
+        assert source_fingerprint() != first
+
+
+class TestProductionDocs:
+    """Tests de la documentación en producción"""
+
+    def test_docs_disabled_in_production(self):
+        """Test de que Swagger UI y ReDoc están desactivados en producción"""
+        code = (
+            "from fastapi.testclient import TestClient\n"
+            "from app.main import app\n"
+            "client = TestClient(app, base_url='http://localhost')\n"
+            "print(client.get('/docs').status_code, client.get('/redoc').status_code,"
+            " client.get('/openapi.json').status_code)"
+        )
+        result = _run_python(code)
+
+        assert result.stdout.strip().splitlines()[-1] == "404 404 200"
@@ -0,0 +1,551 @@
+"""
+Tests para el almacén durable de eventos
+========================================
+"""
+
+import json
+import random
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.models import Event, EventsRequest
+from app.services import EventProcessorService
+from app.storage import (EventStore, ExpiryEvictor, SQLiteEventStore, StoreCorruptedError, WriteAheadLog,
+                         decode_events, encode_events)
+from app.pagination import decode_cursor, encode_cursor
+from app.storage import index as index_module
+from app.storage.index import IndexVersion
+from app.storage.codec import HEADER_SIZE
+from app.storage.store import read_snapshot
+
+
+def make_events(count: int, prefix: str = "e", base: int = None, spread: int = 100, seed: int = 1):
+    rng = random.Random(seed)
+    base = int(time.time()) if base is None else base
+    return [Event(event_id=f"{prefix}{i}", timestamp=base + rng.randint(-spread, spread), data=f"d{i}")
+            for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=0)
+    yield store
+    store.close()
+
+
+class TestCodec:
+    """Tests del formato binario de los lotes"""
+
+    def test_roundtrip(self):
+        ids = ["a", "ñandú", "", "x" * 300, "\ud800"]
+        timestamps = [0, -1, 2 ** 62, 1704067200, 5]
+        datas = ["", "€uro", "a,b", "\n", "z"]
+        assert decode_events(encode_events(ids, timestamps, datas)) == (ids, timestamps, datas)
+
+    def test_empty(self):
+        assert decode_events(encode_events([], [], [])) == ([], [], [])
+
+
+class TestWriteAheadLog:
+    """Tests del WAL"""
+
+    def test_replay_truncates_torn_tail(self, tmp_path):
+        wal = WriteAheadLog(tmp_path, fsync=False)
+        wal.open(0)
+        wal.append([b"one", b"two"])
+        wal.close()
+        with open(wal.path(0), "ab") as f:
+            f.write(b"\x09\x00\x00\x00\x00\x00\x00\x00par")  # Registro a medio escribir
+        wal.open(1)
+        wal.append([b"three"])
+        wal.close()
+
+        assert list(wal.replay(0)) == [b"one", b"two", b"three"]
+        assert wal.path(0).stat().st_size == 2 * 8 + 6  # Truncado tras el último registro válido
+
+    def test_replay_stops_at_bad_crc(self, tmp_path):
+        wal = WriteAheadLog(tmp_path, fsync=False)
+        wal.open(0)
+        wal.append([b"good", b"flip"])
+        wal.close()
+        data = bytearray(wal.path(0).read_bytes())
+        data[-1] ^= 0xFF
+        wal.path(0).write_bytes(bytes(data))
+        assert list(wal.replay(0)) == [b"good"]
+
+
+class TestEventStore:
+    """Tests del almacén"""
+
+    def test_selection_matches_process_events(self, tmp_path):
+        now = int(time.time())
+        for seed in range(5):
+            events = make_events(200, prefix=f"s{seed}_", base=now, seed=seed)
+            # Empates en el timestamp más alto: gana el primero que llegó, como en max()
+            events.append(Event(event_id=f"s{seed}_tie", timestamp=max(e.timestamp for e in events), data="tie"))
+            store = EventStore.open(str(tmp_path / str(seed)), fsync=False)
+            for start in range(0, len(events), 37):
+                store.submit(events[start:start + 37]).result()
+            expected = EventProcessorService.process_events(EventsRequest.model_construct(events=events))
+            assert store.latest_future(now) == expected
+            store.close()
+
+    def test_no_future_events(self, store):
+        store.submit(make_events(10, base=1000, spread=10)).result()
+        assert store.latest_future() is None
+        assert store.latest_future(now=0).timestamp >= 990
+
+    def test_duplicates_rejected(self, store):
+        store.submit(make_events(3)).result()
+        with pytest.raises(ValueError, match="duplicados"):
+            store.submit([Event(event_id="e1", timestamp=1, data="x")])
+        with pytest.raises(ValueError, match="duplicados"):
+            store.submit([Event(event_id="n", timestamp=1, data="x"), Event(event_id="n", timestamp=2, data="y")])
+        assert len(store) == 3
+
+    def test_concurrent_writers_are_group_committed(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False, commit_delay=0.01)
+        commits_before = store._group_size.count  # Histograma global, compartido entre tests
+        futures = []
+
+        def writer(index):
+            futures.append(store.submit(make_events(5, prefix=f"w{index}_")))
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert sum(future.result() for future in futures) == 100
+        store.close(snapshot=False)
+        # Con la espera de 10 ms los 20 lotes caben en muy pocos commits
+        assert len(list(store._wal.replay(0))) == 20
+        assert store._group_size.count - commits_before < 20
+
+    def test_recovery_from_wal(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False)
+        store.submit(make_events(50)).result()
+        winner = store.latest_future()
+        store.close(snapshot=False)
+
+        reopened = EventStore.open(str(tmp_path), fsync=False)
+        assert len(reopened) == 50
+        assert reopened.recovery.wal_events == 50 and reopened.recovery.snapshot_events == 0
+        assert reopened.latest_future() == winner
+        reopened.close()
+
+    def test_submit_does_not_wait_for_indexing(self, store, monkeypatch):
+        indexing, release = threading.Event(), threading.Event()
+        inserted = IndexVersion.inserted
+
+        def slow_inserted(version, rows, best):
+            indexing.set()
+            assert release.wait(5)
+            return inserted(version, rows, best)
+
+        monkeypatch.setattr(IndexVersion, "inserted", slow_inserted)
+        first = store.submit(make_events(10, prefix="a"))
+        assert indexing.wait(5)
+        started = time.perf_counter()
+        second = store.submit(make_events(10, prefix="b"))  # Con el commit de "a" indexando
+        assert time.perf_counter() - started < 1
+        with pytest.raises(ValueError):
+            store.submit(make_events(1, prefix="a"))  # Ya en _events, aún no publicado
+        assert len(store.scan(0, 2 ** 40)) == 0
+        release.set()
+        assert first.result(5) == second.result(5) == 10
+        assert len(store.scan(0, 2 ** 40)) == 20
+
+    def test_recovery_from_snapshot_and_wal_tail(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=1)
+        store.submit(make_events(40, prefix="a")).result()  # Dispara un snapshot
+        while store._snapshot_thread is None:  # Se lanza justo después de confirmar el lote
+            time.sleep(0.001)
+        store._snapshot_thread.join()
+        store.snapshot_bytes = 0
+        store.submit(make_events(10, prefix="b")).result()
+        store._closing = True  # Simula una caída: sin snapshot final
+        with store._cond:
+            store._cond.notify_all()
+        store._commit_thread.join()
+        store._wal.close()
+        store._lock_file.close()
+
+        reopened = EventStore.open(str(tmp_path), fsync=False)
+        assert reopened.recovery.snapshot_events == 40
+        assert reopened.recovery.wal_events == 10
+        assert len(reopened) == 50
+        reopened.close()
+
+    def test_close_writes_snapshot_and_removes_wal(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False)
+        store.submit(make_events(20)).result()
+        store.close()
+        snapshots = list(tmp_path.glob("snapshot-*.bin"))
+        assert len(snapshots) == 1
+        ids, _, _ = read_snapshot(snapshots[0])
+        assert ids == [f"e{i}" for i in range(20)]  # En orden de llegada
+        assert all(path.stat().st_size == 0 for path in tmp_path.glob("wal-*.log"))
+
+    def test_corrupt_snapshot_is_detected(self, tmp_path):
+        store = EventStore.open(str(tmp_path), fsync=False)
+        store.submit(make_events(5)).result()
+        store.close()
+        snapshot = next(tmp_path.glob("snapshot-*.bin"))
+        data = bytearray(snapshot.read_bytes())
+        data[12] ^= 0xFF
+        snapshot.write_bytes(bytes(data))
+        with pytest.raises(StoreCorruptedError):
+            EventStore.open(str(tmp_path), fsync=False)
+
+    def test_directory_is_locked(self, store):
+        with pytest.raises(RuntimeError, match="otro proceso"):
+            EventStore.open(str(store.directory), fsync=False)
+
+
+@pytest.fixture
+def sqlite_store(tmp_path):
+    store = SQLiteEventStore.open(str(tmp_path), fsync=False)
+    yield store
+    store.close()
+
+
+class TestSQLiteEventStore:
+    """Tests del almacén SQLite"""
+
+    def test_selection_matches_process_events(self, tmp_path):
+        now = int(time.time())
+        for seed in range(5):
+            events = make_events(200, prefix=f"s{seed}_", base=now, seed=seed)
+            events.append(Event(event_id=f"s{seed}_tie", timestamp=max(e.timestamp for e in events), data="tie"))
+            store = SQLiteEventStore.open(str(tmp_path / str(seed)), fsync=False)
+            for start in range(0, len(events), 37):
+                store.insert(events[start:start + 37])
+            expected = EventProcessorService.process_events(EventsRequest.model_construct(events=events))
+            assert store.latest_future(now) == expected
+            store.close()
+
+    def test_latest_uses_timestamp_index(self, sqlite_store):
+        from app.storage.sqlite import SELECT_LATEST_FUTURE
+        plan = sqlite_store._reader().execute("EXPLAIN QUERY PLAN " + SELECT_LATEST_FUTURE, (0,)).fetchall()
+        detail = " ".join(row[-1] for row in plan)
+        assert "USING INDEX events_timestamp" in detail
+        assert "TEMP B-TREE" not in detail  # Sin ordenar: lee la primera entrada del índice
+
+    def test_duplicates_rejected_by_unique_index(self, sqlite_store):
+        sqlite_store.insert(make_events(3))
+        with pytest.raises(ValueError, match="duplicados"):
+            sqlite_store.insert([Event(event_id="new", timestamp=1, data="x"), Event(event_id="e1", timestamp=1, data="x")])
+        with pytest.raises(ValueError, match="duplicados"):
+            sqlite_store.insert([Event(event_id="n", timestamp=1, data="x"), Event(event_id="n", timestamp=2, data="y")])
+        assert len(sqlite_store) == 3
+        assert "new" not in sqlite_store  # La transacción se deshace entera
+
+    def test_concurrent_readers_use_one_connection_per_thread(self, sqlite_store):
+        sqlite_store.insert(make_events(100, base=int(time.time()) + 1000, spread=10))
+        expected = sqlite_store.latest_future()
+        results = []
+
+        def reader():
+            for _ in range(20):
+                results.append(sqlite_store.latest_future())
+
+        threads = [threading.Thread(target=reader) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert results == [expected] * 160
+        assert len(sqlite_store._readers) == 9  # Ocho hilos + el del test
+
+    def test_data_survives_reopen(self, tmp_path):
+        store = SQLiteEventStore.open(str(tmp_path), fsync=False)
+        store.insert(make_events(50))
+        winner = store.latest_future(now=0)
+        store.close()
+
+        reopened = SQLiteEventStore.open(str(tmp_path), fsync=False)
+        assert len(reopened) == 50
+        assert reopened.latest_future(now=0) == winner
+        assert reopened.get("e7").data == "d7"
+        reopened.close()
+
+
+@pytest.fixture(params=["wal", "sqlite"])
+def any_store(request, tmp_path):
+    if request.param == "wal":
+        store = EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=0)
+    else:
+        store = SQLiteEventStore.open(str(tmp_path), fsync=False)
+    yield store
+    store.close()
+
+
+@pytest.fixture
+def client(any_store):
+    app.state.event_store = any_store
+    with TestClient(app) as client:
+        yield client
+    app.state.event_store = None
+
+
+def write(store, events):
+    if isinstance(store, SQLiteEventStore):
+        store.insert(events)
+    else:
+        store.submit(events).result()
+
+
+class TestRangeQueries:
+    """Tests de las consultas por rango, con los dos backends"""
+
+    def test_scan_matches_sorted_filter(self, any_store):
+        events = make_events(300, base=5000, spread=50)
+        events += [Event(event_id=f"tie{i}", timestamp=5000, data="t") for i in (3, 1, 2)]
+        write(any_store, events)
+        expected = sorted((e for e in events if 4980 <= e.timestamp < 5020),
+                          key=lambda e: (e.timestamp, e.event_id))
+
+        pages, after = [], None
+        while True:
+            page = any_store.scan(4980, 5020, after, limit=7)
+            pages.extend(page)
+            if len(page) < 7:
+                break
+            after = (page[-1].timestamp, page[-1].event_id)
+        assert pages == expected
+
+    def test_scan_bounds(self, any_store):
+        write(any_store, [Event(event_id=f"b{t}", timestamp=t, data="x") for t in range(10, 20)])
+        assert [e.timestamp for e in any_store.scan(12, 15)] == [12, 13, 14]  # end excluido
+        assert any_store.scan(20, 30) == []
+        # Un cursor anterior al rango no saca eventos de fuera
+        assert [e.timestamp for e in any_store.scan(12, 15, after=(0, "z"))] == [12, 13, 14]
+
+
+class TestExpiry:
+    """Tests de la expiración de eventos pasados, con los dos backends"""
+
+    def test_evicts_only_expired_prefix(self, any_store):
+        write(any_store, [Event(event_id=f"x{t}", timestamp=t, data="d") for t in range(100, 200)])
+        evictor = ExpiryEvictor(any_store, retention=10, batch=7)
+        assert evictor.run_once(now=160) == 50  # timestamp < 150, en varios lotes
+        assert len(any_store) == 50
+        assert any_store.oldest_timestamp() == 150
+        assert "x149" not in any_store and "x150" in any_store
+        assert [e.timestamp for e in any_store.scan(0, 1000, limit=3)] == [150, 151, 152]
+        assert evictor.run_once(now=160) == 0
+
+    def test_pass_is_bounded(self, any_store):
+        write(any_store, [Event(event_id=f"x{t}", timestamp=t, data="d") for t in range(1000)])
+        evictor = ExpiryEvictor(any_store, batch=10, max_pass=0)  # Un solo lote por pasada
+        assert evictor.run_once(now=5000) == 10
+        assert evictor._lag.value == 5000 - 10  # Lo que queda por borrar
+        while evictor.run_once(now=5000):
+            pass
+        assert len(any_store) == 0 and any_store.oldest_timestamp() is None
+        assert evictor._lag.value == 0
+
+    def test_winner_survives_eviction(self, any_store):
+        now = int(time.time())
+        write(any_store, make_events(50, base=now, spread=100))
+        expected = any_store.latest_future(now)
+        ExpiryEvictor(any_store).run_once(now=now)
+        assert any_store.latest_future(now) == expected
+        assert all(e.timestamp >= now for e in any_store.scan(0, now + 1000, limit=100))
+
+    @pytest.mark.parametrize("backend", [EventStore, SQLiteEventStore])
+    def test_encoded_bytes(self, tmp_path, backend):
+        def open_store():
+            if backend is EventStore:
+                return EventStore.open(str(tmp_path), fsync=False, snapshot_bytes=0)
+            return SQLiteEventStore.open(str(tmp_path), fsync=False)
+
+        def size(events):
+            columns = ([e.event_id for e in events], [e.timestamp for e in events], [e.data for e in events])
+            return len(encode_events(*columns)) - HEADER_SIZE
+
+        old = [Event(event_id=f"x{t}", timestamp=t, data="d" * t) for t in range(10, 20)]
+        new = [Event(event_id="ñ", timestamp=500, data="€" * 100)]
+        store = open_store()
+        write(store, old)
+        write(store, new)
+        assert store.encoded_bytes == size(old) + size(new)
+        ExpiryEvictor(store, batch=3).run_once(now=100)
+        assert store.encoded_bytes == size(new)
+        store.close()
+        store = open_store()  # Se recupera al reabrir
+        try:
+            assert store.encoded_bytes == size(new)
+        finally:
+            store.close()
+
+    def test_evicted_ids_can_be_stored_again(self, any_store):
+        write(any_store, [Event(event_id="again", timestamp=10, data="old")])
+        ExpiryEvictor(any_store).run_once(now=100)
+        write(any_store, [Event(event_id="again", timestamp=200, data="new")])
+        assert any_store.get("again").data == "new"
+
+
+class TestIndexVersion:
+    """Tests del índice de versiones inmutables"""
+
+    @pytest.fixture(autouse=True)
+    def small_nodes(self, monkeypatch):
+        # Hojas y ramas pequeñas para que los tests partan nodos
+        monkeypatch.setattr(index_module, "LEAF", 4)
+        monkeypatch.setattr(index_module, "BRANCH", 3)
+
+    @staticmethod
+    def rows(rng, start, count):
+        return [(rng.randrange(500), f"r{i:05d}", f"d{i}") for i in range(start, start + count)]
+
+    def test_matches_sorted_list(self):
+        rng = random.Random(7)
+        version = IndexVersion.build([])
+        expected = []
+        for step in range(60):
+            batch = self.rows(rng, step * 20, rng.randint(1, 20))
+            previous, snapshot = version, list(expected)
+            version = version.inserted(batch, None)
+            expected = sorted(expected + batch)
+            # La versión anterior no cambia
+            assert previous.first(len(previous)) == snapshot and len(previous) == len(snapshot)
+            if step % 7 == 6:
+                count = version.count_before((rng.randrange(500), ""))
+                version, expected = version.without_first(count, None), expected[count:]
+
+            assert len(version) == len(expected) and version.first(len(version)) == expected
+            assert version.last() == (expected[-1] if expected else None)
+            assert version.oldest_timestamp() == (expected[0][0] if expected else None)
+            start, end = sorted(rng.randrange(500) for _ in range(2))
+            key = (start, "")
+            assert version.count_before(key) == sum(1 for row in expected if row < key)
+            page = [(event_id, ts, data) for ts, event_id, data in expected if start <= ts < end][:10]
+            assert version.range(key, end, 10) == page
+
+    def test_without_first_whole_nodes(self):
+        rows = [(t, f"r{t}", "d") for t in range(100)]
+        version = IndexVersion.build(rows, number=3)
+        for count in (0, 1, 4, 12, 13, 37, 99, 100):
+            remaining = version.without_first(count, None)
+            assert remaining.number == 4
+            assert remaining.first(200) == rows[count:]
+            assert remaining.range((0, ""), 1000, 5) == [(e, t, d) for t, e, d in rows[count:count + 5]]
+
+    def test_numbers_and_winner(self):
+        version = IndexVersion.build([], number=5)
+        assert version.range((0, ""), 10, 10) == [] and version.last() is None
+        version = version.inserted([(3, "a", "x")], ("a", 3, "x"))
+        assert version.number == 6 and version.best == ("a", 3, "x")
+
+
+class TestCursors:
+    """Tests de los cursores de paginación"""
+
+    def test_roundtrip(self):
+        assert decode_cursor(encode_cursor(1704067200, "evt_ñ/+=")) == (1704067200, "evt_ñ/+=")
+
+    @pytest.mark.parametrize("cursor", ["", "!!", "bm90IGpzb24", encode_cursor(1, "a")[:-3], "WyJhIiwxXQ"])
+    def test_invalid(self, cursor):
+        with pytest.raises(ValueError, match="Cursor inválido"):
+            decode_cursor(cursor)
+
+
+class TestStoreEndpoints:
+    """Tests de los endpoints del almacén, con los dos backends"""
+
+    def test_store_and_latest(self, client):
+        future = int(time.time()) + 3600
+        events = [{"event_id": "a", "timestamp": future, "data": "x"},
+                  {"event_id": "b", "timestamp": future - 60, "data": "y"}]
+        response = client.post("/events/store", json={"events": events})
+        assert response.status_code == 201
+        assert response.json() == {"stored": 2, "total": 2}
+
+        latest = client.get("/events/latest")
+        assert latest.status_code == 200
+        assert latest.json()["event_id"] == "a"
+        assert client.get("/events/latest", headers={"If-None-Match": latest.headers["etag"]}).status_code == 304
+
+    def test_latest_is_revalidated_after_writes(self, client):
+        empty = client.get("/events/latest")
+        assert empty.status_code == 204
+        assert empty.headers["cache-control"] == "private, no-cache"
+
+        future = int(time.time()) + 3000
+        client.post("/events/store", json={"events": [{"event_id": "a", "timestamp": future, "data": "x"}]})
+        first = client.get("/events/latest", headers={"If-None-Match": empty.headers["etag"]})
+        assert first.status_code == 200
+        assert first.headers["cache-control"] == "private, no-cache"
+
+        client.post("/events/store", json={"events": [{"event_id": "b", "timestamp": future + 1, "data": "y"}]})
+        second = client.get("/events/latest", headers={"If-None-Match": first.headers["etag"]})
+        assert second.status_code == 200
+        assert second.json()["event_id"] == "b"
+
+    def test_duplicate_against_store(self, client):
+        event = {"event_id": "dup", "timestamp": int(time.time()) + 60, "data": "x"}
+        assert client.post("/events/store", json={"events": [event]}).status_code == 201
+        response = client.post("/events/store", json={"events": [event]})
+        assert response.status_code == 400
+        assert "duplicados" in response.json()["detail"]
+
+    def test_latest_without_events(self, client):
+        assert client.get("/events/latest").status_code == 204
+
+    def test_disabled_store(self):
+        with TestClient(app) as client:
+            assert client.get("/events/latest").status_code == 503
+
+    def test_range_pagination(self, client):
+        base = int(time.time()) + 1000
+        events = [{"event_id": f"r{i:02d}", "timestamp": base + i % 5, "data": str(i)} for i in range(23)]
+        assert client.post("/events/store", json={"events": events}).status_code == 201
+
+        seen, cursor = [], None
+        while True:
+            params = {"start": base, "end": base + 4, "limit": 5}
+            if cursor:
+                params["cursor"] = cursor
+            page = client.get("/events/range", params=params).json()
+            seen.extend(page["events"])
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+        expected = sorted((e for e in events if e["timestamp"] < base + 4),
+                          key=lambda e: (e["timestamp"], e["event_id"]))
+        assert seen == expected
+
+    def test_range_etag(self, client):
+        params = {"start": 0, "end": 2 ** 40}
+        first = client.get("/events/range", params=params)
+        assert first.json() == {"events": [], "next_cursor": None}
+        assert client.get("/events/range", params=params,
+                          headers={"If-None-Match": first.headers["etag"]}).status_code == 304
+        client.post("/events/store", json={"events": [{"event_id": "n", "timestamp": 100, "data": "x"}]})
+        assert client.get("/events/range", params=params,
+                          headers={"If-None-Match": first.headers["etag"]}).status_code == 200
+
+    def test_range_rejects_bad_input(self, client):
+        assert client.get("/events/range", params={"start": 10, "end": 10}).status_code == 400
+        assert client.get("/events/range", params={"start": 0, "end": 10, "cursor": "??"}).status_code == 400
+        assert client.get("/events/range", params={"start": 0, "end": 10, "limit": 0}).status_code == 422
+
+    def test_export_ndjson(self, client, monkeypatch):
+        from app import routes
+        monkeypatch.setattr(routes.settings, "event_store_max_page_size", 4)  # Varios lotes
+        events = [{"event_id": f"x{i}", "timestamp": 1000 + i, "data": "d"} for i in range(10)]
+        client.post("/events/store", json={"events": events})
+        response = client.get("/events/range/export", params={"start": 1002, "end": 1010})
+        assert response.headers["content-type"] == "application/x-ndjson"
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert lines == events[2:]
@@ -0,0 +1,104 @@
+"""
+Tests para el calentamiento, la disponibilidad y las métricas
+=============================================================
+"""
+
+import asyncio
+from fastapi.testclient import TestClient
+
+import sys
+from pathlib import Path
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.main import app
+from app.metrics import MetricsRegistry
+from app.warmup import Readiness, asgi_request, internal_host, readiness, run_warmup
+
+
+class TestWarmup:
+    """Tests para el calentamiento del worker"""
+
+    def test_asgi_request(self):
+        """Test de una petición ASGI en el mismo proceso"""
+        status, body = asyncio.run(asgi_request(app, "GET", "/health/"))
+
+        assert status == 200
+        assert b"healthy" in body
+
+    def test_run_warmup_marks_ready(self, monkeypatch):
+        """Test de que el calentamiento marca el worker como disponible"""
+        state = Readiness()
+        monkeypatch.setattr("app.warmup.readiness", state)
+
+        snapshot = asyncio.run(run_warmup(app, rounds=1))
+
+        assert state.ready
+        assert snapshot["status"] == "ready"
+        assert snapshot["warmup_requests"] == 7
+        assert snapshot["warmup_errors"] == 0
+        assert snapshot["warmup_duration_ms"] > 0
+
+    def test_internal_host(self):
+        """Test de selección de la cabecera Host interna"""
+        assert internal_host(["*.example.com", "api.example.com"]) == "api.example.com"
+        assert internal_host(["*"]) == "localhost"
+
+
+class TestReadinessRoutes:
+    """Tests para /health/ready"""
+
+    def test_ready_after_startup(self):
+        """Test de disponibilidad tras el arranque"""
+        with TestClient(app) as client:
+            response = client.get("/health/ready")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+
+    def test_not_ready_while_warming_up(self, monkeypatch):
+        """Test de 503 mientras el worker se calienta, con liveness disponible"""
+        monkeypatch.setattr(readiness, "ready", False)
+        client = TestClient(app)
+
+        assert client.get("/health/ready").status_code == 503
+        assert client.get("/health/ready").json()["status"] == "warming_up"
+        assert client.get("/health/").status_code == 200
+
+
+class TestMetrics:
+    """Tests para el registro y el endpoint de métricas"""
+
+    def test_registry_snapshot(self):
+        """Test de contadores, gauges e histogramas"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total").inc()
+        registry.counter("requests_total").inc(2)
+        registry.gauge("inflight", labels={"lane": "small"}).set(4)
+        registry.histogram("latency_seconds", buckets=(0.1, 1.0)).observe(0.5)
+
+        snapshot = registry.snapshot()
+
+        assert snapshot["requests_total"] == 3
+        assert snapshot['inflight{lane="small"}'] == 4
+        assert snapshot["latency_seconds"]["buckets"] == {"0.1": 0, "1": 1, "+Inf": 1}
+
+    def test_prometheus_format(self):
+        """Test del formato de texto de Prometheus"""
+        registry = MetricsRegistry()
+        registry.histogram("latency_seconds", "Latencia", buckets=(0.1,)).observe(0.05)
+
+        text = registry.render_prometheus()
+
+        assert "# TYPE latency_seconds histogram" in text
+        assert 'latency_seconds_bucket{le="0.1"} 1' in text
+        assert "latency_seconds_count 1" in text
+
+    def test_metrics_endpoint(self):
+        """Test del endpoint de métricas"""
+        with TestClient(app) as client:
+            json_response = client.get("/health/metrics")
+            text_response = client.get("/health/metrics", params={"format": "prometheus"})
+
+        assert json_response.status_code == 200
+        assert "warmup_duration_seconds" in json_response.json()
+        assert "# TYPE warmup_duration_seconds gauge" in text_response.text